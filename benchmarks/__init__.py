@@ -0,0 +1,5 @@
+"""
+Benchmarks package for event contract trading.
+
+Each module can be run directly, e.g. `python -m benchmarks.calculator_benchmark`.
+"""
@@ -0,0 +1,107 @@
+import math
+import time
+from typing import List, Tuple
+from models.Orderbook import Orderbook
+from platforms.TestPlatform import TestPlatform
+from services.arbitrage_finder.calculator import calculate_cross_platform_arbitrage, calculate_many
+
+PROFIT_THRESHOLD = 0.05
+EXPECTED_SLIPPAGE = 0.01
+MAX_COST = 50_000_000
+
+
+def binary_search_details(levels1: List[List[int]], levels2: List[List[int]], max_cost=None) -> Tuple[int, int, int, int]:
+    """The double binary search the breakpoint walk replaced, kept here as the baseline."""
+    def build_curve(levels):
+        cumulative, total_qty, total_cost = [], 0, 0
+        for price, qty in levels:
+            total_qty += qty
+            total_cost += price * qty
+            cumulative.append((total_qty, total_cost, price))
+        return cumulative
+
+    def cost_of_shares(X, curve):
+        for q, c, p in curve:
+            if q >= X:
+                return c - p * (q - X)
+        return float("inf")
+
+    def price_of_share(X, curve):
+        last_qty = 0
+        for q, _, p in curve:
+            if last_qty < X <= q:
+                return p
+            last_qty = q
+        return float("inf")
+
+    curve1, curve2 = build_curve(levels1), build_curve(levels2)
+    lo, hi = 1, min(curve1[-1][0], curve2[-1][0]) if curve1 and curve2 else 0
+    best_profit_shares = 0
+    while lo <= hi:
+        mid = (hi + lo) // 2
+        if price_of_share(mid, curve1) + price_of_share(mid, curve2) >= 1000:
+            hi = mid - 1
+            continue
+        cost = cost_of_shares(mid, curve1) + cost_of_shares(mid, curve2)
+        if 1000 * mid >= math.ceil(cost * (1 + EXPECTED_SLIPPAGE) * (1 + PROFIT_THRESHOLD)):
+            best_profit_shares = mid
+            lo = mid + 1
+        else:
+            hi = mid - 1
+
+    best_cost_shares = float("inf")
+    if max_cost is not None:
+        lo, hi, best_cost_shares = 1, min(curve1[-1][0], curve2[-1][0]) if curve1 and curve2 else 0, 0
+        while lo <= hi:
+            mid = (lo + hi) // 2
+            if cost_of_shares(mid, curve1) + cost_of_shares(mid, curve2) <= max_cost:
+                best_cost_shares = mid
+                lo = mid + 1
+            else:
+                hi = mid - 1
+
+    final_shares = min(best_profit_shares, best_cost_shares)
+    if final_shares <= 0:
+        return 0, 0, 0, 0
+    total_cost = cost_of_shares(final_shares, curve1) + cost_of_shares(final_shares, curve2)
+    return final_shares, total_cost, price_of_share(final_shares, curve1), price_of_share(final_shares, curve2)
+
+
+def _time(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def run(num_levels: int, num_pairs: int) -> None:
+    books = TestPlatform(num_levels=num_levels).get_order_books([f"market-{i}" for i in range(2 * num_pairs)])
+    pairs: List[Tuple[Orderbook, Orderbook]] = list(zip(books[0::2], books[1::2]))
+    kwargs = {"profit_threshold": PROFIT_THRESHOLD, "expected_slippage": EXPECTED_SLIPPAGE, "max_cost": MAX_COST}
+
+    legacy = []
+    legacy_s = _time(lambda: legacy.extend(
+        (binary_search_details(ob1.yes["ask"], ob2.no["ask"], MAX_COST), binary_search_details(ob2.yes["ask"], ob1.no["ask"], MAX_COST))
+        for ob1, ob2 in pairs
+    ))
+    walked = []
+    walk_s = _time(lambda: walked.extend(calculate_cross_platform_arbitrage(ob1, ob2, **kwargs) for ob1, ob2 in pairs))
+    batched = []
+    batch_s = _time(lambda: batched.extend(calculate_many(pairs, **kwargs)))
+
+    # Same answer as the baseline for every pair that has an opportunity.
+    for (details1, details2), opportunity in zip(legacy, walked):
+        if opportunity:
+            expected = details1 if opportunity["type"] == "yes1_no2" else details2
+            assert expected == (opportunity["shares"], opportunity["total_cost"], opportunity["max_price_1"], opportunity["max_price_2"])
+    assert batched == walked
+
+    print(
+        f"{num_levels:>5} levels x {num_pairs} pairs | binary search {legacy_s * 1000:9.1f} ms | "
+        f"breakpoint walk {walk_s * 1000:8.1f} ms ({legacy_s / walk_s:5.1f}x) | "
+        f"calculate_many {batch_s * 1000:8.1f} ms ({legacy_s / batch_s:5.1f}x)"
+    )
+
+
+if __name__ == "__main__":
+    run(num_levels=100, num_pairs=200)
+    run(num_levels=1000, num_pairs=50)
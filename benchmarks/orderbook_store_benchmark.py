@@ -0,0 +1,37 @@
+import random
+import time
+from feeds.BookSource import BookDelta, BookSnapshot
+from feeds.OrderbookStore import OrderbookStore, _Ladder
+
+
+def run(depth: int, num_deltas: int = 100_000, num_reads: int = 2_000, seed: int = 7) -> None:
+    """
+    Times price-level changes on a ladder about `depth` levels deep, half of them adding or
+    removing a level, and the first read of a four-ladder book of that depth after a change.
+    """
+    rng = random.Random(seed)
+    # Prices are tenths of a cent, so a ladder never holds more than 1001 levels.
+    price_range = range(min(1001, 2 * depth))
+    levels = [[price, rng.randint(1, 5000)] for price in rng.sample(price_range, depth)]
+
+    ladder = _Ladder(levels)
+    changes = [(rng.choice(price_range), rng.choice([0, rng.randint(1, 5000)])) for _ in range(num_deltas)]
+    start = time.perf_counter()
+    for price, qty in changes:
+        ladder.set(price, qty)
+    set_s = (time.perf_counter() - start) / num_deltas
+
+    store = OrderbookStore()
+    store.apply_snapshot(BookSnapshot("M", 0, yes_bid=levels, yes_ask=levels, no_bid=levels, no_ask=levels))
+    start = time.perf_counter()
+    for t in range(1, num_reads + 1):
+        store.apply_delta(BookDelta("M", t, "yes", "ask", levels[0][0], t))
+        store.get_order_book("M").prefix_sums("yes")
+    read_s = (time.perf_counter() - start) / num_reads
+
+    print(f"{depth:>5} levels | set {set_s * 1e9:6.0f} ns | first read after a change {read_s * 1e6:7.1f} us")
+
+
+if __name__ == "__main__":
+    for depth in (10, 100, 500, 1000):
+        run(depth)
@@ -0,0 +1,62 @@
+import json
+import os
+import random
+import tempfile
+import time
+from feeds.OrderbookStore import OrderbookStore
+from feeds.PolymarketBookFeed import PolymarketReplaySource
+
+
+def write_market_channel_log(path: str, num_markets: int, num_events: int, seed: int = 7) -> dict:
+    """
+    Writes a synthetic market-channel log: one `book` per token, then random `price_change`
+    frames. Returns the condition ID -> [yes_token_id, no_token_id] mapping for the replay.
+    """
+    rng = random.Random(seed)
+    markets = {f"0xcondition{i}": [f"yes-token-{i}", f"no-token-{i}"] for i in range(num_markets)}
+    tokens = [token for token_ids in markets.values() for token in token_ids]
+    with open(path, "w") as f:
+        for token in tokens:
+            f.write(json.dumps({
+                "event_type": "book",
+                "asset_id": token,
+                "timestamp": "0",
+                "bids": [{"price": f"0.{p:02d}", "size": f"{rng.randint(1, 5000)}.{rng.randint(0, 99):02d}"} for p in range(1, 48)],
+                "asks": [{"price": f"0.{p:02d}", "size": f"{rng.randint(1, 5000)}.{rng.randint(0, 99):02d}"} for p in range(52, 100)],
+            }))
+            f.write("\n")
+        for t in range(1, num_events + 1):
+            change = {
+                "asset_id": rng.choice(tokens),
+                "price": f"0.{rng.randint(1, 99):02d}",
+                "size": rng.choice(["0", f"{rng.randint(1, 5000)}.{rng.randint(0, 99):02d}"]),
+                "side": rng.choice(["BUY", "SELL"]),
+            }
+            f.write(json.dumps({"event_type": "price_change", "timestamp": str(t), "price_changes": [change]}))
+            f.write("\n")
+    return markets
+
+
+def run(num_markets: int, num_events: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "market_channel.jsonl")
+        markets = write_market_channel_log(path, num_markets, num_events)
+
+        store = OrderbookStore()
+        start = time.perf_counter()
+        count = store.consume(PolymarketReplaySource(path, markets))
+        elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        books = store.get_order_books(list(markets))
+        read_s = time.perf_counter() - start
+
+    print(
+        f"{num_markets:>4} markets | replayed {count} events in {elapsed * 1000:8.1f} ms ({count / elapsed:9,.0f} events/s) | "
+        f"read {len(books)} books in {read_s * 1e6:8.0f} us"
+    )
+
+
+if __name__ == "__main__":
+    run(num_markets=10, num_events=100_000)
+    run(num_markets=500, num_events=100_000)
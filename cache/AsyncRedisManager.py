@@ -0,0 +1,143 @@
+from typing import Iterable, Optional
+import redis
+import redis.asyncio
+from cache.RedisManager import (
+    claimed_messages,
+    connect,
+    pending_entries,
+    queue_delivery_counts,
+    queue_stream_stats,
+    queue_xacks,
+    queue_xadds,
+    split_poison_messages,
+    stream_stats_from,
+    stream_trim_policy,
+)
+
+class AsyncRedisManager:
+    """
+    asyncio counterpart of RedisManager, on `redis.asyncio`, for services that run on an event
+    loop. Methods mirror RedisManager's names and behaviour (including printing and swallowing
+    errors) but are coroutines, so stream I/O overlaps with the service's other requests. The
+    commands and the handling of their replies come from the helpers in cache.RedisManager; only
+    executing them differs.
+    """
+
+    def __init__(self, host=None, port=6379, db=0, **client_options):
+        """
+        Initializes the AsyncRedisManager. Like RedisManager, it uses REDIS_URL if set and falls
+        back to the provided host, port, and db. No connection is made until the first command.
+        """
+        self.redis_client = connect(redis.asyncio, host, port, db, **client_options)
+        self._claim_cursors = {}
+
+        print("AsyncRedisManager initialized.")
+
+    async def close(self):
+        await self.redis_client.aclose()
+
+    async def add_to_stream(self, stream_name: str, message: dict):
+        """Adds a message to a Redis Stream. See RedisManager.add_to_stream."""
+        try:
+            await self.redis_client.xadd(stream_name, message, approximate=True, **stream_trim_policy(stream_name))
+        except Exception as e:
+            print(f"Error adding to stream {stream_name}: {e}")
+
+    async def add_many_to_stream(self, stream_name: str, messages: Iterable[dict], maxlen: Optional[int] = None, batch_size: int = 500) -> list:
+        """Adds messages with one pipelined round trip per batch. See RedisManager.add_many_to_stream."""
+        messages = list(messages)
+        message_ids = []
+        for i in range(0, len(messages), batch_size):
+            batch = messages[i:i + batch_size]
+            try:
+                pipeline = queue_xadds(self.redis_client.pipeline(transaction=False), stream_name, batch, maxlen)
+                message_ids.extend(await pipeline.execute())
+            except Exception as e:
+                print(f"Error adding {len(batch)} messages to stream {stream_name}: {e}")
+                message_ids.extend([None] * len(batch))
+        return message_ids
+
+    async def create_consumer_group(self, stream_name: str, group_name: str):
+        """Creates a consumer group if it does not exist yet. See RedisManager.create_consumer_group."""
+        try:
+            await self.redis_client.xgroup_create(stream_name, group_name, id='0', mkstream=True)
+            print(f"Consumer group '{group_name}' created for stream '{stream_name}'.")
+        except redis.exceptions.ResponseError as e:
+            if "BUSYGROUP" in str(e):
+                print(f"Consumer group '{group_name}' already exists for stream '{stream_name}'.")
+            else:
+                raise
+
+    async def read_from_stream(self, stream_name: str, group_name: str, consumer_name: str, count: int = 1, block_ms: Optional[int] = None):
+        """Reads new messages for a consumer group, optionally blocking. See RedisManager.read_from_stream."""
+        try:
+            response = await self.redis_client.xreadgroup(group_name, consumer_name, {stream_name: '>'}, count=count, block=block_ms)
+            if response:
+                return response[0][1]
+            return None
+        except Exception as e:
+            print(f"Error reading from stream {stream_name}: {e}")
+            return None
+
+    async def acknowledge_message(self, stream_name: str, group_name: str, message_id: str):
+        """Acknowledges one processed message."""
+        try:
+            await self.redis_client.xack(stream_name, group_name, message_id)
+        except Exception as e:
+            print(f"Error acknowledging message {message_id} in stream {stream_name}: {e}")
+
+    async def acknowledge_messages(self, stream_name: str, group_name: str, message_ids: Iterable[str], batch_size: int = 1000) -> int:
+        """Acknowledges processed messages in multi-ID XACKs. See RedisManager.acknowledge_messages."""
+        message_ids = list(message_ids)
+        if not message_ids:
+            return 0
+        try:
+            pipeline = queue_xacks(self.redis_client.pipeline(transaction=False), stream_name, group_name, message_ids, batch_size)
+            return sum(await pipeline.execute())
+        except Exception as e:
+            print(f"Error acknowledging {len(message_ids)} messages in stream {stream_name}: {e}")
+            return 0
+
+    async def claim_stale_messages(
+        self,
+        stream_name: str,
+        group_name: str,
+        consumer_name: str,
+        min_idle_ms: int,
+        count: int = 100,
+        max_deliveries: int = 5,
+        dead_letter_stream: Optional[str] = None,
+    ) -> list:
+        """Reclaims stale pending messages and dead-letters poison ones. See RedisManager.claim_stale_messages."""
+        dead_letter_stream = dead_letter_stream or f"{stream_name}:dead_letter"
+        cursor_key = (stream_name, group_name)
+        try:
+            response = await self.redis_client.xautoclaim(
+                stream_name, group_name, consumer_name, min_idle_ms,
+                start_id=self._claim_cursors.get(cursor_key, "0-0"), count=count,
+            )
+            self._claim_cursors[cursor_key], claimed = claimed_messages(response)
+            if not claimed:
+                return []
+            pipeline = self.redis_client.pipeline(transaction=False)
+            pending = pending_entries(await queue_delivery_counts(pipeline, stream_name, group_name, consumer_name, claimed).execute())
+        except Exception as e:
+            print(f"Error claiming stale messages in stream {stream_name}: {e}")
+            return []
+
+        retry, dead_letters, dead_ids = split_poison_messages(stream_name, claimed, pending, max_deliveries)
+        if dead_letters:
+            print(f"Moving {len(dead_ids)} messages from stream {stream_name} to {dead_letter_stream} after {max_deliveries} deliveries.")
+            if all(await self.add_many_to_stream(dead_letter_stream, dead_letters)):
+                await self.acknowledge_messages(stream_name, group_name, dead_ids)
+        return retry
+
+    async def stream_stats(self, stream_name: str, group_name: str) -> dict:
+        """Stream length, pending-list size and consumer idle times. See RedisManager.stream_stats."""
+        try:
+            pipeline = queue_stream_stats(self.redis_client.pipeline(transaction=False), stream_name, group_name)
+            length, pending, consumers = await pipeline.execute()
+        except Exception as e:
+            print(f"Error reading stats for stream {stream_name}: {e}")
+            return {}
+        return stream_stats_from(length, pending, consumers)
@@ -0,0 +1,59 @@
+from typing import List
+import hashlib
+from models.Market import Market
+
+class MarketDeduplicator:
+    """
+    Remembers which markets the poller has already published, so unchanged markets are not
+    sent downstream again every cycle.
+
+    Each (platform, market_id) has a Redis key holding a hash of the fields downstream services
+    use (name, rules and close time). A market counts as new if it has no key, and as changed if
+    the stored hash differs. Keys expire after `ttl_s`, so a market is republished at most once
+    per TTL even if nothing about it changes.
+    """
+
+    def __init__(self, redis_client, ttl_s: int = 7 * 24 * 3600, prefix: str = "seen_market"):
+        self.redis_client = redis_client
+        self.ttl_s = ttl_s
+        self.prefix = prefix
+
+    @staticmethod
+    def fingerprint(market: Market) -> str:
+        content = "\x1f".join([market.name or "", market.rules or "", str(market.close_timestamp)])
+        return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+    def _key(self, market: Market) -> str:
+        return f"{self.prefix}:{market.platform.value}:{market.market_id}"
+
+    def filter_new(self, markets: List[Market]) -> List[Market]:
+        """
+        Returns the markets that are new or whose content changed since they were last marked
+        seen. If Redis is unavailable every market is returned, so nothing is silently dropped.
+        """
+        if not markets:
+            return []
+        try:
+            stored = self.redis_client.mget([self._key(market) for market in markets])
+        except Exception as e:
+            print(f"Error reading seen markets from Redis: {e}")
+            return list(markets)
+        fresh = []
+        for market, value in zip(markets, stored):
+            if isinstance(value, bytes):
+                value = value.decode("utf-8")
+            if value != self.fingerprint(market):
+                fresh.append(market)
+        return fresh
+
+    def mark_seen(self, markets: List[Market]) -> None:
+        """Records the markets' current content. Call after they were published."""
+        if not markets:
+            return
+        try:
+            pipeline = self.redis_client.pipeline(transaction=False)
+            for market in markets:
+                pipeline.set(self._key(market), self.fingerprint(market), ex=self.ttl_s)
+            pipeline.execute()
+        except Exception as e:
+            print(f"Error recording seen markets in Redis: {e}")
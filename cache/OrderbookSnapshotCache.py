@@ -0,0 +1,269 @@
+from typing import Awaitable, Callable, Iterable, Optional
+from redis.backoff import NoBackoff
+from redis.retry import Retry
+from cache.RedisManager import RedisManager
+from models.CompactOrderbook import CompactOrderbook
+from models.PlatformType import PlatformType
+import asyncio
+import logging
+import os
+import struct
+import threading
+import time
+import uuid
+
+# While Redis is unreachable books are fetched directly, and Redis is retried after this long.
+REDIS_RETRY_S = 30.0
+
+# A snapshot value is the fetch time in ms followed by CompactOrderbook.to_bytes().
+_FETCHED_AT = struct.Struct("<q")
+
+# Deletes the fetch locks still held by the caller's token, so a lock that expired and was
+# taken by another process is not released by the old holder. Returns how many it deleted.
+RELEASE_LOCKS_SCRIPT = """
+local released = 0
+for _, key in ipairs(KEYS) do
+    if redis.call('GET', key) == ARGV[1] then
+        released = released + redis.call('DEL', key)
+    end
+end
+return released
+"""
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+class OrderbookSnapshotCache:
+    """
+    Normalized order books shared by every service and replica through Redis.
+
+    Each book is stored under orderbook:<PLATFORM>:<market_id> as its fetch time followed by the
+    CompactOrderbook binary encoding, and expires after `ttl_ms`. Readers pass the oldest
+    snapshot they accept (`max_age_ms`); older ones count as missing.
+
+    `get_many` fetches the missing books from the venue and writes them back. Each refresh is
+    single-flight: the process that wins a book's fetch lock (SET NX, expiring after `lock_ms`)
+    fetches it, and the others poll the cache for up to `wait_ms` before fetching it themselves.
+    Venue load therefore stays at one fetch per book per `max_age_ms`, however many consumers
+    read it.
+
+    While Redis is unreachable every book is fetched directly, as if there were no cache.
+
+    Settings come from the environment:
+        ORDERBOOK_CACHE_TTL_MS: how long snapshots are kept (default 60000).
+        ORDERBOOK_CACHE_LOCK_MS: fetch lock expiry (default 5000).
+        ORDERBOOK_CACHE_WAIT_MS: how long to wait for another process's fetch (default 2000).
+    """
+
+    def __init__(
+        self,
+        redis_client=None,
+        ttl_ms: Optional[int] = None,
+        lock_ms: Optional[int] = None,
+        wait_ms: Optional[int] = None,
+        poll_ms: int = 20,
+    ):
+        """
+        Args:
+            redis_client: redis-py client created with decode_responses=False, or None to fetch
+                every book directly.
+        """
+        self.redis_client = redis_client
+        self.ttl_ms = ttl_ms or int(os.getenv("ORDERBOOK_CACHE_TTL_MS", 60000))
+        self.lock_ms = lock_ms or int(os.getenv("ORDERBOOK_CACHE_LOCK_MS", 5000))
+        self.wait_ms = wait_ms if wait_ms is not None else int(os.getenv("ORDERBOOK_CACHE_WAIT_MS", 2000))
+        self.poll_ms = poll_ms
+        self._release = redis_client.register_script(RELEASE_LOCKS_SCRIPT) if redis_client is not None else None
+        self._redis_down_until = 0.0
+
+        self.hits = 0
+        self.fetched = 0
+        self.waited = 0
+
+    @staticmethod
+    def key(platform: PlatformType, market_id: str) -> str:
+        return f"orderbook:{platform.value}:{market_id}"
+
+    @staticmethod
+    def encode(orderbook, fetched_at_ms: int) -> bytes:
+        return _FETCHED_AT.pack(fetched_at_ms) + CompactOrderbook.from_orderbook(orderbook).to_bytes()
+
+    @staticmethod
+    def decode(market_id: str, value: bytes) -> tuple[CompactOrderbook, int]:
+        """(book, fetch time in ms) of an encoded snapshot."""
+        (fetched_at_ms,) = _FETCHED_AT.unpack_from(value)
+        return CompactOrderbook.from_bytes(market_id, value[_FETCHED_AT.size:]), fetched_at_ms
+
+    def _available(self) -> bool:
+        return self.redis_client is not None and time.monotonic() >= self._redis_down_until
+
+    def _redis_failed(self, e: Exception) -> None:
+        logging.warning(f"Order book cache cannot reach Redis, fetching directly: {e}")
+        self._redis_down_until = time.monotonic() + REDIS_RETRY_S
+
+    def read(self, platform: PlatformType, market_ids: list[str], max_age_ms: Optional[int] = None) -> dict:
+        """
+        market_id -> book for the cached snapshots no older than `max_age_ms` (any age if None).
+        """
+        if not market_ids or not self._available():
+            return {}
+        try:
+            values = self.redis_client.mget([self.key(platform, market_id) for market_id in market_ids])
+        except Exception as e:
+            self._redis_failed(e)
+            return {}
+        oldest = _now_ms() - max_age_ms if max_age_ms is not None else None
+        books = {}
+        for market_id, value in zip(market_ids, values):
+            if value is None:
+                continue
+            orderbook, fetched_at_ms = self.decode(market_id, value)
+            if oldest is None or fetched_at_ms >= oldest:
+                books[market_id] = orderbook
+        return books
+
+    def write(self, platform: PlatformType, orderbooks: Iterable, fetched_at_ms: Optional[int] = None) -> None:
+        """Stores books fetched at `fetched_at_ms` (now if None), in one round trip."""
+        orderbooks = list(orderbooks)
+        if not orderbooks or not self._available():
+            return
+        fetched_at_ms = fetched_at_ms or _now_ms()
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            for orderbook in orderbooks:
+                pipe.set(self.key(platform, orderbook.market_id), self.encode(orderbook, fetched_at_ms), px=self.ttl_ms)
+            pipe.execute()
+        except Exception as e:
+            self._redis_failed(e)
+
+    def _acquire(self, platform: PlatformType, market_ids: list[str], token: str) -> tuple[list, list]:
+        """
+        Takes the fetch locks that are free. Returns (market ids locked by `token`, market ids
+        another process is fetching). Without Redis every market counts as locked.
+        """
+        if not self._available():
+            return list(market_ids), []
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            for market_id in market_ids:
+                pipe.set(f"lock:{self.key(platform, market_id)}", token, nx=True, px=self.lock_ms)
+            taken = pipe.execute()
+        except Exception as e:
+            self._redis_failed(e)
+            return list(market_ids), []
+        owned = [market_id for market_id, ok in zip(market_ids, taken) if ok]
+        return owned, [market_id for market_id, ok in zip(market_ids, taken) if not ok]
+
+    def _unlock(self, platform: PlatformType, market_ids: list[str], token: str) -> None:
+        if not market_ids or not self._available():
+            return
+        try:
+            self._release(keys=[f"lock:{self.key(platform, market_id)}" for market_id in market_ids], args=[token])
+        except Exception as e:
+            self._redis_failed(e)
+
+    def get_many(
+        self,
+        platform: PlatformType,
+        market_ids: list[str],
+        fetch_many: Callable[[list[str]], list],
+        max_age_ms: int,
+    ) -> list:
+        """
+        Books of the given markets no older than `max_age_ms`, from the cache where possible and
+        otherwise through `fetch_many` (e.g. a platform's get_order_books), in `market_ids` order.
+        Markets whose book cannot be fetched are left out.
+        """
+        books = self.read(platform, market_ids, max_age_ms)
+        self.hits += len(books)
+        missing = [market_id for market_id in market_ids if market_id not in books]
+        if missing:
+            token = uuid.uuid4().hex
+            owned, others = self._acquire(platform, missing, token)
+            if owned:
+                try:
+                    fetched = fetch_many(owned)
+                    self.write(platform, fetched)
+                finally:
+                    self._unlock(platform, owned, token)
+                self.fetched += len(fetched)
+                books.update({orderbook.market_id: orderbook for orderbook in fetched})
+            deadline = time.monotonic() + self.wait_ms / 1000
+            while others and time.monotonic() < deadline:
+                time.sleep(self.poll_ms / 1000)
+                books.update(self.read(platform, others, max_age_ms))
+                others = [market_id for market_id in others if market_id not in books]
+            self.waited += len(missing) - len(owned) - len(others)
+            if others:
+                # The other fetch failed or is too slow; fetch these without waiting any longer.
+                fetched = fetch_many(others)
+                self.write(platform, fetched)
+                self.fetched += len(fetched)
+                books.update({orderbook.market_id: orderbook for orderbook in fetched})
+        return [books[market_id] for market_id in market_ids if market_id in books]
+
+    async def aget_many(
+        self,
+        platform: PlatformType,
+        market_ids: list[str],
+        afetch_many: Callable[[list[str]], Awaitable[list]],
+        max_age_ms: int,
+    ) -> list:
+        """
+        Async version of get_many taking a coroutine fetch (e.g. aget_order_books). The Redis
+        calls run in a worker thread, so the event loop is not blocked on them.
+        """
+        books = await asyncio.to_thread(self.read, platform, market_ids, max_age_ms)
+        self.hits += len(books)
+        missing = [market_id for market_id in market_ids if market_id not in books]
+        if missing:
+            token = uuid.uuid4().hex
+            owned, others = await asyncio.to_thread(self._acquire, platform, missing, token)
+            if owned:
+                try:
+                    fetched = await afetch_many(owned)
+                    await asyncio.to_thread(self.write, platform, fetched)
+                finally:
+                    await asyncio.to_thread(self._unlock, platform, owned, token)
+                self.fetched += len(fetched)
+                books.update({orderbook.market_id: orderbook for orderbook in fetched})
+            deadline = time.monotonic() + self.wait_ms / 1000
+            while others and time.monotonic() < deadline:
+                await asyncio.sleep(self.poll_ms / 1000)
+                books.update(await asyncio.to_thread(self.read, platform, others, max_age_ms))
+                others = [market_id for market_id in others if market_id not in books]
+            self.waited += len(missing) - len(owned) - len(others)
+            if others:
+                fetched = await afetch_many(others)
+                await asyncio.to_thread(self.write, platform, fetched)
+                self.fetched += len(fetched)
+                books.update({orderbook.market_id: orderbook for orderbook in fetched})
+        return [books[market_id] for market_id in market_ids if market_id in books]
+
+    def stats(self) -> dict:
+        """Books served from the cache, fetched from venues, and received from another process's fetch."""
+        return {"hits": self.hits, "fetched": self.fetched, "waited": self.waited}
+
+
+_cache: Optional[OrderbookSnapshotCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_orderbook_cache() -> OrderbookSnapshotCache:
+    """
+    The process-wide OrderbookSnapshotCache. It uses Redis unless ORDERBOOK_CACHE is "false",
+    in which case every book is fetched directly.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            redis_client = None
+            if os.getenv("ORDERBOOK_CACHE", "true").lower() != "false":
+                # Fail fast: a read should fall back to fetching, not wait on Redis retries.
+                redis_client = RedisManager(
+                    socket_connect_timeout=0.5, socket_timeout=0.5, retry=Retry(NoBackoff(), 0), decode_responses=False
+                ).redis_client
+            _cache = OrderbookSnapshotCache(redis_client)
+        return _cache
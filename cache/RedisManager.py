@@ -1,19 +1,153 @@
+from typing import Iterable, Optional
 import redis
 import os
+import time
+
+# Approximate trimming applied on every XADD so streams stay bounded. A stream gets either a
+# length cap ("maxlen") or an age cap in milliseconds ("max_age_ms", trimmed with MINID).
+# Overridable per stream with STREAM_MAXLEN_<STREAM> / STREAM_MAX_AGE_MS_<STREAM>, where
+# <STREAM> is the upper-cased stream name with ":" replaced by "_"; STREAM_MAXLEN sets the
+# cap for streams not listed here.
+STREAM_TRIM_POLICIES = {
+    "market_events_stream": {"maxlen": 100000},
+    "similar_market_pairs_stream": {"maxlen": 100000},
+    # An opportunity is worthless once the books have moved, so keep only the last hour.
+    "arbitrage_opportunities_stream": {"max_age_ms": 3600 * 1000},
+}
+DEFAULT_STREAM_MAXLEN = 100000
+
+
+def stream_trim_policy(stream_name: str) -> dict:
+    """
+    Returns the XADD trimming arguments for a stream: {"maxlen": n} or {"minid": id}.
+    """
+    key = stream_name.upper().replace(":", "_").replace("-", "_")
+    policy = dict(STREAM_TRIM_POLICIES.get(stream_name, {}))
+    if os.getenv(f"STREAM_MAXLEN_{key}"):
+        policy = {"maxlen": int(os.getenv(f"STREAM_MAXLEN_{key}"))}
+    elif os.getenv(f"STREAM_MAX_AGE_MS_{key}"):
+        policy = {"max_age_ms": int(os.getenv(f"STREAM_MAX_AGE_MS_{key}"))}
+    elif not policy:
+        policy = {"maxlen": int(os.getenv("STREAM_MAXLEN", DEFAULT_STREAM_MAXLEN))}
+    if "max_age_ms" in policy:
+        # Stream IDs start with the entry's millisecond timestamp, so MINID trims by age.
+        return {"minid": f"{int(time.time() * 1000) - policy['max_age_ms']}-0"}
+    return {"maxlen": policy["maxlen"]}
+
+
+def connect(redis_module, host=None, port=6379, db=0, **client_options):
+    """
+    Creates a client from `redis` or `redis.asyncio`: for REDIS_URL if it is set, otherwise for
+    the given host (default REDIS_HOST, or localhost), port and db, decoding responses unless
+    `client_options` says otherwise.
+    """
+    redis_url = os.getenv("REDIS_URL")
+    if redis_url:
+        return redis_module.from_url(redis_url, **client_options)
+    host = host or os.getenv("REDIS_HOST", "localhost")
+    client_options.setdefault("decode_responses", True)
+    return redis_module.Redis(host=host, port=port, db=db, **client_options)
+
+
+# The helpers below queue commands on a pipeline or read their replies. RedisManager and
+# AsyncRedisManager share them, so they only differ in how the pipeline is executed.
+
+def queue_xadds(pipeline, stream_name: str, messages: Iterable[dict], maxlen: Optional[int] = None):
+    """Queues an XADD per message, trimmed to `maxlen` if set and by the stream's policy otherwise."""
+    trim = {"maxlen": maxlen} if maxlen is not None else stream_trim_policy(stream_name)
+    for message in messages:
+        pipeline.xadd(stream_name, message, approximate=True, **trim)
+    return pipeline
+
+
+def queue_xacks(pipeline, stream_name: str, group_name: str, message_ids: list, batch_size: int):
+    """Queues one XACK per `batch_size` message IDs."""
+    for i in range(0, len(message_ids), batch_size):
+        pipeline.xack(stream_name, group_name, *message_ids[i:i + batch_size])
+    return pipeline
+
+
+def queue_delivery_counts(pipeline, stream_name: str, group_name: str, consumer_name: str, claimed: list):
+    """
+    Queues one XPENDING per claimed message, bounded to its own ID. A single query over the
+    range of claimed IDs would also return the consumer's other pending messages in between,
+    and with the count capped it could miss some of the claimed ones.
+    """
+    for message_id, _ in claimed:
+        pipeline.xpending_range(stream_name, group_name, min=message_id, max=message_id, count=1, consumername=consumer_name)
+    return pipeline
+
+
+def queue_stream_stats(pipeline, stream_name: str, group_name: str):
+    """Queues the XLEN, XPENDING and XINFO CONSUMERS commands `stream_stats_from` reads."""
+    pipeline.xlen(stream_name)
+    pipeline.xpending(stream_name, group_name)
+    pipeline.xinfo_consumers(stream_name, group_name)
+    return pipeline
+
+
+def claimed_messages(response) -> tuple[str, list]:
+    """
+    Splits an XAUTOCLAIM reply into the ID the next scan starts from and the claimed
+    (message_id, message_data) pairs, leaving out entries deleted from the stream while pending.
+    """
+    # [next start ID, claimed messages, IDs deleted from the stream while pending]
+    return response[0], [(message_id, data) for message_id, data in response[1] if data is not None]
+
+
+def pending_entries(replies: list) -> list:
+    """Flattens the replies of the queries `queue_delivery_counts` queued."""
+    return [entry for reply in replies for entry in reply]
+
+
+def split_poison_messages(stream_name: str, claimed: list, pending: list, max_deliveries: int) -> tuple[list, list, list]:
+    """
+    Splits claimed (message_id, message_data) pairs by their XPENDING delivery counts into the
+    messages to retry, the dead-letter entries for the rest and the IDs those entries replace.
+    """
+    deliveries = {entry["message_id"]: entry["times_delivered"] for entry in pending}
+    retry, dead_letters, dead_ids = [], [], []
+    for message_id, data in claimed:
+        if deliveries.get(message_id, 0) > max_deliveries:
+            dead_letters.append({
+                **data,
+                "dead_letter_source": stream_name,
+                "dead_letter_id": message_id,
+                "dead_letter_deliveries": deliveries[message_id],
+            })
+            dead_ids.append(message_id)
+        else:
+            retry.append((message_id, data))
+    return retry, dead_letters, dead_ids
+
+
+def stream_stats_from(length: int, pending: dict, consumers: list) -> dict:
+    """Shapes XLEN, XPENDING and XINFO CONSUMERS replies into the dict `stream_stats` returns."""
+    return {
+        "length": length,
+        "pending": pending["pending"],
+        "consumers": {
+            _decode(consumer["name"]): {"pending": consumer["pending"], "idle_ms": consumer["idle"]}
+            for consumer in consumers
+        },
+    }
+
+
+def _decode(value):
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
 
 class RedisManager:
-    def __init__(self, host=None, port=6379, db=0):
+    def __init__(self, host=None, port=6379, db=0, **client_options):
         """
         Initializes the RedisManager, connecting to a Redis instance.
         It first attempts to connect using a Redis URL from environment variables,
-        then falls back to the provided host, port, and db.
+        then falls back to the provided host, port, and db. `client_options` (timeouts, retry
+        policy, decode_responses=False for binary values) are passed on to the redis-py client.
         """
-        redis_url = os.getenv("REDIS_URL")
-        if redis_url:
-            self.redis_client = redis.from_url(redis_url)
-        else:
-            host = host or os.getenv("REDIS_HOST", "localhost")
-            self.redis_client = redis.Redis(host=host, port=port, db=db, decode_responses=True)
+        self.redis_client = connect(redis, host, port, db, **client_options)
+        # Where the next XAUTOCLAIM scan of each (stream, group) pending list starts.
+        self._claim_cursors = {}
         
         print("RedisManager initialized and connected to Redis.")
 
@@ -26,10 +160,39 @@ class RedisManager:
             message: A dictionary representing the message to add.
         """
         try:
-            self.redis_client.xadd(stream_name, message)
+            self.redis_client.xadd(stream_name, message, approximate=True, **stream_trim_policy(stream_name))
         except Exception as e:
             print(f"Error adding to stream {stream_name}: {e}")
 
+    def add_many_to_stream(self, stream_name: str, messages: Iterable[dict], maxlen: Optional[int] = None, batch_size: int = 500) -> list:
+        """
+        Adds messages to a Redis Stream with one pipelined round trip per `batch_size` messages,
+        instead of one round trip per message.
+
+        Args:
+            stream_name: The name of the stream to add the messages to.
+            messages: Dictionaries representing the messages, added in order.
+            maxlen: If set, the stream is approximately capped at this many entries instead of
+                following its trim policy.
+            batch_size: The maximum number of XADDs sent per pipeline.
+
+        Returns:
+            The ID of each message, in order. A batch that fails is printed and its messages
+            get None, so callers can tell which messages were not added.
+        """
+        messages = list(messages)
+        message_ids = []
+        for i in range(0, len(messages), batch_size):
+            batch = messages[i:i + batch_size]
+            try:
+                # No MULTI/EXEC: the entries are independent, so a plain pipeline is enough.
+                pipeline = queue_xadds(self.redis_client.pipeline(transaction=False), stream_name, batch, maxlen)
+                message_ids.extend(pipeline.execute())
+            except Exception as e:
+                print(f"Error adding {len(batch)} messages to stream {stream_name}: {e}")
+                message_ids.extend([None] * len(batch))
+        return message_ids
+
     def create_consumer_group(self, stream_name: str, group_name: str):
         """
         Creates a new consumer group for a stream.
@@ -44,7 +207,7 @@ class RedisManager:
             else:
                 raise
 
-    def read_from_stream(self, stream_name: str, group_name: str, consumer_name: str, count: int = 1):
+    def read_from_stream(self, stream_name: str, group_name: str, consumer_name: str, count: int = 1, block_ms: Optional[int] = None):
         """
         Reads messages from a stream using a consumer group.
 
@@ -53,13 +216,15 @@ class RedisManager:
             group_name: The name of the consumer group.
             consumer_name: A unique identifier for the consumer reading the messages.
             count: The maximum number of messages to read.
+            block_ms: If set, waits up to this many milliseconds for a message to arrive when
+                none are available, returning as soon as one does.
 
         Returns:
             A list of messages or None if no new messages are available.
         """
         try:
             # ">" means read new messages that have not been delivered to any other consumer.
-            response = self.redis_client.xreadgroup(group_name, consumer_name, {stream_name: '>'}, count=count)
+            response = self.redis_client.xreadgroup(group_name, consumer_name, {stream_name: '>'}, count=count, block=block_ms)
             if response:
                 # The response is structured as [[stream_name, [(message_id, message_data)]]]
                 return response[0][1]
@@ -80,4 +245,94 @@ class RedisManager:
         try:
             self.redis_client.xack(stream_name, group_name, message_id)
         except Exception as e:
-            print(f"Error acknowledging message {message_id} in stream {stream_name}: {e}") 
\ No newline at end of file
+            print(f"Error acknowledging message {message_id} in stream {stream_name}: {e}")
+
+    def acknowledge_messages(self, stream_name: str, group_name: str, message_ids: Iterable[str], batch_size: int = 1000) -> int:
+        """
+        Acknowledges processed messages, sending up to `batch_size` IDs per XACK.
+
+        Args:
+            stream_name: The name of the stream.
+            group_name: The name of the consumer group.
+            message_ids: The IDs of the messages to acknowledge.
+            batch_size: The maximum number of IDs per XACK.
+
+        Returns:
+            The number of messages Redis acknowledged.
+        """
+        message_ids = list(message_ids)
+        if not message_ids:
+            return 0
+        try:
+            pipeline = queue_xacks(self.redis_client.pipeline(transaction=False), stream_name, group_name, message_ids, batch_size)
+            return sum(pipeline.execute())
+        except Exception as e:
+            print(f"Error acknowledging {len(message_ids)} messages in stream {stream_name}: {e}")
+            return 0
+
+    def claim_stale_messages(
+        self,
+        stream_name: str,
+        group_name: str,
+        consumer_name: str,
+        min_idle_ms: int,
+        count: int = 100,
+        max_deliveries: int = 5,
+        dead_letter_stream: Optional[str] = None,
+    ) -> list:
+        """
+        Takes over messages that were delivered to some consumer of the group but not acknowledged
+        for at least `min_idle_ms`, using XAUTOCLAIM. Messages delivered more than `max_deliveries`
+        times are treated as poison: they are copied to the dead-letter stream, with their source
+        stream, ID and delivery count added, and acknowledged so they are not retried again.
+
+        Successive calls walk the whole pending entries list, `count` entries at a time.
+
+        Args:
+            stream_name: The name of the stream.
+            group_name: The name of the consumer group.
+            consumer_name: The consumer that takes over the messages.
+            min_idle_ms: Minimum time since a message was last delivered for it to be claimed.
+            count: The maximum number of messages claimed per call.
+            max_deliveries: The number of deliveries, including this one, a message may have.
+            dead_letter_stream: Defaults to "<stream_name>:dead_letter".
+
+        Returns:
+            The claimed (message_id, message_data) pairs to process again.
+        """
+        dead_letter_stream = dead_letter_stream or f"{stream_name}:dead_letter"
+        cursor_key = (stream_name, group_name)
+        try:
+            response = self.redis_client.xautoclaim(
+                stream_name, group_name, consumer_name, min_idle_ms,
+                start_id=self._claim_cursors.get(cursor_key, "0-0"), count=count,
+            )
+            self._claim_cursors[cursor_key], claimed = claimed_messages(response)
+            if not claimed:
+                return []
+            pipeline = self.redis_client.pipeline(transaction=False)
+            pending = pending_entries(queue_delivery_counts(pipeline, stream_name, group_name, consumer_name, claimed).execute())
+        except Exception as e:
+            print(f"Error claiming stale messages in stream {stream_name}: {e}")
+            return []
+
+        retry, dead_letters, dead_ids = split_poison_messages(stream_name, claimed, pending, max_deliveries)
+        if dead_letters:
+            print(f"Moving {len(dead_ids)} messages from stream {stream_name} to {dead_letter_stream} after {max_deliveries} deliveries.")
+            # Only drop them from the pending list once they are safely in the dead-letter stream.
+            if all(self.add_many_to_stream(dead_letter_stream, dead_letters)):
+                self.acknowledge_messages(stream_name, group_name, dead_ids)
+        return retry
+
+    def stream_stats(self, stream_name: str, group_name: str) -> dict:
+        """
+        Returns the stream's length, the group's pending-list size and, per consumer, its pending
+        count and idle time in milliseconds. Empty if Redis cannot be reached.
+        """
+        try:
+            pipeline = queue_stream_stats(self.redis_client.pipeline(transaction=False), stream_name, group_name)
+            length, pending, consumers = pipeline.execute()
+        except Exception as e:
+            print(f"Error reading stats for stream {stream_name}: {e}")
+            return {}
+        return stream_stats_from(length, pending, consumers)
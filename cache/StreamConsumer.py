@@ -0,0 +1,214 @@
+from typing import Awaitable, Callable, Optional
+import asyncio
+import os
+import time
+from cache.RedisManager import RedisManager
+
+class StreamConsumer:
+    """
+    Consumer-group loop shared by the stream services.
+
+    Each read blocks in XREADGROUP until a message arrives or `block_ms` passes, so a message
+    is handled as soon as it is published instead of on the next polling tick. Up to
+    `batch_size` messages are read at once; while a backlog remains the reads return full
+    batches immediately and the loop drains it without waiting. The stop condition is checked
+    between reads, so shutdown takes at most about `block_ms`.
+
+    Every `maintenance_interval_s` the loop also reclaims messages that some consumer of the
+    group read but never acknowledged within `claim_idle_ms` (a handler raised, or the consumer
+    died), hands them to the handler again, and moves those delivered more than
+    `max_deliveries` times to the stream's dead-letter stream. It then prints the stream length,
+    pending-list size and this consumer's idle time.
+    """
+
+    def __init__(
+        self,
+        redis_manager: RedisManager,
+        stream_name: str,
+        group_name: str,
+        consumer_name: str,
+        handler: Callable[[list], None],
+        batch_size: Optional[int] = None,
+        block_ms: Optional[int] = None,
+        claim_idle_ms: Optional[int] = None,
+        max_deliveries: Optional[int] = None,
+        maintenance_interval_s: Optional[float] = None,
+    ):
+        """
+        Args:
+            redis_manager: Connection used for reads.
+            stream_name: The stream to consume.
+            group_name: The consumer group, which must already exist.
+            consumer_name: This consumer's name within the group.
+            handler: Called with each non-empty batch of (message_id, message_data) pairs. It
+                acknowledges what it processed.
+            batch_size: Maximum messages per read. Defaults to STREAM_BATCH_SIZE, or 100.
+            block_ms: Maximum wait for a message per read. Defaults to STREAM_BLOCK_MS, or 1000.
+            claim_idle_ms: Unacknowledged time after which a message is reclaimed. Defaults to
+                STREAM_CLAIM_IDLE_MS, or 60000.
+            max_deliveries: Deliveries before a message is dead-lettered. Defaults to
+                STREAM_MAX_DELIVERIES, or 5.
+            maintenance_interval_s: Time between recovery and stats runs. Defaults to
+                STREAM_MAINTENANCE_INTERVAL_S, or 30.
+        """
+        self.redis_manager = redis_manager
+        self.stream_name = stream_name
+        self.group_name = group_name
+        self.consumer_name = consumer_name
+        self.handler = handler
+        self.batch_size = batch_size or int(os.getenv("STREAM_BATCH_SIZE", 100))
+        self.block_ms = block_ms or int(os.getenv("STREAM_BLOCK_MS", 1000))
+        self.claim_idle_ms = claim_idle_ms or int(os.getenv("STREAM_CLAIM_IDLE_MS", 60000))
+        self.max_deliveries = max_deliveries or int(os.getenv("STREAM_MAX_DELIVERIES", 5))
+        self.maintenance_interval_s = maintenance_interval_s or float(os.getenv("STREAM_MAINTENANCE_INTERVAL_S", 30))
+        self._next_maintenance = 0.0
+
+    # The calls and bookkeeping below are shared with AsyncStreamConsumer, whose versions of the
+    # public methods only add the awaits.
+
+    def _read(self):
+        """Reads one batch; a coroutine when `redis_manager` is an AsyncRedisManager."""
+        return self.redis_manager.read_from_stream(
+            self.stream_name, self.group_name, self.consumer_name, count=self.batch_size, block_ms=self.block_ms
+        )
+
+    def _claim(self):
+        """Claims one batch of stale messages; a coroutine when `redis_manager` is an AsyncRedisManager."""
+        return self.redis_manager.claim_stale_messages(
+            self.stream_name, self.group_name, self.consumer_name, self.claim_idle_ms,
+            count=self.batch_size, max_deliveries=self.max_deliveries,
+        )
+
+    def _print_reprocessing(self, claimed: list) -> None:
+        print(f"Reprocessing {len(claimed)} stale messages from stream {self.stream_name}.")
+
+    def _print_stats(self, stats: dict) -> dict:
+        if stats:
+            consumer = stats["consumers"].get(self.consumer_name, {})
+            print(
+                f"Stream {self.stream_name}: length={stats['length']}, pending={stats['pending']}, "
+                f"consumers={len(stats['consumers'])}, {self.consumer_name} pending={consumer.get('pending', 0)} "
+                f"idle={consumer.get('idle_ms', 0)}ms"
+            )
+        return stats
+
+    def _maintenance_due(self) -> bool:
+        now = time.monotonic()
+        if now < self._next_maintenance:
+            return False
+        self._next_maintenance = now + self.maintenance_interval_s
+        return True
+
+    def _idle_wait(self, started: float, handled: int, should_stop: Callable[[], bool]) -> float:
+        """Seconds to wait before the next read, after one that started at `started`."""
+        if handled:
+            return 0.0
+        # An empty read returns after block_ms. One that returns sooner means the read failed
+        # (read_from_stream reports and swallows errors), so wait out the rest of the interval
+        # instead of retrying in a tight loop.
+        remaining = self.block_ms / 1000 - (time.monotonic() - started)
+        return remaining if remaining > 0 and not should_stop() else 0.0
+
+    def poll(self) -> int:
+        """Reads and handles at most one batch. Returns the number of messages handled."""
+        messages = self._read()
+        if not messages:
+            return 0
+        self.handler(messages)
+        return len(messages)
+
+    def recover(self) -> int:
+        """
+        Reclaims stale pending messages and handles them again. Returns the number handled.
+        """
+        handled = 0
+        while claimed := self._claim():
+            self._print_reprocessing(claimed)
+            self.handler(claimed)
+            handled += len(claimed)
+            if len(claimed) < self.batch_size:
+                break
+        return handled
+
+    def report_stats(self) -> dict:
+        """Prints and returns the stream's length, pending-list size and consumer idle times."""
+        return self._print_stats(self.redis_manager.stream_stats(self.stream_name, self.group_name))
+
+    def _maintain(self) -> None:
+        if not self._maintenance_due():
+            return
+        try:
+            self.recover()
+            self.report_stats()
+        except Exception as e:
+            print(f"Error maintaining stream {self.stream_name}: {e}")
+
+    def run(self, should_stop: Callable[[], bool]) -> None:
+        """Handles batches until `should_stop()` returns True."""
+        while not should_stop():
+            self._maintain()
+            started = time.monotonic()
+            try:
+                handled = self.poll()
+            except Exception as e:
+                print(f"Error handling messages from stream {self.stream_name}: {e}")
+                handled = 0
+            wait = self._idle_wait(started, handled, should_stop)
+            if wait:
+                time.sleep(wait)
+
+
+class AsyncStreamConsumer(StreamConsumer):
+    """
+    The same loop for services running on an event loop: `redis_manager` is an
+    AsyncRedisManager and `handler` a coroutine function, so a blocked read only suspends this
+    task and other work on the loop keeps running.
+    """
+
+    handler: Callable[[list], Awaitable[None]]
+
+    async def poll(self) -> int:
+        """Reads and handles at most one batch. Returns the number of messages handled."""
+        messages = await self._read()
+        if not messages:
+            return 0
+        await self.handler(messages)
+        return len(messages)
+
+    async def recover(self) -> int:
+        """Reclaims stale pending messages and handles them again. Returns the number handled."""
+        handled = 0
+        while claimed := await self._claim():
+            self._print_reprocessing(claimed)
+            await self.handler(claimed)
+            handled += len(claimed)
+            if len(claimed) < self.batch_size:
+                break
+        return handled
+
+    async def report_stats(self) -> dict:
+        """Prints and returns the stream's length, pending-list size and consumer idle times."""
+        return self._print_stats(await self.redis_manager.stream_stats(self.stream_name, self.group_name))
+
+    async def _maintain(self) -> None:
+        if not self._maintenance_due():
+            return
+        try:
+            await self.recover()
+            await self.report_stats()
+        except Exception as e:
+            print(f"Error maintaining stream {self.stream_name}: {e}")
+
+    async def run(self, should_stop: Callable[[], bool]) -> None:
+        """Handles batches until `should_stop()` returns True."""
+        while not should_stop():
+            await self._maintain()
+            started = time.monotonic()
+            try:
+                handled = await self.poll()
+            except Exception as e:
+                print(f"Error handling messages from stream {self.stream_name}: {e}")
+                handled = 0
+            wait = self._idle_wait(started, handled, should_stop)
+            if wait:
+                await asyncio.sleep(wait)
@@ -0,0 +1,154 @@
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, Iterable, Optional
+from redis.backoff import NoBackoff
+from redis.retry import Retry
+from cache.RedisManager import RedisManager
+import json
+import logging
+import os
+import threading
+import time
+
+# While Redis is unreachable lookups skip the shared hash, and Redis is retried after this long.
+REDIS_RETRY_S = 30.0
+
+class TokenIdCache:
+    """
+    Two-level cache of Polymarket condition ID -> [yes_token_id, no_token_id].
+
+    Token IDs never change for a market, so entries never expire. Lookups go through an
+    in-process LRU, then a Redis hash shared by all services, and only the remaining misses
+    are resolved through `fetch_many` in a single batched call, whose results are written
+    back to both levels. Concurrent lookups of the same missing ID wait for the one fetch
+    already in flight instead of issuing their own. While Redis is unreachable the cache works
+    from the LRU and `fetch_many` alone.
+    """
+
+    def __init__(
+        self,
+        fetch_many: Callable[[list[str]], dict],
+        redis_client=None,
+        max_size: int = 50000,
+        hash_name: str = "polymarket:token_ids",
+    ):
+        """
+        Args:
+            fetch_many: Resolves a list of condition IDs to a dict of their token ID pairs. IDs it
+                cannot resolve are left out.
+            redis_client: redis-py client for the shared hash, or None to cache in-process only.
+            max_size: Number of entries kept in the in-process LRU.
+            hash_name: Name of the Redis hash.
+        """
+        self.fetch_many = fetch_many
+        self.redis_client = redis_client
+        self.max_size = max_size
+        self.hash_name = hash_name
+
+        self._lru: OrderedDict[str, list[str]] = OrderedDict()
+        self._in_flight: dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._redis_down_until = 0.0
+
+        self.hits = 0
+        self.redis_hits = 0
+        self.fetched = 0
+
+    def get(self, condition_id: str) -> Optional[list[str]]:
+        return self.get_many([condition_id]).get(condition_id)
+
+    def get_many(self, condition_ids: Iterable[str]) -> dict:
+        """
+        Returns the token ID pairs of the given condition IDs, leaving out IDs that could not be resolved.
+        """
+        result = {}
+        owned, waiting = [], {}
+        with self._lock:
+            for condition_id in dict.fromkeys(condition_ids):
+                token_ids = self._lru.get(condition_id)
+                if token_ids is not None:
+                    self._lru.move_to_end(condition_id)
+                    result[condition_id] = token_ids
+                    self.hits += 1
+                elif condition_id in self._in_flight:
+                    waiting[condition_id] = self._in_flight[condition_id]
+                else:
+                    self._in_flight[condition_id] = Future()
+                    owned.append(condition_id)
+
+        if owned:
+            resolved = {}
+            try:
+                resolved = self._load(owned)
+            finally:
+                with self._lock:
+                    for condition_id, token_ids in resolved.items():
+                        self._remember(condition_id, token_ids)
+                    futures = [self._in_flight.pop(condition_id) for condition_id in owned]
+                for condition_id, future in zip(owned, futures):
+                    future.set_result(resolved.get(condition_id))
+            result.update(resolved)
+
+        for condition_id, future in waiting.items():
+            token_ids = future.result()
+            if token_ids is not None:
+                result[condition_id] = token_ids
+        return result
+
+    def put_many(self, mapping: dict) -> None:
+        """Adds known token ID pairs to both levels, e.g. from a market listing that already carries them."""
+        with self._lock:
+            for condition_id, token_ids in mapping.items():
+                self._remember(condition_id, list(token_ids))
+        self._store(mapping)
+
+    def _remember(self, condition_id: str, token_ids: list[str]) -> None:
+        self._lru[condition_id] = token_ids
+        self._lru.move_to_end(condition_id)
+        while len(self._lru) > self.max_size:
+            self._lru.popitem(last=False)
+
+    def _available(self) -> bool:
+        return self.redis_client is not None and time.monotonic() >= self._redis_down_until
+
+    def _redis_failed(self, e: Exception) -> None:
+        logging.warning(f"Token ID cache cannot reach Redis hash {self.hash_name}, using the local cache only: {e}")
+        self._redis_down_until = time.monotonic() + REDIS_RETRY_S
+
+    def _load(self, condition_ids: list[str]) -> dict:
+        resolved = {}
+        if self._available():
+            try:
+                values = self.redis_client.hmget(self.hash_name, condition_ids)
+                for condition_id, value in zip(condition_ids, values):
+                    if value is not None:
+                        resolved[condition_id] = json.loads(value)
+                self.redis_hits += len(resolved)
+            except Exception as e:
+                self._redis_failed(e)
+
+        missing = [condition_id for condition_id in condition_ids if condition_id not in resolved]
+        if missing:
+            fetched = {condition_id: list(token_ids) for condition_id, token_ids in self.fetch_many(missing).items()}
+            self.fetched += len(fetched)
+            self._store(fetched)
+            resolved.update(fetched)
+        return resolved
+
+    def _store(self, mapping: dict) -> None:
+        if not mapping or not self._available():
+            return
+        try:
+            self.redis_client.hset(self.hash_name, mapping={k: json.dumps(list(v)) for k, v in mapping.items()})
+        except Exception as e:
+            self._redis_failed(e)
+
+
+def token_id_redis_client():
+    """
+    Client for the shared token ID hash, or None if TOKEN_ID_CACHE_SHARED is "false". It fails
+    fast, so a lookup falls back to the local cache instead of waiting on Redis retries.
+    """
+    if os.getenv("TOKEN_ID_CACHE_SHARED", "true").lower() == "false":
+        return None
+    return RedisManager(socket_connect_timeout=0.5, socket_timeout=0.5, retry=Retry(NoBackoff(), 0)).redis_client
@@ -0,0 +1,209 @@
+from datetime import datetime
+from typing import Callable, Iterable, Optional
+import sqlite3
+import threading
+from models.Market import Market
+from models.PlatformType import PlatformType
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS markets (
+    condition_id TEXT PRIMARY KEY,
+    gamma_id INTEGER NOT NULL,
+    question TEXT NOT NULL,
+    description TEXT NOT NULL,
+    close_timestamp INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS markets_gamma_id ON markets (gamma_id);
+CREATE TABLE IF NOT EXISTS sync_state (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+class MarketCatalog():
+    """
+    On-disk SQLite index of Polymarket Gamma markets keyed by condition ID.
+
+    The catalog is built by one full pass over the market list, newest first, and then kept
+    fresh incrementally: Gamma IDs only grow, so a sync pages newest-first and stops at the
+    first market at or below the highest ID a completed sync has seen. That cursor is kept in
+    its own table and only `sync` moves it, since markets upserted from elsewhere (lookups,
+    discovery) can be newer than markets the sync has not reached yet. Lookups are primary-key
+    reads; condition IDs the catalog does not have yet are fetched in a targeted request and
+    stored.
+    The database is opened on first use, and `start_background_sync` runs syncs on a daemon
+    thread so callers never wait for one.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        fetch_page: Callable[[int, int], list[dict]],
+        fetch_by_ids: Callable[[list[str]], list[dict]],
+        page_size: int = 500,
+    ):
+        """
+        Args:
+            path: SQLite file, or ":memory:".
+            fetch_page: (offset, limit) -> Gamma market dicts ordered by descending ID.
+            fetch_by_ids: condition IDs -> Gamma market dicts for those of them Gamma knows.
+            page_size: Markets requested per page while syncing.
+        """
+        self.path = path
+        self.fetch_page = fetch_page
+        self.fetch_by_ids = fetch_by_ids
+        self.page_size = page_size
+
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._sync_thread: Optional[threading.Thread] = None
+        self._stop_sync = threading.Event()
+
+    def _connection(self) -> sqlite3.Connection:
+        # Callers hold self._lock.
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+        return self._conn
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection().execute("SELECT COUNT(*) FROM markets").fetchone()[0]
+
+    def high_water_mark(self) -> int:
+        """Highest Gamma ID seen by a completed sync, or 0 before the first one."""
+        with self._lock:
+            row = self._connection().execute("SELECT value FROM sync_state WHERE key = 'high_water_mark'").fetchone()
+            return row[0] if row is not None else 0
+
+    def _set_high_water_mark(self, gamma_id: int) -> None:
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO sync_state (key, value) VALUES ('high_water_mark', ?)", (gamma_id,))
+
+    def upsert(self, gamma_markets: Iterable[dict]) -> int:
+        """Stores Gamma market dicts, skipping entries without a condition ID or end date. Returns the number stored."""
+        rows = [row for row in map(_to_row, gamma_markets) if row is not None]
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO markets (condition_id, gamma_id, question, description, close_timestamp) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    rows,
+                )
+        return len(rows)
+
+    def lookup(self, market_ids: Iterable[str]) -> dict[str, Market]:
+        """Markets the catalog already has, keyed by condition ID. Never touches the network."""
+        market_ids = list(dict.fromkeys(market_ids))
+        found = {}
+        with self._lock:
+            conn = self._connection()
+            # Stay under SQLite's bound-parameter limit.
+            for i in range(0, len(market_ids), 500):
+                chunk = market_ids[i:i + 500]
+                rows = conn.execute(
+                    "SELECT condition_id, question, description, close_timestamp FROM markets "
+                    f"WHERE condition_id IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+                for condition_id, question, description, close_timestamp in rows:
+                    found[condition_id] = Market(
+                        platform=PlatformType.POLYMARKET,
+                        market_id=condition_id,
+                        name=question,
+                        rules=description,
+                        close_timestamp=close_timestamp,
+                    )
+        return found
+
+    def get_markets(self, market_ids: list[str]) -> list[Market]:
+        """
+        Markets for the given condition IDs in request order. Misses are fetched in one targeted
+        request and added to the catalog; IDs Gamma does not know are left out.
+        """
+        found = self.lookup(market_ids)
+        missing = [market_id for market_id in dict.fromkeys(market_ids) if market_id not in found]
+        if missing:
+            self.upsert(self.fetch_by_ids(missing))
+            found.update(self.lookup(missing))
+        return [found[market_id] for market_id in dict.fromkeys(market_ids) if market_id in found]
+
+    def sync(self) -> int:
+        """
+        Adds every market newer than the high-water mark, paging newest first. The first sync of
+        an empty catalog walks the whole list. The mark only moves once the walk has reached it,
+        so an interrupted sync starts over from the top next time. Returns the number of markets
+        stored.
+        """
+        with self._sync_lock:
+            high_water_mark = self.high_water_mark()
+            newest = high_water_mark
+            stored, offset = 0, 0
+            while not self._stop_sync.is_set():
+                page = self.fetch_page(offset, self.page_size)
+                if not page:
+                    break
+                newer = [m for m in page if _gamma_id(m) > high_water_mark]
+                newest = max([newest, *map(_gamma_id, newer)])
+                stored += self.upsert(newer)
+                if len(newer) < len(page) or len(page) < self.page_size:
+                    break
+                offset += len(page)
+            else:
+                return stored
+            self._set_high_water_mark(newest)
+            return stored
+
+    def start_background_sync(self, interval_s: float = 60.0) -> threading.Thread:
+        """Syncs now and then every `interval_s` seconds on a daemon thread."""
+        if self._sync_thread is not None and self._sync_thread.is_alive():
+            return self._sync_thread
+        self._stop_sync.clear()
+
+        def loop():
+            while not self._stop_sync.is_set():
+                try:
+                    stored = self.sync()
+                    if stored:
+                        print(f"Market catalog synced {stored} new markets.")
+                except Exception as e:
+                    print(f"Error syncing market catalog: {e}")
+                self._stop_sync.wait(interval_s)
+
+        self._sync_thread = threading.Thread(target=loop, name="market-catalog-sync", daemon=True)
+        self._sync_thread.start()
+        return self._sync_thread
+
+    def stop_background_sync(self, timeout: float = 5.0) -> None:
+        self._stop_sync.set()
+        if self._sync_thread is not None:
+            self._sync_thread.join(timeout)
+            self._sync_thread = None
+
+
+def _gamma_id(gamma_market: dict) -> int:
+    return int(gamma_market.get("id") or 0)
+
+
+def _to_row(gamma_market: dict) -> Optional[tuple]:
+    condition_id, end_date = gamma_market.get("conditionId"), gamma_market.get("endDate")
+    if not condition_id or not end_date:
+        return None
+    try:
+        # Read as naive time, like the "%Y-%m-%dT%H:%M:%SZ" strptime parse used elsewhere, but far cheaper.
+        end = datetime.fromisoformat(end_date.replace("Z", "+00:00")).replace(tzinfo=None)
+    except ValueError:
+        return None
+    close_timestamp = int(end.timestamp())
+    return (
+        condition_id,
+        _gamma_id(gamma_market),
+        gamma_market.get("question") or "",
+        gamma_market.get("description") or "",
+        close_timestamp,
+    )
@@ -0,0 +1,153 @@
+from abc import ABC, abstractmethod
+from typing import Iterable, Iterator, Optional, Union
+import json
+
+
+class BookSnapshot():
+    """Full normalized book for one market: [price, qty] ladders in deci-cents and shares x100."""
+    __slots__ = ("market_id", "timestamp", "yes_bid", "yes_ask", "no_bid", "no_ask")
+
+    def __init__(
+        self,
+        market_id: str,
+        timestamp: int,
+        yes_bid: list[list[int]],
+        yes_ask: list[list[int]],
+        no_bid: list[list[int]],
+        no_ask: list[list[int]],
+    ):
+        self.market_id = market_id
+        self.timestamp = timestamp
+        self.yes_bid = yes_bid
+        self.yes_ask = yes_ask
+        self.no_bid = no_bid
+        self.no_ask = no_ask
+
+
+class BookSideSnapshot():
+    """
+    Replacement of both ladders of one side of a book, for feeds that publish the yes and no
+    outcomes as separate instruments. A market's book is readable once both sides have arrived.
+    """
+    __slots__ = ("market_id", "timestamp", "side", "bid", "ask")
+
+    def __init__(self, market_id: str, timestamp: int, side: str, bid: list[list[int]], ask: list[list[int]]):
+        self.market_id = market_id
+        self.timestamp = timestamp
+        self.side = side        # "yes" or "no"
+        self.bid = bid
+        self.ask = ask
+
+
+class BookDelta():
+    """
+    Change to one price level of one ladder.
+
+    `quantity` replaces the resting quantity at `price` (0 removes the level), or is added to it
+    when `relative` is True, as in feeds that publish signed size changes.
+    """
+    __slots__ = ("market_id", "timestamp", "side", "kind", "price", "quantity", "relative")
+
+    def __init__(self, market_id: str, timestamp: int, side: str, kind: str, price: int, quantity: int, relative: bool = False):
+        self.market_id = market_id
+        self.timestamp = timestamp
+        self.side = side        # "yes" or "no"
+        self.kind = kind        # "bid" or "ask"
+        self.price = price
+        self.quantity = quantity
+        self.relative = relative
+
+
+BookEvent = Union[BookSnapshot, BookSideSnapshot, BookDelta]
+
+
+class BookSource(ABC):
+    """A feed of normalized book events that an OrderbookStore can consume."""
+
+    @abstractmethod
+    def events(self) -> Iterator[BookEvent]:
+        """
+        Yields snapshots and deltas in arrival order. A snapshot (or side snapshot) for a market
+        always comes before any delta for it.
+        """
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class ReplayBookSource(BookSource):
+    """
+    Replays events recorded with `record_events` from a JSON-lines file, as fast as they can be read.
+    Used to test and benchmark the store offline at high message rates.
+    """
+
+    def __init__(self, path: str, limit: Optional[int] = None):
+        self.path = path
+        self.limit = limit
+
+    def events(self) -> Iterator[BookEvent]:
+        with open(self.path) as f:
+            for i, line in enumerate(f):
+                if self.limit is not None and i >= self.limit:
+                    return
+                if line.strip():
+                    yield event_from_dict(json.loads(line))
+
+
+def event_to_dict(event: BookEvent) -> dict:
+    if isinstance(event, BookSnapshot):
+        return {
+            "type": "snapshot",
+            "market_id": event.market_id,
+            "timestamp": event.timestamp,
+            "yes_bid": event.yes_bid,
+            "yes_ask": event.yes_ask,
+            "no_bid": event.no_bid,
+            "no_ask": event.no_ask,
+        }
+    if isinstance(event, BookSideSnapshot):
+        return {
+            "type": "side_snapshot",
+            "market_id": event.market_id,
+            "timestamp": event.timestamp,
+            "side": event.side,
+            "bid": event.bid,
+            "ask": event.ask,
+        }
+    return {
+        "type": "delta",
+        "market_id": event.market_id,
+        "timestamp": event.timestamp,
+        "side": event.side,
+        "kind": event.kind,
+        "price": event.price,
+        "quantity": event.quantity,
+        "relative": event.relative,
+    }
+
+
+def event_from_dict(data: dict) -> BookEvent:
+    if data["type"] == "snapshot":
+        return BookSnapshot(
+            data["market_id"], data["timestamp"], data["yes_bid"], data["yes_ask"], data["no_bid"], data["no_ask"]
+        )
+    if data["type"] == "side_snapshot":
+        return BookSideSnapshot(data["market_id"], data["timestamp"], data["side"], data["bid"], data["ask"])
+    if data["type"] == "delta":
+        return BookDelta(
+            data["market_id"], data["timestamp"], data["side"], data["kind"],
+            data["price"], data["quantity"], data.get("relative", False),
+        )
+    raise ValueError(f"Unknown book event type: {data['type']}")
+
+
+def record_events(path: str, events: Iterable[BookEvent]) -> int:
+    """Writes events to a JSON-lines file readable by ReplayBookSource. Returns the number written."""
+    count = 0
+    with open(path, "w") as f:
+        for event in events:
+            f.write(json.dumps(event_to_dict(event)))
+            f.write("\n")
+            count += 1
+    return count
@@ -0,0 +1,172 @@
+from typing import Iterable, Optional
+import itertools
+import json
+import logging
+import time
+from cryptography.hazmat.primitives.asymmetric import rsa
+from websockets.asyncio.client import connect
+from feeds.BookSource import BookDelta, BookSnapshot
+from feeds.OrderbookStore import OrderbookStore
+from feeds.WebSocketBookFeed import WebSocketBookFeed
+from platforms.KalshiPlatform import kalshi_auth_headers
+
+KALSHI_WS_URL = "wss://api.elections.kalshi.com/trade-api/ws/v2"
+KALSHI_WS_PATH = "/trade-api/ws/v2"
+
+logger = logging.getLogger(__name__)
+
+
+class KalshiBookFeed(WebSocketBookFeed):
+    """
+    Streams Kalshi `orderbook_delta` channel updates for a changing set of tickers into an
+    OrderbookStore.
+
+    Kalshi publishes one snapshot per market followed by signed size changes, all numbered by a
+    per-subscription `seq`. Both are normalized the same way as the REST adapter: a yes level at
+    c cents with q contracts becomes a yes bid [c*10, q*100] and a no ask [1000 - c*10, q*100],
+    and no levels map onto the no bids and yes asks. A gap in `seq` means the local books of that
+    subscription can no longer be trusted, so they are dropped from the store (readers fall back
+    to REST) and the tickers are resubscribed, which makes Kalshi send fresh snapshots.
+
+    A changed watched set is applied with `subscribe`, `update_subscription` (delete_markets) and
+    `unsubscribe` commands.
+    """
+
+    def __init__(
+        self,
+        store: OrderbookStore,
+        key_id: str,
+        private_key: rsa.RSAPrivateKey,
+        url: str = KALSHI_WS_URL,
+        reconnect_delay: float = 1.0,
+        record_path: Optional[str] = None,
+    ):
+        self.key_id = key_id
+        self.private_key = private_key
+        self._ids = itertools.count(1)
+        self.gaps_detected = 0
+        super().__init__(store, url, reconnect_delay, record_path)
+
+    def _reset_connection_state(self) -> None:
+        # Owned by the event loop: sid -> tickers, request id -> tickers, sid -> last seq.
+        self._subscriptions: dict[int, set[str]] = {}
+        self._pending: dict[int, set[str]] = {}
+        self._last_seq: dict[int, int] = {}
+        self._stale_sids: set[int] = set()
+
+    def watch(self, tickers: Iterable[str]) -> None:
+        """Adds tickers to the streamed set. Their books appear in the store once the snapshot arrives."""
+        self._add_watched(dict.fromkeys(tickers, True))
+
+    def _connect(self):
+        headers = kalshi_auth_headers(self.key_id, self.private_key, "GET", KALSHI_WS_PATH)
+        return connect(self.url, additional_headers=headers, max_size=None)
+
+    async def _send(self, ws, cmd: str, params: dict) -> int:
+        request_id = next(self._ids)
+        await ws.send(json.dumps({"id": request_id, "cmd": cmd, "params": params}))
+        return request_id
+
+    async def _sync(self, ws) -> None:
+        """Brings the connection's subscriptions in line with the watched set."""
+        watched = set(self.watched())
+
+        if self._stale_sids:
+            sids, self._stale_sids = sorted(self._stale_sids), set()
+            await self._send(ws, "unsubscribe", {"sids": sids})
+
+        covered = set()
+        for sid, tickers in list(self._subscriptions.items()):
+            removed = tickers - watched
+            if removed == tickers:
+                del self._subscriptions[sid]
+                await self._send(ws, "unsubscribe", {"sids": [sid]})
+            elif removed:
+                tickers -= removed
+                await self._send(ws, "update_subscription", {
+                    "sids": [sid],
+                    "market_tickers": sorted(removed),
+                    "action": "delete_markets",
+                })
+            for ticker in removed:
+                self.store.remove(ticker)
+            covered |= tickers
+        for tickers in self._pending.values():
+            covered |= tickers
+
+        missing = watched - covered
+        if missing:
+            request_id = await self._send(ws, "subscribe", {
+                "channels": ["orderbook_delta"],
+                "market_tickers": sorted(missing),
+            })
+            self._pending[request_id] = missing
+
+    def _handle(self, raw) -> None:
+        message = json.loads(raw)
+        msg_type = message.get("type")
+        if msg_type in ("orderbook_snapshot", "orderbook_delta"):
+            sid = message.get("sid")
+            if sid not in self._subscriptions or not self._in_sequence(sid, message.get("seq")):
+                return
+            body = message["msg"]
+            if body["market_ticker"] not in self._subscriptions[sid]:
+                return
+            if msg_type == "orderbook_snapshot":
+                self.store.apply_snapshot(_snapshot(body))
+            else:
+                for delta in _deltas(body):
+                    self.store.apply_delta(delta)
+        elif msg_type == "subscribed":
+            tickers = self._pending.pop(message.get("id"), None)
+            if tickers is not None:
+                sid = message["msg"]["sid"]
+                self._subscriptions[sid] = tickers
+                self._last_seq.pop(sid, None)
+                # The watched set may have shrunk while the request was in flight.
+                self._wake.set()
+        elif msg_type == "error":
+            tickers = self._pending.pop(message.get("id"), None)
+            logger.warning(f"Kalshi book feed error {message.get('msg')} for tickers {sorted(tickers or ())}")
+
+    def _in_sequence(self, sid: int, seq: Optional[int]) -> bool:
+        last = self._last_seq.get(sid)
+        if seq is None or last is None or seq == last + 1:
+            if seq is not None:
+                self._last_seq[sid] = seq
+            return True
+        self.gaps_detected += 1
+        logger.warning(f"Kalshi book feed sequence gap on sid {sid}: expected {last + 1}, got {seq}; resubscribing")
+        tickers = self._subscriptions.pop(sid)
+        self._last_seq.pop(sid, None)
+        for ticker in tickers:
+            self.store.remove(ticker)
+        self._stale_sids.add(sid)
+        self._wake.set()
+        return False
+
+
+def _snapshot(body: dict) -> BookSnapshot:
+    yes_bid = [[price * 10, qty * 100] for price, qty in body.get("yes") or []]
+    no_bid = [[price * 10, qty * 100] for price, qty in body.get("no") or []]
+    return BookSnapshot(
+        market_id=body["market_ticker"],
+        timestamp=int(time.time() * 1000),
+        yes_bid=yes_bid,
+        yes_ask=[[1000 - price, qty] for price, qty in no_bid],
+        no_bid=no_bid,
+        no_ask=[[1000 - price, qty] for price, qty in yes_bid],
+    )
+
+
+def _deltas(body: dict) -> tuple[BookDelta, BookDelta]:
+    market_id = body["market_ticker"]
+    timestamp = int(time.time() * 1000)
+    side = body["side"]
+    other = "no" if side == "yes" else "yes"
+    price = body["price"] * 10
+    quantity = body["delta"] * 100
+    return (
+        BookDelta(market_id, timestamp, side, "bid", price, quantity, relative=True),
+        BookDelta(market_id, timestamp, other, "ask", 1000 - price, quantity, relative=True),
+    )
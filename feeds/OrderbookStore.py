@@ -0,0 +1,203 @@
+from bisect import bisect_left
+from typing import Callable, Iterable, Optional
+import threading
+import numpy as np
+from models.CompactOrderbook import CompactOrderbook
+from feeds.BookSource import BookDelta, BookEvent, BookSideSnapshot, BookSnapshot, BookSource
+
+_LADDERS = (("yes", "bid"), ("yes", "ask"), ("no", "bid"), ("no", "ask"))
+
+
+class _Ladder():
+    """
+    One side of a book: sorted resting prices plus the quantity at each.
+
+    Changing the quantity at an existing level is a dict update. Adding or removing a level is
+    a bisect plus a list insert or delete, which moves the levels after it: O(n) in the ladder's
+    depth, but a memmove of at most 1001 pointers since prices are tenths of a cent, about
+    300 ns at any depth (benchmarks/orderbook_store_benchmark.py). The int32 columns are rebuilt
+    in O(n) on the first read after a change and cached until the next one.
+    """
+    __slots__ = ("prices", "quantities", "_columns")
+
+    def __init__(self, levels: Iterable = ()):
+        self.quantities = {}
+        for price, qty in levels:
+            if qty > 0:
+                self.quantities[price] = self.quantities.get(price, 0) + qty
+        self.prices = sorted(self.quantities)
+        self._columns = None
+
+    def set(self, price: int, qty: int) -> None:
+        if qty <= 0:
+            if self.quantities.pop(price, None) is not None:
+                del self.prices[bisect_left(self.prices, price)]
+                self._columns = None
+            return
+        if price not in self.quantities:
+            self.prices.insert(bisect_left(self.prices, price), price)
+        self.quantities[price] = qty
+        self._columns = None
+
+    def add(self, price: int, delta: int) -> None:
+        self.set(price, self.quantities.get(price, 0) + delta)
+
+    def columns(self) -> tuple[np.ndarray, np.ndarray]:
+        if self._columns is None:
+            prices = np.array(self.prices, dtype=np.int32)
+            quantities = np.array(list(map(self.quantities.__getitem__, self.prices)), dtype=np.int32)
+            self._columns = (prices, quantities)
+        return self._columns
+
+
+class _LocalBook():
+    __slots__ = ("market_id", "timestamp", "ladders", "missing_sides", "_snapshot")
+
+    def __init__(self, market_id: str, timestamp: int, yes_bid=(), yes_ask=(), no_bid=(), no_ask=(), missing_sides=()):
+        self.market_id = market_id
+        self.timestamp = timestamp
+        self.ladders = {
+            ("yes", "bid"): _Ladder(yes_bid),
+            ("yes", "ask"): _Ladder(yes_ask),
+            ("no", "bid"): _Ladder(no_bid),
+            ("no", "ask"): _Ladder(no_ask),
+        }
+        self.missing_sides = set(missing_sides)
+        self._snapshot = None
+
+    def replace_side(self, snapshot: BookSideSnapshot) -> None:
+        self.ladders[(snapshot.side, "bid")] = _Ladder(snapshot.bid)
+        self.ladders[(snapshot.side, "ask")] = _Ladder(snapshot.ask)
+        self.missing_sides.discard(snapshot.side)
+        self.timestamp = max(self.timestamp, snapshot.timestamp)
+        self._snapshot = None
+
+    def apply(self, delta: BookDelta) -> None:
+        ladder = self.ladders[(delta.side, delta.kind)]
+        if delta.relative:
+            ladder.add(delta.price, delta.quantity)
+        else:
+            ladder.set(delta.price, delta.quantity)
+        self.timestamp = max(self.timestamp, delta.timestamp)
+        self._snapshot = None
+
+    def orderbook(self) -> Optional[CompactOrderbook]:
+        if self.missing_sides:
+            return None
+        # Rebuilt only after a change, so prefix sums and best prices cached on the book stay valid.
+        if self._snapshot is None:
+            columns = [self.ladders[ladder].columns() for ladder in _LADDERS]
+            self._snapshot = CompactOrderbook.from_levels(self.market_id, self.timestamp, *columns)
+        return self._snapshot
+
+
+class OrderbookStore():
+    """
+    Local order books kept current from a snapshot followed by price-level deltas.
+
+    A delta that changes a level's quantity is a dict update; one that adds or removes a level
+    also shifts the ladder's sorted price list, O(depth) but cheap at the depths a 0-1000 price
+    range allows (see _Ladder). Readers get an immutable CompactOrderbook that is rebuilt lazily
+    when the book has changed since the last read, reusing the columns of ladders that did not
+    change, so a fast feed does not pay for derived structures nobody looks at. The rebuild and
+    the book's prefix sums are O(total depth). Safe to write from a feed thread while services
+    read.
+    """
+
+    def __init__(self):
+        self._books: dict[str, _LocalBook] = {}
+        self._lock = threading.Lock()
+        self.events_applied = 0
+        self.deltas_dropped = 0
+
+    def apply_snapshot(self, snapshot: BookSnapshot) -> None:
+        """Replaces the whole book for the snapshot's market."""
+        book = _LocalBook(
+            snapshot.market_id, snapshot.timestamp, snapshot.yes_bid, snapshot.yes_ask, snapshot.no_bid, snapshot.no_ask
+        )
+        with self._lock:
+            self._books[snapshot.market_id] = book
+            self.events_applied += 1
+
+    def apply_side_snapshot(self, snapshot: BookSideSnapshot) -> None:
+        """
+        Replaces one side of the market's book. A market first seen this way is not returned to
+        readers until the other side has arrived too; deltas to either side apply meanwhile.
+        """
+        with self._lock:
+            book = self._books.get(snapshot.market_id)
+            if book is None:
+                other = "no" if snapshot.side == "yes" else "yes"
+                book = _LocalBook(snapshot.market_id, snapshot.timestamp, missing_sides=(other,))
+                self._books[snapshot.market_id] = book
+            book.replace_side(snapshot)
+            self.events_applied += 1
+
+    def apply_delta(self, delta: BookDelta) -> bool:
+        """
+        Applies one price-level change. Returns False, and drops the delta, if no snapshot has
+        been seen for the market yet.
+        """
+        with self._lock:
+            book = self._books.get(delta.market_id)
+            if book is None:
+                self.deltas_dropped += 1
+                return False
+            book.apply(delta)
+            self.events_applied += 1
+            return True
+
+    def apply(self, event: BookEvent) -> None:
+        if isinstance(event, BookSnapshot):
+            self.apply_snapshot(event)
+        elif isinstance(event, BookSideSnapshot):
+            self.apply_side_snapshot(event)
+        else:
+            self.apply_delta(event)
+
+    def consume(self, source: BookSource, should_stop: Optional[Callable[[], bool]] = None) -> int:
+        """
+        Applies every event of `source` until it is exhausted or `should_stop()` returns True.
+        Returns the number of events read.
+        """
+        count = 0
+        try:
+            for event in source.events():
+                self.apply(event)
+                count += 1
+                if should_stop is not None and should_stop():
+                    break
+        finally:
+            source.close()
+        return count
+
+    def remove(self, market_id: str) -> None:
+        with self._lock:
+            self._books.pop(market_id, None)
+
+    def get_order_book(self, market_id: str) -> Optional[CompactOrderbook]:
+        with self._lock:
+            book = self._books.get(market_id)
+            return book.orderbook() if book is not None else None
+
+    def get_order_books(self, market_ids: list[str]) -> list[CompactOrderbook]:
+        """Current books for the given markets, skipping markets without a complete snapshot."""
+        with self._lock:
+            books = (self._books[market_id].orderbook() for market_id in market_ids if market_id in self._books)
+            return [book for book in books if book is not None]
+
+    def last_update(self, market_id: str) -> Optional[int]:
+        """Timestamp (ms) of the latest event applied to the market's book."""
+        with self._lock:
+            book = self._books.get(market_id)
+            return book.timestamp if book is not None else None
+
+    def market_ids(self) -> list[str]:
+        with self._lock:
+            return list(self._books)
+
+    def __contains__(self, market_id: str) -> bool:
+        return market_id in self._books
+
+    def __len__(self) -> int:
+        return len(self._books)
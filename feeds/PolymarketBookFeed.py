@@ -0,0 +1,174 @@
+from typing import Iterator, Optional
+import asyncio
+import json
+import logging
+import time
+from websockets.asyncio.client import connect
+from feeds.BookSource import BookDelta, BookEvent, BookSideSnapshot, BookSource
+from feeds.OrderbookStore import OrderbookStore
+from feeds.WebSocketBookFeed import WebSocketBookFeed
+from platforms.PolyMarketPlatform import parse_fixed
+
+POLYMARKET_WS_URL = "wss://ws-subscriptions-clob.polymarket.com/ws/market"
+PING_INTERVAL_S = 10
+
+logger = logging.getLogger(__name__)
+
+
+class PolymarketEventParser():
+    """
+    Turns CLOB market-channel events into normalized book events keyed by condition ID.
+
+    Each condition trades as two tokens; the yes token's book becomes the yes side and the no
+    token's book the no side, exactly as `PolyMarketPlatform.get_order_books` builds them. Prices
+    and sizes are parsed from their decimal strings into deci-cents and shares x100.
+    """
+
+    def __init__(self, markets: Optional[dict] = None):
+        self._assets: dict[str, tuple[str, str]] = {}
+        for condition_id, token_ids in (markets or {}).items():
+            self.add_market(condition_id, token_ids)
+
+    def add_market(self, condition_id: str, token_ids: list[str]) -> None:
+        yes_token, no_token = token_ids
+        self._assets[yes_token] = (condition_id, "yes")
+        self._assets[no_token] = (condition_id, "no")
+
+    def remove_market(self, condition_id: str) -> None:
+        self._assets = {asset: market for asset, market in self._assets.items() if market[0] != condition_id}
+
+    def asset_ids(self) -> set[str]:
+        return set(self._assets)
+
+    def parse(self, message: dict) -> list[BookEvent]:
+        event_type = message.get("event_type")
+        timestamp = int(message.get("timestamp") or time.time() * 1000)
+        if event_type == "book":
+            market = self._assets.get(message.get("asset_id"))
+            if market is None:
+                return []
+            condition_id, side = market
+            bids = message.get("bids", message.get("buys")) or []
+            asks = message.get("asks", message.get("sells")) or []
+            return [BookSideSnapshot(condition_id, timestamp, side, _levels(bids), _levels(asks))]
+        if event_type == "price_change":
+            if "price_changes" in message:
+                changes = message["price_changes"]
+            else:
+                changes = [{**change, "asset_id": message.get("asset_id")} for change in message.get("changes") or []]
+            events = []
+            for change in changes:
+                market = self._assets.get(change.get("asset_id"))
+                if market is None:
+                    continue
+                condition_id, side = market
+                kind = "bid" if change["side"].upper() == "BUY" else "ask"
+                events.append(BookDelta(
+                    condition_id, timestamp, side, kind, parse_fixed(change["price"], 3), parse_fixed(change["size"], 2)
+                ))
+            return events
+        return []
+
+
+def _levels(summaries: list[dict]) -> list[list[int]]:
+    return [[parse_fixed(level["price"], 3), parse_fixed(level["size"], 2)] for level in summaries]
+
+
+def _frames(raw) -> list[dict]:
+    if raw in ("PONG", b"PONG") or not raw:
+        return []
+    data = json.loads(raw)
+    return data if isinstance(data, list) else [data]
+
+
+class PolymarketBookFeed(WebSocketBookFeed):
+    """
+    Streams the Polymarket CLOB market channel for the yes and no tokens of each watched
+    condition into an OrderbookStore.
+
+    `book` events replace one side of a market and `price_change` events set the absolute size
+    at a price level, so there is no sequence to check: resubscribing makes the server send fresh
+    `book` events, which is what happens after every reconnect. A market's book is readable once
+    both of its tokens' books have arrived.
+    """
+
+    def __init__(
+        self,
+        store: OrderbookStore,
+        url: str = POLYMARKET_WS_URL,
+        reconnect_delay: float = 1.0,
+        record_path: Optional[str] = None,
+    ):
+        self.parser = PolymarketEventParser()
+        super().__init__(store, url, reconnect_delay, record_path)
+
+    def _reset_connection_state(self) -> None:
+        self._subscribed_assets: set[str] = set()
+        self._initialized = False
+
+    def watch(self, markets: dict) -> None:
+        """
+        Adds markets to the streamed set.
+
+        Arguments:
+            markets: dict -> condition ID to its [yes_token_id, no_token_id], as returned by
+                `PolyMarketPlatform.get_token_ids`
+        """
+        self._add_watched({condition_id: tuple(token_ids) for condition_id, token_ids in markets.items()})
+
+    def _connect(self):
+        # Polymarket expects its own text PING keepalive rather than protocol pings.
+        return connect(self.url, max_size=None, ping_interval=None)
+
+    def _background(self, ws) -> list:
+        return [self._keepalive(ws)]
+
+    async def _keepalive(self, ws) -> None:
+        while True:
+            await asyncio.sleep(PING_INTERVAL_S)
+            await ws.send("PING")
+
+    async def _sync(self, ws) -> None:
+        parser = PolymarketEventParser()
+        for condition_id, token_ids in self.watched().items():
+            parser.add_market(condition_id, token_ids)
+        # Swapped in before subscribing so the first `book` events already resolve.
+        self.parser = parser
+        assets = parser.asset_ids()
+
+        if not self._initialized:
+            if assets:
+                await ws.send(json.dumps({"type": "market", "assets_ids": sorted(assets)}))
+                self._initialized = True
+                self._subscribed_assets = assets
+            return
+
+        added = assets - self._subscribed_assets
+        removed = self._subscribed_assets - assets
+        if added:
+            await ws.send(json.dumps({"assets_ids": sorted(added), "operation": "subscribe"}))
+        if removed:
+            await ws.send(json.dumps({"assets_ids": sorted(removed), "operation": "unsubscribe"}))
+        self._subscribed_assets = assets
+
+    def _handle(self, raw) -> None:
+        for message in _frames(raw):
+            for event in self.parser.parse(message):
+                self.store.apply(event)
+
+
+class PolymarketReplaySource(BookSource):
+    """
+    Replays raw market-channel frames, one per line as written by a feed's `record_path`,
+    through the same parser the live feed uses. Used to stress-test the store offline.
+    """
+
+    def __init__(self, path: str, markets: dict):
+        self.path = path
+        self.parser = PolymarketEventParser(markets)
+
+    def events(self) -> Iterator[BookEvent]:
+        with open(self.path) as f:
+            for line in f:
+                for message in _frames(line.strip()):
+                    yield from self.parser.parse(message)
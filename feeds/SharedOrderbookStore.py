@@ -0,0 +1,278 @@
+from collections import OrderedDict
+from multiprocessing import shared_memory
+from typing import Iterable, Optional
+import os
+import numpy as np
+from models.CompactOrderbook import CompactOrderbook
+from feeds.OrderbookStore import OrderbookStore
+
+_LADDERS = (("yes", "bid"), ("yes", "ask"), ("no", "bid"), ("no", "ask"))
+
+# Longest market ID a slot can hold, in UTF-8 bytes. Polymarket condition IDs take 66.
+KEY_BYTES = 96
+
+# Header fields: layout version, slot count, levels per ladder, slots handed out so far, and a
+# generation counter bumped whenever a slot changes market.
+_VERSION = 2
+_HEADER_FIELDS = 5
+
+# Reads retried while the writer keeps changing a slot, before giving up on it.
+READ_RETRIES = 100
+
+
+def _layout(capacity: int, max_depth: int) -> list:
+    """(name, dtype, shape) of each array in the segment, in order."""
+    return [
+        ("header", np.int64, (_HEADER_FIELDS,)),
+        ("seq", np.int64, (capacity,)),
+        ("timestamps", np.int64, (capacity,)),
+        ("lengths", np.int32, (capacity, 4)),
+        ("ids", f"S{KEY_BYTES}", (capacity,)),
+        ("data", np.int32, (capacity, 2, 4 * max_depth)),
+    ]
+
+
+def _size(capacity: int, max_depth: int) -> int:
+    return sum(np.dtype(dtype).itemsize * int(np.prod(shape)) for _, dtype, shape in _layout(capacity, max_depth))
+
+
+class SharedOrderbookStore():
+    """
+    Order books in one shared memory segment, written by one process and read by any number.
+
+    Every market gets a fixed-size slot holding its timestamp, ladder lengths, market ID and a
+    (2, 4 * max_depth) int32 array laid out like CompactOrderbook's packed buffer. Readers get
+    CompactOrderbooks over the slot itself, so a book costs no memory and no deserialization in
+    the processes reading it.
+
+    Slots are versioned like a seqlock: the writer makes a slot's sequence number odd before
+    changing it and even again after. A read is consistent if the number was even and unchanged
+    around it. `get_order_book` copies the slot under that check. `view_order_books` returns
+    zero-copy views and their versions; the caller uses them and then checks `unchanged`,
+    discarding results computed from a book that was rewritten meanwhile.
+
+    Market IDs must be unique across the books stored. Ladders deeper than `max_depth` are cut
+    to their best `max_depth` levels, like a depth-limited venue request. When every slot is
+    taken, the market written least recently is evicted.
+
+    Settings come from the environment:
+        SHARED_BOOK_CAPACITY: number of slots (default 20000).
+        SHARED_BOOK_DEPTH: levels per ladder (default 64).
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        self._shm = shm
+        self.owner = owner
+        header = np.ndarray((_HEADER_FIELDS,), dtype=np.int64, buffer=shm.buf)
+        if header[0] != _VERSION:
+            raise ValueError(f"Shared memory segment {shm.name} is not an order book store.")
+        self.capacity = int(header[1])
+        self.max_depth = int(header[2])
+        offset = 0
+        for name, dtype, shape in _layout(self.capacity, self.max_depth):
+            array = np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)
+            setattr(self, f"_{name}", array)
+            offset += array.nbytes
+        # market_id -> slot. Authoritative in the writer; refreshed from the IDs on a miss in readers.
+        self._index: dict[str, int] = {}
+        self._generation = -1
+        # Writer only: the book last written per market, least recently written first.
+        self._written: OrderedDict = OrderedDict()
+        self._free: list[int] = []
+        self.truncated = 0
+
+    @classmethod
+    def create(cls, capacity: Optional[int] = None, max_depth: Optional[int] = None, name: Optional[str] = None) -> "SharedOrderbookStore":
+        """Creates a new segment; the returned store is its writer."""
+        capacity = capacity or int(os.getenv("SHARED_BOOK_CAPACITY", 20000))
+        max_depth = max_depth or int(os.getenv("SHARED_BOOK_DEPTH", 64))
+        shm = shared_memory.SharedMemory(name=name, create=True, size=_size(capacity, max_depth))
+        header = np.ndarray((_HEADER_FIELDS,), dtype=np.int64, buffer=shm.buf)
+        header[:] = (_VERSION, capacity, max_depth, 0, 0)
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> "SharedOrderbookStore":
+        """Opens an existing segment for reading."""
+        return cls(shared_memory.SharedMemory(name=name), owner=False)
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    @property
+    def nbytes(self) -> int:
+        return self._shm.size
+
+    def close(self) -> None:
+        """Releases this process's mapping. Books read from the store must not be used after."""
+        for name, _, _ in _layout(self.capacity, self.max_depth):
+            setattr(self, f"_{name}", None)
+        self._shm.close()
+
+    def unlink(self) -> None:
+        """Destroys the segment once every process has closed it. Writer only."""
+        self._shm.unlink()
+
+    # Writer
+
+    def _allocate(self) -> Optional[int]:
+        if self._free:
+            return self._free.pop()
+        used = int(self._header[3])
+        if used < self.capacity:
+            self._header[3] = used + 1
+            return used
+        if self._written:
+            self.remove(next(iter(self._written)))
+            return self._free.pop()
+        return None
+
+    def put(self, orderbook) -> bool:
+        """
+        Writes the book to its market's slot, cutting ladders to `max_depth` levels. Returns
+        False if it could not be stored because the market ID is too long. Writing the same book
+        object again is a no-op.
+        """
+        market_id = orderbook.market_id
+        if self._written.get(market_id) is orderbook:
+            self._written.move_to_end(market_id)
+            return True
+        key = market_id.encode()
+        if len(key) > KEY_BYTES:
+            return False
+        book = CompactOrderbook.from_orderbook(orderbook)
+        ladders = []
+        for side, kind in _LADDERS:
+            prices, qtys = book.columns(side, kind)
+            if prices.shape[0] > self.max_depth:
+                # Ladders are in ascending price order: the best bids are last, the best asks first.
+                best = slice(-self.max_depth, None) if kind == "bid" else slice(self.max_depth)
+                prices, qtys = prices[best], qtys[best]
+                self.truncated += 1
+            ladders.append((prices, qtys))
+        slot = self._index.get(market_id)
+        new = slot is None
+        if new:
+            slot = self._allocate()
+            if slot is None:
+                return False
+            self._index[market_id] = slot
+
+        self._seq[slot] += 1
+        self._ids[slot] = key
+        self._timestamps[slot] = book.timestamp
+        self._lengths[slot] = [prices.shape[0] for prices, _ in ladders]
+        start = 0
+        for prices, qtys in ladders:
+            end = start + prices.shape[0]
+            self._data[slot, 0, start:end] = prices
+            self._data[slot, 1, start:end] = qtys
+            start = end
+        self._seq[slot] += 1
+        if new:
+            # Bumped only once the ID is in place, so a reader that sees the new generation finds it.
+            self._header[4] += 1
+
+        self._written[market_id] = orderbook
+        self._written.move_to_end(market_id)
+        return True
+
+    def put_many(self, orderbooks: Iterable) -> list[bool]:
+        return [self.put(orderbook) for orderbook in orderbooks]
+
+    def remove(self, market_id: str) -> None:
+        slot = self._index.pop(market_id, None)
+        if slot is None:
+            return
+        self._seq[slot] += 1
+        self._ids[slot] = b""
+        self._lengths[slot] = 0
+        self._seq[slot] += 1
+        self._header[4] += 1
+        self._written.pop(market_id, None)
+        self._free.append(slot)
+
+    def sync(self, store: OrderbookStore) -> int:
+        """
+        Writes every book of a local store that changed since the last sync, for a writer
+        process mirroring its feeds. Returns the number of books written.
+        """
+        written = 0
+        for market_id in store.market_ids():
+            orderbook = store.get_order_book(market_id)
+            if orderbook is not None and self._written.get(market_id) is not orderbook:
+                written += self.put(orderbook)
+        return written
+
+    # Readers
+
+    def _slot(self, market_id: str) -> Optional[int]:
+        slot = self._index.get(market_id)
+        if self.owner or (slot is not None and self._ids[slot] == market_id.encode()):
+            return slot
+        # Rebuilt only if slots changed market since the last rebuild, so looking up markets that
+        # were never stored costs a dict lookup.
+        generation = int(self._header[4])
+        if generation == self._generation:
+            return None
+        self._generation = generation
+        used = int(self._header[3])
+        self._index = {key.decode(): i for i, key in enumerate(self._ids[:used].tolist()) if key}
+        return self._index.get(market_id)
+
+    def _read(self, market_id: str, copy: bool) -> tuple:
+        """(book, (slot, sequence number)) read consistently, or (None, None)."""
+        slot = self._slot(market_id)
+        if slot is None:
+            return None, None
+        key = market_id.encode()
+        for _ in range(READ_RETRIES):
+            before = int(self._seq[slot])
+            if before & 1:
+                continue
+            if self._ids[slot] != key:
+                return None, None
+            # Clamped so that a torn read never slices outside the slot.
+            lengths = np.minimum(self._lengths[slot], self.max_depth).tolist()
+            timestamp = int(self._timestamps[slot])
+            data = self._data[slot]
+            if copy:
+                data = data[:, :sum(lengths)].copy()
+            if int(self._seq[slot]) == before:
+                return CompactOrderbook.from_buffer(market_id, timestamp, lengths, data), (slot, before)
+        return None, None
+
+    def get_order_book(self, market_id: str) -> Optional[CompactOrderbook]:
+        """A consistent copy of the market's book, or None if it is not stored."""
+        return self._read(market_id, copy=True)[0]
+
+    def get_order_books(self, market_ids: list[str]) -> list[CompactOrderbook]:
+        """Copies of the stored books of the given markets, skipping the others."""
+        books = (self.get_order_book(market_id) for market_id in market_ids)
+        return [book for book in books if book is not None]
+
+    def view_order_books(self, market_ids: list[str]) -> tuple[list, list]:
+        """
+        Zero-copy books of the given markets, None for markets not stored, and the version of
+        each to pass to `unchanged` once done with it.
+        """
+        reads = [self._read(market_id, copy=False) for market_id in market_ids]
+        return [book for book, _ in reads], [version for _, version in reads]
+
+    def unchanged(self, version: Optional[tuple]) -> bool:
+        """Whether the slot read at `version` has not been written since."""
+        if version is None:
+            return False
+        slot, seq = version
+        return int(self._seq[slot]) == seq
+
+    def market_ids(self) -> list[str]:
+        used = int(self._header[3])
+        return [key.decode() for key in self._ids[:used].tolist() if key]
+
+    def __contains__(self, market_id: str) -> bool:
+        return self._slot(market_id) is not None
+
+    def __len__(self) -> int:
+        return len(self.market_ids())
@@ -0,0 +1,172 @@
+from abc import ABC, abstractmethod
+from typing import Iterable, Optional
+import asyncio
+import logging
+import threading
+from websockets.exceptions import WebSocketException
+from feeds.OrderbookStore import OrderbookStore
+
+logger = logging.getLogger(__name__)
+
+
+class WebSocketBookFeed(ABC):
+    """
+    Long-lived WebSocket connection that keeps the books of a changing set of watched markets
+    current in an OrderbookStore.
+
+    The watched set can be changed from any thread; the connection task reconciles its
+    subscriptions against it whenever it changes, and again after every reconnect. Books of a
+    lost connection are removed from the store so readers fall back to REST instead of reading
+    stale state. Run with `await run()` or on a background thread with `start()`/`stop()`.
+
+    Subclasses implement the platform protocol: `_connect`, `_sync`, `_handle` and
+    `_reset_connection_state`.
+    """
+
+    def __init__(self, store: OrderbookStore, url: str, reconnect_delay: float = 1.0, record_path: Optional[str] = None):
+        self.store = store
+        self.url = url
+        self.reconnect_delay = reconnect_delay
+        self.record_path = record_path
+
+        self._watched: dict = {}
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._stop: Optional[asyncio.Event] = None
+        self._stop_requested = False
+        self._thread: Optional[threading.Thread] = None
+        self._reset_connection_state()
+
+        self.messages_received = 0
+        self.connections = 0
+
+    @abstractmethod
+    def _connect(self):
+        """Returns the `websockets` connect context for a new connection."""
+        pass
+
+    @abstractmethod
+    async def _sync(self, ws) -> None:
+        """Brings the connection's subscriptions in line with `watched()`."""
+        pass
+
+    @abstractmethod
+    def _handle(self, raw) -> None:
+        """Applies one received frame to the store."""
+        pass
+
+    @abstractmethod
+    def _reset_connection_state(self) -> None:
+        pass
+
+    def _background(self, ws) -> list:
+        """Extra coroutines to run for the lifetime of a connection, e.g. keepalives."""
+        return []
+
+    def _add_watched(self, markets: dict) -> None:
+        with self._lock:
+            added = {market_id: value for market_id, value in markets.items() if self._watched.get(market_id) != value}
+            self._watched.update(added)
+        if added:
+            self._notify()
+
+    def unwatch(self, market_ids: Iterable[str]) -> None:
+        """Stops streaming the markets and removes their books from the store."""
+        with self._lock:
+            removed = [market_id for market_id in market_ids if self._watched.pop(market_id, None) is not None]
+        for market_id in removed:
+            self.store.remove(market_id)
+        if removed:
+            self._notify()
+
+    def watched(self) -> dict:
+        with self._lock:
+            return dict(self._watched)
+
+    def is_watched(self, market_id: str) -> bool:
+        return market_id in self._watched
+
+    def get_order_books(self, market_ids: list[str]) -> list:
+        """Streamed books for the given markets, skipping markets without a complete snapshot yet."""
+        return self.store.get_order_books(market_ids)
+
+    def _notify(self) -> None:
+        loop, wake = self._loop, self._wake
+        if loop is not None and wake is not None:
+            loop.call_soon_threadsafe(wake.set)
+
+    def start(self) -> threading.Thread:
+        """Runs the feed on a daemon thread with its own event loop."""
+        self._stop_requested = False
+        self._thread = threading.Thread(target=asyncio.run, args=(self.run(),), name=type(self).__name__, daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop_requested = True
+        loop, stop = self._loop, self._stop
+        if loop is not None and stop is not None:
+            loop.call_soon_threadsafe(stop.set)
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    async def run(self) -> None:
+        """Keeps a connection open, reconnecting after failures, until `stop()` is called."""
+        self._wake = asyncio.Event()
+        self._stop = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+        try:
+            while not self._stop_requested:
+                try:
+                    async with self._connect() as ws:
+                        self.connections += 1
+                        await self._session(ws)
+                except (OSError, WebSocketException) as e:
+                    logger.warning(f"{type(self).__name__} connection lost: {e}")
+                finally:
+                    # Nothing arriving while disconnected can be applied, so the books are stale.
+                    for market_id in self.watched():
+                        self.store.remove(market_id)
+                    self._reset_connection_state()
+                if not self._stop_requested:
+                    try:
+                        await asyncio.wait_for(self._stop.wait(), self.reconnect_delay)
+                    except asyncio.TimeoutError:
+                        pass
+        finally:
+            self._loop = None
+
+    async def _session(self, ws) -> None:
+        self._wake.set()
+        coroutines = [self._read(ws), self._sync_loop(ws), self._stop.wait(), *self._background(ws)]
+        tasks = [asyncio.ensure_future(coroutine) for coroutine in coroutines]
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        for task in done:
+            if not task.cancelled() and task.exception() is not None:
+                raise task.exception()
+
+    async def _read(self, ws) -> None:
+        record = open(self.record_path, "a") if self.record_path else None
+        try:
+            async for raw in ws:
+                self.messages_received += 1
+                if record is not None:
+                    record.write(raw if isinstance(raw, str) else raw.decode())
+                    record.write("\n")
+                self._handle(raw)
+        finally:
+            if record is not None:
+                record.close()
+
+    async def _sync_loop(self, ws) -> None:
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            await self._sync(ws)
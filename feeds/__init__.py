@@ -0,0 +1,12 @@
+"""
+Feeds package for event contract trading.
+
+This package keeps local order books current from snapshot + delta feeds, so services can read
+books without a network round trip.
+"""
+
+from .BookSource import BookSnapshot, BookSideSnapshot, BookDelta, BookSource, ReplayBookSource
+from .OrderbookStore import OrderbookStore
+from .SharedOrderbookStore import SharedOrderbookStore
+
+__all__ = ['BookSnapshot', 'BookSideSnapshot', 'BookDelta', 'BookSource', 'ReplayBookSource', 'OrderbookStore', 'SharedOrderbookStore']
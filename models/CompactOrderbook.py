@@ -0,0 +1,217 @@
+from collections.abc import Mapping
+from typing import Iterable, Optional
+import struct
+import numpy as np
+from models.Orderbook import Orderbook
+
+# Header of the binary encoding: timestamp, then the length of each ladder in _LADDERS order.
+_HEADER = struct.Struct("<q4I")
+
+# Ladder order inside the packed buffer.
+_LADDERS = (("yes", "bid"), ("yes", "ask"), ("no", "bid"), ("no", "ask"))
+_LADDER_INDEX = {ladder: i for i, ladder in enumerate(_LADDERS)}
+
+_INT32 = np.iinfo(np.int32)
+
+
+class LadderView(Mapping):
+    """
+    Read-only `{"bid": [[price, qty], ...], "ask": [...]}` view of one side of a CompactOrderbook,
+    so code written against `Orderbook.yes`/`Orderbook.no` keeps working unchanged.
+    """
+    __slots__ = ("_book", "_side")
+
+    def __init__(self, book: "CompactOrderbook", side: str):
+        self._book = book
+        self._side = side
+
+    def __getitem__(self, kind: str) -> list[list[int]]:
+        if kind not in ("bid", "ask"):
+            raise KeyError(kind)
+        return self._book.levels(self._side, kind)
+
+    def __iter__(self):
+        return iter(("bid", "ask"))
+
+    def __len__(self) -> int:
+        return 2
+
+
+class CompactOrderbook():
+    """
+    Orderbook variant that packs all four ladders into one contiguous int32 buffer.
+
+    Row 0 of the buffer holds prices and row 1 quantities; ladder i occupies columns
+    offsets[i]:offsets[i + 1] in (yes bid, yes ask, no bid, no ask) order. Ladders are kept in
+    non-decreasing price order, like the lists the platform adapters produce.
+    """
+    __slots__ = ("market_id", "timestamp", "_data", "_offsets", "_best", "_prefix_sums", "_fingerprint")
+
+    def __init__(self, market_id: str, timestamp: int, yes: dict["str", list[list[int]]], no: dict["str", list[list[int]]]):
+        self._init(market_id, timestamp, [yes["bid"], yes["ask"], no["bid"], no["ask"]], sort=False)
+
+    def _init(self, market_id: str, timestamp: int, ladders: list, sort: bool) -> None:
+        self.market_id = market_id
+        self.timestamp = timestamp
+        self._best = None
+        self._prefix_sums = None
+        self._fingerprint = None
+
+        columns = [_as_columns(ladder, sort) for ladder in ladders]
+        for column in (column for pair in columns for column in pair):
+            # Assigning into the int32 buffer would wrap silently.
+            if column.shape[0] and column.dtype != np.int32 and (column.min() < _INT32.min or column.max() > _INT32.max):
+                raise ValueError(f"Order book {market_id} has a price or quantity outside the int32 range.")
+        lengths = [prices.shape[0] for prices, _ in columns]
+        self._offsets = (0, *np.cumsum(lengths).tolist())
+        self._data = np.empty((2, self._offsets[-1]), dtype=np.int32)
+        for (prices, qtys), start, end in zip(columns, self._offsets, self._offsets[1:]):
+            self._data[0, start:end] = prices
+            self._data[1, start:end] = qtys
+
+    @classmethod
+    def from_levels(
+        cls,
+        market_id: str,
+        timestamp: int,
+        yes_bid: Iterable,
+        yes_ask: Iterable,
+        no_bid: Iterable,
+        no_ask: Iterable,
+    ) -> "CompactOrderbook":
+        """
+        Builds a book from raw [price, qty] levels in any order, or (prices, qtys) column pairs.
+        Each ladder is stably sorted by price.
+        """
+        book = cls.__new__(cls)
+        book._init(market_id, timestamp, [yes_bid, yes_ask, no_bid, no_ask], sort=True)
+        return book
+
+    @classmethod
+    def from_orderbook(cls, orderbook: Orderbook) -> "CompactOrderbook":
+        if isinstance(orderbook, cls):
+            return orderbook
+        return cls(orderbook.market_id, orderbook.timestamp, orderbook.yes, orderbook.no)
+
+    def to_bytes(self) -> bytes:
+        """
+        Compact binary encoding: the timestamp and ladder lengths, then the int32 price row and
+        quantity row of the packed buffer, little-endian. The market ID is not included.
+        """
+        lengths = np.diff(self._offsets).tolist()
+        return _HEADER.pack(self.timestamp, *lengths) + self._data.astype("<i4", copy=False).tobytes()
+
+    @classmethod
+    def from_bytes(cls, market_id: str, data: bytes) -> "CompactOrderbook":
+        """Decodes `to_bytes` output. The ladders are read-only views of `data`."""
+        timestamp, *lengths = _HEADER.unpack_from(data)
+        total = sum(lengths)
+        return cls.from_buffer(market_id, timestamp, lengths, np.frombuffer(data, dtype="<i4", count=2 * total, offset=_HEADER.size).reshape(2, total))
+
+    @classmethod
+    def from_buffer(cls, market_id: str, timestamp: int, lengths: Iterable[int], data: np.ndarray) -> "CompactOrderbook":
+        """
+        Wraps an existing (2, n) int32 array laid out like the packed buffer, with ladders of the
+        given lengths, without copying it. Only the first sum(lengths) columns are used.
+        """
+        book = cls.__new__(cls)
+        book.market_id = market_id
+        book.timestamp = timestamp
+        book._best = None
+        book._prefix_sums = None
+        book._fingerprint = None
+        book._offsets = (0, *np.cumsum(lengths, dtype=np.int64).tolist())
+        book._data = data[:, :book._offsets[-1]]
+        return book
+
+    def to_orderbook(self) -> Orderbook:
+        return Orderbook(
+            market_id=self.market_id,
+            timestamp=self.timestamp,
+            yes={"bid": self.levels("yes", "bid"), "ask": self.levels("yes", "ask")},
+            no={"bid": self.levels("no", "bid"), "ask": self.levels("no", "ask")},
+        )
+
+    @property
+    def yes(self) -> LadderView:
+        return LadderView(self, "yes")
+
+    @property
+    def no(self) -> LadderView:
+        return LadderView(self, "no")
+
+    def columns(self, side: str, kind: str) -> tuple[np.ndarray, np.ndarray]:
+        """Zero-copy (prices, qtys) int32 views of one ladder."""
+        i = _LADDER_INDEX[(side, kind)]
+        start, end = self._offsets[i], self._offsets[i + 1]
+        return self._data[0, start:end], self._data[1, start:end]
+
+    def levels(self, side: str, kind: str) -> list[list[int]]:
+        """One ladder as the `[[price, qty], ...]` lists used by `Orderbook`."""
+        i = _LADDER_INDEX[(side, kind)]
+        return self._data[:, self._offsets[i]:self._offsets[i + 1]].T.tolist()
+
+    def depth(self, side: str, kind: str) -> int:
+        i = _LADDER_INDEX[(side, kind)]
+        return self._offsets[i + 1] - self._offsets[i]
+
+    def _best_prices(self) -> tuple:
+        if self._best is None:
+            best = []
+            for side, kind in _LADDERS:
+                prices, _ = self.columns(side, kind)
+                if prices.shape[0] == 0:
+                    best.append(None)
+                else:
+                    best.append(int(prices.max() if kind == "bid" else prices.min()))
+            self._best = tuple(best)
+        return self._best
+
+    def best_bid(self, side: str) -> Optional[int]:
+        """Highest bid price on `side`, or None if the ladder is empty."""
+        return self._best_prices()[_LADDER_INDEX[(side, "bid")]]
+
+    def best_ask(self, side: str) -> Optional[int]:
+        """Lowest ask price on `side`, or None if the ladder is empty."""
+        return self._best_prices()[_LADDER_INDEX[(side, "ask")]]
+
+    def prefix_sums(self, side: str, kind: str = "ask") -> tuple[np.ndarray, np.ndarray]:
+        """
+        Cumulative (quantity, cost) int64 arrays of one ladder, i.e. the curve the arbitrage
+        calculator walks. Computed once per book.
+        """
+        key = (side, kind)
+        if self._prefix_sums is None:
+            self._prefix_sums = {}
+        if key not in self._prefix_sums:
+            prices, qtys = self.columns(side, kind)
+            qtys = qtys.astype(np.int64)
+            self._prefix_sums[key] = (np.cumsum(qtys), np.cumsum(prices * qtys))
+        return self._prefix_sums[key]
+
+    def ask_fingerprint(self) -> int:
+        """
+        Hash of the raw price and quantity columns of both ask ladders, computed once per book.
+        See Orderbook.ask_fingerprint.
+        """
+        if self._fingerprint is None:
+            yes_ask = self._data[:, self._offsets[1]:self._offsets[2]]
+            no_ask = self._data[:, self._offsets[3]:self._offsets[4]]
+            self._fingerprint = hash((yes_ask.tobytes(), no_ask.tobytes()))
+        return self._fingerprint
+
+    @property
+    def nbytes(self) -> int:
+        return self._data.nbytes
+
+
+def _as_columns(ladder, sort: bool) -> tuple[np.ndarray, np.ndarray]:
+    if isinstance(ladder, tuple) and len(ladder) == 2 and isinstance(ladder[0], np.ndarray):
+        prices, qtys = ladder
+    else:
+        levels = np.asarray(ladder, dtype=np.int64).reshape(-1, 2)
+        prices, qtys = levels[:, 0], levels[:, 1]
+    if sort and prices.shape[0] > 1:
+        order = np.argsort(prices, kind="stable")
+        prices, qtys = prices[order], qtys[order]
+    return prices, qtys
@@ -5,4 +5,14 @@ class Orderbook():
         self.timestamp = timestamp
         self.yes = yes
         self.no = no
-        
\ No newline at end of file
+
+    def ask_fingerprint(self) -> int:
+        """
+        Hash of both ask ladders, the only part of a book the arbitrage calculator reads. Equal
+        ladders give equal fingerprints, so results can be reused while the asks are unchanged.
+        Recomputed on every call, since the ladders are plain lists that may be edited in place.
+        """
+        return hash((
+            tuple(tuple(level) for level in self.yes["ask"]),
+            tuple(tuple(level) for level in self.no["ask"]),
+        ))
@@ -0,0 +1,43 @@
+from typing import Optional
+from models.Orderbook import Orderbook
+
+class TopOfBook():
+    """
+    Best bid and ask of both sides of a market, in the same price units as Orderbook ladders
+    (thousandths of a dollar). A price is None when that side of the book is empty.
+    """
+    __slots__ = ("market_id", "yes_bid", "yes_ask", "no_bid", "no_ask")
+
+    def __init__(
+        self,
+        market_id: str,
+        yes_bid: Optional[int] = None,
+        yes_ask: Optional[int] = None,
+        no_bid: Optional[int] = None,
+        no_ask: Optional[int] = None,
+    ):
+        self.market_id = market_id
+        self.yes_bid = yes_bid
+        self.yes_ask = yes_ask
+        self.no_bid = no_bid
+        self.no_ask = no_ask
+
+    @classmethod
+    def from_orderbook(cls, orderbook: Orderbook) -> "TopOfBook":
+        """The top of a full book (an Orderbook or CompactOrderbook)."""
+        def best(levels, pick):
+            return pick(price for price, _ in levels) if levels else None
+
+        return cls(
+            market_id=orderbook.market_id,
+            yes_bid=best(orderbook.yes["bid"], max),
+            yes_ask=best(orderbook.yes["ask"], min),
+            no_bid=best(orderbook.no["bid"], max),
+            no_ask=best(orderbook.no["ask"], min),
+        )
+
+    def __repr__(self):
+        return (
+            f"TopOfBook({self.market_id!r}, yes_bid={self.yes_bid}, yes_ask={self.yes_ask}, "
+            f"no_bid={self.no_bid}, no_ask={self.no_ask})"
+        )
@@ -6,6 +6,8 @@ This package contains the core data models used across the platform.
 
 from .Market import Market
 from .Orderbook import Orderbook
+from .CompactOrderbook import CompactOrderbook
 from .PlatformType import PlatformType
+from .TopOfBook import TopOfBook
 
-__all__ = ['Market', 'Orderbook', 'PlatformType']
+__all__ = ['Market', 'Orderbook', 'CompactOrderbook', 'PlatformType', 'TopOfBook']
@@ -1,13 +1,20 @@
 # import abstract class
 from abc import ABC, abstractmethod
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, AsyncIterator, Awaitable, TypeVar
+import asyncio
+import threading
 from models.Order import Order
+from models.TopOfBook import TopOfBook
+from platforms.HttpTransport import get_transport
 
 if TYPE_CHECKING:
     from models.Market import Market
     from models.Orderbook import Orderbook
-    
+
 class BasePlatform(ABC):
+    # PlatformType of the venue; set by every implementation.
+    PLATFORM = None
+
     @abstractmethod
     def get_balance(self) -> float:
         """
@@ -38,6 +45,32 @@ class BasePlatform(ABC):
         """
         pass
 
+    def get_top_of_book(self, market_ids: list[str]) -> dict[str, TopOfBook]:
+        """
+        Arguments:
+            market_ids:
+                - Market IDs to get the best bid and ask of.
+            returns:
+                - market ID -> TopOfBook, leaving out markets that could not be fetched.
+        Used to screen markets before requesting full depth. Platforms whose APIs return best
+        prices for many markets in one call override this; by default it derives them from
+        get_order_books.
+        """
+        return {orderbook.market_id: TopOfBook.from_orderbook(orderbook) for orderbook in self.get_order_books(market_ids)}
+
+    async def iter_new_markets(self, num_markets: int) -> AsyncIterator[str]:
+        """
+        Arguments:
+            num_markets:
+                - Maximum number of market IDs to yield.
+            yields:
+                - Market IDs as they are discovered, without duplicates.
+        Platforms with paginated listings override this to stream pages as they arrive; by
+        default it runs find_new_markets in a worker thread.
+        """
+        for market_id in await asyncio.to_thread(self.find_new_markets, num_markets):
+            yield market_id
+
     @abstractmethod
     def get_markets(self, market_ids: list[str]) -> list["Market"]:
         """
@@ -59,4 +92,85 @@ class BasePlatform(ABC):
 
     @abstractmethod
     def get_order_status(self, order: Order) -> None:
-        pass
\ No newline at end of file
+        pass
+
+    # asyncio counterparts of the methods above, for callers running on an event loop. By default
+    # each runs its blocking method in a worker thread; platforms with native async I/O override
+    # them and implement the blocking method as `run_sync(self.a...(...))`.
+
+    async def aget_balance(self) -> float:
+        return await asyncio.to_thread(self.get_balance)
+
+    async def aget_order_books(self, market_ids: list[str]) -> list["Orderbook"]:
+        return await asyncio.to_thread(self.get_order_books, market_ids)
+
+    async def aget_top_of_book(self, market_ids: list[str]) -> dict[str, TopOfBook]:
+        return await asyncio.to_thread(self.get_top_of_book, market_ids)
+
+    async def afind_new_markets(self, num_markets: int) -> list[str]:
+        return await collect(self.iter_new_markets(num_markets))
+
+    async def aget_markets(self, market_ids: list[str]) -> list["Market"]:
+        return await asyncio.to_thread(self.get_markets, market_ids)
+
+    async def aplace_order(self, order: Order) -> dict:
+        return await asyncio.to_thread(self.place_order, order)
+
+    async def acancel_order(self, order: Order):
+        return await asyncio.to_thread(self.cancel_order, order)
+
+    async def aget_order_status(self, order: Order):
+        return await asyncio.to_thread(self.get_order_status, order)
+
+    # Connection pre-warming. Platforms that talk HTTP list the URLs they call in _http_origins;
+    # services warm them at start so the first poll does not pay for TCP and TLS handshakes.
+
+    def _http_origins(self) -> list[str]:
+        return []
+
+    def warm_connections(self) -> None:
+        """Opens pooled connections to this platform's hosts for blocking callers."""
+        get_transport().warm(self._http_origins())
+
+    async def awarm_connections(self) -> None:
+        """Opens pooled connections to this platform's hosts on the running event loop."""
+        await get_transport().awarm(self._http_origins())
+
+async def collect(iterator: AsyncIterator) -> list:
+    """Drains an async iterator into a list, e.g. `run_sync(collect(platform.iter_new_markets(n)))`."""
+    return [item async for item in iterator]
+
+
+T = TypeVar("T")
+
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def event_loop() -> asyncio.AbstractEventLoop:
+    """
+    The process-wide event loop that blocking platform methods run their async I/O on. It is
+    started on a daemon thread on first use and lives for the rest of the process, so
+    connections and clients bound to it can be reused across calls.
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="platform-event-loop", daemon=True).start()
+            _loop = loop
+        return _loop
+
+
+def run_sync(coroutine: Awaitable[T]) -> T:
+    """
+    Runs a coroutine on the shared event loop and blocks until it finishes. Unlike
+    `asyncio.run`, this does not create and tear down a loop per call. Code already running on
+    an event loop must await the coroutine instead, since blocking here would stall its loop.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run_coroutine_threadsafe(coroutine, event_loop()).result()
+    coroutine.close()
+    raise RuntimeError("run_sync called from a running event loop; await the async method instead.")
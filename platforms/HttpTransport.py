@@ -0,0 +1,143 @@
+from typing import Iterable, Optional
+from urllib.parse import urlsplit
+import asyncio
+import logging
+import os
+import threading
+import weakref
+import httpx
+
+class HttpTransport:
+    """
+    Pooled HTTP clients shared by every platform adapter in the process.
+
+    There is one keep-alive pool per origin (scheme://host:port), so a venue's connections are
+    reused by all of its requests instead of being set up per call. Blocking callers get an
+    `httpx.Client`; coroutines get an `httpx.AsyncClient` for the event loop they run on, since
+    async connections cannot move between loops. Auth is passed per request, so clients are
+    shared regardless of credentials.
+
+    Settings come from the environment:
+        HTTP_MAX_CONNECTIONS: connections per origin (default 100).
+        HTTP_MAX_KEEPALIVE: idle connections kept per origin (default 20).
+        HTTP_KEEPALIVE_EXPIRY_S: how long an idle connection is kept (default 60).
+        HTTP_TIMEOUT_S: request timeout (default 30).
+        HTTP_CONNECT_TIMEOUT_S: connect timeout (default 5).
+        HTTP2: "true" to negotiate HTTP/2 where the server offers it. Needs the `h2` package;
+            without it the transport falls back to HTTP/1.1.
+    """
+
+    def __init__(
+        self,
+        max_connections: Optional[int] = None,
+        max_keepalive: Optional[int] = None,
+        keepalive_expiry_s: Optional[float] = None,
+        timeout_s: Optional[float] = None,
+        connect_timeout_s: Optional[float] = None,
+        http2: Optional[bool] = None,
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections or int(os.getenv("HTTP_MAX_CONNECTIONS", 100)),
+            max_keepalive_connections=max_keepalive or int(os.getenv("HTTP_MAX_KEEPALIVE", 20)),
+            keepalive_expiry=keepalive_expiry_s or float(os.getenv("HTTP_KEEPALIVE_EXPIRY_S", 60)),
+        )
+        self.timeout = httpx.Timeout(
+            timeout_s or float(os.getenv("HTTP_TIMEOUT_S", 30)),
+            connect=connect_timeout_s or float(os.getenv("HTTP_CONNECT_TIMEOUT_S", 5)),
+        )
+        if http2 is None:
+            http2 = os.getenv("HTTP2", "false").lower() == "true"
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logging.warning("HTTP2 is enabled but the h2 package is not installed; using HTTP/1.1.")
+                http2 = False
+        self.http2 = http2
+
+        self._lock = threading.Lock()
+        self._clients: dict[str, httpx.Client] = {}
+        # event loop -> origin -> client; entries go away with their loop.
+        self._async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, httpx.AsyncClient]]" = weakref.WeakKeyDictionary()
+
+    @staticmethod
+    def origin(url: str) -> str:
+        parts = urlsplit(url)
+        return f"{parts.scheme}://{parts.netloc}"
+
+    def client(self, url: str) -> httpx.Client:
+        """The shared blocking client for the origin of `url`."""
+        origin = self.origin(url)
+        with self._lock:
+            client = self._clients.get(origin)
+            if client is None:
+                client = httpx.Client(limits=self.limits, timeout=self.timeout, http2=self.http2)
+                self._clients[origin] = client
+            return client
+
+    def async_client(self, url: str) -> httpx.AsyncClient:
+        """The shared async client for the origin of `url` on the running event loop."""
+        loop = asyncio.get_running_loop()
+        origin = self.origin(url)
+        with self._lock:
+            clients = self._async_clients.setdefault(loop, {})
+            client = clients.get(origin)
+            if client is None or client.is_closed:
+                client = httpx.AsyncClient(limits=self.limits, timeout=self.timeout, http2=self.http2)
+                clients[origin] = client
+            return client
+
+    def _one_per_origin(self, urls: Iterable[str]) -> list[str]:
+        first = {}
+        for url in urls:
+            first.setdefault(self.origin(url), url)
+        return list(first.values())
+
+    def warm(self, urls: Iterable[str]) -> None:
+        """
+        Opens a connection to each origin among `urls` with a HEAD request to the first URL
+        listed for it, so the first real request does not pay for the TCP and TLS handshakes.
+        Failures are logged and ignored.
+        """
+        for url in self._one_per_origin(urls):
+            try:
+                self.client(url).head(url)
+            except httpx.HTTPError as e:
+                logging.warning(f"Could not pre-warm connection to {self.origin(url)}: {e}")
+
+    async def awarm(self, urls: Iterable[str]) -> None:
+        """Async version of warm for the running event loop's clients; origins are warmed concurrently."""
+        async def warm_one(url):
+            try:
+                await self.async_client(url).head(url)
+            except httpx.HTTPError as e:
+                logging.warning(f"Could not pre-warm connection to {self.origin(url)}: {e}")
+
+        await asyncio.gather(*(warm_one(url) for url in self._one_per_origin(urls)))
+
+    def close(self) -> None:
+        """Closes the blocking clients. Async clients are closed with `aclose` on their loop."""
+        with self._lock:
+            clients, self._clients = list(self._clients.values()), {}
+        for client in clients:
+            client.close()
+
+    async def aclose(self) -> None:
+        """Closes the running event loop's async clients."""
+        with self._lock:
+            clients = self._async_clients.pop(asyncio.get_running_loop(), {})
+        for client in clients.values():
+            await client.aclose()
+
+
+_transport: Optional[HttpTransport] = None
+_transport_lock = threading.Lock()
+
+
+def get_transport() -> HttpTransport:
+    """The process-wide HttpTransport, created from the environment on first use."""
+    global _transport
+    with _transport_lock:
+        if _transport is None:
+            _transport = HttpTransport()
+        return _transport
@@ -1,13 +1,17 @@
 from datetime import datetime, timezone
 import logging
 import time
-from typing import List
+from typing import AsyncIterator, List, Optional
 from models.Market import Market
 from models.Orderbook import Orderbook
-from platforms.BasePlatform import BasePlatform
+from models.CompactOrderbook import CompactOrderbook
+from models.TopOfBook import TopOfBook
+from platforms.BasePlatform import BasePlatform, collect, run_sync
+from platforms.HttpTransport import get_transport
+from platforms.LatencyTracker import endpoint_key
+from platforms.RateLimiter import MARKET_DATA, ORDER_ENTRY, PORTFOLIO, get_rate_limiter
 from models.PlatformType import PlatformType
 from models.Order import Order
-import requests
 import asyncio
 import time
 import httpx
@@ -16,45 +20,74 @@ import base64
 from cryptography.hazmat.primitives import serialization, hashes
 from cryptography.hazmat.primitives.asymmetric import padding, rsa
 from cryptography.hazmat.backends import default_backend
-from requests.auth import AuthBase
-from urllib.parse import urlparse
 from models.OrderStatus import OrderStatus
 from models.Trade import Trade
 
-class KalshiAuth(AuthBase):
-    def __init__(self, key_id: str, private_key: rsa.RSAPrivateKey):
-        self.key_id = key_id
-        self.private_key = private_key
+# Largest page the /markets listing serves.
+KALSHI_PAGE_SIZE = 1000
 
-    def __call__(self, r):
-        timestamp = str(int(datetime.now(timezone.utc).timestamp() * 1000))
-        parsed_url = urlparse(r.url)
-        path = parsed_url.path
-        if parsed_url.query:
-            path += "?" + parsed_url.query
-        
-        msg_string = f"{timestamp}{r.method.upper()}{path}"
-
-        signature = self.private_key.sign(
-            msg_string.encode('utf-8'),
-            padding.PSS(
-                mgf=padding.MGF1(hashes.SHA256()),
-                salt_length=padding.PSS.DIGEST_LENGTH
-            ),
-            hashes.SHA256()
-        )
-        encoded_signature = base64.b64encode(signature).decode('utf-8')
-
-        r.headers['KALSHI-ACCESS-KEY'] = self.key_id
-        r.headers['KALSHI-ACCESS-TIMESTAMP'] = timestamp
-        r.headers['KALSHI-ACCESS-SIGNATURE'] = encoded_signature
-        
-        if 'Authorization' in r.headers:
-            del r.headers['Authorization']
-        if 'Content-Type' not in r.headers:
-            r.headers['Content-Type'] = 'application/json'
-            
-        return r
+def kalshi_auth_headers(key_id: str, private_key: rsa.RSAPrivateKey, method: str, path: str) -> dict:
+    """
+    Signs `timestamp + METHOD + path` with RSA-PSS and returns the Kalshi access headers.
+    Shared by the REST auth hooks and the WebSocket handshake.
+    """
+    timestamp = str(int(datetime.now(timezone.utc).timestamp() * 1000))
+    msg_string = f"{timestamp}{method.upper()}{path}"
+
+    signature = private_key.sign(
+        msg_string.encode('utf-8'),
+        padding.PSS(
+            mgf=padding.MGF1(hashes.SHA256()),
+            salt_length=padding.PSS.DIGEST_LENGTH
+        ),
+        hashes.SHA256()
+    )
+    encoded_signature = base64.b64encode(signature).decode('utf-8')
+
+    return {
+        'KALSHI-ACCESS-KEY': key_id,
+        'KALSHI-ACCESS-TIMESTAMP': timestamp,
+        'KALSHI-ACCESS-SIGNATURE': encoded_signature,
+    }
+
+def _top_of_book(a_market: dict) -> TopOfBook:
+    """TopOfBook of a /markets entry. Kalshi quotes cents and reports an empty side as 0 (bid) or 100 (ask)."""
+    def bid(cents):
+        return cents * 10 if cents else None
+
+    def ask(cents):
+        return cents * 10 if cents and cents < 100 else None
+
+    return TopOfBook(
+        market_id=a_market['ticker'],
+        yes_bid=bid(a_market.get('yes_bid')),
+        yes_ask=ask(a_market.get('yes_ask')),
+        no_bid=bid(a_market.get('no_bid')),
+        no_ask=ask(a_market.get('no_ask')),
+    )
+
+def _orderbook_from(market_id: str, orderbook: dict, depth: Optional[int] = None) -> CompactOrderbook:
+    """
+    Normalizes an orderbook payload. Kalshi only lists resting bids, in cents and contracts, so
+    each side's asks are the other side's bids at 100 minus the price. Levels outside the 1-99
+    cent range or without size are dropped, and `depth` keeps the best levels of each side.
+    """
+    def bids(levels):
+        valid = sorted((price, qty) for price, qty in levels or [] if 0 < price < 100 and qty > 0)
+        if depth:
+            valid = valid[-depth:]
+        return [[price * 10, qty * 100] for price, qty in valid]
+
+    yes_bids = bids(orderbook.get("yes"))
+    no_bids = bids(orderbook.get("no"))
+    return CompactOrderbook.from_levels(
+        market_id=market_id,
+        timestamp=int(time.time() * 1000),
+        yes_bid=yes_bids,
+        yes_ask=[[1000 - price, qty] for price, qty in no_bids],
+        no_bid=no_bids,
+        no_ask=[[1000 - price, qty] for price, qty in yes_bids],
+    )
 
 class KalshiHttpxAuth(httpx.Auth):
     def __init__(self, key_id: str, private_key: rsa.RSAPrivateKey):
@@ -62,26 +95,11 @@ class KalshiHttpxAuth(httpx.Auth):
         self.private_key = private_key
 
     def auth_flow(self, r):
-        timestamp = str(int(datetime.now(timezone.utc).timestamp() * 1000))
         path = r.url.path
         if r.url.query:
             path += "?" + r.url.query.decode('utf-8')
 
-        msg_string = f"{timestamp}{r.method.upper()}{path}"
-        
-        signature = self.private_key.sign(
-            msg_string.encode('utf-8'),
-            padding.PSS(
-                mgf=padding.MGF1(hashes.SHA256()),
-                salt_length=padding.PSS.DIGEST_LENGTH
-            ),
-            hashes.SHA256()
-        )
-        encoded_signature = base64.b64encode(signature).decode('utf-8')
-
-        r.headers['KALSHI-ACCESS-KEY'] = self.key_id
-        r.headers['KALSHI-ACCESS-TIMESTAMP'] = timestamp
-        r.headers['KALSHI-ACCESS-SIGNATURE'] = encoded_signature
+        r.headers.update(kalshi_auth_headers(self.key_id, self.private_key, r.method, path))
         
         if 'Authorization' in r.headers:
             del r.headers['Authorization']
@@ -98,9 +116,10 @@ class KalshiPlatform(BasePlatform):
     the outcome of real-world events.
     """
     
+    PLATFORM = PlatformType.KALSHI
+
     def __init__(self):
         self.base_url = "https://api.elections.kalshi.com/trade-api/v2"
-        self.session = requests.Session()
 
         key_id = os.getenv("KALSHI_ACCESS_KEY")
         private_key_pem = os.getenv("KALSHI_PRIVATE_KEY")
@@ -116,99 +135,119 @@ class KalshiPlatform(BasePlatform):
         )
         self.key_id = key_id
 
-        self.session.auth = KalshiAuth(self.key_id, self.private_key)
-
         logging.getLogger("httpx").setLevel(logging.WARNING)
 
+    @property
+    def http_auth(self) -> KalshiHttpxAuth:
+        return KalshiHttpxAuth(self.key_id, self.private_key)
+
+    def _request(self, endpoint_class: str, method: str, url: str, **kwargs) -> httpx.Response:
+        """Sends a signed request over the shared connection pool, paced by the endpoint class's rate limit."""
+        client = get_transport().client(url)
+        return get_rate_limiter(self.PLATFORM).send(
+            endpoint_class, lambda: client.request(method, url, auth=self.http_auth, **kwargs)
+        )
+
+    async def _arequest(
+        self,
+        session: httpx.AsyncClient,
+        endpoint_class: str,
+        method: str,
+        url: str,
+        route: Optional[str] = None,
+        hedge: bool = False,
+        **kwargs,
+    ) -> httpx.Response:
+        """
+        Async version of _request on the given client. The request is timed out from the
+        latency of its endpoint (`route` names per-market paths, e.g. "/markets/{ticker}"), and
+        with `hedge` a slow one is duplicated.
+        """
+        return await get_rate_limiter(self.PLATFORM).asend(
+            endpoint_class,
+            lambda: session.request(method, url, auth=self.http_auth, **kwargs),
+            latency_key=endpoint_key(url, route),
+            hedge=hedge,
+        )
+
+    def _http_origins(self) -> List[str]:
+        return [self.base_url]
+
     def get_balance(self) -> float:
         """
         Fetches the user's cash balance from the Kalshi API.
         """
-        response = self.session.get(f"{self.base_url}/portfolio/balance")
+        response = self._request(PORTFOLIO, "GET", f"{self.base_url}/portfolio/balance")
         response.raise_for_status()
         balance_data = response.json()
         # Kalshi returns the balance in cents, so we divide by 100.
         return float(balance_data.get("balance", 0)) / 100.0
 
-    async def _get_order_books_async(self, market_ids: List[str], markets: dict) -> List[Orderbook]:
-        auth = KalshiHttpxAuth(self.key_id, self.private_key)
-        async with httpx.AsyncClient(auth=auth) as session:
-            tasks = [
-                self._fetch_orderbook(session, self.base_url, mid, markets)
-                for mid in market_ids
-            ]
-            results = await asyncio.gather(*tasks)
-            return [ob for ob in results if ob is not None]
-    
-    async def _fetch_orderbook(self, session, base_url, market_id, markets):
+    async def _fetch_orderbook(self, session, market_id: str, depth: Optional[int] = None) -> Optional[CompactOrderbook]:
+        """
+        The market's book from its orderbook endpoint alone, or None if it cannot be fetched.
+        """
         try:
-            response = await session.get(f"{base_url}/markets/{market_id}/orderbook")
+            response = await self._arequest(
+                session, MARKET_DATA, "GET", f"{self.base_url}/markets/{market_id}/orderbook",
+                route="/markets/{ticker}/orderbook", hedge=True,
+                params={"depth": depth} if depth else None,
+            )
             if response.status_code != 200:
+                logging.warning(f"Kalshi order book request for {market_id} failed with status {response.status_code}")
                 return None
-
-            data = response.json()["orderbook"]
-            data2 = markets[market_id]
-            highest_no_bid = data2["no_bid"]
-            highest_yes_bid = data2["yes_bid"]
-
-            yes_bids = []
-            yes_asks = []
-            no_bids = []
-            no_asks = []
-
-            yes = data.get("yes") or []
-            no = data.get("no") or []
-            for a_yes in yes:
-                if a_yes[0] <= highest_yes_bid:
-                    yes_bids.append([a_yes[0] * 10, a_yes[1] * 100])
-
-            for a_no in no:
-                if a_no[0] <= highest_no_bid:
-                    no_bids.append([a_no[0] * 10, a_no[1] * 100])
-
-            for i in range(len(yes_bids)):
-                no_asks.append([1000 - yes_bids[i][0], yes_bids[i][1]])
-            for i in range(len(no_bids)):
-                yes_asks.append([1000 - no_bids[i][0], no_bids[i][1]])
-
-
-            yes_bids.sort(key=lambda x: x[0])
-            yes_asks.sort(key=lambda x: x[0])
-            no_bids.sort(key=lambda x: x[0])
-            no_asks.sort(key=lambda x: x[0])
-            return Orderbook(
-                market_id=market_id,
-                timestamp=int(time.time() * 1000),
-                yes={"bid": yes_bids, "ask": yes_asks},
-                no={"bid": no_bids, "ask": no_asks}
-            )
+            return _orderbook_from(market_id, response.json()["orderbook"], depth)
         except Exception as e:
-            print(f"Error processing market {market_id}: {e}")
+            logging.warning(f"Kalshi order book request for {market_id} failed: {e!r}")
             return None
 
-
-    def get_order_books(self, market_ids: List[str]) -> List[Orderbook]:
+    def get_order_books(self, market_ids: List[str], depth: Optional[int] = None) -> List[Orderbook]:
         
         """
         Get order books for the specified market IDs.
         
         Args:
             market_ids: List of market IDs to get order books for
+            depth: Price levels to keep per side, best first; None for the whole book
             
         Returns:
             List of Orderbook objects containing bid/ask data
         """
+        return run_sync(self.aget_order_books(market_ids, depth))
 
-        markets = {}
-        while len(markets) < len(market_ids):
-            limited_request_ids = market_ids[len(markets):len(markets) + 50]
-            response = self.session.get(f"{self.base_url}/markets?tickers={','.join(limited_request_ids)}")
-            if response.status_code == 200:
-                data = response.json()["markets"]
-                for a_market in data:
-                    markets[a_market['ticker']] = a_market
-    
-        return asyncio.run(self._get_order_books_async(market_ids, markets))
+    async def aget_order_books(self, market_ids: List[str], depth: Optional[int] = None) -> List[Orderbook]:
+        """
+        Async version of get_order_books. Every book is fetched concurrently, one request per
+        market. Markets whose book cannot be fetched are left out, the rest are still returned.
+        """
+        session = get_transport().async_client(self.base_url)
+        results = await asyncio.gather(*[self._fetch_orderbook(session, mid, depth) for mid in market_ids])
+        missing = sum(ob is None for ob in results)
+        if missing:
+            logging.warning(f"Kalshi order books missing for {missing} of {len(market_ids)} markets")
+        return [ob for ob in results if ob is not None]
+
+    def get_top_of_book(self, market_ids: List[str]) -> dict:
+        return run_sync(self.aget_top_of_book(market_ids))
+
+    async def aget_top_of_book(self, market_ids: List[str]) -> dict:
+        """
+        Best prices from the market lookup alone, which carries them for 50 tickers per request,
+        so screening needs no order book requests.
+        """
+        session = get_transport().async_client(self.base_url)
+        pages = await asyncio.gather(*[
+            self._fetch_markets_by_tickers(session, market_ids[i:i + 50])
+            for i in range(0, len(market_ids), 50)
+        ])
+        return {a_market['ticker']: _top_of_book(a_market) for page in pages for a_market in page}
+
+    async def _fetch_markets_by_tickers(self, session, tickers: List[str]) -> list:
+        response = await self._arequest(session, MARKET_DATA, "GET", f"{self.base_url}/markets?tickers={','.join(tickers)}")
+        if response.status_code != 200:
+            logging.warning(f"Kalshi market lookup failed with status {response.status_code}")
+            return []
+        return response.json()["markets"]
 
     def find_new_markets(self, num_markets: int) -> List[str]:
         """
@@ -220,26 +259,47 @@ class KalshiPlatform(BasePlatform):
         Returns:
             List of market IDs for new/active markets
         """
+        return run_sync(collect(self.iter_new_markets(num_markets)))
 
+    async def iter_new_markets(self, num_markets: int) -> AsyncIterator[str]:
+        """
+        Yields tickers of open markets until `num_markets` have been yielded or the cursor is
+        exhausted.
+
+        Each page's cursor comes from the previous response, so pages cannot be fetched in
+        parallel; instead the next page is requested as soon as its cursor is known, while the
+        current one is being consumed.
+        """
         if num_markets <= 0:
-            return []
-        curr_num_markets = 0
-        market_ids = []
-        cursor = ""
-        while curr_num_markets < num_markets:
-            num_pages_to_fetch = min((num_markets - curr_num_markets), 1000)
-            response = self.session.get(f"{self.base_url}/markets?limit={num_pages_to_fetch}&cursor={cursor}&status=open")
-
-            parsed_response = response.json()
-
-            for market in parsed_response['markets']:
-                market_ids.append(market['ticker'])
-                curr_num_markets += 1
-                if curr_num_markets >= num_markets:
-                    break
-            cursor = parsed_response.get('cursor')
-
-        return market_ids
+            return
+        remaining = num_markets
+        session = get_transport().async_client(self.base_url)
+        next_page = asyncio.ensure_future(self._fetch_markets_page(session, "", min(remaining, KALSHI_PAGE_SIZE)))
+        try:
+            while next_page is not None:
+                page = await next_page
+                next_page = None
+                markets = page.get("markets") or []
+                cursor = page.get("cursor")
+                left_after_page = remaining - len(markets)
+                if markets and cursor and left_after_page > 0:
+                    next_page = asyncio.ensure_future(
+                        self._fetch_markets_page(session, cursor, min(left_after_page, KALSHI_PAGE_SIZE))
+                    )
+                for market in markets[:remaining]:
+                    yield market['ticker']
+                remaining -= min(len(markets), remaining)
+        finally:
+            if next_page is not None:
+                next_page.cancel()
+                await asyncio.gather(next_page, return_exceptions=True)
+
+    async def _fetch_markets_page(self, session, cursor: str, limit: int) -> dict:
+        response = await self._arequest(
+            session, MARKET_DATA, "GET", f"{self.base_url}/markets", params={"limit": limit, "cursor": cursor, "status": "open"}
+        )
+        response.raise_for_status()
+        return response.json()
     
 
     def get_markets(self, market_ids: List[str]) -> List[Market]:
@@ -257,31 +317,35 @@ class KalshiPlatform(BasePlatform):
             return []
 
         markets = []
-        while len(markets) < len(market_ids):
-            limited_request_ids = market_ids[len(markets):len(markets) + 50]
-            response = self.session.get(f"{self.base_url}/markets?tickers={','.join(limited_request_ids)}")
-            if response.status_code == 200:
-                data = response.json()["markets"]
-                for a_market in data:
-                    close_iso_time = a_market["close_time"]
-                    dt = datetime.strptime(close_iso_time, "%Y-%m-%dT%H:%M:%SZ")
-                    unix_ts = int(dt.timestamp())
-
-                    market = Market(
-                        platform=PlatformType.KALSHI,
-                        market_id=a_market['ticker'],
-                        name=a_market['title'],
-                        rules=a_market['rules_primary'],
-                        close_timestamp=unix_ts
-                    )
-                    markets.append(market)
+        for i in range(0, len(market_ids), 50):
+            limited_request_ids = market_ids[i:i + 50]
+            response = self._request(MARKET_DATA, "GET", f"{self.base_url}/markets?tickers={','.join(limited_request_ids)}")
+            if response.status_code != 200:
+                logging.warning(f"Kalshi market lookup failed with status {response.status_code}")
+                continue
+            data = response.json()["markets"]
+            for a_market in data:
+                close_iso_time = a_market["close_time"]
+                dt = datetime.strptime(close_iso_time, "%Y-%m-%dT%H:%M:%SZ")
+                unix_ts = int(dt.timestamp())
+
+                market = Market(
+                    platform=PlatformType.KALSHI,
+                    market_id=a_market['ticker'],
+                    name=a_market['title'],
+                    rules=a_market['rules_primary'],
+                    close_timestamp=unix_ts
+                )
+                markets.append(market)
         return markets
 
     def place_order(self, order: Order) -> None:
         """
         Place an order on the Kalshi platform.
         """
-        response = self.session.post(
+        response = self._request(
+            ORDER_ENTRY,
+            "POST",
             f"{self.base_url}/portfolio/orders",
             json={
                 "ticker": order.market_id,
@@ -315,7 +379,7 @@ class KalshiPlatform(BasePlatform):
             return
 
         # Per Kalshi docs, this reduces the resting contracts to zero.
-        response = self.session.delete(f"{self.base_url}/portfolio/orders/{order.order_id}")
+        response = self._request(ORDER_ENTRY, "DELETE", f"{self.base_url}/portfolio/orders/{order.order_id}")
 
         if response.status_code == 200:
             logging.info(f"Order {order.order_id} cancelled successfully on Kalshi.")
@@ -333,7 +397,7 @@ class KalshiPlatform(BasePlatform):
             order.status = OrderStatus.FAILED
             return []
 
-        response = self.session.get(f"{self.base_url}/portfolio/orders/{order.order_id}")
+        response = self._request(PORTFOLIO, "GET", f"{self.base_url}/portfolio/orders/{order.order_id}")
 
         if response.status_code != 200:
             logging.error(f"Failed to get order status for {order.order_id}: {response.status_code} - {response.text}")
@@ -354,7 +418,7 @@ class KalshiPlatform(BasePlatform):
         order.fill_size = order_data.get("fillsTotalCount", order.fill_size)
 
         # Fetch and return fills
-        fills_response = self.session.get(f"{self.base_url}/portfolio/fills?order_id={order.order_id}")
+        fills_response = self._request(PORTFOLIO, "GET", f"{self.base_url}/portfolio/fills?order_id={order.order_id}")
         if fills_response.status_code == 200:
             fills_data = fills_response.json().get("fills", [])
             new_trades = []
@@ -0,0 +1,231 @@
+from collections import deque
+from typing import Awaitable, Callable, Optional, TypeVar
+from urllib.parse import urlsplit
+import asyncio
+import os
+import threading
+import time
+
+T = TypeVar("T")
+
+
+def endpoint_key(url: str, route: Optional[str] = None) -> str:
+    """
+    Latency key of a request: its host plus `route`, a path template such as
+    "/markets/{ticker}/orderbook" that keeps per-market URLs under one key, or the URL's own
+    path when no route is given.
+    """
+    parts = urlsplit(url)
+    return f"{parts.netloc}{route if route is not None else parts.path}"
+
+
+class EndpointLatency:
+    """Rolling latency samples of one endpoint and the percentiles derived from them."""
+
+    def __init__(self, window: int):
+        self.samples = deque(maxlen=window)
+        self.requests = 0
+        self.timeouts = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self._percentiles: Optional[tuple[float, float, float]] = None
+        self._recorded = 0
+
+    def record(self, seconds: float) -> None:
+        self.samples.append(seconds)
+        self._recorded += 1
+        # Re-sorting the window on every sample would cost more than it is worth.
+        if self._recorded % 16 == 0:
+            self._percentiles = None
+
+    def percentiles(self) -> tuple[float, float, float]:
+        """(p50, p95, p99) in seconds."""
+        if self._percentiles is None:
+            ordered = sorted(self.samples)
+            last = len(ordered) - 1
+            self._percentiles = tuple(ordered[int(q * last)] for q in (0.50, 0.95, 0.99))
+        return self._percentiles
+
+
+class LatencyTracker:
+    """
+    Keeps rolling p50/p95/p99 latencies per endpoint and uses them to bound slow requests.
+
+    Once an endpoint has `min_samples` samples, each request gets a timeout of
+    `timeout_multiplier` times its p99, within [min_timeout_s, max_timeout_s], so one stuck
+    response cannot hold back a whole gather. An attempt that is cancelled, because it timed out
+    or a hedge answered first, is recorded at the time it had been running, so the estimate
+    still rises if the venue slows down as a whole.
+
+    Requests may also be hedged: if one is still outstanding at the endpoint's p95, a duplicate
+    is sent and whichever answer comes first is used. Hedges are only sent when the caller's
+    rate limiter has a token free right now, and at most for `max_hedge_ratio` of an
+    endpoint's requests, so extra load stays at a few percent.
+
+    Settings come from the environment:
+        LATENCY_WINDOW: samples kept per endpoint (default 1000).
+        LATENCY_MIN_SAMPLES: samples needed before timeouts and hedges apply (default 20).
+        LATENCY_TIMEOUT_MULTIPLIER: timeout as a multiple of p99 (default 3).
+        LATENCY_MIN_TIMEOUT_S / LATENCY_MAX_TIMEOUT_S: timeout bounds (default 0.5 / 30).
+        HEDGE_REQUESTS: "false" to never hedge (default "true").
+        HEDGE_MAX_RATIO: largest share of requests that may be hedged (default 0.1).
+    """
+
+    def __init__(
+        self,
+        window: Optional[int] = None,
+        min_samples: Optional[int] = None,
+        timeout_multiplier: Optional[float] = None,
+        min_timeout_s: Optional[float] = None,
+        max_timeout_s: Optional[float] = None,
+        hedge: Optional[bool] = None,
+        max_hedge_ratio: Optional[float] = None,
+    ):
+        self.window = window or int(os.getenv("LATENCY_WINDOW", 1000))
+        self.min_samples = min_samples or int(os.getenv("LATENCY_MIN_SAMPLES", 20))
+        self.timeout_multiplier = timeout_multiplier or float(os.getenv("LATENCY_TIMEOUT_MULTIPLIER", 3))
+        self.min_timeout_s = min_timeout_s or float(os.getenv("LATENCY_MIN_TIMEOUT_S", 0.5))
+        self.max_timeout_s = max_timeout_s or float(os.getenv("LATENCY_MAX_TIMEOUT_S", 30))
+        self.hedge = hedge if hedge is not None else os.getenv("HEDGE_REQUESTS", "true").lower() != "false"
+        self.max_hedge_ratio = max_hedge_ratio if max_hedge_ratio is not None else float(os.getenv("HEDGE_MAX_RATIO", 0.1))
+        self._endpoints: dict[str, EndpointLatency] = {}
+        self._lock = threading.Lock()
+
+    def _endpoint(self, key: str) -> EndpointLatency:
+        with self._lock:
+            endpoint = self._endpoints.get(key)
+            if endpoint is None:
+                endpoint = EndpointLatency(self.window)
+                self._endpoints[key] = endpoint
+            return endpoint
+
+    def record(self, key: str, seconds: float) -> None:
+        endpoint = self._endpoint(key)
+        with self._lock:
+            endpoint.record(seconds)
+
+    def percentiles(self, key: str) -> Optional[tuple[float, float, float]]:
+        """(p50, p95, p99) in seconds, or None until the endpoint has `min_samples` samples."""
+        endpoint = self._endpoint(key)
+        with self._lock:
+            if len(endpoint.samples) < self.min_samples:
+                return None
+            return endpoint.percentiles()
+
+    def timeout_for(self, key: str) -> Optional[float]:
+        """The request timeout for the endpoint, or None (the transport's own) while it is unknown."""
+        percentiles = self.percentiles(key)
+        if percentiles is None:
+            return None
+        return min(self.max_timeout_s, max(self.min_timeout_s, percentiles[2] * self.timeout_multiplier))
+
+    def _hedge_delay(self, key: str, endpoint: EndpointLatency) -> Optional[float]:
+        if not self.hedge:
+            return None
+        percentiles = self.percentiles(key)
+        with self._lock:
+            if percentiles is None or endpoint.hedged >= self.max_hedge_ratio * endpoint.requests:
+                return None
+        return percentiles[1]
+
+    async def _timed(self, key: str, request: Callable[[], Awaitable[T]]) -> T:
+        start = time.monotonic()
+        try:
+            result = await request()
+        except asyncio.CancelledError:
+            # An attempt cut off by a winning hedge or the timeout took at least this long.
+            # Recording only the attempts that finish would keep the fast ones and pull the
+            # percentiles down exactly when the endpoint is slow.
+            self.record(key, time.monotonic() - start)
+            raise
+        self.record(key, time.monotonic() - start)
+        return result
+
+    async def run(
+        self,
+        key: str,
+        request: Callable[[], Awaitable[T]],
+        can_hedge: Optional[Callable[[], bool]] = None,
+    ) -> T:
+        """
+        Awaits `request()` under the endpoint's timeout, recording its latency.
+
+        Args:
+            key: The endpoint, see endpoint_key.
+            request: Sends the request; called a second time for a hedge.
+            can_hedge: Called when a hedge is due; takes a rate-limit token and returns True if
+                the hedge may go out. None disables hedging for this request.
+
+        Raises:
+            TimeoutError: No answer within the timeout.
+        """
+        endpoint = self._endpoint(key)
+        with self._lock:
+            endpoint.requests += 1
+        timeout = self.timeout_for(key)
+        hedge_delay = self._hedge_delay(key, endpoint) if can_hedge is not None else None
+        start = time.monotonic()
+        first = asyncio.ensure_future(self._timed(key, request))
+        tasks = {first}
+        try:
+            if hedge_delay is not None and (timeout is None or hedge_delay < timeout):
+                done, _ = await asyncio.wait(tasks, timeout=hedge_delay)
+                if not done and can_hedge():
+                    with self._lock:
+                        endpoint.hedged += 1
+                    tasks.add(asyncio.ensure_future(self._timed(key, request)))
+            while tasks:
+                remaining = None if timeout is None else timeout - (time.monotonic() - start)
+                if remaining is not None and remaining <= 0:
+                    break
+                done, tasks = await asyncio.wait(tasks, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    break
+                for task in done:
+                    if task.exception() is None:
+                        if task is not first:
+                            with self._lock:
+                                endpoint.hedge_wins += 1
+                        return task.result()
+                # Every finished attempt failed; wait for the other one if it is still running.
+                if not tasks:
+                    return done.pop().result()
+            with self._lock:
+                endpoint.timeouts += 1
+            raise TimeoutError(f"No response from {key} within {timeout:.2f}s")
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def stats(self) -> dict:
+        """endpoint -> sample count, p50/p95/p99 and timeout in ms, and timeout and hedge counts."""
+        with self._lock:
+            endpoints = dict(self._endpoints)
+        stats = {}
+        for key, endpoint in endpoints.items():
+            percentiles = self.percentiles(key) or (0.0, 0.0, 0.0)
+            timeout = self.timeout_for(key)
+            stats[key] = {
+                "requests": endpoint.requests,
+                "p50_ms": 1000 * percentiles[0],
+                "p95_ms": 1000 * percentiles[1],
+                "p99_ms": 1000 * percentiles[2],
+                "timeout_ms": 1000 * timeout if timeout is not None else None,
+                "timeouts": endpoint.timeouts,
+                "hedged": endpoint.hedged,
+                "hedge_wins": endpoint.hedge_wins,
+            }
+        return stats
+
+
+_tracker: Optional[LatencyTracker] = None
+_tracker_lock = threading.Lock()
+
+
+def get_latency_tracker() -> LatencyTracker:
+    """The process-wide LatencyTracker, created from the environment on first use."""
+    global _tracker
+    with _tracker_lock:
+        if _tracker is None:
+            _tracker = LatencyTracker()
+        return _tracker
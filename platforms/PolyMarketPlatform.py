@@ -1,26 +1,67 @@
-from typing import List
+from typing import AsyncIterator, List, Optional
+from collections import deque
 from models.Market import Market
 from models.Orderbook import Orderbook
-from platforms.BasePlatform import BasePlatform
+from models.CompactOrderbook import CompactOrderbook
+from models.TopOfBook import TopOfBook
+from platforms.BasePlatform import BasePlatform, collect, run_sync
+from platforms.HttpTransport import get_transport
+from platforms.LatencyTracker import endpoint_key
+from platforms.RateLimiter import MARKET_DATA, ORDER_ENTRY, PORTFOLIO, get_rate_limiter
 from models.Order import Order
 from py_clob_client.client import ClobClient 
-from py_clob_client.clob_types import BookParams, OrderArgs, OrderType
+from py_clob_client.clob_types import OrderArgs, OrderType
 from dotenv import load_dotenv
 import os
-import requests
 from models.PlatformType import PlatformType
+from cache.TokenIdCache import TokenIdCache, token_id_redis_client
+from db.MarketCatalog import MarketCatalog
 import logging
 import json
-import aiohttp
 import asyncio
-from datetime import datetime
+from decimal import Decimal
 import time
 from py_clob_client.order_builder.constants import BUY, SELL
 from models.OrderStatus import OrderStatus
 from models.Trade import Trade
 from web3 import Web3
+from functools import cached_property
+import py_clob_client.http_helpers.helpers as clob_http
 
 load_dotenv()  
+
+def parse_fixed(value, digits: int) -> int:
+    """
+    Parses a decimal string such as "0.29" into an integer scaled by 10**digits, truncating any
+    further digits. Done on the digits directly, because float parsing turns 0.29 * 1000 into 289.
+    """
+    text = str(value).strip()
+    if "e" in text or "E" in text:
+        text = format(Decimal(text), "f")
+    negative = text.startswith("-")
+    whole, _, fraction = text.lstrip("+-").partition(".")
+    scaled = int(whole or 0) * 10 ** digits + int((fraction + "0" * digits)[:digits])
+    return -scaled if negative else scaled
+
+# Condition IDs per Gamma /markets lookup; keeps the query string well under URL length limits.
+TOKEN_ID_BATCH_SIZE = 50
+# Largest page Gamma serves, and how many pages market discovery keeps in flight.
+GAMMA_PAGE_SIZE = 500
+DISCOVERY_CONCURRENCY = 8
+# Tokens per CLOB /books request, and per /prices request (two entries each).
+BOOK_CHUNK_SIZE = 50
+PRICE_CHUNK_SIZE = 250
+POLYGON_RPC_URL = "https://polygon-rpc.com/"
+
+def _token_ids_of(gamma_markets: list) -> dict:
+    """condition ID -> [yes_token_id, no_token_id] for every Gamma market entry that lists its tokens."""
+    cid_to_tkd = {}
+    for market in gamma_markets:
+        condition_id, token_ids = market.get("conditionId"), market.get("clobTokenIds")
+        if condition_id and token_ids:
+            cid_to_tkd[condition_id] = json.loads(token_ids) if isinstance(token_ids, str) else token_ids
+    return cid_to_tkd
+
 class PolyMarketPlatform(BasePlatform):
     """
     PolyMarket Platform implementation that interfaces with the PolyMarket GraphQL API.
@@ -29,7 +70,14 @@ class PolyMarketPlatform(BasePlatform):
     the outcome of real-world events.
     """
     
-    def __init__(self):
+    PLATFORM = PlatformType.POLYMARKET
+
+    def __init__(self, token_ids: Optional[TokenIdCache] = None):
+        """
+        Args:
+            token_ids: Cache of condition ID -> token IDs to use instead of the default one,
+                which is created on first use.
+        """
         # for CLOB client access
         host: str = "https://clob.polymarket.com"
         key: str = os.getenv("PRIVATE_KEY")
@@ -37,19 +85,30 @@ class PolyMarketPlatform(BasePlatform):
         chain_id: int = 137
         # Using signature_type=1, which corresponds to an Email/Magic link account (like Google sign-in)
         self.client = ClobClient(host, key=key, chain_id=chain_id, signature_type=1, funder=POLYMARKET_PROXY_ADDRESS)
+        # py_clob_client sends every request through one module-level httpx client; point it at
+        # the shared pool so CLOB calls reuse the same keep-alive connections and settings.
+        if hasattr(clob_http, "_http_client"):
+            clob_http._http_client = get_transport().client(host)
 
         # for Gamma API access
         self.base_url = "https://gamma-api.polymarket.com"
         self.client.set_api_creds(self.client.create_or_derive_api_creds())
 
+        if token_ids is not None:
+            self.token_ids = token_ids
+        # Local index of Gamma markets for get_markets; opened lazily on first lookup.
+        self.catalog = MarketCatalog(
+            os.getenv("POLYMARKET_CATALOG_PATH", "polymarket_markets.sqlite3"),
+            fetch_page=self._fetch_market_page,
+            fetch_by_ids=self._fetch_markets_by_ids,
+        )
+
     def get_balance(self) -> float:
         """
         Fetches the USDC balance of the user's proxy contract from the Polygon blockchain.
         This represents the funds "deposited" and available for trading on PolyMarket.
         """
-        # Connect to the Polygon network
-        w3 = Web3(Web3.HTTPProvider("https://polygon-rpc.com/"))
-
+        w3 = self.w3
         balance_of_abi = [{"constant": True, "inputs": [{"name": "_owner", "type": "address"}], "name": "balanceOf", "outputs": [{"name": "balance", "type": "uint256"}], "type": "function"}]
         usdc_contract_address = "0x2791Bca1f2de4661ED88A30C99A7a9449Aa84174"
         usdc_contract = w3.eth.contract(address=usdc_contract_address, abi=balance_of_abi)
@@ -64,158 +123,274 @@ class PolyMarketPlatform(BasePlatform):
         
         return balance_usd
 
+    @cached_property
+    def token_ids(self) -> TokenIdCache:
+        """
+        condition ID -> [yes_token_id, no_token_id], shared between services through Redis
+        unless TOKEN_ID_CACHE_SHARED is "false". Created on first use.
+        """
+        return TokenIdCache(self._fetch_token_ids, redis_client=token_id_redis_client())
+
+    @cached_property
+    def w3(self) -> Web3:
+        """
+        Polygon RPC connection, made once. web3 talks to the node through its own keep-alive
+        requests session, which stays open between balance checks.
+        """
+        return Web3(Web3.HTTPProvider(POLYGON_RPC_URL, request_kwargs={"timeout": get_transport().timeout.read}))
+
+    def _http_origins(self) -> List[str]:
+        return [self.base_url, self.client.host]
+
+    def _request(self, endpoint_class: str, method: str, url: str, **kwargs):
+        """Sends a request over the shared connection pool, paced by the endpoint class's rate limit."""
+        client = get_transport().client(url)
+        return get_rate_limiter(self.PLATFORM).send(endpoint_class, lambda: client.request(method, url, **kwargs))
+
+    async def _arequest(self, session, endpoint_class: str, method: str, url: str, hedge: bool = False, **kwargs):
+        """
+        Async version of _request on the given client. The request is timed out from its
+        endpoint's latency, and with `hedge` a slow one is duplicated.
+        """
+        return await get_rate_limiter(self.PLATFORM).asend(
+            endpoint_class, lambda: session.request(method, url, **kwargs), latency_key=endpoint_key(url), hedge=hedge
+        )
+
+    def _clob(self, endpoint_class: str, method, *args, **kwargs):
+        """Calls a py_clob_client method, paced by the endpoint class's rate limit."""
+        return get_rate_limiter(self.PLATFORM).call(endpoint_class, method, *args, **kwargs)
+
     def _get_trade(self, trade_id: str) -> dict:
         """Fetches a single trade by its ID."""
-        response = requests.get(f"{self.client.host}/data/trade/{trade_id}")
+        response = self._request(PORTFOLIO, "GET", f"{self.client.host}/data/trade/{trade_id}")
         response.raise_for_status()
         return response.json()
 
-    async def _fetch_market(self, session, base_url, market_id):
-        url = f"{base_url}/markets?condition_ids={market_id}"
-        async with session.get(url) as resp:
-            resp.raise_for_status()
-            data = await resp.json()
-            return market_id, json.loads(data[0]["clobTokenIds"])
+    async def _fetch_markets_batch(self, session, base_url, market_ids):
+        params = [("condition_ids", market_id) for market_id in market_ids] + [("limit", len(market_ids))]
+        resp = await self._arequest(session, MARKET_DATA, "GET", f"{base_url}/markets", params=params)
+        resp.raise_for_status()
+        return _token_ids_of(resp.json())
 
     async def _fetch_all_cid_to_tkd(self, base_url, market_ids):
+        """
+        Looks up the token IDs of many condition IDs with one Gamma request per
+        TOKEN_ID_BATCH_SIZE IDs, all in flight at once.
+        """
+        market_ids = list(market_ids)
         cid_to_tkd = {}
-        timeout = aiohttp.ClientTimeout(total=20)
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            tasks = [self._fetch_market(session, base_url, market_id) for market_id in market_ids]
-            results = await asyncio.gather(*tasks)
-            for market_id, tkd_list in results:
-                cid_to_tkd[market_id] = tkd_list
+        session = get_transport().async_client(base_url)
+        tasks = [
+            self._fetch_markets_batch(session, base_url, market_ids[i:i + TOKEN_ID_BATCH_SIZE])
+            for i in range(0, len(market_ids), TOKEN_ID_BATCH_SIZE)
+        ]
+        for batch in await asyncio.gather(*tasks):
+            cid_to_tkd.update(batch)
         return cid_to_tkd
 
+    def _fetch_token_ids(self, market_ids: List[str]) -> dict:
+        return run_sync(self._fetch_all_cid_to_tkd(self.base_url, market_ids))
+
+    def get_token_ids(self, market_ids: List[str]) -> dict:
+        """
+        Resolves condition IDs to their CLOB [yes_token_id, no_token_id] pairs, leaving out
+        condition IDs Gamma does not know.
+        """
+        return self.token_ids.get_many(market_ids)
+
+    async def aget_token_ids(self, market_ids: List[str]) -> dict:
+        # The cache is shared with blocking callers and de-duplicates lookups across threads, so
+        # it is consulted from a worker thread rather than made async.
+        return await asyncio.to_thread(self.get_token_ids, market_ids)
+
     def get_order_books(self, market_ids: List[str]) -> List[Orderbook]:
-        
         """
         Get order books for the specified market IDs.
-        
+
         Args:
             market_ids: List of market IDs to get order books for
-            
+
         Returns:
             List of Orderbook objects containing bid/ask data
         """
+        return run_sync(self.aget_order_books(market_ids))
 
-        market_id_set = set(market_ids)
-
-        
-
-        # str -> [str, str]
-        cid_to_tkd = {}
-
-        tkd_to_order_book = {}
-        
-        start_time = datetime.now()
-        cid_to_tkd = asyncio.run(self._fetch_all_cid_to_tkd(self.base_url, market_id_set))
-
-        duration_ms = int((datetime.now() - start_time).total_seconds() * 1000)
+    async def aget_order_books(self, market_ids: List[str]) -> List[Orderbook]:
+        """
+        Async version of get_order_books. Books are requested from the CLOB BOOK_CHUNK_SIZE tokens
+        per request, all chunks at once, each under its endpoint's latency-based timeout and
+        hedged when slow. Markets whose books could not be fetched are left out.
+        """
+        cid_to_tkd = await self.aget_token_ids(market_ids)
         all_tkd = [tkd for tkd_list in cid_to_tkd.values() for tkd in tkd_list]
+        session = get_transport().async_client(self.client.host)
+        chunks = await asyncio.gather(*[
+            self._fetch_book_chunk(session, all_tkd[i:i + BOOK_CHUNK_SIZE])
+            for i in range(0, len(all_tkd), BOOK_CHUNK_SIZE)
+        ])
+        tkd_to_order_book = {book["asset_id"]: book for chunk in chunks for book in chunk}
 
-        
-        def chunk_list(lst, size):
-            for i in range(0, len(lst), size):
-                yield lst[i:i + size]
-
-        CHUNK_SIZE = 50
-        params = [BookParams(token_id=t) for t in all_tkd]
-        temp_tkd_to_orderbook = []
-
-        for chunk in chunk_list(params, CHUNK_SIZE):
-
-            partial_result = self.client.get_order_books(params=chunk)
-            temp_tkd_to_orderbook.extend(partial_result)
-
-        for i, tkd in enumerate(all_tkd):
-            tkd_to_order_book[tkd] = temp_tkd_to_orderbook[i]
         orderbooks = []
         for market_id in market_ids:
+            if market_id not in cid_to_tkd:
+                logging.warning(f"No token IDs found for PolyMarket market {market_id}")
+                continue
+            yes_token, no_token = cid_to_tkd[market_id][0], cid_to_tkd[market_id][1]
+            if yes_token not in tkd_to_order_book or no_token not in tkd_to_order_book:
+                continue
+            try:
+                orderbooks.append(self._orderbook_from(market_id, tkd_to_order_book[yes_token], tkd_to_order_book[no_token]))
+            except ValueError as e:
+                # e.g. a level too large for CompactOrderbook; only this market is skipped.
+                logging.warning(f"Skipping PolyMarket order book for {market_id}: {e}")
+        return orderbooks
 
-            yes_token = cid_to_tkd[market_id][0]
-            no_token = cid_to_tkd[market_id][1]
-
-            yes_order_book = tkd_to_order_book[yes_token]
-            no_order_book = tkd_to_order_book[no_token]
-            yes_bid = []
-            yes_ask = []
-            
-            # get yes bid
-            for an_order_summary in yes_order_book.bids:
-                yes_bid.append([int(float(an_order_summary.price) * 1000), int(float(an_order_summary.size) * 100)])
-
-            # get yes ask
-            for an_order_summary in yes_order_book.asks:
-                yes_ask.append([int(float(an_order_summary.price) * 1000), int(float(an_order_summary.size) * 100)])
+    async def _fetch_book_chunk(self, session, token_ids: List[str]) -> list:
+        """Raw CLOB books of the given tokens, or [] if the request fails."""
+        try:
+            response = await self._arequest(
+                session, MARKET_DATA, "POST", f"{self.client.host}/books",
+                hedge=True, json=[{"token_id": token_id} for token_id in token_ids],
+            )
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            logging.warning(f"PolyMarket book request for {len(token_ids)} tokens failed: {e!r}")
+            return []
 
-            
-            no_bid = []
-            no_ask = []
-            # get no bid
-            for an_order_summary in no_order_book.bids:
-                no_bid.append([int(float(an_order_summary.price) * 1000), int(float(an_order_summary.size) * 100)])
-
-            # get no ask
-            for an_order_summary in no_order_book.asks:
-                no_ask.append([int(float(an_order_summary.price) * 1000), int(float(an_order_summary.size) * 100)])
-            
-            yes_bid.sort(key=lambda x: x[0])
-            yes_ask.sort(key=lambda x: x[0])
-            no_bid.sort(key=lambda x: x[0])
-            no_ask.sort(key=lambda x: x[0])
+    def get_top_of_book(self, market_ids: List[str]) -> dict:
+        return run_sync(self.aget_top_of_book(market_ids))
 
-            orderbook = Orderbook(
+    async def aget_top_of_book(self, market_ids: List[str]) -> dict:
+        """
+        Best prices of both outcome tokens from the CLOB /prices endpoint, PRICE_CHUNK_SIZE
+        tokens per request, without fetching any book depth.
+        """
+        cid_to_tkd = await self.aget_token_ids(market_ids)
+        all_tkd = [tkd for tkd_list in cid_to_tkd.values() for tkd in tkd_list]
+        session = get_transport().async_client(self.client.host)
+        chunks = await asyncio.gather(*[
+            self._fetch_price_chunk(session, all_tkd[i:i + PRICE_CHUNK_SIZE])
+            for i in range(0, len(all_tkd), PRICE_CHUNK_SIZE)
+        ])
+        prices = {token_id: sides for chunk in chunks for token_id, sides in chunk.items()}
+
+        def price(token_id, side):
+            value = prices.get(token_id, {}).get(side)
+            return parse_fixed(value, 3) if value is not None else None
+
+        tops = {}
+        for market_id in market_ids:
+            if market_id not in cid_to_tkd:
+                continue
+            yes_token, no_token = cid_to_tkd[market_id][0], cid_to_tkd[market_id][1]
+            if yes_token not in prices and no_token not in prices:
+                continue
+            # A token's BUY price is its best bid and its SELL price the best ask, i.e. the sides
+            # of the resting orders.
+            tops[market_id] = TopOfBook(
                 market_id=market_id,
-                timestamp=int(time.time() * 1000),
-                yes={
-                "bid": yes_bid,
-                "ask": yes_ask
-                },
-                no={
-                    "bid": no_bid,
-                    "ask": no_ask
-                }
+                yes_bid=price(yes_token, "BUY"),
+                yes_ask=price(yes_token, "SELL"),
+                no_bid=price(no_token, "BUY"),
+                no_ask=price(no_token, "SELL"),
             )
+        return tops
 
-            orderbooks.append(orderbook)
-
-        return orderbooks
+    async def _fetch_price_chunk(self, session, token_ids: List[str]) -> dict:
+        """token ID -> {"BUY": price, "SELL": price} for the given tokens, or {} if the request fails."""
+        body = [{"token_id": token_id, "side": side} for token_id in token_ids for side in ("BUY", "SELL")]
+        try:
+            response = await self._arequest(session, MARKET_DATA, "POST", f"{self.client.host}/prices", json=body)
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            logging.warning(f"PolyMarket price request for {len(token_ids)} tokens failed: {e!r}")
+            return {}
+
+    @staticmethod
+    def _orderbook_from(market_id: str, yes_order_book: dict, no_order_book: dict) -> Orderbook:
+        def levels(orders):
+            return [[parse_fixed(order["price"], 3), parse_fixed(order["size"], 2)] for order in orders]
+
+        return CompactOrderbook.from_levels(
+            market_id=market_id,
+            timestamp=int(time.time() * 1000),
+            yes_bid=levels(yes_order_book["bids"]),
+            yes_ask=levels(yes_order_book["asks"]),
+            no_bid=levels(no_order_book["bids"]),
+            no_ask=levels(no_order_book["asks"]),
+        )
 
     def find_new_markets(self, num_markets: int) -> List[str]:
         """
-        Find new markets from PolyMarket using GraphQL.
+        Find new markets from PolyMarket using the Gamma REST API.
         
         Args:
             num_markets: Number of markets to return
             
         Returns:
-            List of market IDs for new/active markets
+            List of market IDs for new/active markets, newest first
+        """
+        return run_sync(collect(self.iter_new_markets(num_markets)))
+
+    async def iter_new_markets(self, num_markets: int, concurrency: int = DISCOVERY_CONCURRENCY) -> AsyncIterator[str]:
         """
+        Yields condition IDs of active markets, newest first, until `num_markets` have been
+        yielded or the list ends.
 
-        num_requests = 0
-        new_markets = set()
-        page_offset = 0
-        while num_requests < num_markets:
-            # https://gamma-api.polymarket.com/markets?order=id&closed=false&active=true&ascending=false
-            limit = 500 # max limit per request
-            limit = min(limit, num_markets - num_requests)
-            response = requests.request("GET", f"{self.base_url}/markets?order=id&closed=false&active=true&ascending=false&limit=500&offset={page_offset}")
-
-            for a_market in response.json():
-                if a_market.get("endDateIso") is not None and a_market["endDateIso"] is not None:
+        Gamma pages by offset, so page offsets are known up front and up to `concurrency` pages
+        are fetched at once, ahead of the one being consumed. Pages are still yielded in order.
+        Listed markets are added to the market catalog and token ID cache on the way.
+        """
+        if num_markets <= 0:
+            return
+        page_size = min(GAMMA_PAGE_SIZE, num_markets)
+        seen = set()
+        pending = deque()
+        next_offset = 0
+        session = get_transport().async_client(self.base_url)
+
+        def prefetch():
+            nonlocal next_offset
+            # Only as many pages as could still be needed, at most `concurrency` in flight.
+            while len(pending) < concurrency and len(seen) + len(pending) * page_size < num_markets:
+                pending.append(asyncio.ensure_future(self._fetch_new_markets_page(session, next_offset, page_size)))
+                next_offset += page_size
+
+        try:
+            prefetch()
+            while pending:
+                page = await pending.popleft()
+                for a_market in page:
                     condition_id = a_market.get("conditionId")
-                    if condition_id and condition_id not in new_markets:
-                        new_markets.add(condition_id)
-                        num_requests += 1
-                        if num_requests >= num_markets:
-                            break
-            page_offset += 500
-        return list(new_markets)
+                    if a_market.get("endDateIso") is not None and condition_id and condition_id not in seen:
+                        seen.add(condition_id)
+                        yield condition_id
+                        if len(seen) >= num_markets:
+                            return
+                if len(page) < page_size:
+                    return  # end of the list
+                prefetch()
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    async def _fetch_new_markets_page(self, session, offset: int, limit: int) -> list:
+        url = f"{self.base_url}/markets?order=id&closed=false&active=true&ascending=false&limit={limit}&offset={offset}"
+        resp = await self._arequest(session, MARKET_DATA, "GET", url)
+        resp.raise_for_status()
+        markets = resp.json()
+        # A Redis HSET and a SQLite write; off the shared loop so they cannot stall other venues' discovery.
+        await asyncio.to_thread(self.token_ids.put_many, _token_ids_of(markets))
+        await asyncio.to_thread(self.catalog.upsert, markets)
+        return markets
 
     def get_markets(self, market_ids: List[str]) -> List[Market]:
         """
-        Get market details for the specified market IDs using the Gamma REST API.
+        Get market details for the specified market IDs from the local market catalog, fetching
+        any the catalog does not have yet from the Gamma REST API.
 
         Args:
             market_ids: List of condition IDs (market IDs) to retrieve
@@ -223,41 +398,26 @@ class PolyMarketPlatform(BasePlatform):
         Returns:
             List of Market objects with market information
         """
-        market_id_set = set(market_ids)
-        print(f"Fetching markets for IDs: {market_id_set}")
-        matched_markets = []
+        return self.catalog.get_markets(market_ids)
 
-        offset = 0
-        limit = 500
-        seen_ids = set()
-        
-
-        while len(seen_ids) < len(market_id_set):
-            url = f"{self.base_url}/markets?order=id&closed=false&active=true&ascending=false&limit={limit}&offset={offset}"
-            response = requests.get(url)
+    def _fetch_market_page(self, offset: int, limit: int) -> list:
+        """One page of the Gamma market list, newest first."""
+        response = self._request(MARKET_DATA, "GET", f"{self.base_url}/markets?order=id&ascending=false&limit={limit}&offset={offset}")
+        response.raise_for_status()
+        markets = response.json()
+        self.token_ids.put_many(_token_ids_of(markets))
+        return markets
+
+    def _fetch_markets_by_ids(self, market_ids: List[str]) -> list:
+        markets = []
+        for i in range(0, len(market_ids), TOKEN_ID_BATCH_SIZE):
+            chunk = market_ids[i:i + TOKEN_ID_BATCH_SIZE]
+            params = [("condition_ids", market_id) for market_id in chunk] + [("limit", len(chunk))]
+            response = self._request(MARKET_DATA, "GET", f"{self.base_url}/markets", params=params)
             response.raise_for_status()
-
-            markets = response.json()
-            if not markets:
-                break  # no more data
-            for m in markets:
-                cid = m.get("conditionId")
-                if cid in market_id_set:
-                
-                    iso = m["endDate"]
-                    dt = datetime.strptime(iso, "%Y-%m-%dT%H:%M:%SZ")
-                    unix_ts = int(dt.timestamp())
-
-                    matched_markets.append(Market(
-                        platform=PlatformType.POLYMARKET,
-                        market_id=cid,
-                        name=m["question"],
-                        rules=m["description"],
-                        close_timestamp=unix_ts
-                    ))
-                    seen_ids.add(cid)
-            offset += 500
-        return matched_markets
+            markets.extend(response.json())
+        self.token_ids.put_many(_token_ids_of(markets))
+        return markets
 
     def place_order(self, order: Order) -> None:
         if order.size < 5:
@@ -297,7 +457,7 @@ class PolyMarketPlatform(BasePlatform):
             # To ensure all orders can be placed, we are forcing them to GTC,
             # which is the only type that signs reliably.
             signed_order = self.client.create_order(order_args)
-            order_receipt = self.client.post_order(signed_order, OrderType.GTC) # Force GTC
+            order_receipt = self._clob(ORDER_ENTRY, self.client.post_order, signed_order, OrderType.GTC) # Force GTC
             order.order_id = order_receipt["orderID"]
             order.status = OrderStatus.OPEN
             logging.info(f"PolyMarket order placed successfully: {order.order_id}")
@@ -316,7 +476,7 @@ class PolyMarketPlatform(BasePlatform):
 
         try:
             # The py_clob_client.cancel method takes the order hash.
-            response = self.client.cancel(order.order_id)
+            response = self._clob(ORDER_ENTRY, self.client.cancel, order.order_id)
             logging.info(f"PolyMarket cancel order response: {response}")
             
             # The client library raises an exception on failure. If we get here,
@@ -338,7 +498,7 @@ class PolyMarketPlatform(BasePlatform):
             return []
 
         try:
-            order_data = self.client.get_order(order.order_id)
+            order_data = self._clob(PORTFOLIO, self.client.get_order, order.order_id)
             
             polymarket_status = order_data.get("status")
             original_size = float(order_data.get("original_size", 0))
@@ -378,10 +538,12 @@ class PolyMarketPlatform(BasePlatform):
         return []
 
     def _get_token_id(self, market_id: str, side: str) -> str:
-        cid_to_tkd = asyncio.run(self._fetch_all_cid_to_tkd(self.base_url, [market_id]))
+        token_ids = self.token_ids.get(market_id)
+        if token_ids is None:
+            raise ValueError(f"No token IDs found for PolyMarket market {market_id}")
         if side.lower() == 'yes':
-            return cid_to_tkd[market_id][0]
+            return token_ids[0]
         elif side.lower() == 'no':
-            return cid_to_tkd[market_id][1]
+            return token_ids[1]
         else:
             raise ValueError(f"Invalid side: {side}")
\ No newline at end of file
@@ -0,0 +1,456 @@
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Optional, TypeVar
+import asyncio
+import logging
+import os
+import threading
+import time
+from redis.backoff import NoBackoff
+from redis.retry import Retry
+from cache.RedisManager import RedisManager
+from platforms.LatencyTracker import get_latency_tracker
+from models.PlatformType import PlatformType
+
+T = TypeVar("T")
+
+# Endpoint classes. Venues meter these separately, so each gets its own bucket.
+MARKET_DATA = "market_data"
+PORTFOLIO = "portfolio"
+ORDER_ENTRY = "order_entry"
+
+# Requests per second per endpoint class, at or just under each venue's published limit.
+# Overridable with RATE_LIMIT_<PLATFORM>_<CLASS>="<rate>" or "<rate>:<burst>", e.g.
+# RATE_LIMIT_KALSHI_MARKET_DATA=30:30.
+RATE_LIMITS = {
+    PlatformType.KALSHI: {MARKET_DATA: 20, PORTFOLIO: 10, ORDER_ENTRY: 10},
+    PlatformType.POLYMARKET: {MARKET_DATA: 15, PORTFOLIO: 5, ORDER_ENTRY: 5},
+}
+DEFAULT_RATE_LIMIT = 5
+
+# Pause after a 429 that carries no Retry-After hint.
+DEFAULT_RETRY_AFTER_S = 1.0
+# While Redis is unreachable the buckets count locally, and retry Redis after this long.
+REDIS_RETRY_S = 30.0
+
+# Token bucket in a Redis hash, refilled from the server clock so every service draws from
+# one budget. The hash also holds the adapted rate, which starts at the configured rate
+# (ARGV[1]) and is changed for every service by ARGV[5]: "slow" halves it unless the bucket is
+# already paused, "cap" lowers it to ARGV[6], and "raise" adds a tenth of the configured rate.
+# Returns {milliseconds to wait, current rate}. Without a pause or an adjustment it takes one
+# token and the wait is how long the caller must hold off before using it (the token count
+# goes negative while callers queue). With a pause (ARGV[3] > 0) it instead blocks the bucket
+# for that many milliseconds and takes nothing; an adjustment alone takes nothing either.
+# With ARGV[4] = 1 it takes a token only if one is free right now, and the wait is -1 otherwise.
+TOKEN_BUCKET_SCRIPT = """
+local max_rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local pause_ms = tonumber(ARGV[3])
+local only_if_free = tonumber(ARGV[4]) == 1
+local adjust = ARGV[5]
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) * 1000 + math.floor(tonumber(clock[2]) / 1000)
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated', 'blocked_until', 'rate')
+local tokens = tonumber(state[1]) or burst
+local updated = tonumber(state[2]) or now
+local blocked_until = tonumber(state[3]) or 0
+local rate = tonumber(state[4]) or max_rate
+tokens = math.min(burst, tokens + (now - updated) * rate / 1000)
+local min_rate = max_rate / 20
+if adjust == 'slow' and blocked_until <= now then
+    rate = math.max(min_rate, rate / 2)
+elseif adjust == 'cap' then
+    rate = math.max(min_rate, math.min(rate, tonumber(ARGV[6])))
+elseif adjust == 'raise' then
+    rate = math.min(max_rate, rate + max_rate / 10)
+end
+local wait = 0
+if pause_ms > 0 then
+    blocked_until = math.max(blocked_until, now + pause_ms)
+    tokens = math.min(tokens, 0)
+    wait = blocked_until - now
+elseif adjust == '' then
+    if only_if_free and (tokens < 1 or blocked_until > now) then
+        wait = -1
+    else
+        tokens = tokens - 1
+        if tokens < 0 then
+            wait = math.ceil(-tokens * 1000 / rate)
+        end
+        wait = math.max(wait, blocked_until - now)
+    end
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', now, 'blocked_until', blocked_until, 'rate', tostring(rate))
+redis.call('PEXPIRE', KEYS[1], 60000)
+return {wait, tostring(rate)}
+"""
+
+
+def _header(headers, *names) -> Optional[str]:
+    for name in names:
+        value = headers.get(name)
+        if value is not None:
+            return value
+    return None
+
+
+def retry_after_seconds(headers) -> Optional[float]:
+    """Seconds to wait according to a Retry-After header, given as seconds or an HTTP date."""
+    value = _header(headers, "Retry-After", "retry-after")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def rate_limit_window(headers) -> Optional[tuple[int, float]]:
+    """
+    (requests remaining, seconds until the window resets) from X-RateLimit-* or RateLimit-*
+    headers, or None when the response carries neither. Reset may be an epoch timestamp or a
+    number of seconds.
+    """
+    remaining = _header(headers, "X-RateLimit-Remaining", "RateLimit-Remaining", "x-ratelimit-remaining", "ratelimit-remaining")
+    reset = _header(headers, "X-RateLimit-Reset", "RateLimit-Reset", "x-ratelimit-reset", "ratelimit-reset")
+    if remaining is None or reset is None:
+        return None
+    try:
+        remaining, reset = int(float(remaining)), float(reset)
+    except ValueError:
+        return None
+    if reset > 1e12:
+        reset = reset / 1000 - time.time()
+    elif reset > 1e9:
+        reset -= time.time()
+    return remaining, max(0.0, reset)
+
+
+class TokenBucket:
+    """
+    Paces one endpoint class of one venue.
+
+    Callers take a token before each request and wait when none is left, so a burst of
+    requests queues up and goes out at `rate` per second instead of hitting the venue at once.
+    The rate adapts to what the venue reports: a 429 halves it (once per pause) and pauses the
+    bucket for the Retry-After time, rate-limit headers lower it to what the remaining window allows, and
+    every successful response raises it again by a tenth of the configured rate.
+
+    With a Redis client the tokens and the adapted rate live in Redis, so all services using
+    the same venue account share one budget and slow down together. If Redis is unreachable
+    the bucket falls back to counting locally until it is back.
+    """
+
+    def __init__(self, name: str, rate: float, burst: Optional[float] = None, redis_client=None):
+        """
+        Args:
+            name: Identifies the bucket in Redis and in metrics, e.g. "KALSHI:market_data".
+            rate: The venue's limit in requests per second.
+            burst: Requests allowed at once after an idle period. Defaults to one second's worth.
+            redis_client: redis-py client for the shared budget, or None to count in-process only.
+        """
+        self.name = name
+        self.max_rate = float(rate)
+        self.rate = float(rate)
+        self.min_rate = self.max_rate / 20
+        self.burst = float(burst or max(1.0, rate))
+        self.redis_client = redis_client
+        self._script = redis_client.register_script(TOKEN_BUCKET_SCRIPT) if redis_client is not None else None
+        self._redis_down_until = 0.0
+
+        self._lock = threading.Lock()
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+
+        self.acquired = 0
+        self.throttled = 0
+        self.wait_total_s = 0.0
+        self.wait_max_s = 0.0
+        self._recent_waits = deque(maxlen=1000)
+
+    def _shared(self, pause_ms: int = 0, only_if_free: bool = False, adjust: str = "", rate: float = 0.0) -> Optional[int]:
+        """
+        Runs the Redis script, takes over the shared rate it reports and returns its wait in
+        milliseconds; None when there is no shared budget or Redis is unreachable.
+
+        Args:
+            adjust: "slow", "cap" or "raise" to change the shared rate, see TOKEN_BUCKET_SCRIPT.
+            rate: The rate to cap at, for "cap".
+        """
+        if self._script is None or time.monotonic() < self._redis_down_until:
+            return None
+        try:
+            wait_ms, shared_rate = self._script(
+                keys=[f"ratelimit:{self.name}"],
+                args=[self.max_rate, self.burst, pause_ms, int(only_if_free), adjust, rate],
+            )
+        except Exception as e:
+            logging.warning(f"Rate limiter {self.name} cannot reach Redis, limiting locally: {e}")
+            self._redis_down_until = time.monotonic() + REDIS_RETRY_S
+            return None
+        with self._lock:
+            self.rate = float(shared_rate)
+        return int(wait_ms)
+
+    def _reserve(self) -> float:
+        """Takes a token. Returns the seconds to wait before using it."""
+        wait_ms = self._shared()
+        if wait_ms is not None:
+            return max(wait_ms / 1000, self._paused_for())
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            return max(wait, self._blocked_until - now)
+
+    def try_acquire(self) -> bool:
+        """
+        Takes a token only if one is free right now, without waiting or queueing behind other
+        requests. For optional extra requests such as hedges.
+        """
+        if self._paused_for() > 0:
+            return False
+        wait_ms = self._shared(only_if_free=True)
+        if wait_ms is not None:
+            taken = wait_ms >= 0
+        else:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                taken = self._tokens >= 1
+                if taken:
+                    self._tokens -= 1
+        if taken:
+            self._record_wait(0.0)
+        return taken
+
+    def _pause(self, seconds: float, slow: bool = False) -> None:
+        """
+        Holds back every request of this bucket, here and in other services, for `seconds`.
+        With `slow` the shared rate is halved too, unless another service already paused it.
+        """
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+            self._tokens = min(self._tokens, 0.0)
+        self._shared(pause_ms=int(seconds * 1000), adjust="slow" if slow else "")
+
+    def _paused_for(self) -> float:
+        with self._lock:
+            return max(0.0, self._blocked_until - time.monotonic())
+
+    def _record_wait(self, waited: float) -> None:
+        with self._lock:
+            self.acquired += 1
+            self.wait_total_s += waited
+            self.wait_max_s = max(self.wait_max_s, waited)
+            self._recent_waits.append(waited)
+
+    def acquire(self) -> float:
+        """Blocks until a request may be sent. Returns the time spent waiting, in seconds."""
+        start = time.monotonic()
+        delay = self._reserve()
+        while delay > 0:
+            time.sleep(delay)
+            # A 429 seen by another request while this one waited extends the wait.
+            delay = self._paused_for()
+        waited = time.monotonic() - start
+        self._record_wait(waited)
+        return waited
+
+    async def aacquire(self) -> float:
+        """Async version of acquire; waiting only suspends the calling task."""
+        start = time.monotonic()
+        if self._script is not None:
+            delay = await asyncio.to_thread(self._reserve)
+        else:
+            delay = self._reserve()
+        while delay > 0:
+            await asyncio.sleep(delay)
+            delay = self._paused_for()
+        waited = time.monotonic() - start
+        self._record_wait(waited)
+        return waited
+
+    def observe(self, status_code: int, headers) -> None:
+        """Adapts the rate to a venue response's status and rate-limit headers."""
+        if status_code == 429:
+            pause = retry_after_seconds(headers)
+            pause = DEFAULT_RETRY_AFTER_S if pause is None else pause
+            with self._lock:
+                self.throttled += 1
+                # Requests already in flight when the first 429 came back are rejected too;
+                # slow down once per pause rather than once per rejection.
+                if self._blocked_until <= time.monotonic():
+                    self.rate = max(self.min_rate, self.rate / 2)
+            self._pause(pause, slow=True)
+            logging.warning(f"Rate limited by {self.name}; pausing {pause:.2f}s and slowing to {self.rate:.2f} req/s")
+            return
+
+        window = rate_limit_window(headers)
+        if window is not None:
+            remaining, reset_s = window
+            if remaining <= 0 and reset_s > 0:
+                self._pause(reset_s)
+                return
+            if reset_s > 0 and remaining / reset_s < self.rate:
+                with self._lock:
+                    self.rate = max(self.min_rate, remaining / reset_s)
+                self._shared(adjust="cap", rate=remaining / reset_s)
+                return
+        if status_code < 400 and self.rate < self.max_rate:
+            with self._lock:
+                self.rate = min(self.max_rate, self.rate + self.max_rate / 10)
+            self._shared(adjust="raise")
+
+    async def aobserve(self, status_code: int, headers) -> None:
+        """Async version of observe; updating the shared rate runs off the event loop."""
+        if self._script is not None:
+            await asyncio.to_thread(self.observe, status_code, headers)
+        else:
+            self.observe(status_code, headers)
+
+    def stats(self) -> dict:
+        """Current rate, request and 429 counts, and queue wait times in milliseconds."""
+        with self._lock:
+            recent = sorted(self._recent_waits)
+            return {
+                "rate": self.rate,
+                "max_rate": self.max_rate,
+                "acquired": self.acquired,
+                "throttled": self.throttled,
+                "wait_avg_ms": 1000 * self.wait_total_s / self.acquired if self.acquired else 0.0,
+                "wait_p95_ms": 1000 * recent[int(0.95 * (len(recent) - 1))] if recent else 0.0,
+                "wait_max_ms": 1000 * self.wait_max_s,
+            }
+
+
+class RateLimiter:
+    """
+    The token buckets of one venue, one per endpoint class, and the retry loop that sends
+    requests through them.
+    """
+
+    def __init__(self, platform: PlatformType, redis_client=None, max_retries: int = 3):
+        self.platform = platform
+        self.redis_client = redis_client
+        self.max_retries = max_retries
+        self._buckets: dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, endpoint_class: str) -> TokenBucket:
+        with self._lock:
+            bucket = self._buckets.get(endpoint_class)
+            if bucket is None:
+                rate, burst = self._limit(endpoint_class)
+                bucket = TokenBucket(f"{self.platform.value}:{endpoint_class}", rate, burst, self.redis_client)
+                self._buckets[endpoint_class] = bucket
+            return bucket
+
+    def _limit(self, endpoint_class: str) -> tuple[float, Optional[float]]:
+        setting = os.getenv(f"RATE_LIMIT_{self.platform.value}_{endpoint_class.upper()}")
+        if setting:
+            rate, _, burst = setting.partition(":")
+            return float(rate), float(burst) if burst else None
+        return RATE_LIMITS.get(self.platform, {}).get(endpoint_class, DEFAULT_RATE_LIMIT), None
+
+    def send(self, endpoint_class: str, request: Callable[[], T]) -> T:
+        """
+        Sends `request()` (which returns an httpx response) once a token is available, and
+        sends it again after the venue's pause if it comes back 429, up to `max_retries` times.
+        Returns the last response.
+        """
+        bucket = self.bucket(endpoint_class)
+        for attempt in range(self.max_retries + 1):
+            bucket.acquire()
+            response = request()
+            bucket.observe(response.status_code, response.headers)
+            if response.status_code != 429 or attempt == self.max_retries:
+                return response
+
+    async def asend(
+        self,
+        endpoint_class: str,
+        request: Callable[[], Awaitable[T]],
+        latency_key: Optional[str] = None,
+        hedge: bool = False,
+    ) -> T:
+        """
+        Async version of send; `request()` returns an awaitable response.
+
+        With a `latency_key` the request runs under the LatencyTracker's timeout for that
+        endpoint, and with `hedge` it may be duplicated when slow, if a token is free for it.
+        """
+        bucket = self.bucket(endpoint_class)
+        for attempt in range(self.max_retries + 1):
+            await bucket.aacquire()
+            if latency_key is None:
+                response = await request()
+            else:
+                response = await get_latency_tracker().run(
+                    latency_key, request, can_hedge=bucket.try_acquire if hedge else None
+                )
+            await bucket.aobserve(response.status_code, response.headers)
+            if response.status_code != 429 or attempt == self.max_retries:
+                return response
+
+    def call(self, endpoint_class: str, function: Callable[..., T], *args, **kwargs) -> T:
+        """
+        Paces a call into a venue SDK that raises instead of returning responses. An exception
+        carrying `status_code == 429` pauses the bucket and the call is retried.
+        """
+        bucket = self.bucket(endpoint_class)
+        for attempt in range(self.max_retries + 1):
+            bucket.acquire()
+            try:
+                result = function(*args, **kwargs)
+            except Exception as e:
+                if getattr(e, "status_code", None) != 429 or attempt == self.max_retries:
+                    raise
+                bucket.observe(429, {})
+                continue
+            bucket.observe(200, {})
+            return result
+
+    def stats(self) -> dict:
+        """endpoint class -> TokenBucket.stats()"""
+        with self._lock:
+            buckets = dict(self._buckets)
+        return {endpoint_class: bucket.stats() for endpoint_class, bucket in buckets.items()}
+
+
+_limiters: dict[PlatformType, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(platform: PlatformType) -> RateLimiter:
+    """
+    The process-wide RateLimiter of a venue. Its budget is shared with other services through
+    Redis unless RATE_LIMIT_SHARED is "false".
+    """
+    with _limiters_lock:
+        limiter = _limiters.get(platform)
+        if limiter is None:
+            redis_client = None
+            if os.getenv("RATE_LIMIT_SHARED", "true").lower() != "false":
+                # Fail fast: a request should fall back to local limiting, not wait on Redis retries.
+                redis_client = RedisManager(
+                    socket_connect_timeout=0.5, socket_timeout=0.5, retry=Retry(NoBackoff(), 0)
+                ).redis_client
+            limiter = RateLimiter(platform, redis_client)
+            _limiters[platform] = limiter
+        return limiter
+
+
+def rate_limiter_stats(platform: PlatformType) -> dict:
+    """RateLimiter.stats() of a venue's limiter, or {} if the venue has not sent requests yet."""
+    with _limiters_lock:
+        limiter = _limiters.get(platform)
+    return limiter.stats() if limiter is not None else {}
@@ -11,6 +11,15 @@ from random import randint
 from models.Order import Order
 
 class TestPlatform(BasePlatform):
+    PLATFORM = PlatformType.TEST
+
+    def __init__(self, num_levels: int = 100):
+        # depth of each generated ladder
+        self.num_levels = num_levels
+
+    def get_balance(self) -> float:
+        return 0.0
+
     def get_order_books(self, market_ids: list[str]) -> list[Orderbook]:
 
         if market_ids is None:
@@ -22,20 +31,22 @@ class TestPlatform(BasePlatform):
             
 
             # Generate yes bids as [price, quantity] pairs
-            yes_bid_prices = sorted(randint(1, 500) for _ in range(100))
-            yes_bid_quantities = [randint(1, 20000) for _ in range(100)]
+            yes_bid_prices = sorted(randint(1, 500) for _ in range(self.num_levels))
+            yes_bid_quantities = [randint(1, 20000) for _ in range(self.num_levels)]
             yes_bids = [[price, quantity] for price, quantity in zip(yes_bid_prices, yes_bid_quantities)]
 
             # Generate no asks as [1000 - price, quantity] pairs (mirrored from yes bids)
             no_asks = [[1000 - price, quantity] for price, quantity in zip(yes_bid_prices, yes_bid_quantities)]
+            no_asks.reverse()  # asks are kept in non-decreasing price order
 
             # Generate no bids as [price, quantity] pairs
-            no_bid_prices = sorted(randint(500, 1000) for _ in range(100))
-            no_bid_quantities = [randint(1, 20000) for _ in range(100)]
+            no_bid_prices = sorted(randint(500, 1000) for _ in range(self.num_levels))
+            no_bid_quantities = [randint(1, 20000) for _ in range(self.num_levels)]
             no_bids = [[price, quantity] for price, quantity in zip(no_bid_prices, no_bid_quantities)]
 
             # Generate yes asks as [1000 - price, quantity] pairs (mirrored from no bids)
             yes_asks = [[1000 - price, quantity] for price, quantity in zip(no_bid_prices, no_bid_quantities)]
+            yes_asks.reverse()
 
             orderbook = Orderbook(
                 market_id=market_id,
@@ -1,6 +1,13 @@
 from models.Orderbook import Orderbook
-from typing import List, Tuple, Optional, Dict, Any
+from models.CompactOrderbook import CompactOrderbook
+from models.TopOfBook import TopOfBook
+from typing import List, Tuple, Optional, Dict, Any, Sequence
 import math
+from itertools import chain
+import numpy as np
+
+# (shares, total_cost, max_price_1, max_price_2, ladder)
+ArbitrageDetails = Tuple[int, int, int, int, List[List[int]]]
 
 def calculate_cross_platform_arbitrage(
     ob1: Orderbook,
@@ -26,83 +33,109 @@ def calculate_cross_platform_arbitrage(
     yes2 = ob2.yes["ask"]
     no2 = ob2.no["ask"]
 
-    def build_curve(levels: List[List[int]]) -> List[Tuple[int, int, int]]:
-        cumulative = []
-        total_qty = 0
-        total_cost = 0
-        for price, qty in levels:
-            total_qty += qty
-            total_cost += price * qty
-            cumulative.append((total_qty, total_cost, price))
-        return cumulative
-    
-    curve_y1 = build_curve(yes1)
-    curve_n1 = build_curve(no1)
-    curve_y2 = build_curve(yes2)
-    curve_n2 = build_curve(no2)
-
-    def cost_of_shares(X: int, curve: List[Tuple[int, int, int]]) -> int:
-        for q, c, p in curve:
-            if q >= X:
-                dif = q - X
-                cost_dif = p * dif
-                return c - cost_dif
-        return float("inf")
-
-    def price_of_share(X: int, curve: List[Tuple[int, int, int]]) -> int:
-        """Gets the price of the X-th share in a cumulative curve."""
-        last_qty = 0
-        for q, _, p in curve:
-            if last_qty < X <= q:
-                return p
-            last_qty = q
-        return float("inf")
-            
-    def get_arbitrage_details(curve1: List[Tuple[int, int, int]], curve2: List[Tuple[int, int, int]]) -> Tuple[int, int, int, int]:
-        lo = 1
-        hi = min(curve1[-1][0], curve2[-1][0]) if curve1 and curve2 else 0
-        best_profit_shares = 0
-
-        while lo <= hi:
-            mid = (hi + lo) // 2
-            
-            # Clamp shares if marginal price is >= $1.00
-            price1 = price_of_share(mid, curve1)
-            price2 = price_of_share(mid, curve2)
-            if price1 + price2 >= 1000:
-                hi = mid - 1
-                continue
-
-            cost = cost_of_shares(mid, curve1) + cost_of_shares(mid, curve2)
-            required_revenue = math.ceil(cost * (1 + expected_slippage) * (1 + profit_threshold))
-            revenue = 1000 * mid
-
-            if revenue >= required_revenue:
-                best_profit_shares = mid
-                lo = mid + 1
-            else:
-                hi = mid - 1
-        
-        best_cost_shares = float('inf')
-        if max_cost is not None:
-            lo, hi, best_cost_shares = 1, min(curve1[-1][0], curve2[-1][0]) if curve1 and curve2 else 0, 0
-            while lo <= hi:
-                mid = (lo + hi) // 2
-                if cost_of_shares(mid, curve1) + cost_of_shares(mid, curve2) <= max_cost:
-                    best_cost_shares = mid
-                    lo = mid + 1
-                else:
-                    hi = mid - 1
-
-        final_shares = min(best_profit_shares, best_cost_shares)
-        total_cost = cost_of_shares(final_shares, curve1) + cost_of_shares(final_shares, curve2) if final_shares > 0 else 0
-        
-        max_price1 = price_of_share(final_shares, curve1) if final_shares > 0 else 0
-        max_price2 = price_of_share(final_shares, curve2) if final_shares > 0 else 0
-        return final_shares, total_cost, max_price1, max_price2
-    
-    shares1, cost1, max_p_y1, max_p_n2 = get_arbitrage_details(curve_y1, curve_n2)
-    shares2, cost2, max_p_y2, max_p_n1 = get_arbitrage_details(curve_y2, curve_n1)
+    details1 = _walk_breakpoints(yes1, no2, profit_threshold, expected_slippage, max_cost)
+    details2 = _walk_breakpoints(yes2, no1, profit_threshold, expected_slippage, max_cost)
+    return _select_opportunity(details1, details2)
+
+
+def _walk_breakpoints(
+    levels1: List[List[int]],
+    levels2: List[List[int]],
+    profit_threshold: float,
+    expected_slippage: float,
+    max_cost: Optional[int],
+) -> ArbitrageDetails:
+    """
+    Finds the largest X such that every share up to X is bought below $1.00, the total cost stays
+    within `max_cost`, and 1000 * X covers the cost grown by slippage and the profit threshold.
+
+    Both ladders are merged once. Between two consecutive breakpoints (a level boundary on either
+    side) the marginal price p1 + p2 is constant, so the cost is linear in X and the last profitable
+    X in the segment has a closed form. The walk is O(n + m) instead of two binary searches that
+    each rescan the curves.
+
+    Returns:
+        (shares, total_cost, max_price_1, max_price_2, ladder) where ladder holds one
+        [cumulative_shares, price_1, price_2, marginal_profit] entry per segment bought.
+    """
+    growth = (1 + expected_slippage) * (1 + profit_threshold)
+
+    def profitable(shares: int, cost: int) -> bool:
+        return 1000 * shares >= math.ceil(cost * (1 + expected_slippage) * (1 + profit_threshold))
+
+    shares, cost = 0, 0
+    max_price1, max_price2 = 0, 0
+    ladder = []
+    i, j = 0, 0
+    taken1, taken2 = 0, 0
+    while i < len(levels1) and j < len(levels2):
+        price1, qty1 = levels1[i][0], levels1[i][1]
+        price2, qty2 = levels2[j][0], levels2[j][1]
+        if qty1 - taken1 <= 0:
+            i, taken1 = i + 1, 0
+            continue
+        if qty2 - taken2 <= 0:
+            j, taken2 = j + 1, 0
+            continue
+
+        marginal = price1 + price2
+        # Clamp shares if marginal price is >= $1.00
+        if marginal >= 1000:
+            break
+
+        step = min(qty1 - taken1, qty2 - taken2)
+        segment_end = shares + step
+        limit = segment_end
+        if max_cost is not None and cost + marginal * step > max_cost:
+            limit = shares + max(0, (max_cost - cost) // marginal if marginal else 0)
+
+        end = limit
+        if not profitable(limit, cost + marginal * (limit - shares)):
+            end = _last_profitable_in_segment(shares, cost, marginal, limit, growth, profitable)
+
+        if end > shares:
+            cost += marginal * (end - shares)
+            shares = end
+            max_price1, max_price2 = price1, price2
+            ladder.append([shares, price1, price2, 1000 - marginal])
+        if end < segment_end:
+            break
+        taken1 += step
+        taken2 += step
+
+    return shares, cost, max_price1, max_price2, ladder
+
+
+def _last_profitable_in_segment(start, start_cost, marginal, limit, growth, profitable) -> int:
+    """
+    Largest X in [start, limit] with profitable(X, cost(X)), given the cost is linear on the segment.
+
+    Solves 1000 X >= growth * (start_cost + marginal * (X - start)) in closed form, then nudges the
+    answer by a share or two so it agrees with the exact integer/ceil check used everywhere else.
+    """
+    if 1000 - growth * marginal < 0:
+        candidate = math.floor(growth * (marginal * start - start_cost) / (growth * marginal - 1000))
+        shares = min(max(candidate, start), limit)
+    else:
+        shares = start
+
+    while shares < limit and profitable(shares + 1, start_cost + marginal * (shares + 1 - start)):
+        shares += 1
+    while shares > start and not profitable(shares, start_cost + marginal * (shares - start)):
+        shares -= 1
+    return shares
+
+
+def _select_opportunity(details1: ArbitrageDetails, details2: ArbitrageDetails) -> Optional[Dict[str, Any]]:
+    """
+    Builds the opportunity dictionaries for both directions of a pair and returns the cheaper one.
+
+    Arguments:
+        details1: (shares, total_cost, max_price_1, max_price_2, ladder) for buying yes on ob1 and no on ob2
+        details2: (shares, total_cost, max_price_1, max_price_2, ladder) for buying yes on ob2 and no on ob1
+    """
+    shares1, cost1, max_p_y1, max_p_n2, ladder1 = details1
+    shares2, cost2, max_p_y2, max_p_n1, ladder2 = details2
 
     opp1 = None
     if shares1 > 0:
@@ -113,6 +146,7 @@ def calculate_cross_platform_arbitrage(
             "cost_per_share": cost1 / shares1,
             "max_price_1": max_p_y1,
             "max_price_2": max_p_n2,
+            "ladder": ladder1,
         }
 
     opp2 = None
@@ -124,9 +158,287 @@ def calculate_cross_platform_arbitrage(
             "cost_per_share": cost2 / shares2,
             "max_price_1": max_p_y2,
             "max_price_2": max_p_n1,
+            "ladder": ladder2,
         }
 
     if opp1 and opp2:
         return opp1 if opp1["cost_per_share"] <= opp2["cost_per_share"] else opp2
 
     return opp1 or opp2
+
+
+class _PackedCurves:
+    """
+    Cumulative curves for many ask ladders, zero-padded into (rows, width) int64 matrices.
+
+    Padded cells repeat the last cumulative value, so a left `searchsorted` for X lands on the
+    first level whose cumulative quantity reaches X, i.e. the level the X-th share is bought at.
+    """
+
+    def __init__(self, prices: np.ndarray, cum_qty: np.ndarray, cum_cost: np.ndarray, lengths: np.ndarray):
+        self.prices = prices
+        self.cum_qty = cum_qty
+        self.cum_cost = cum_cost
+        self.lengths = lengths
+        self.totals = cum_qty[:, -1]
+
+        # Shift each row into its own band so one flat searchsorted serves every row at once.
+        rows, width = cum_qty.shape
+        band = int(self.totals.max()) + 1 if rows else 1
+        self._rows = np.arange(rows)
+        self._offsets = self._rows.astype(np.int64) * band
+        self._flat_cum_qty = (cum_qty + self._offsets[:, None]).ravel()
+        self._row_starts = self._rows.astype(np.int64) * width
+        self._width = width
+
+    @classmethod
+    def from_books(cls, books: Sequence[Orderbook], side: str) -> "_PackedCurves":
+        """Packs the `side` ask ladder of every book, reading CompactOrderbook columns without copies to lists."""
+        if all(isinstance(ob, CompactOrderbook) for ob in books):
+            return cls.from_columns([ob.columns(side, "ask") for ob in books])
+        return cls.from_ladders([ob.no["ask"] if side == "no" else ob.yes["ask"] for ob in books])
+
+    @classmethod
+    def from_ladders(cls, ladders: Sequence[List[List[int]]]) -> "_PackedCurves":
+        rows = len(ladders)
+        lengths = np.fromiter((len(levels) for levels in ladders), dtype=np.int64, count=rows)
+        prices, qtys, filled = cls._empty(lengths)
+        num_levels = int(lengths.sum())
+        if num_levels > 0:
+            flat = np.fromiter(chain.from_iterable(chain.from_iterable(ladders)), dtype=np.int64, count=2 * num_levels)
+            prices[filled] = flat[0::2]
+            qtys[filled] = flat[1::2]
+        return cls(prices, np.cumsum(qtys, axis=1), np.cumsum(prices * qtys, axis=1), lengths)
+
+    @classmethod
+    def from_columns(cls, columns: Sequence[Tuple[np.ndarray, np.ndarray]]) -> "_PackedCurves":
+        lengths = np.fromiter((len(ladder_prices) for ladder_prices, _ in columns), dtype=np.int64, count=len(columns))
+        prices, qtys, filled = cls._empty(lengths)
+        if int(lengths.sum()) > 0:
+            prices[filled] = np.concatenate([ladder_prices for ladder_prices, _ in columns])
+            qtys[filled] = np.concatenate([ladder_qtys for _, ladder_qtys in columns])
+        return cls(prices, np.cumsum(qtys, axis=1), np.cumsum(prices * qtys, axis=1), lengths)
+
+    @staticmethod
+    def _empty(lengths: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        width = max(int(lengths.max()) if len(lengths) else 0, 1)
+        prices = np.zeros((len(lengths), width), dtype=np.int64)
+        qtys = np.zeros((len(lengths), width), dtype=np.int64)
+        return prices, qtys, np.arange(width) < lengths[:, None]
+
+    def head(self, rows: np.ndarray, levels: int) -> "_PackedCurves":
+        """The first `levels` levels of the given rows; prefix sums of a prefix are unchanged."""
+        return _PackedCurves(
+            self.prices[rows, :levels],
+            self.cum_qty[rows, :levels],
+            self.cum_cost[rows, :levels],
+            np.minimum(self.lengths[rows], levels),
+        )
+
+    def _row_index(self, like: np.ndarray) -> np.ndarray:
+        return self._rows if like.ndim == 1 else self._rows[:, None]
+
+    def locate(self, shares: np.ndarray) -> np.ndarray:
+        """Index of the level holding the `shares`-th share, for a (rows,) or (rows, k) array."""
+        rows = self._row_index(shares)
+        idx = np.searchsorted(self._flat_cum_qty, shares + self._offsets[rows], side="left") - self._row_starts[rows]
+        return np.minimum(idx, self._width - 1)
+
+    def cost(self, shares: np.ndarray, idx: np.ndarray) -> np.ndarray:
+        """Cost of buying `shares` in every row, given `idx = locate(shares)`."""
+        rows = self._row_index(shares)
+        return self.cum_cost[rows, idx] - self.prices[rows, idx] * (self.cum_qty[rows, idx] - shares)
+
+    def price(self, idx: np.ndarray) -> np.ndarray:
+        return self.prices[self._row_index(idx), idx]
+
+
+def _batched_arbitrage_details(
+    curves1: _PackedCurves,
+    curves2: _PackedCurves,
+    profit_threshold: float,
+    expected_slippage: float,
+    max_cost: Optional[int],
+    initial_levels: int = 32,
+) -> List[ArbitrageDetails]:
+    """
+    Vectorized `_walk_breakpoints` for row i of curves1 against row i of curves2.
+
+    Most walks stop within the first few levels, so rows are first solved on a shallow head of
+    each ladder and only the rows that walk off the end of it are retried on a deeper one.
+    """
+    has_depth = (curves1.lengths > 0) & (curves2.lengths > 0)
+    depth = np.where(has_depth, np.minimum(curves1.totals, curves2.totals), 0)
+    width = max(curves1.prices.shape[1], curves2.prices.shape[1])
+
+    details: List[Optional[ArbitrageDetails]] = [None] * len(depth)
+    pending = np.arange(len(depth))
+    levels = initial_levels
+    while len(pending):
+        solved, rows_done = _walk_packed(
+            curves1.head(pending, levels), curves2.head(pending, levels), depth[pending],
+            profit_threshold, expected_slippage, max_cost,
+        )
+        if levels >= width:
+            rows_done[:] = True
+        for row, done, row_details in zip(pending.tolist(), rows_done.tolist(), solved):
+            if done:
+                details[row] = row_details
+        pending = pending[~rows_done]
+        levels *= 4
+    return details
+
+
+def _walk_packed(
+    curves1: _PackedCurves,
+    curves2: _PackedCurves,
+    depth: np.ndarray,
+    profit_threshold: float,
+    expected_slippage: float,
+    max_cost: Optional[int],
+) -> Tuple[List[ArbitrageDetails], np.ndarray]:
+    """
+    Breakpoint walk over (possibly truncated) curves. Also returns which rows are final: those
+    that stopped inside the curves or whose curves reach the full `depth`.
+    """
+    growth = (1 + expected_slippage) * (1 + profit_threshold)
+
+    def profitable(shares, cost):
+        return 1000 * shares >= np.ceil(cost * (1 + expected_slippage) * (1 + profit_threshold))
+
+    rows = len(depth)
+    reach = np.minimum(depth, np.minimum(curves1.totals, curves2.totals))
+
+    # Segment k covers shares (starts[:, k], ends[:, k]]; breakpoints past `reach` collapse to empty segments.
+    ends = np.minimum(np.sort(np.concatenate([curves1.cum_qty, curves2.cum_qty], axis=1), axis=1), reach[:, None])
+    starts = np.concatenate([np.zeros((rows, 1), dtype=np.int64), ends[:, :-1]], axis=1)
+    idx1 = curves1.locate(ends)
+    idx2 = curves2.locate(ends)
+    prices1 = curves1.price(idx1)
+    prices2 = curves2.price(idx2)
+    marginal = prices1 + prices2
+    end_costs = curves1.cost(ends, idx1) + curves2.cost(ends, idx2)
+    start_costs = np.concatenate([np.zeros((rows, 1), dtype=np.int64), end_costs[:, :-1]], axis=1)
+
+    non_empty = ends > starts
+    passes = (marginal < 1000) & profitable(ends, end_costs)
+    if max_cost is not None:
+        passes &= end_costs <= max_cost
+    failing = non_empty & ~passes
+    stopped = failing.any(axis=1)
+    k = failing.argmax(axis=1)
+    all_rows = np.arange(rows)
+
+    start = starts[all_rows, k]
+    start_cost = start_costs[all_rows, k]
+    seg_marginal = marginal[all_rows, k]
+    limit = ends[all_rows, k]
+    if max_cost is not None:
+        over_budget = end_costs[all_rows, k] > max_cost
+        affordable = np.where(seg_marginal > 0, (max_cost - start_cost) // np.maximum(seg_marginal, 1), 0)
+        limit = np.where(over_budget, start + np.maximum(affordable, 0), limit)
+
+    def cost_at(shares):
+        return start_cost + seg_marginal * (shares - start)
+
+    # Closed-form last profitable share on the failing segment, then the same exact nudging as the scalar walk.
+    partial = ~profitable(limit, cost_at(limit))
+    slope_negative = 1000 - growth * seg_marginal < 0
+    denominator = np.where(slope_negative, growth * seg_marginal - 1000, 1.0)
+    candidate = np.floor(growth * (seg_marginal * start - start_cost) / denominator)
+    shares = np.where(slope_negative, np.clip(candidate, start, limit), start).astype(np.int64)
+    while True:
+        grow = partial & (shares < limit)
+        grow[grow] = profitable(shares[grow] + 1, cost_at(shares + 1)[grow])
+        if not grow.any():
+            break
+        shares += grow
+    while True:
+        shrink = partial & (shares > start)
+        shrink[shrink] = ~profitable(shares[shrink], cost_at(shares)[shrink])
+        if not shrink.any():
+            break
+        shares -= shrink
+    shares = np.where(partial, shares, limit)
+    shares = np.where(seg_marginal >= 1000, start, shares)
+    final_shares = np.where(stopped, shares, reach)
+
+    traded = final_shares > 0
+    final_idx1 = curves1.locate(final_shares)
+    final_idx2 = curves2.locate(final_shares)
+    total_cost = np.where(traded, curves1.cost(final_shares, final_idx1) + curves2.cost(final_shares, final_idx2), 0)
+    max_price1 = np.where(traded, curves1.price(final_idx1), 0)
+    max_price2 = np.where(traded, curves2.price(final_idx2), 0)
+
+    bought = non_empty & (starts < final_shares[:, None])
+    segments = np.stack([np.minimum(ends, final_shares[:, None]), prices1, prices2, 1000 - marginal], axis=2)
+    details = []
+    for row, (n, cost, p1, p2) in enumerate(zip(final_shares.tolist(), total_cost.tolist(), max_price1.tolist(), max_price2.tolist())):
+        ladder = segments[row][bought[row]].tolist() if n > 0 else []
+        details.append((n, cost, p1, p2, ladder))
+    return details, stopped | (reach == depth)
+
+
+def calculate_many(
+    pairs: Sequence[Tuple[Orderbook, Orderbook]],
+    profit_threshold: Optional[float] = 0.05,
+    expected_slippage: Optional[float] = 0.01,
+    max_cost: Optional[int] = None,
+    chunk_size: int = 1024,
+) -> List[Optional[Dict[str, Any]]]:
+    """
+    Batched `calculate_cross_platform_arbitrage`: scores every (ob1, ob2) pair in one vectorized pass.
+
+    Arguments:
+        pairs: list of (Orderbook, Orderbook) -> Orderbook pairs to evaluate
+        profit_threshold: float -> Minimum profit threshold for arbitrage opportunity
+        expected_slippage: float -> Expected slippage for arbitrage opportunity
+        max_cost: int -> Maximum cost willing to incur across both markets
+        chunk_size: int -> Number of pairs packed together, bounding the size of the padded arrays
+    Returns:
+        One entry per pair, identical to what `calculate_cross_platform_arbitrage` returns for it.
+    """
+    results: List[Optional[Dict[str, Any]]] = []
+    for start in range(0, len(pairs), chunk_size):
+        chunk = pairs[start:start + chunk_size]
+
+        # Row i of (buy, hedge) is yes1/no2 for pair i; row n + i is yes2/no1 for pair i.
+        buy = _PackedCurves.from_books([ob1 for ob1, _ in chunk] + [ob2 for _, ob2 in chunk], "yes")
+        hedge = _PackedCurves.from_books([ob2 for _, ob2 in chunk] + [ob1 for ob1, _ in chunk], "no")
+        details = _batched_arbitrage_details(buy, hedge, profit_threshold, expected_slippage, max_cost)
+
+        n = len(chunk)
+        for i in range(n):
+            results.append(_select_opportunity(details[i], details[n + i]))
+    return results
+
+
+def top_of_book_gap(
+    top1: TopOfBook,
+    top2: TopOfBook,
+    profit_threshold: Optional[float] = 0.05,
+    expected_slippage: Optional[float] = 0.01,
+) -> Optional[int]:
+    """
+    How far the pair's best asks are from an opportunity, from top of book alone. The finder
+    uses it to skip fetching full books for pairs that cannot be an opportunity.
+
+    The first share of either direction costs best yes ask + best no ask, and asks only get dearer
+    deeper in the book, so if that share does not clear the threshold no larger size does either.
+
+    Arguments:
+        top1: TopOfBook -> Top of book for the first platform
+        top2: TopOfBook -> Top of book for the second platform
+        profit_threshold: float -> Minimum profit threshold for arbitrage opportunity
+        expected_slippage: float -> Expected slippage for arbitrage opportunity
+    Returns:
+        Thousandths by which the cheaper direction's first share misses the threshold, zero or
+        negative if it clears it, or None if neither direction has both asks.
+    """
+    gaps = [
+        # Same check as _walk_breakpoints for a single share.
+        math.ceil((yes_ask + no_ask) * (1 + expected_slippage) * (1 + profit_threshold)) - 1000
+        for yes_ask, no_ask in ((top1.yes_ask, top2.no_ask), (top2.yes_ask, top1.no_ask))
+        if yes_ask is not None and no_ask is not None
+    ]
+    return min(gaps) if gaps else None
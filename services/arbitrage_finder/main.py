@@ -1,13 +1,26 @@
-import time
+import asyncio
 import socket
 import os
 import signal
+import threading
+import time
 from cache.RedisManager import RedisManager
+from cache.AsyncRedisManager import AsyncRedisManager
+from cache.OrderbookSnapshotCache import get_orderbook_cache
+from cache.StreamConsumer import AsyncStreamConsumer, StreamConsumer
 from db.DBManager import DBManager
 from models.PlatformType import PlatformType
 from platforms.KalshiPlatform import KalshiPlatform
 from platforms.PolyMarketPlatform import PolyMarketPlatform
-from services.arbitrage_finder.calculator import calculate_cross_platform_arbitrage
+from platforms.HttpTransport import get_transport
+from services.arbitrage_finder.calculator import top_of_book_gap
+from services.arbitrage_finder.memo import ArbitrageMemo
+from services.arbitrage_finder.watchlist import PairWatchlist, pair_key
+from services.arbitrage_finder.workers import SweepPool
+from models.TopOfBook import TopOfBook
+from feeds.OrderbookStore import OrderbookStore
+from feeds.KalshiBookFeed import KalshiBookFeed
+from feeds.PolymarketBookFeed import PolymarketBookFeed
 
 class ArbitrageFinderService:
     def __init__(self):
@@ -17,6 +30,40 @@ class ArbitrageFinderService:
             PlatformType.KALSHI: KalshiPlatform(),
             PlatformType.POLYMARKET: PolyMarketPlatform()
         }
+        # Books kept current by streaming feeds; markets without a local book are fetched over REST.
+        self.orderbook_stores = {
+            PlatformType.KALSHI: OrderbookStore(),
+            PlatformType.POLYMARKET: OrderbookStore()
+        }
+        self.kalshi_feed = None
+        if os.getenv("KALSHI_BOOK_FEED", "false").lower() == "true":
+            kalshi = self.platforms[PlatformType.KALSHI]
+            self.kalshi_feed = KalshiBookFeed(self.orderbook_stores[PlatformType.KALSHI], kalshi.key_id, kalshi.private_key)
+            self.kalshi_feed.start()
+        self.polymarket_feed = None
+        if os.getenv("POLYMARKET_BOOK_FEED", "false").lower() == "true":
+            self.polymarket_feed = PolymarketBookFeed(self.orderbook_stores[PlatformType.POLYMARKET])
+            self.polymarket_feed.start()
+        # Pairs are first screened on top of book, fetched in bulk, and only the pairs that could be
+        # an opportunity get their full books fetched. SCREEN_MARGIN is in thousandths of a dollar.
+        self.screen_top_of_book = os.getenv("SCREEN_TOP_OF_BOOK", "true").lower() != "false"
+        self.screen_margin = int(os.getenv("SCREEN_MARGIN", 10))
+        # The last opportunity published per pair, by pair_key, so an unchanged one is not
+        # republished. Dropped when the pair is checked without an opportunity or stops being watched.
+        self.published = {}
+        # Every pair seen, from the database and the input stream, is re-checked on its own schedule.
+        self.watchlist = PairWatchlist(on_remove=self._forget_published) if os.getenv("PAIR_WATCHLIST", "true").lower() != "false" else None
+        # With ARBITRAGE_WORKERS set, pairs are scored by worker processes reading the books from
+        # shared memory instead of in this process.
+        self.sweep_pool = SweepPool() if int(os.getenv("ARBITRAGE_WORKERS", 0)) > 0 else None
+        # Calculator results by the books' ask fingerprints, so unchanged books are not recalculated.
+        self.memo = ArbitrageMemo(calculate=self.sweep_pool.calculate_many if self.sweep_pool is not None else None)
+        # Sweeps run in a worker thread on the async path; one at a time, as the memo and the
+        # shared store have one writer.
+        self._sweep_lock = threading.Lock()
+        # Fetched books go through the snapshot cache shared with other replicas and the executor.
+        self.snapshots = get_orderbook_cache()
+        self.book_max_age_ms = int(os.getenv("ORDERBOOK_MAX_AGE_MS", 1000))
         
         self.input_stream_name = "similar_market_pairs_stream"
         self.output_stream_name = "arbitrage_opportunities_stream"
@@ -24,90 +71,456 @@ class ArbitrageFinderService:
         self.consumer_name = f"arbitrage-consumer-{socket.gethostname()}"
         
         self.redis_manager.create_consumer_group(self.input_stream_name, self.group_name)
+        self.consumer = StreamConsumer(
+            self.redis_manager, self.input_stream_name, self.group_name, self.consumer_name, self.handle_market_pairs
+        )
         self.shutdown_requested = False
         signal.signal(signal.SIGINT, self.request_shutdown)
         signal.signal(signal.SIGTERM, self.request_shutdown)
 
     def request_shutdown(self, signum, frame):
         """Gracefully handle shutdown requests."""
-        print(f"Shutdown requested by signal {signum}. Finishing current cycle...")
+        print(f"Shutdown requested by signal {signum}. Finishing current batch...")
         self.shutdown_requested = True
 
+    def _local_order_book(self, platform_type: PlatformType, market_id: str):
+        store = self.orderbook_stores.get(platform_type)
+        return store.get_order_book(market_id) if store is not None else None
+
+    def _markets_by_platform(self, pairs: list) -> dict:
+        """platform_type -> (client, market ids) over every leg of the pairs, without repeats."""
+        markets = {}
+        for _, legs in pairs:
+            for market_id, platform_type, client in legs:
+                markets.setdefault(platform_type, (client, {}))[1][market_id] = None
+        return {platform_type: (client, list(market_ids)) for platform_type, (client, market_ids) in markets.items()}
+
+    def _missing_books(self, pairs: list) -> dict:
+        """platform_type -> (client, market ids) of the markets in the pairs without a local book."""
+        missing = {}
+        for platform_type, (client, market_ids) in self._markets_by_platform(pairs).items():
+            market_ids = [market_id for market_id in market_ids if self._local_order_book(platform_type, market_id) is None]
+            if market_ids:
+                missing[platform_type] = (client, market_ids)
+        return missing
+
+    def _unwatched(self, platform_type: PlatformType, market_ids: list) -> list:
+        """
+        The markets not yet streamed by the platform's feed. Fetched markets are added to the
+        feed, if enabled, so later reads of them are served locally.
+        """
+        feed = {PlatformType.KALSHI: self.kalshi_feed, PlatformType.POLYMARKET: self.polymarket_feed}.get(platform_type)
+        if feed is None:
+            return []
+        return [market_id for market_id in market_ids if not feed.is_watched(market_id)]
+
+    def _fetch_books(self, pairs: list) -> tuple:
+        """
+        Returns ({(platform_type, market_id): book}, platform types whose fetch failed) for every
+        market in the pairs. Books kept locally by a feed are used as they are; the rest come
+        from the shared snapshot cache if fresh enough, or else from one get_order_books call per
+        platform.
+        """
+        for platform_type, (client, market_ids) in self._markets_by_platform(pairs).items():
+            unwatched = self._unwatched(platform_type, market_ids)
+            if unwatched and platform_type == PlatformType.KALSHI:
+                self.kalshi_feed.watch(unwatched)
+            elif unwatched:
+                self.polymarket_feed.watch(client.get_token_ids(unwatched))
+        books, failed = {}, set()
+        for platform_type, (client, market_ids) in self._missing_books(pairs).items():
+            try:
+                fetched = self.snapshots.get_many(platform_type, market_ids, client.get_order_books, self.book_max_age_ms)
+            except Exception as e:
+                print(f"Error fetching {len(market_ids)} order books from {platform_type.value}: {e}")
+                failed.add(platform_type)
+                continue
+            books.update({(platform_type, orderbook.market_id): orderbook for orderbook in fetched})
+        return books, failed
+
+    async def _afetch_books(self, pairs: list) -> tuple:
+        """Async version of _fetch_books; the platforms are fetched concurrently."""
+        for platform_type, (client, market_ids) in self._markets_by_platform(pairs).items():
+            unwatched = self._unwatched(platform_type, market_ids)
+            if unwatched and platform_type == PlatformType.KALSHI:
+                self.kalshi_feed.watch(unwatched)
+            elif unwatched:
+                self.polymarket_feed.watch(await client.aget_token_ids(unwatched))
+        missing = self._missing_books(pairs)
+        results = await asyncio.gather(
+            *[
+                self.snapshots.aget_many(platform_type, market_ids, client.aget_order_books, self.book_max_age_ms)
+                for platform_type, (client, market_ids) in missing.items()
+            ],
+            return_exceptions=True,
+        )
+        books, failed = {}, set()
+        for (platform_type, (_, market_ids)), result in zip(missing.items(), results):
+            if isinstance(result, Exception):
+                print(f"Error fetching {len(market_ids)} order books from {platform_type.value}: {result}")
+                failed.add(platform_type)
+                continue
+            books.update({(platform_type, orderbook.market_id): orderbook for orderbook in result})
+        return books, failed
+
+    def _parse_pair(self, message_data: dict):
+        """
+        Returns the pair's ((market_id, platform_type, client), (market_id, platform_type, client)),
+        or None if a platform has no client.
+        """
+        market_id_1 = message_data['market_id_1']
+        platform_1 = PlatformType(message_data['platform_1'])
+        market_id_2 = message_data['market_id_2']
+        platform_2 = PlatformType(message_data['platform_2'])
+
+        platform1_client = self.platforms.get(platform_1)
+        platform2_client = self.platforms.get(platform_2)
+
+        if not platform1_client or not platform2_client:
+            print(f"Platform client not found for one or both platforms in pair: {platform_1}, {platform_2}")
+            return None
+        return (market_id_1, platform_1, platform1_client), (market_id_2, platform_2, platform2_client)
+
+    def _parse_pairs(self, messages: list):
+        """
+        Returns ([(message_id, legs)] for pairs to check, [message_id] of messages already done
+        with). Messages that fail to parse are in neither list, so they are not acknowledged.
+        """
+        pairs, processed = [], []
+        for message_id, message_data in messages:
+            print(f"Processing message {message_id}: {message_data}")
+            try:
+                legs = self._parse_pair(message_data)
+            except Exception as e:
+                print(f"Error processing message {message_id}: {e}")
+                continue
+            if legs is None:
+                processed.append(message_id)
+            else:
+                pairs.append((message_id, legs))
+        return pairs, processed
+
+    def _pair_gap(self, legs, tops: dict):
+        """
+        The pair's top-of-book gap (see calculator.top_of_book_gap), from local books where a feed
+        keeps them and the fetched tops otherwise, or None if its top of book is not known.
+        """
+        pair_tops = []
+        for market_id, platform_type, _ in legs:
+            orderbook = self._local_order_book(platform_type, market_id)
+            top = TopOfBook.from_orderbook(orderbook) if orderbook is not None else tops.get(platform_type, {}).get(market_id)
+            if top is None:
+                return None
+            pair_tops.append(top)
+        return top_of_book_gap(
+            *pair_tops,
+            profit_threshold=float(os.getenv("PROFIT_THRESHOLD", 0.05)),
+            expected_slippage=float(os.getenv("EXPECTED_SLIPPAGE", 0.01)),
+        )
+
+    def _screened(self, pairs: list, tops: dict) -> tuple:
+        """
+        Splits pairs into (passed, rejected ids, {id: gap}) given the fetched tops. A pair whose
+        top of book is not known passes, leaving it to the full check.
+        """
+        passed, rejected, gaps = [], [], {}
+        for pair_id, legs in pairs:
+            gap = gaps[pair_id] = self._pair_gap(legs, tops)
+            if gap is None or gap <= self.screen_margin:
+                passed.append((pair_id, legs))
+            else:
+                rejected.append(pair_id)
+                self._forget_published(pair_key(legs[0][0], legs[1][0]))
+        print(f"Screened {len(pairs)} pairs on top of book, {len(passed)} passed.")
+        return passed, rejected, gaps
+
+    def _fetch_tops(self, pairs: list) -> dict:
+        """
+        platform_type -> {market_id: TopOfBook} for every market of the pairs without a local
+        book, one bulk call per platform.
+        """
+        tops = {}
+        for platform_type, (client, market_ids) in self._missing_books(pairs).items():
+            try:
+                tops[platform_type] = client.get_top_of_book(market_ids)
+            except Exception as e:
+                print(f"Error fetching top of book from {platform_type.value}: {e}")
+        return tops
+
+    async def _afetch_tops(self, pairs: list) -> dict:
+        """Async version of _fetch_tops; the platforms are queried concurrently."""
+        requests = self._missing_books(pairs)
+        results = await asyncio.gather(
+            *[client.aget_top_of_book(market_ids) for client, market_ids in requests.values()],
+            return_exceptions=True,
+        )
+        tops = {}
+        for platform_type, result in zip(requests, results):
+            if isinstance(result, Exception):
+                print(f"Error fetching top of book from {platform_type.value}: {result}")
+            else:
+                tops[platform_type] = result
+        return tops
+
+    def _check_pairs(self, pairs: list) -> tuple:
+        """
+        Screens the (id, legs) pairs on top of book, if enabled, and scores the ones that pass on
+        their full books.
+
+        Returns:
+            ([id] of the pairs checked, {id: opportunity message}, {id: top-of-book gap}).
+        """
+        checked, gaps = [], {}
+        if self.screen_top_of_book:
+            pairs, checked, gaps = self._screened(pairs, self._fetch_tops(pairs))
+        found = {}
+        if pairs:
+            scored, found = self._sweep(pairs, *self._fetch_books(pairs))
+            checked.extend(scored)
+        return checked, found, gaps
+
+    async def _acheck_pairs(self, pairs: list) -> tuple:
+        """Async version of _check_pairs."""
+        checked, gaps = [], {}
+        if self.screen_top_of_book:
+            pairs, checked, gaps = self._screened(pairs, await self._afetch_tops(pairs))
+        found = {}
+        if pairs:
+            # Scoring a large batch is CPU-bound, or waits on the sweep pool, so it runs off the loop.
+            scored, found = await asyncio.to_thread(self._sweep, pairs, *await self._afetch_books(pairs))
+            checked.extend(scored)
+        return checked, found, gaps
+
+    def _sweep(self, pairs: list, fetched: dict, failed: set) -> tuple:
+        """
+        Scores every pair of the batch in one calculate_many call, reusing the results of pairs
+        whose asks are unchanged.
+
+        Returns:
+            ([id] of the pairs checked, {id: opportunity message}). Pairs on a platform whose
+            fetch failed are left out of both, so they are redelivered.
+        """
+        processed, scored = [], []
+        for pair_id, legs in pairs:
+            if any(platform_type in failed for _, platform_type, _ in legs):
+                continue
+            processed.append(pair_id)
+            orderbooks = [
+                self._local_order_book(platform_type, market_id) or fetched.get((platform_type, market_id))
+                for market_id, platform_type, _ in legs
+            ]
+            if None in orderbooks:
+                print(f"Could not fetch order book for one or both markets in pair: {legs[0][0]}, {legs[1][0]}")
+                continue
+            scored.append((pair_id, legs, tuple(orderbooks)))
+
+        max_cost_str = os.getenv("MAX_TRADE_COST")
+        with self._sweep_lock:
+            results = self.memo.calculate_many(
+                [orderbooks for _, _, orderbooks in scored],
+                profit_threshold=float(os.getenv("PROFIT_THRESHOLD", 0.05)),
+                expected_slippage=float(os.getenv("EXPECTED_SLIPPAGE", 0.01)),
+                max_cost=int(max_cost_str) if max_cost_str else None,
+            )
+        found = {}
+        for (pair_id, legs, _), opportunity in zip(scored, results):
+            if opportunity:
+                found[pair_id] = self._opportunity_message(*legs, opportunity)
+            else:
+                self._forget_published(pair_key(legs[0][0], legs[1][0]))
+        print(f"Checked {len(processed)} pairs, {len(found)} opportunities found, {100 * self.memo.stats()['hit_rate']:.0f}% from cache.")
+        return processed, found
+
+    def _unpublished(self, found: dict) -> list:
+        """
+        The opportunity messages that differ from the last one published for their pair. An
+        opportunity that is still there on unchanged books is not written to the stream again.
+        """
+        fresh = []
+        for message in found.values():
+            key = pair_key(message["market_id_1"], message["market_id_2"])
+            if self.published.get(key) != message:
+                print(f"Arbitrage opportunity found for pair {message['market_id_1']} and {message['market_id_2']}: {message['opportunity']}")
+                fresh.append(message)
+        return fresh
+
+    def _record_published(self, messages: list, message_ids: list) -> None:
+        """
+        Remembers the messages that got a stream ID. Those in a batch that failed stay
+        unpublished, so the next check sends them again.
+        """
+        for message, message_id in zip(messages, message_ids):
+            if message_id is not None:
+                self.published[pair_key(message["market_id_1"], message["market_id_2"])] = message
+
+    def _forget_published(self, key: tuple) -> None:
+        self.published.pop(key, None)
+
+    def _opportunity_message(self, leg1, leg2, opportunity: dict) -> dict:
+        market_id_1, platform_1, _ = leg1
+        market_id_2, platform_2, _ = leg2
+        return {
+            "market_id_1": market_id_1,
+            "platform_1": platform_1.value,
+            "market_id_2": market_id_2,
+            "platform_2": platform_2.value,
+            "opportunity": str(opportunity)
+        }
+
     def process_market_pairs(self):
         """
         Processes market pairs from the Redis Stream, checks for arbitrage, and publishes opportunities.
+        Reads a single batch without waiting; `run` consumes the stream continuously instead.
         """
         print(f"Checking for new market pairs as consumer '{self.consumer_name}'...")
-        messages = self.redis_manager.read_from_stream(self.input_stream_name, self.group_name, self.consumer_name)
+        messages = self.redis_manager.read_from_stream(
+            self.input_stream_name, self.group_name, self.consumer_name, count=self.consumer.batch_size
+        )
         
         if not messages:
             print("No new market pairs.")
             return
+        self.handle_market_pairs(messages)
 
-        for message_id, message_data in messages:
-            print(f"Processing message {message_id}: {message_data}")
-            try:
-                market_id_1 = message_data['market_id_1']
-                platform_1 = PlatformType(message_data['platform_1'])
-                market_id_2 = message_data['market_id_2']
-                platform_2 = PlatformType(message_data['platform_2'])
-
-                platform1_client = self.platforms.get(platform_1)
-                platform2_client = self.platforms.get(platform_2)
-
-                if not platform1_client or not platform2_client:
-                    print(f"Platform client not found for one or both platforms in pair: {platform_1}, {platform_2}")
-                    self.redis_manager.acknowledge_message(self.input_stream_name, self.group_name, message_id)
-                    continue
-
-                orderbook1 = platform1_client.get_order_books([market_id_1])[0]
-                orderbook2 = platform2_client.get_order_books([market_id_2])[0]
-
-                if not orderbook1 or not orderbook2:
-                    print(f"Could not fetch order book for one or both markets in pair: {market_id_1}, {market_id_2}")
-                    self.redis_manager.acknowledge_message(self.input_stream_name, self.group_name, message_id)
-                    continue
-                
-                profit_threshold = float(os.getenv("PROFIT_THRESHOLD", 0.05))
-                expected_slippage = float(os.getenv("EXPECTED_SLIPPAGE", 0.01))
-                max_cost_str = os.getenv("MAX_TRADE_COST")
-                max_cost = int(max_cost_str) if max_cost_str else None
-
-                opportunity = calculate_cross_platform_arbitrage(
-                    orderbook1, 
-                    orderbook2,
-                    profit_threshold=profit_threshold,
-                    expected_slippage=expected_slippage,
-                    max_cost=max_cost
-                )
-
-                if opportunity:
-                    print(f"Arbitrage opportunity found for pair {market_id_1} and {market_id_2}: {opportunity}")
-                    opportunity_message = {
-                        "market_id_1": market_id_1,
-                        "platform_1": platform_1.value,
-                        "market_id_2": market_id_2,
-                        "platform_2": platform_2.value,
-                        "opportunity": str(opportunity)
-                    }
-                    self.redis_manager.add_to_stream(self.output_stream_name, opportunity_message)
-
-                self.redis_manager.acknowledge_message(self.input_stream_name, self.group_name, message_id)
-                print(f"Successfully processed and acknowledged message {message_id}.")
+    def _watch_pairs(self, pairs: list, checked: list, found: dict, gaps: dict) -> None:
+        """Adds the stream's pairs to the watchlist, scheduling the checked ones from their result."""
+        if self.watchlist is None:
+            return
+        checked = set(checked)
+        for message_id, ((market_id_1, platform_1, _), (market_id_2, platform_2, _)) in pairs:
+            watched = self.watchlist.add(market_id_1, platform_1, market_id_2, platform_2)
+            if message_id in checked:
+                self.watchlist.record(watched.key, gaps.get(message_id), message_id in found)
+
+    def handle_market_pairs(self, messages: list):
+        """
+        Handles a batch of (message_id, message_data) pairs read from the input stream. The books
+        of the whole batch are fetched with one call per platform and scored together.
+        """
+        pairs, processed = self._parse_pairs(messages)
+        checked, found, gaps = self._check_pairs(pairs) if pairs else ([], {}, {})
+        processed.extend(checked)
+        self._watch_pairs(pairs, checked, found, gaps)
+
+        # One pipelined publish and one XACK for the whole batch. Opportunities go out before
+        # their pairs are acknowledged, so a crash in between redelivers rather than loses them.
+        opportunities = self._unpublished(found)
+        if opportunities:
+            self._record_published(opportunities, self.redis_manager.add_many_to_stream(self.output_stream_name, opportunities))
+        self.redis_manager.acknowledge_messages(self.input_stream_name, self.group_name, processed)
+
+    async def ahandle_market_pairs(self, messages: list):
+        """
+        Async version of handle_market_pairs used by `run`: the platforms are fetched
+        concurrently.
+        """
+        pairs, processed = self._parse_pairs(messages)
+        checked, found, gaps = await self._acheck_pairs(pairs) if pairs else ([], {}, {})
+        processed.extend(checked)
+        self._watch_pairs(pairs, checked, found, gaps)
+        opportunities = self._unpublished(found)
+        if opportunities:
+            self._record_published(opportunities, await self.async_redis_manager.add_many_to_stream(self.output_stream_name, opportunities))
+        await self.async_redis_manager.acknowledge_messages(self.input_stream_name, self.group_name, processed)
+
+    def _load_watchlist(self) -> int:
+        """Adds every pair stored in the database to the watchlist and returns how many were added."""
+        pairs = self.db_manager.get_all_market_pairs()
+        markets = {market.market_id: market for market in self.db_manager.get_markets(list({mid for pair in pairs for mid in pair}))}
+        self.watchlist.set_close_timestamps({market_id: market.close_timestamp for market_id, market in markets.items()})
+        added = 0
+        for market_id_1, market_id_2 in pairs:
+            market_1, market_2 = markets.get(market_id_1), markets.get(market_id_2)
+            if market_1 is not None and market_2 is not None:
+                self.watchlist.add(market_id_1, market_1.platform, market_id_2, market_2.platform)
+                added += 1
+        return added
+
+    def _look_up_close_timestamps(self) -> None:
+        """Looks up the close timestamps of watched markets that came in on the stream."""
+        market_ids = self.watchlist.markets_without_close()
+        closes = dict.fromkeys(market_ids)
+        closes.update({market.market_id: market.close_timestamp for market in self.db_manager.get_markets(market_ids)})
+        self.watchlist.set_close_timestamps(closes)
 
+    async def acheck_watchlist(self, now=None) -> int:
+        """
+        Checks the watched pairs that are due, publishes the opportunities found and schedules
+        each pair's next check. Returns how many pairs were due.
+        """
+        pairs = []
+        for watched in self.watchlist.due(now, limit=self.consumer.batch_size):
+            clients = [self.platforms.get(watched.platform_1), self.platforms.get(watched.platform_2)]
+            if None in clients:
+                self.watchlist.remove(watched.key)
+                continue
+            pairs.append((watched.key, (
+                (watched.market_id_1, watched.platform_1, clients[0]),
+                (watched.market_id_2, watched.platform_2, clients[1]),
+            )))
+        if not pairs:
+            return 0
+        checked, found, gaps = await self._acheck_pairs(pairs)
+        for key in checked:
+            self.watchlist.record(key, gaps.get(key), key in found, now)
+        opportunities = self._unpublished(found)
+        if opportunities:
+            self._record_published(opportunities, await self.async_redis_manager.add_many_to_stream(self.output_stream_name, opportunities))
+        return len(pairs)
+
+    async def _awatch(self):
+        """Re-checks watched pairs as they come due until shutdown is requested."""
+        try:
+            print(f"Watching {await asyncio.to_thread(self._load_watchlist)} market pairs from the database.")
+        except Exception as e:
+            print(f"Error loading market pairs from the database: {e}")
+        while not self.shutdown_requested:
+            due = 0
+            try:
+                if self.watchlist.markets_without_close():
+                    await asyncio.to_thread(self._look_up_close_timestamps)
+                due = await self.acheck_watchlist()
             except Exception as e:
-                print(f"Error processing message {message_id}: {e}")
+                print(f"Error checking watched pairs: {e}")
+            if not due:
+                next_due = self.watchlist.next_due()
+                wait = 1.0 if next_due is None else next_due - time.time()
+                await asyncio.sleep(min(1.0, max(0.05, wait)))
+
+    async def arun(self):
+        """
+        Consumes market pairs on the current event loop until shutdown is requested, while
+        re-checking watched pairs as they come due.
+        """
+        self.async_redis_manager = AsyncRedisManager()
+        consumer = AsyncStreamConsumer(
+            self.async_redis_manager, self.input_stream_name, self.group_name, self.consumer_name, self.ahandle_market_pairs,
+            batch_size=self.consumer.batch_size, block_ms=self.consumer.block_ms,
+        )
+        await asyncio.gather(*(platform.awarm_connections() for platform in self.platforms.values()))
+        try:
+            if self.watchlist is not None:
+                await asyncio.gather(consumer.run(lambda: self.shutdown_requested), self._awatch())
+            else:
+                await consumer.run(lambda: self.shutdown_requested)
+        finally:
+            await self.async_redis_manager.close()
+            await get_transport().aclose()
 
     def run(self):
         """
-        Runs the arbitrage service indefinitely.
+        Runs the arbitrage service indefinitely on one event loop.
         """
-        polling_interval = int(os.getenv("ARBITRAGE_POLLING_INTERVAL_S", 10))
-        print(f"Starting Arbitrage Service with a {polling_interval} second interval...")
-        while not self.shutdown_requested:
-            self.process_market_pairs()
-            if not self.shutdown_requested:
-                time.sleep(polling_interval)
+        print(f"Starting Arbitrage Service as consumer '{self.consumer_name}'...")
+        try:
+            asyncio.run(self.arun())
+        finally:
+            for feed in (self.kalshi_feed, self.polymarket_feed):
+                if feed is not None:
+                    feed.stop()
+            # Unlinks the shared memory segment, which would otherwise outlive the process.
+            if self.sweep_pool is not None:
+                self.sweep_pool.close()
         print("Arbitrage Finder Service shut down gracefully.")
 
 if __name__ == '__main__':
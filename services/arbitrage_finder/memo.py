@@ -0,0 +1,82 @@
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from models.Orderbook import Orderbook
+from services.arbitrage_finder.calculator import calculate_many
+import os
+
+_MISSING = object()
+
+
+class ArbitrageMemo():
+    """
+    Bounded LRU cache of calculator results keyed by the books' ask fingerprints.
+
+    A result depends only on both books' ask ladders and the calculator settings, so a key of
+    (fingerprint_1, fingerprint_2, profit_threshold, expected_slippage, max_cost) identifies it.
+    Most refreshes return the same asks as the previous one, and those pairs are answered from
+    the cache. Only the rest go to `calculate` (calculator.calculate_many by default), still in
+    a single batch.
+
+    Settings come from the environment:
+        ARBITRAGE_MEMO_SIZE: results kept (default 100000).
+    """
+
+    def __init__(self, max_size: Optional[int] = None, calculate: Optional[Callable] = None):
+        self.max_size = max_size or int(os.getenv("ARBITRAGE_MEMO_SIZE", 100000))
+        self.calculate = calculate or calculate_many
+        self._results: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._results)
+
+    @staticmethod
+    def key(ob1: Orderbook, ob2: Orderbook, profit_threshold: float, expected_slippage: float, max_cost: Optional[int]) -> tuple:
+        return (ob1.ask_fingerprint(), ob2.ask_fingerprint(), profit_threshold, expected_slippage, max_cost)
+
+    def calculate_many(
+        self,
+        pairs: Sequence[Tuple[Orderbook, Orderbook]],
+        profit_threshold: Optional[float] = 0.05,
+        expected_slippage: Optional[float] = 0.01,
+        max_cost: Optional[int] = None,
+    ) -> List[Optional[Dict[str, Any]]]:
+        """
+        Same as calculator.calculate_many, answering pairs whose asks were seen before from the cache.
+        """
+        keys = [self.key(ob1, ob2, profit_threshold, expected_slippage, max_cost) for ob1, ob2 in pairs]
+        results = []
+        missed = []
+        for i, key in enumerate(keys):
+            result = self._results.get(key, _MISSING)
+            if result is _MISSING:
+                missed.append(i)
+            else:
+                self._results.move_to_end(key)
+            results.append(result)
+        self.hits += len(pairs) - len(missed)
+        self.misses += len(missed)
+
+        if missed:
+            computed = self.calculate(
+                [pairs[i] for i in missed],
+                profit_threshold=profit_threshold,
+                expected_slippage=expected_slippage,
+                max_cost=max_cost,
+            )
+            for i, result in zip(missed, computed):
+                results[i] = result
+                self._results[keys[i]] = result
+            while len(self._results) > self.max_size:
+                self._results.popitem(last=False)
+        return results
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._results),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
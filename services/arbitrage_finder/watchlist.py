@@ -0,0 +1,231 @@
+from collections import deque
+from statistics import pstdev
+from typing import Callable, Optional
+from models.PlatformType import PlatformType
+import heapq
+import os
+import time
+
+# Close timestamps below this are in seconds (Kalshi), above it in milliseconds.
+_MILLISECOND_TIMESTAMPS = 10 ** 11
+
+
+def to_millis(timestamp) -> Optional[int]:
+    """A close timestamp in milliseconds, whether it was stored in seconds or milliseconds."""
+    if timestamp is None:
+        return None
+    timestamp = int(timestamp)
+    return timestamp * 1000 if timestamp < _MILLISECOND_TIMESTAMPS else timestamp
+
+
+def pair_key(market_id_1: str, market_id_2: str) -> tuple:
+    """A pair's key whatever the order of its legs: the smaller market ID first, as in the database."""
+    return (market_id_1, market_id_2) if market_id_1 <= market_id_2 else (market_id_2, market_id_1)
+
+
+class WatchedPair():
+    """A market pair on the watchlist and what its recent checks found."""
+    __slots__ = ("market_id_1", "platform_1", "market_id_2", "platform_2", "gaps", "checks", "hits", "interval", "due")
+
+    def __init__(self, market_id_1: str, platform_1: PlatformType, market_id_2: str, platform_2: PlatformType, history: int):
+        self.market_id_1 = market_id_1
+        self.platform_1 = platform_1
+        self.market_id_2 = market_id_2
+        self.platform_2 = platform_2
+        # Top-of-book gaps of recent checks, see calculator.top_of_book_gap.
+        self.gaps = deque(maxlen=history)
+        self.checks = 0
+        self.hits = 0
+        self.interval: Optional[float] = None
+        self.due = 0.0
+
+    @property
+    def key(self) -> tuple:
+        return (self.market_id_1, self.market_id_2)
+
+    def __repr__(self):
+        return f"WatchedPair({self.market_id_1!r}, {self.market_id_2!r}, checks={self.checks}, hits={self.hits})"
+
+
+class PairWatchlist():
+    """
+    Market pairs the arbitrage finder keeps re-checking, each on its own schedule.
+
+    Every check scores a pair between 0 (cold) and 1 (hot) from four signals, each in [0, 1]:
+        proximity: how close its best asks were to an opportunity on the last check
+        volatility: how much that gap moved over recent checks
+        closeness: how near its earliest market is to closing
+        hit rate: the share of its checks that found an opportunity
+    The score is 1 - prod(1 - weight * signal), so one strong signal is enough to make a pair
+    hot, and the next check is due after max_interval * (min_interval / max_interval) ** score.
+    With the defaults a pair that is an opportunity right now is checked again within a second,
+    and a pair far from one, calm and far from closing every five minutes.
+
+    Pairs whose earliest market has closed are evicted when they come due. `on_remove` is called
+    with the key of every pair that leaves the watchlist, removed or evicted.
+
+    Settings come from the environment:
+        WATCH_MIN_INTERVAL_S / WATCH_MAX_INTERVAL_S: interval bounds (default 1 / 300).
+        WATCH_GAP_SCALE: gap in thousandths of a dollar at which proximity reaches 0 (default 100).
+        WATCH_CLOSE_HORIZON_S: time to close at which closeness starts rising (default 86400).
+    """
+
+    WEIGHTS = {"proximity": 1.0, "hit_rate": 0.8, "volatility": 0.5, "closeness": 0.3}
+
+    def __init__(
+        self,
+        min_interval_s: Optional[float] = None,
+        max_interval_s: Optional[float] = None,
+        gap_scale: Optional[int] = None,
+        close_horizon_s: Optional[float] = None,
+        history: int = 20,
+        on_remove: Optional[Callable[[tuple], None]] = None,
+    ):
+        self.min_interval_s = min_interval_s or float(os.getenv("WATCH_MIN_INTERVAL_S", 1))
+        self.max_interval_s = max_interval_s or float(os.getenv("WATCH_MAX_INTERVAL_S", 300))
+        self.gap_scale = gap_scale or int(os.getenv("WATCH_GAP_SCALE", 100))
+        self.close_horizon_s = close_horizon_s or float(os.getenv("WATCH_CLOSE_HORIZON_S", 86400))
+        self.history = history
+        self.on_remove = on_remove
+        self._pairs: dict[tuple, WatchedPair] = {}
+        # market_id -> close timestamp in ms, None once looked up without result.
+        self._closes: dict[str, Optional[int]] = {}
+        self._heap: list = []
+        self._seq = 0
+        self.evicted = 0
+
+    def __len__(self):
+        return len(self._pairs)
+
+    def __contains__(self, key: tuple):
+        return key in self._pairs
+
+    def get(self, key: tuple) -> Optional[WatchedPair]:
+        return self._pairs.get(key)
+
+    def _schedule(self, pair: WatchedPair, due: float) -> None:
+        pair.due = due
+        self._seq += 1
+        heapq.heappush(self._heap, (due, self._seq, pair.key))
+
+    def add(self, market_id_1: str, platform_1: PlatformType, market_id_2: str, platform_2: PlatformType, now: Optional[float] = None) -> WatchedPair:
+        """
+        Adds the pair, due at once, or returns it unchanged if it is already watched. Pairs are
+        keyed with the smaller market ID first, as in the database, so either order matches.
+        """
+        if market_id_2 < market_id_1:
+            market_id_1, platform_1, market_id_2, platform_2 = market_id_2, platform_2, market_id_1, platform_1
+        pair = self._pairs.get((market_id_1, market_id_2))
+        if pair is None:
+            pair = WatchedPair(market_id_1, platform_1, market_id_2, platform_2, self.history)
+            self._pairs[pair.key] = pair
+            self._schedule(pair, time.time() if now is None else now)
+        return pair
+
+    def remove(self, key: tuple) -> None:
+        if self._pairs.pop(key, None) is not None and self.on_remove is not None:
+            self.on_remove(key)
+
+    def set_close_timestamps(self, closes: dict) -> None:
+        """Records market_id -> close timestamp, in seconds or milliseconds, or None if unknown."""
+        for market_id, close_timestamp in closes.items():
+            self._closes[market_id] = to_millis(close_timestamp)
+
+    def markets_without_close(self) -> list[str]:
+        """Watched markets whose close timestamp has not been looked up yet."""
+        market_ids = {market_id for pair in self._pairs.values() for market_id in pair.key}
+        return [market_id for market_id in market_ids if market_id not in self._closes]
+
+    def close_of(self, pair: WatchedPair) -> Optional[int]:
+        """The earliest known close timestamp of the pair's markets, in milliseconds."""
+        closes = [self._closes.get(market_id) for market_id in pair.key]
+        closes = [close for close in closes if close is not None]
+        return min(closes) if closes else None
+
+    def _signals(self, pair: WatchedPair, now: float) -> dict:
+        def clamp(value):
+            return min(1.0, max(0.0, value))
+
+        close = self.close_of(pair)
+        return {
+            # An unscreened pair (no gap yet) counts as halfway.
+            "proximity": clamp(1 - max(0, pair.gaps[-1]) / self.gap_scale) if pair.gaps else 0.5,
+            "volatility": clamp(pstdev(pair.gaps) / self.gap_scale) if len(pair.gaps) > 1 else 0.0,
+            "closeness": clamp(1 - (close / 1000 - now) / self.close_horizon_s) if close is not None else 0.0,
+            "hit_rate": pair.hits / pair.checks if pair.checks else 0.0,
+        }
+
+    def priority(self, pair: WatchedPair, now: Optional[float] = None) -> float:
+        """The pair's score between 0 (cold) and 1 (hot)."""
+        cold = 1.0
+        for name, signal in self._signals(pair, time.time() if now is None else now).items():
+            cold *= 1 - self.WEIGHTS[name] * signal
+        return 1 - cold
+
+    def interval(self, pair: WatchedPair, now: Optional[float] = None) -> float:
+        """Seconds until the pair's next check."""
+        return self.max_interval_s * (self.min_interval_s / self.max_interval_s) ** self.priority(pair, now)
+
+    def record(self, key: tuple, gap: Optional[int], hit: bool, now: Optional[float] = None) -> None:
+        """
+        Records a check of the pair and schedules its next one.
+
+        Args:
+            key: The pair's (market_id_1, market_id_2).
+            gap: The top-of-book gap found, or None if its top of book was not known.
+            hit: Whether the check found an opportunity.
+        """
+        pair = self._pairs.get(key)
+        if pair is None:
+            return
+        now = time.time() if now is None else now
+        if gap is not None:
+            pair.gaps.append(gap)
+        pair.checks += 1
+        pair.hits += bool(hit)
+        pair.interval = self.interval(pair, now)
+        self._schedule(pair, now + pair.interval)
+
+    def _expired(self, pair: WatchedPair, now: float) -> bool:
+        close = self.close_of(pair)
+        return close is not None and close <= now * 1000
+
+    def due(self, now: Optional[float] = None, limit: Optional[int] = None) -> list[WatchedPair]:
+        """
+        Pops up to `limit` pairs whose check is due, most overdue first, and evicts pairs that
+        have closed. Each returned pair is provisionally rescheduled one interval ahead, so it is
+        not lost if its check fails before `record` is called.
+        """
+        now = time.time() if now is None else now
+        due = []
+        while self._heap and self._heap[0][0] <= now and (limit is None or len(due) < limit):
+            scheduled, _, key = heapq.heappop(self._heap)
+            pair = self._pairs.get(key)
+            if pair is None or pair.due != scheduled:
+                continue  # removed or rescheduled since
+            if self._expired(pair, now):
+                self.remove(key)
+                self.evicted += 1
+                continue
+            self._schedule(pair, now + (pair.interval or self.min_interval_s))
+            due.append(pair)
+        return due
+
+    def next_due(self) -> Optional[float]:
+        """When the next check is due, as a time.time() value, or None if nothing is watched."""
+        while self._heap:
+            scheduled, _, key = self._heap[0]
+            pair = self._pairs.get(key)
+            if pair is not None and pair.due == scheduled:
+                return scheduled
+            heapq.heappop(self._heap)
+        return None
+
+    def stats(self) -> dict:
+        intervals = sorted(pair.interval for pair in self._pairs.values() if pair.interval is not None)
+        return {
+            "pairs": len(self._pairs),
+            "evicted": self.evicted,
+            "hot": sum(interval <= 5 * self.min_interval_s for interval in intervals),
+            "median_interval_s": intervals[len(intervals) // 2] if intervals else None,
+        }
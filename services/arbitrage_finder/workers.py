@@ -0,0 +1,101 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from feeds.SharedOrderbookStore import SharedOrderbookStore
+from models.Orderbook import Orderbook
+from services.arbitrage_finder.calculator import calculate_many
+import multiprocessing
+import os
+
+# A worker's result for a pair whose book was no longer in the store.
+_MISSING = "missing"
+
+# The store attached in each worker process.
+_store: Optional[SharedOrderbookStore] = None
+
+
+def _attach(name: str) -> None:
+    global _store
+    _store = SharedOrderbookStore.attach(name)
+
+
+def _evaluate(market_pairs: list, settings: dict) -> list:
+    """
+    Scores (market_id_1, market_id_2) pairs on zero-copy views of the shared books. Pairs whose
+    books were rewritten during the pass are scored again on consistent copies.
+    """
+    market_ids = list(dict.fromkeys(market_id for pair in market_pairs for market_id in pair))
+    views, versions = _store.view_order_books(market_ids)
+    books = dict(zip(market_ids, views))
+    present = [i for i, (m1, m2) in enumerate(market_pairs) if books[m1] is not None and books[m2] is not None]
+    results = [_MISSING] * len(market_pairs)
+    for i, result in zip(present, calculate_many([(books[m1], books[m2]) for m1, m2 in (market_pairs[i] for i in present)], **settings)):
+        results[i] = result
+
+    stale = {market_id for market_id, version in zip(market_ids, versions) if version is not None and not _store.unchanged(version)}
+    retried = [i for i in present if stale.intersection(market_pairs[i])]
+    if retried:
+        books.update({market_id: _store.get_order_book(market_id) for market_id in stale})
+        rescored = [i for i in retried if books[market_pairs[i][0]] is not None and books[market_pairs[i][1]] is not None]
+        for i in retried:
+            results[i] = _MISSING
+        for i, result in zip(rescored, calculate_many([(books[m1], books[m2]) for m1, m2 in (market_pairs[i] for i in rescored)], **settings)):
+            results[i] = result
+    return results
+
+
+class SweepPool():
+    """
+    Worker processes that score pairs against books in a SharedOrderbookStore.
+
+    `calculate_many` takes the same arguments as calculator.calculate_many. It writes the books
+    to the shared store, where this process is the only writer, and sends each worker a share of
+    the pairs as market IDs. Workers read the books in place, so adding workers adds neither
+    book memory nor serialization. Pairs whose books cannot be stored, or were evicted before a
+    worker read them, are scored in this process and counted in `scored_locally`.
+
+    Settings come from the environment:
+        ARBITRAGE_WORKERS: worker processes (default: CPU count).
+    """
+
+    def __init__(self, processes: Optional[int] = None, capacity: Optional[int] = None, max_depth: Optional[int] = None):
+        self.processes = processes or int(os.getenv("ARBITRAGE_WORKERS", 0)) or os.cpu_count()
+        self.store = SharedOrderbookStore.create(capacity, max_depth)
+        # Spawned rather than forked: the finder runs feed threads.
+        self._pool = multiprocessing.get_context("spawn").Pool(self.processes, initializer=_attach, initargs=(self.store.name,))
+        self.scored_locally = 0
+
+    def calculate_many(
+        self,
+        pairs: Sequence[Tuple[Orderbook, Orderbook]],
+        profit_threshold: Optional[float] = 0.05,
+        expected_slippage: Optional[float] = 0.01,
+        max_cost: Optional[int] = None,
+    ) -> List[Optional[Dict[str, Any]]]:
+        """Same as calculator.calculate_many, with the pairs scored by the workers."""
+        settings = {"profit_threshold": profit_threshold, "expected_slippage": expected_slippage, "max_cost": max_cost}
+        shared, local = [], []
+        for i, (ob1, ob2) in enumerate(pairs):
+            (shared if self.store.put(ob1) and self.store.put(ob2) else local).append(i)
+
+        results: list = [None] * len(pairs)
+        if shared:
+            chunk_size = -(-len(shared) // self.processes)
+            chunks = [shared[start:start + chunk_size] for start in range(0, len(shared), chunk_size)]
+            tasks = [([(pairs[i][0].market_id, pairs[i][1].market_id) for i in chunk], settings) for chunk in chunks]
+            for chunk, chunk_results in zip(chunks, self._pool.starmap(_evaluate, tasks)):
+                for i, result in zip(chunk, chunk_results):
+                    if result == _MISSING:
+                        local.append(i)
+                    else:
+                        results[i] = result
+        if local:
+            print(f"Scoring {len(local)} of {len(pairs)} pairs in-process: their books are not in the shared store.")
+            self.scored_locally += len(local)
+            for i, result in zip(local, calculate_many([pairs[i] for i in local], **settings)):
+                results[i] = result
+        return results
+
+    def close(self) -> None:
+        self._pool.close()
+        self._pool.join()
+        self.store.close()
+        self.store.unlink()
@@ -1,11 +1,16 @@
 import time
 import os
 import signal
+import asyncio
+import concurrent.futures
 from platforms.KalshiPlatform import KalshiPlatform
 from platforms.PolyMarketPlatform import PolyMarketPlatform
 from platforms.TestPlatform import TestPlatform
+from platforms.BasePlatform import run_sync
+from platforms.RateLimiter import rate_limiter_stats
 from db.DBManager import DBManager
 from cache.RedisManager import RedisManager
+from cache.MarketDeduplicator import MarketDeduplicator
 
 class MarketPollingService:
     def __init__(self):
@@ -16,7 +21,28 @@ class MarketPollingService:
             PolyMarketPlatform(),
             TestPlatform()
         ]
+        # Keeps local market catalogs (Polymarket) fresh without blocking polling.
+        catalog_sync_interval = int(os.getenv("CATALOG_SYNC_INTERVAL_S", 300))
+        for platform in self.platforms:
+            catalog = getattr(platform, "catalog", None)
+            if catalog is not None:
+                catalog.start_background_sync(catalog_sync_interval)
+        # Discovery runs on the shared event loop and lookups on blocking clients; open both
+        # kinds of pooled connection before the first cycle.
+        for platform in self.platforms:
+            platform.warm_connections()
+            run_sync(platform.awarm_connections())
         self.stream_name = "market_events_stream"
+        self.deduplicator = MarketDeduplicator(
+            self.redis_manager.redis_client,
+            ttl_s=int(os.getenv("SEEN_MARKET_TTL_S", 7 * 24 * 3600))
+        )
+        # Unchanged markets suppressed by each platform's latest cycle.
+        self.suppressed: dict[str, int] = {}
+        self.suppressed_last_cycle = 0
+        # One worker per platform so a slow venue never waits for a free thread.
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=len(self.platforms), thread_name_prefix="market-poller")
+        self.in_flight: dict[str, concurrent.futures.Future] = {}
         self.shutdown_requested = False
         signal.signal(signal.SIGINT, self.request_shutdown)
         signal.signal(signal.SIGTERM, self.request_shutdown)
@@ -26,56 +52,140 @@ class MarketPollingService:
         print(f"Shutdown requested by signal {signum}. Finishing current cycle...")
         self.shutdown_requested = True
 
-    def poll_markets(self):
+    def _platform_name(self, platform) -> str:
+        return platform.PLATFORM.value if getattr(platform, "PLATFORM", None) is not None else type(platform).__name__
+
+    def _platform_setting(self, platform, name: str, default: float) -> float:
+        """Per-platform override such as POLLING_INTERVAL_S_KALSHI, falling back to POLLING_INTERVAL_S."""
+        value = os.getenv(f"{name}_{self._platform_name(platform)}", os.getenv(name))
+        return float(value) if value else default
+
+    def _publish(self, found: list) -> tuple[int, int]:
+        """Publishes the new or changed markets of a batch. Returns (streamed, suppressed)."""
+        markets = self.deduplicator.filter_new(found)
+        message_ids = []
+        if markets:
+            message_ids = self.redis_manager.add_many_to_stream(self.stream_name, [{
+                "market_id": market.market_id,
+                "platform": market.platform.value,
+                "name": market.name,
+                "rules": market.rules
+            } for market in markets])
+        # Markets whose XADD failed stay unseen, so the next cycle publishes them again.
+        published = [market for market, message_id in zip(markets, message_ids) if message_id is not None]
+        self.deduplicator.mark_seen(published)
+        return len(published), len(found) - len(markets)
+
+    async def _stream_platform(self, platform, num_markets: int, stats: dict) -> None:
+        batch_size = int(os.getenv("POLL_PUBLISH_BATCH_SIZE", 100))
+        batch = []
+
+        async def flush():
+            found = await asyncio.to_thread(platform.get_markets, batch)
+            streamed, suppressed = await asyncio.to_thread(self._publish, found)
+            stats["found"] += len(found)
+            stats["streamed"] += streamed
+            stats["suppressed"] += suppressed
+            batch.clear()
+
+        # Markets are looked up and published a batch at a time while discovery keeps paging.
+        async for market_id in platform.iter_new_markets(num_markets):
+            batch.append(market_id)
+            if len(batch) >= batch_size:
+                await flush()
+        if batch:
+            await flush()
+
+    def poll_platform(self, platform) -> dict:
         """
-        Polls for markets from all platforms and adds them to a Redis Stream.
+        One discovery cycle for one platform, publishing results as they arrive. A cycle that
+        exceeds the platform's POLL_TIMEOUT_S is cancelled, keeping what it published so far.
+        Never raises; failures are reported in the returned stats.
+        """
+        num_markets = int(self._platform_setting(platform, "POLL_NUM_MARKETS", 100))
+        timeout = self._platform_setting(platform, "POLL_TIMEOUT_S", 300)
+        stats = {"platform": self._platform_name(platform), "found": 0, "streamed": 0, "suppressed": 0, "error": None}
+        start = time.perf_counter()
+        try:
+            # On the persistent loop, so pooled async connections carry over between cycles.
+            run_sync(asyncio.wait_for(self._stream_platform(platform, num_markets, stats), timeout))
+        except asyncio.TimeoutError:
+            stats["error"] = "timeout"
+        except Exception as e:
+            stats["error"] = str(e)
+        stats["seconds"] = time.perf_counter() - start
+        self.suppressed[stats["platform"]] = stats["suppressed"]
+        self.suppressed_last_cycle = sum(self.suppressed.values())
+        self._report(stats)
+        self._report_rate_limits(platform)
+        return stats
+
+    def _report(self, stats: dict) -> None:
+        if stats["error"] == "timeout":
+            print(f"Polling {stats['platform']} timed out after {stats['seconds']:.2f}s and was cancelled; streamed {stats['streamed']} markets first.")
+        elif stats["error"] is not None:
+            print(f"Error polling from {stats['platform']} after {stats['seconds']:.2f}s: {stats['error']}")
+        else:
+            print(
+                f"Found {stats['found']} markets on {stats['platform']} in {stats['seconds']:.2f}s: "
+                f"streamed {stats['streamed']}, suppressed {stats['suppressed']} already seen"
+            )
+
+    def _report_rate_limits(self, platform) -> None:
+        for endpoint_class, limits in rate_limiter_stats(getattr(platform, "PLATFORM", None)).items():
+            print(
+                f"{self._platform_name(platform)} {endpoint_class}: {limits['acquired']} requests at "
+                f"{limits['rate']:.1f}/{limits['max_rate']:.1f} req/s, {limits['throttled']} rate limited, queue wait "
+                f"avg {limits['wait_avg_ms']:.0f}ms p95 {limits['wait_p95_ms']:.0f}ms max {limits['wait_max_ms']:.0f}ms"
+            )
+
+    def poll_markets(self) -> dict:
+        """
+        Polls all platforms concurrently and adds the new or changed markets to a Redis Stream
+        as each platform produces them. Markets already published with the same content are
+        suppressed. A platform that exceeds its POLL_TIMEOUT_S is cancelled and reported,
+        without holding up the others.
+
+        Returns:
+            Per-platform stats: found/streamed/suppressed counts, seconds and error.
         """
         print("Polling for new markets...")
-        for platform in self.platforms:
-            try:
-                market_ids = platform.find_new_markets(100)
-                markets = platform.get_markets(market_ids)
-                for market in markets:
-                    market_data = {
-                        "market_id": market.market_id,
-                        "platform": market.platform.value,
-                        "name": market.name,
-                        "rules": market.rules
-                    }
-                    self.redis_manager.add_to_stream(self.stream_name, market_data)
-                platform_name = "Unknown"
-                if hasattr(platform, 'PLATFORM'):
-                    platform_name = platform.PLATFORM.value
-                elif isinstance(platform, KalshiPlatform):
-                    platform_name = "Kalshi"
-                elif isinstance(platform, PolyMarketPlatform):
-                    platform_name = "PolyMarket"
-                elif isinstance(platform, TestPlatform):
-                    platform_name = "Test"
-                print(f"Found and streamed {len(markets)} markets on {platform_name}")
-            except Exception as e:
-                platform_name = "Unknown"
-                if hasattr(platform, 'PLATFORM'):
-                    platform_name = platform.PLATFORM.value
-                elif isinstance(platform, KalshiPlatform):
-                    platform_name = "Kalshi"
-                elif isinstance(platform, PolyMarketPlatform):
-                    platform_name = "PolyMarket"
-                elif isinstance(platform, TestPlatform):
-                    platform_name = "Test"
-                print(f"Error polling from {platform_name}: {e}")
+        futures = {self._platform_name(platform): self._submit(platform) for platform in self.platforms}
+        # poll_platform enforces each platform's timeout, so every future completes.
+        results = {name: future.result() for name, future in futures.items()}
+        print(f"Suppressed {self.suppressed_last_cycle} unchanged markets this cycle.")
+        return results
+
+    def _submit(self, platform) -> concurrent.futures.Future:
+        """Starts a cycle for the platform unless its previous one is still running."""
+        name = self._platform_name(platform)
+        running = self.in_flight.get(name)
+        if running is not None and not running.done():
+            return running
+        future = self.executor.submit(self.poll_platform, platform)
+        self.in_flight[name] = future
+        return future
 
     def run(self):
         """
-        Runs the polling service indefinitely.
+        Runs the polling service indefinitely. Each platform is polled on its own cadence
+        (POLLING_INTERVAL_S, overridable per platform as POLLING_INTERVAL_S_<PLATFORM>), so a
+        slow venue never delays the others.
         """
-        polling_interval = int(os.getenv("POLLING_INTERVAL_S", 60))
-        print(f"Starting Market Polling Service with a {polling_interval} second interval...")
+        next_due = {self._platform_name(platform): 0.0 for platform in self.platforms}
+        print(f"Starting Market Polling Service for {', '.join(next_due)}...")
         while not self.shutdown_requested:
-            self.poll_markets()
+            now = time.monotonic()
+            for platform in self.platforms:
+                name = self._platform_name(platform)
+                running = self.in_flight.get(name)
+                if now >= next_due[name] and (running is None or running.done()):
+                    self._submit(platform)
+                    next_due[name] = now + self._platform_setting(platform, "POLLING_INTERVAL_S", 60)
             # The sleep is interruptible by signals, so we check the flag again.
             if not self.shutdown_requested:
-                time.sleep(polling_interval)
+                time.sleep(max(0.0, min(1.0, min(next_due.values()) - time.monotonic())))
+        self.executor.shutdown(wait=False, cancel_futures=True)
         print("Market Polling Service shut down gracefully.")
 
 if __name__ == '__main__':
@@ -1,4 +1,3 @@
-import time
 import socket
 import os
 import instructor
@@ -8,6 +7,7 @@ from pydantic import BaseModel
 from typing import List
 
 from cache.RedisManager import RedisManager
+from cache.StreamConsumer import StreamConsumer
 from db.DBManager import DBManager
 from models.Market import Market
 from models.PlatformType import PlatformType
@@ -30,6 +30,9 @@ class MarketSimilarityService:
         self.consumer_name = f"similarity-consumer-{socket.gethostname()}"
 
         self.redis_manager.create_consumer_group(self.input_stream_name, self.group_name)
+        self.consumer = StreamConsumer(
+            self.redis_manager, self.input_stream_name, self.group_name, self.consumer_name, self.handle_market_events
+        )
         self.client = instructor.patch(OpenAI())
         self.shutdown_requested = False
         signal.signal(signal.SIGINT, self.request_shutdown)
@@ -37,7 +40,7 @@ class MarketSimilarityService:
 
     def request_shutdown(self, signum, frame):
         """Gracefully handle shutdown requests."""
-        print(f"Shutdown requested by signal {signum}. Finishing current cycle...")
+        print(f"Shutdown requested by signal {signum}. Finishing current batch...")
         self.shutdown_requested = True
 
     def _check_gpt_similarity(self, market1: Market, market2: Market) -> bool:
@@ -62,14 +65,23 @@ class MarketSimilarityService:
     def process_market_events(self):
         """
         Processes market events from the Redis Stream.
+        Reads a single batch without waiting; `run` consumes the stream continuously instead.
         """
         print(f"Checking for new market events as consumer '{self.consumer_name}'...")
-        messages = self.redis_manager.read_from_stream(self.input_stream_name, self.group_name, self.consumer_name)
+        messages = self.redis_manager.read_from_stream(
+            self.input_stream_name, self.group_name, self.consumer_name, count=self.consumer.batch_size
+        )
         
         if not messages:
             print("No new market events.")
             return
+        self.handle_market_events(messages)
 
+    def handle_market_events(self, messages: list):
+        """
+        Handles a batch of (message_id, message_data) pairs read from the input stream.
+        """
+        processed = []
         for message_id, message_data in messages:
             print(f"Processing message {message_id}: {message_data}")
             try:
@@ -84,7 +96,7 @@ class MarketSimilarityService:
                 candidate_market_ids = self.similarity_db_manager.find_similar_markets(market)
                 
                 if not candidate_market_ids:
-                    self.redis_manager.acknowledge_message(self.input_stream_name, self.group_name, message_id)
+                    processed.append(message_id)
                     continue
 
                 candidate_markets = self.db_manager.get_markets(candidate_market_ids)
@@ -115,33 +127,29 @@ class MarketSimilarityService:
                         db_pairs = [(p[0][0], p[1][0]) for p in unique_pairings]
                         self.db_manager.add_market_pairs(db_pairs)
 
-                        for market1_info, market2_info in unique_pairings:
-                            pair_message = {
-                                "market_id_1": market1_info[0],
-                                "platform_1": market1_info[1],
-                                "market_id_2": market2_info[0],
-                                "platform_2": market2_info[1]
-                            }
-                            self.redis_manager.add_to_stream(self.output_stream_name, pair_message)
+                        self.redis_manager.add_many_to_stream(self.output_stream_name, [{
+                            "market_id_1": market1_info[0],
+                            "platform_1": market1_info[1],
+                            "market_id_2": market2_info[0],
+                            "platform_2": market2_info[1]
+                        } for market1_info, market2_info in unique_pairings])
                         print(f"Published {len(unique_pairings)} new market pairs.")
 
-                self.redis_manager.acknowledge_message(self.input_stream_name, self.group_name, message_id)
-                print(f"Successfully processed and acknowledged message {message_id}.")
+                processed.append(message_id)
+                print(f"Successfully processed message {message_id}.")
 
             except Exception as e:
                 print(f"Error processing message {message_id}: {e}")
                 # We do not acknowledge the message, so it can be re-processed.
 
+        self.redis_manager.acknowledge_messages(self.input_stream_name, self.group_name, processed)
+
     def run(self):
         """
         Runs the similarity service indefinitely.
         """
-        polling_interval = int(os.getenv("SIMILARITY_POLLING_INTERVAL_S", 10))
-        print(f"Starting Market Similarity Service with a {polling_interval} second interval...")
-        while not self.shutdown_requested:
-            self.process_market_events()
-            if not self.shutdown_requested:
-                time.sleep(polling_interval)
+        print(f"Starting Market Similarity Service as consumer '{self.consumer_name}'...")
+        self.consumer.run(lambda: self.shutdown_requested)
         print("Market Similarity Service shut down gracefully.")
 
 if __name__ == '__main__':
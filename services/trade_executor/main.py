@@ -1,14 +1,19 @@
-import time
+import asyncio
 import socket
 import json
 import os
 import signal
 from cache.RedisManager import RedisManager
+from cache.AsyncRedisManager import AsyncRedisManager
+from cache.OrderbookSnapshotCache import get_orderbook_cache
+from cache.StreamConsumer import AsyncStreamConsumer, StreamConsumer
 from db.DBManager import DBManager
 from models.PlatformType import PlatformType
 from platforms.KalshiPlatform import KalshiPlatform
 from platforms.PolyMarketPlatform import PolyMarketPlatform
-from services.trade_executor.strategies.arbitrage_strategy import create_arbitrage_orders
+from platforms.HttpTransport import get_transport
+from services.arbitrage_finder.calculator import calculate_cross_platform_arbitrage
+from services.trade_executor.strategies.arbitrage_strategy import acreate_arbitrage_orders, create_arbitrage_orders
 
 class TradeExecutionService:
     def __init__(self):
@@ -18,57 +23,118 @@ class TradeExecutionService:
             PlatformType.KALSHI: KalshiPlatform(),
             PlatformType.POLYMARKET: PolyMarketPlatform(),
         }
+        # Opportunities are re-checked on books no older than this before trading, taken from the
+        # snapshot cache the finder writes to, so usually without another venue request.
+        self.snapshots = get_orderbook_cache()
+        self.book_max_age_ms = int(os.getenv("EXECUTION_BOOK_MAX_AGE_MS", 500))
 
         self.input_stream_name = "arbitrage_opportunities_stream"
         self.group_name = "trade_execution_group"
         self.consumer_name = f"trade-executor-{socket.gethostname()}"
         
         self.redis_manager.create_consumer_group(self.input_stream_name, self.group_name)
+        # A failed opportunity may already have placed one leg, so it is never retried
+        # automatically: once reclaimed it goes straight to the dead-letter stream for review.
+        self.consumer = StreamConsumer(
+            self.redis_manager, self.input_stream_name, self.group_name, self.consumer_name, self.handle_arbitrage_opportunities,
+            max_deliveries=1,
+        )
         self.shutdown_requested = False
         signal.signal(signal.SIGINT, self.request_shutdown)
         signal.signal(signal.SIGTERM, self.request_shutdown)
 
     def request_shutdown(self, signum, frame):
         """Gracefully handle shutdown requests."""
-        print(f"Shutdown requested by signal {signum}. Finishing current cycle...")
+        print(f"Shutdown requested by signal {signum}. Finishing current batch...")
         self.shutdown_requested = True
 
     def process_arbitrage_opportunities(self):
         """
         Processes arbitrage opportunities from the Redis Stream and executes trades.
+        Reads a single batch without waiting; `run` consumes the stream continuously instead.
         """
         print(f"Checking for new arbitrage opportunities as consumer '{self.consumer_name}'...")
-        messages = self.redis_manager.read_from_stream(self.input_stream_name, self.group_name, self.consumer_name)
+        messages = self.redis_manager.read_from_stream(
+            self.input_stream_name, self.group_name, self.consumer_name, count=self.consumer.batch_size
+        )
         
         if not messages:
             print("No new arbitrage opportunities.")
             return
+        self.handle_arbitrage_opportunities(messages)
 
+    def _prepare_trade(self, message_data: dict):
+        """
+        Returns (market1, market2, platform1_client, platform2_client, opportunity) for an
+        opportunity message, or None if any of them is unavailable.
+        """
+        market_id_1 = message_data['market_id_1']
+        platform_1 = PlatformType(message_data['platform_1'])
+        market_id_2 = message_data['market_id_2']
+        platform_2 = PlatformType(message_data['platform_2'])
+        
+        opportunity = json.loads(message_data['opportunity'].replace("'", "\""))
+
+        market1 = self.db_manager.get_markets([market_id_1])[0]
+        market2 = self.db_manager.get_markets([market_id_2])[0]
+        
+        platform1_client = self.platforms.get(platform_1)
+        platform2_client = self.platforms.get(platform_2)
+
+        if not all([market1, market2, platform1_client, platform2_client]):
+            print("Could not retrieve all necessary market or platform data. Skipping opportunity.")
+            return None
+        return market1, market2, platform1_client, platform2_client, opportunity
+
+    def _revalidate(self, trade: tuple, orderbooks: list):
+        """
+        Returns the trade with its opportunity recalculated on the current books, or None if the
+        opportunity is gone. If either book cannot be had, the published opportunity is kept.
+        """
+        market1, market2, platform1_client, platform2_client, opportunity = trade
+        if len(orderbooks) < 2:
+            print("Could not get current order books. Executing the opportunity as published.")
+            return trade
+        max_cost_str = os.getenv("MAX_TRADE_COST")
+        current = calculate_cross_platform_arbitrage(
+            *orderbooks,
+            profit_threshold=float(os.getenv("PROFIT_THRESHOLD", 0.05)),
+            expected_slippage=float(os.getenv("EXPECTED_SLIPPAGE", 0.01)),
+            max_cost=int(max_cost_str) if max_cost_str else None,
+        )
+        if current is None or current["type"] != opportunity["type"]:
+            print(f"Opportunity no longer available on current order books. Skipping: {opportunity}")
+            return None
+        return market1, market2, platform1_client, platform2_client, current
+
+    def _current_books(self, trade: tuple) -> list:
+        market1, market2, platform1_client, platform2_client, _ = trade
+        orderbooks = []
+        for market, client in ((market1, platform1_client), (market2, platform2_client)):
+            orderbooks += self.snapshots.get_many(market.platform, [market.market_id], client.get_order_books, self.book_max_age_ms)
+        return orderbooks
+
+    async def _acurrent_books(self, trade: tuple) -> list:
+        market1, market2, platform1_client, platform2_client, _ = trade
+        books1, books2 = await asyncio.gather(
+            self.snapshots.aget_many(market1.platform, [market1.market_id], platform1_client.aget_order_books, self.book_max_age_ms),
+            self.snapshots.aget_many(market2.platform, [market2.market_id], platform2_client.aget_order_books, self.book_max_age_ms),
+        )
+        return books1 + books2
+
+    def handle_arbitrage_opportunities(self, messages: list):
+        """
+        Handles a batch of (message_id, message_data) pairs read from the input stream.
+        """
         for message_id, message_data in messages:
             print(f"Processing message {message_id}: {message_data}")
             try:
-                market_id_1 = message_data['market_id_1']
-                platform_1 = PlatformType(message_data['platform_1'])
-                market_id_2 = message_data['market_id_2']
-                platform_2 = PlatformType(message_data['platform_2'])
-                
-                opportunity = json.loads(message_data['opportunity'].replace("'", "\""))
-
-                market1 = self.db_manager.get_markets([market_id_1])[0]
-                market2 = self.db_manager.get_markets([market_id_2])[0]
-                
-                platform1_client = self.platforms.get(platform_1)
-                platform2_client = self.platforms.get(platform_2)
-
-                if not all([market1, market2, platform1_client, platform2_client]):
-                    print("Could not retrieve all necessary market or platform data. Skipping opportunity.")
-                    self.redis_manager.acknowledge_message(self.input_stream_name, self.group_name, message_id)
-                    continue
-
-                print(f"Executing arbitrage trade for opportunity: {opportunity}")
-                create_arbitrage_orders(
-                    market1, market2, platform1_client, platform2_client, opportunity, self.db_manager
-                )
+                trade = self._prepare_trade(message_data)
+                if trade is not None:
+                    trade = self._revalidate(trade, self._current_books(trade))
+                if trade is not None:
+                    print(f"Executing arbitrage trade for opportunity: {trade[4]}")
+                    create_arbitrage_orders(*trade, self.db_manager)
                 
                 self.redis_manager.acknowledge_message(self.input_stream_name, self.group_name, message_id)
                 print(f"Successfully processed and acknowledged message {message_id}.")
@@ -76,16 +142,50 @@ class TradeExecutionService:
             except Exception as e:
                 print(f"Error processing message {message_id}: {e}")
 
+    async def ahandle_arbitrage_opportunities(self, messages: list):
+        """
+        Async version of handle_arbitrage_opportunities used by `run`. Opportunities are still
+        executed one after another, so two trades never compete for the same balance, but the
+        legs of each trade go out concurrently.
+        """
+        for message_id, message_data in messages:
+            print(f"Processing message {message_id}: {message_data}")
+            try:
+                trade = self._prepare_trade(message_data)
+                if trade is not None:
+                    trade = self._revalidate(trade, await self._acurrent_books(trade))
+                if trade is not None:
+                    print(f"Executing arbitrage trade for opportunity: {trade[4]}")
+                    await acreate_arbitrage_orders(*trade, self.db_manager)
+
+                await self.async_redis_manager.acknowledge_message(self.input_stream_name, self.group_name, message_id)
+                print(f"Successfully processed and acknowledged message {message_id}.")
+
+            except Exception as e:
+                print(f"Error processing message {message_id}: {e}")
+
+    async def arun(self):
+        """
+        Consumes opportunities on the current event loop until shutdown is requested.
+        """
+        self.async_redis_manager = AsyncRedisManager()
+        consumer = AsyncStreamConsumer(
+            self.async_redis_manager, self.input_stream_name, self.group_name, self.consumer_name, self.ahandle_arbitrage_opportunities,
+            batch_size=self.consumer.batch_size, block_ms=self.consumer.block_ms, max_deliveries=self.consumer.max_deliveries,
+        )
+        await asyncio.gather(*(platform.awarm_connections() for platform in self.platforms.values()))
+        try:
+            await consumer.run(lambda: self.shutdown_requested)
+        finally:
+            await self.async_redis_manager.close()
+            await get_transport().aclose()
+
     def run(self):
         """
-        Runs the trade execution service indefinitely.
+        Runs the trade execution service indefinitely on one event loop.
         """
-        polling_interval = int(os.getenv("TRADE_POLLING_INTERVAL_S", 10))
-        print(f"Starting Trade Execution Service with a {polling_interval} second interval...")
-        while not self.shutdown_requested:
-            self.process_arbitrage_opportunities()
-            if not self.shutdown_requested:
-                time.sleep(polling_interval)
+        print(f"Starting Trade Execution Service as consumer '{self.consumer_name}'...")
+        asyncio.run(self.arun())
         print("Trade Execution Service shut down gracefully.")
 
 if __name__ == '__main__':
@@ -1,9 +1,10 @@
+import asyncio
 import time
 import os
 from models.Market import Market
 from models.Order import Order
 from models.OrderStatus import OrderStatus
-from platforms.BasePlatform import BasePlatform
+from platforms.BasePlatform import BasePlatform, run_sync
 from db.DBManager import DBManager
 
 POLLING_TIMEOUT_S = 30  # Max time to wait for a chunk to fill
@@ -19,6 +20,23 @@ def create_arbitrage_orders(
     """
     Executes an arbitrage opportunity by breaking it into chunks and ensuring
     each chunk is filled before proceeding to the next.
+    Blocking wrapper around acreate_arbitrage_orders.
+    """
+    run_sync(acreate_arbitrage_orders(market1, market2, platform1, platform2, opportunity, db_manager))
+
+async def acreate_arbitrage_orders(
+    market1: Market,
+    market2: Market,
+    platform1: BasePlatform,
+    platform2: BasePlatform,
+    opportunity: dict,
+    db_manager: DBManager,
+) -> None:
+    """
+    Executes an arbitrage opportunity by breaking it into chunks and ensuring
+    each chunk is filled before proceeding to the next. Both legs of a chunk are
+    placed, polled and cancelled concurrently, so the second leg is not delayed
+    by the first venue's round trip.
     """
     total_shares = opportunity["shares"]
     shares_executed = 0
@@ -28,12 +46,6 @@ def create_arbitrage_orders(
         f"{market2.platform.value}/{market2.market_id}."
     )
 
-    max_price_1 = round(opportunity["max_price_1"] / 10)
-    max_price_1 = max(1, min(max_price_1, 99))
-    
-    max_price_2 = round(opportunity["max_price_2"] / 10)
-    max_price_2 = max(1, min(max_price_2, 99))
-
     order_chunk_size = max(1, total_shares // 10)
 
     while shares_executed < total_shares:
@@ -48,26 +60,28 @@ def create_arbitrage_orders(
             print(f"Invalid opportunity type: {opportunity['type']}. Aborting.")
             return
 
+        max_price_1, max_price_2 = _chunk_max_prices(opportunity, shares_executed + chunk_size)
         order1 = Order.create_market_buy_order(market1.market_id, market1.platform, side1, chunk_size, max_price_1)
         order2 = Order.create_market_buy_order(market2.market_id, market2.platform, side2, chunk_size, max_price_2)
         
         order1.id = db_manager.add_order(order1)
         order2.id = db_manager.add_order(order2)
 
-        platform1.place_order(order1)
-        platform2.place_order(order2)
+        await asyncio.gather(platform1.aplace_order(order1), platform2.aplace_order(order2))
 
         if order1.status == OrderStatus.FAILED or order2.status == OrderStatus.FAILED:
             print("One or both orders failed immediately on placement. Aborting arbitrage.")
+            cancels = []
             if order1.status != OrderStatus.FAILED and order1.order_id:
-                platform1.cancel_order(order1)
+                cancels.append(platform1.acancel_order(order1))
             if order2.status != OrderStatus.FAILED and order2.order_id:
-                platform2.cancel_order(order2)
+                cancels.append(platform2.acancel_order(order2))
+            await asyncio.gather(*cancels)
             return
 
         print(f"Chunk orders placed. O1: {order1.order_id}, O2: {order2.order_id}. Awaiting execution...")
 
-        if not _wait_for_execution(platform1, order1, platform2, order2, db_manager):
+        if not await _wait_for_execution(platform1, order1, platform2, order2, db_manager):
             print("Failed to confirm chunk execution. Halting arbitrage.")
             return
 
@@ -75,45 +89,61 @@ def create_arbitrage_orders(
 
     print(f"Successfully executed all {total_shares} shares for the arbitrage opportunity.")
 
-def _wait_for_execution(p1: BasePlatform, o1: Order, p2: BasePlatform, o2: Order, db_manager: DBManager) -> bool:
-    """Polls two orders until they are both executed or a timeout is reached."""
+def _chunk_max_prices(opportunity: dict, chunk_end: int) -> tuple[int, int]:
+    """
+    Max prices in cents for the orders on market1 and market2 of a chunk ending at share `chunk_end`.
+
+    The opportunity's marginal-profit ladder gives the price level each share is bought at, so early
+    chunks are capped at the level they actually consume instead of the deepest level of the trade.
+    """
+    yes_price, no_price = opportunity["max_price_1"], opportunity["max_price_2"]
+    for shares, price_1, price_2, _ in opportunity.get("ladder") or []:
+        if shares >= chunk_end:
+            yes_price, no_price = price_1, price_2
+            break
+
+    # price_1 is always the yes leg; market1 holds the yes leg only for yes1_no2.
+    price_market1, price_market2 = (yes_price, no_price) if opportunity["type"] == "yes1_no2" else (no_price, yes_price)
+    return max(1, min(round(price_market1 / 10), 99)), max(1, min(round(price_market2 / 10), 99))
+
+async def _wait_for_execution(p1: BasePlatform, o1: Order, p2: BasePlatform, o2: Order, db_manager: DBManager) -> bool:
+    """Polls two orders, both at once, until they are both executed or a timeout is reached."""
     polling_timeout = int(os.getenv("POLLING_TIMEOUT_S", 30))
     start_time = time.time()
-    o1_filled = False
-    o2_filled = False
+    filled = {1: False, 2: False}
 
-    while time.time() - start_time < polling_timeout:
-        if not o1_filled:
-            new_trades1 = p1.get_order_status(o1)
-            db_manager.update_order(o1)
-            if new_trades1:
-                db_manager.add_trades(new_trades1)
-
-            if o1.status == OrderStatus.EXECUTED:
-                o1_filled = True
-                print(f"Order 1 ({o1.order_id}) confirmed EXECUTED.")
-        
-        if not o2_filled:
-            new_trades2 = p2.get_order_status(o2)
-            db_manager.update_order(o2)
-            if new_trades2:
-                db_manager.add_trades(new_trades2)
+    async def poll(n: int, platform: BasePlatform, order: Order):
+        new_trades = await platform.aget_order_status(order)
+        db_manager.update_order(order)
+        if new_trades:
+            db_manager.add_trades(new_trades)
+
+        if order.status == OrderStatus.EXECUTED:
+            filled[n] = True
+            print(f"Order {n} ({order.order_id}) confirmed EXECUTED.")
 
-            if o2.status == OrderStatus.EXECUTED:
-                o2_filled = True
-                print(f"Order 2 ({o2.order_id}) confirmed EXECUTED.")
+    async def cancel_open():
+        cancels = []
+        if o1.status == OrderStatus.OPEN: cancels.append(p1.acancel_order(o1))
+        if o2.status == OrderStatus.OPEN: cancels.append(p2.acancel_order(o2))
+        await asyncio.gather(*cancels)
+
+    while time.time() - start_time < polling_timeout:
+        await asyncio.gather(*[
+            poll(n, platform, order)
+            for n, platform, order in ((1, p1, o1), (2, p2, o2))
+            if not filled[n]
+        ])
 
-        if o1_filled and o2_filled:
+        if filled[1] and filled[2]:
             return True
         
         if o1.status in [OrderStatus.CANCELED, OrderStatus.FAILED] or \
            o2.status in [OrderStatus.CANCELED, OrderStatus.FAILED]:
             print(f"Order failed during execution poll. O1:{o1.status.value}, O2:{o2.status.value}.")
-            if o1.status == OrderStatus.OPEN: p1.cancel_order(o1)
-            if o2.status == OrderStatus.OPEN: p2.cancel_order(o2)
+            await cancel_open()
             return False
             
     print(f"Polling timed out after {polling_timeout}s. O1:{o1.status.value}, O2:{o2.status.value}.")
-    if o1.status == OrderStatus.OPEN: p1.cancel_order(o1)
-    if o2.status == OrderStatus.OPEN: p2.cancel_order(o2)
-    return False 
\ No newline at end of file
+    await cancel_open()
+    return False
@@ -13,6 +13,8 @@ class TradeReconciliationService:
             PlatformType.KALSHI: KalshiPlatform(),
             PlatformType.POLYMARKET: PolyMarketPlatform(),
         }
+        for platform in self.platforms.values():
+            platform.warm_connections()
         self.shutdown_requested = False
         signal.signal(signal.SIGINT, self.request_shutdown)
         signal.signal(signal.SIGTERM, self.request_shutdown)
@@ -1,6 +1,9 @@
 import unittest
+import math
+import random
 from models.Orderbook import Orderbook
-from services.arbitrage_finder.calculator import calculate_cross_platform_arbitrage
+from models.TopOfBook import TopOfBook
+from services.arbitrage_finder.calculator import calculate_cross_platform_arbitrage, calculate_many, top_of_book_gap
 
 class TestArbitrageCalculator(unittest.TestCase):
 
@@ -54,5 +57,106 @@ class TestArbitrageCalculator(unittest.TestCase):
         # Assert
         self.assertIsNone(opportunity)
 
+    def test_calculate_many_matches_single_pair(self):
+        """
+        Test that the batched calculator returns exactly what the single-pair calculator returns.
+        """
+        # Arrange
+        rng = random.Random(7)
+
+        def random_book(market_id, depth):
+            def ladder():
+                prices = sorted(rng.randint(1, 999) for _ in range(rng.randint(0, depth)))
+                return [[price, rng.randint(0, 500)] for price in prices]
+            return Orderbook(market_id=market_id, timestamp=0, yes={"bid": [], "ask": ladder()}, no={"bid": [], "ask": ladder()})
+
+        pairs = [(random_book(f"a{i}", 12), random_book(f"b{i}", 12)) for i in range(300)]
+        pairs += [(random_book(f"c{i}", 100), random_book(f"d{i}", 100)) for i in range(20)]
+
+        for kwargs in ({}, {"max_cost": 50000}, {"profit_threshold": 0.0, "expected_slippage": 0.0}):
+            # Act
+            batched = calculate_many(pairs, chunk_size=64, **kwargs)
+
+            # Assert
+            expected = [calculate_cross_platform_arbitrage(ob1, ob2, **kwargs) for ob1, ob2 in pairs]
+            self.assertEqual(batched, expected)
+            self.assertTrue(any(expected), "Fixture should contain at least one opportunity.")
+
+    def test_top_of_book_screen_agrees_with_full_calculation(self):
+        """
+        Test that a pair's top-of-book gap clears the threshold exactly when the full books hold
+        an opportunity, and that allowing a margin only lets more pairs through.
+        """
+        # Arrange
+        rng = random.Random(11)
+
+        def random_book(market_id):
+            def ladder():
+                prices = sorted(rng.randint(300, 700) for _ in range(rng.randint(0, 5)))
+                return [[price, rng.randint(1, 500)] for price in prices]
+            return Orderbook(market_id=market_id, timestamp=0, yes={"bid": [], "ask": ladder()}, no={"bid": [], "ask": ladder()})
+
+        pairs = [(random_book(f"a{i}"), random_book(f"b{i}")) for i in range(500)]
+
+        # Act
+        gaps = [top_of_book_gap(TopOfBook.from_orderbook(ob1), TopOfBook.from_orderbook(ob2)) for ob1, ob2 in pairs]
+        screened = [gap is not None and gap <= 0 for gap in gaps]
+        with_margin = [gap is not None and gap <= 20 for gap in gaps]
+
+        # Assert
+        expected = [calculate_cross_platform_arbitrage(ob1, ob2) is not None for ob1, ob2 in pairs]
+        self.assertEqual(screened, expected)
+        self.assertTrue(any(expected) and not all(expected), "Fixture should contain pairs on both sides of the bound.")
+        self.assertGreater(sum(with_margin), sum(screened))
+        self.assertTrue(all(wide for wide, exact in zip(with_margin, screened) if exact))
+        self.assertIsNone(top_of_book_gap(TopOfBook("a", yes_ask=100), TopOfBook("b")))
+
+    def test_breakpoint_walk_finds_largest_profitable_size(self):
+        """
+        Test that the walk returns the largest size whose every share is affordable and profitable, with its ladder.
+        """
+        # Arrange
+        orderbook1 = Orderbook(
+            market_id="1",
+            timestamp=123456789,
+            yes={"bid": [], "ask": [[300, 40], [400, 30], [450, 100]]},
+            no={"bid": [], "ask": [[900, 100]]}
+        )
+        orderbook2 = Orderbook(
+            market_id="2",
+            timestamp=123456789,
+            yes={"bid": [], "ask": [[900, 100]]},
+            no={"bid": [], "ask": [[350, 50], [500, 60], [560, 70]]}
+        )
+
+        def brute_force(max_cost):
+            yes_prices = [p for p, q in orderbook1.yes["ask"] for _ in range(q)]
+            no_prices = [p for p, q in orderbook2.no["ask"] for _ in range(q)]
+            best, cost = 0, 0
+            for x, (p1, p2) in enumerate(zip(yes_prices, no_prices), start=1):
+                cost += p1 + p2
+                if p1 + p2 >= 1000 or 1000 * x < math.ceil(cost * 1.01 * 1.05) or (max_cost is not None and cost > max_cost):
+                    break
+                best = x
+            return best
+
+        for max_cost in (None, 40000, 10):
+            # Act
+            opportunity = calculate_cross_platform_arbitrage(orderbook1, orderbook2, max_cost=max_cost)
+
+            # Assert
+            expected_shares = brute_force(max_cost)
+            if expected_shares == 0:
+                self.assertIsNone(opportunity)
+                continue
+            self.assertEqual(opportunity["type"], "yes1_no2")
+            self.assertEqual(opportunity["shares"], expected_shares)
+            self.assertEqual(opportunity["ladder"][-1][0], expected_shares)
+            self.assertEqual(opportunity["ladder"][0], [40, 300, 350, 350])
+            self.assertEqual(opportunity["total_cost"], sum(
+                (end - prev_end) * (1000 - profit) for (end, _, _, profit), (prev_end, *_) in
+                zip(opportunity["ladder"], [[0]] + opportunity["ladder"])
+            ))
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
@@ -1,7 +1,15 @@
+import asyncio
+import time
 import unittest
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 from services.arbitrage_finder.main import ArbitrageFinderService, PlatformType
 from models.Orderbook import Orderbook
+from feeds.BookSource import BookSnapshot
+from models.TopOfBook import TopOfBook
+
+
+def stream_ids(stream_name, messages):
+    return [f"{i}-0" for i, _ in enumerate(messages, 1)]
 
 class TestArbitrageFinderService(unittest.TestCase):
 
@@ -27,6 +35,8 @@ class TestArbitrageFinderService(unittest.TestCase):
         orderbook2 = Orderbook(market_id="POLY_MARKET_1", timestamp=123, yes={"ask": [[600, 10]], "bid": []}, no={"ask": [[400, 10]], "bid": []})
         mock_kalshi_platform.get_order_books.return_value = [orderbook1]
         mock_polymarket_platform.get_order_books.return_value = [orderbook2]
+        mock_kalshi_platform.get_top_of_book.return_value = {"KALSHI_MARKET_1": TopOfBook.from_orderbook(orderbook1)}
+        mock_polymarket_platform.get_top_of_book.return_value = {"POLY_MARKET_1": TopOfBook.from_orderbook(orderbook2)}
 
         # Act
         service = ArbitrageFinderService()
@@ -34,9 +44,9 @@ class TestArbitrageFinderService(unittest.TestCase):
 
         # Assert
         # Check that an opportunity was published to Redis
-        mock_redis_manager.add_to_stream.assert_called_once()
+        mock_redis_manager.add_many_to_stream.assert_called_once()
         # Check that the original message was acknowledged
-        mock_redis_manager.acknowledge_message.assert_called_with(service.input_stream_name, service.group_name, message_id)
+        mock_redis_manager.acknowledge_messages.assert_called_with(service.input_stream_name, service.group_name, [message_id])
 
     @patch('services.arbitrage_finder.main.RedisManager')
     @patch('services.arbitrage_finder.main.KalshiPlatform')
@@ -59,6 +69,8 @@ class TestArbitrageFinderService(unittest.TestCase):
         orderbook2 = Orderbook(market_id="POLY_MARKET_1", timestamp=123, yes={"ask": [[510, 10]], "bid": []}, no={"ask": [[510, 10]], "bid": []})
         mock_kalshi_platform.get_order_books.return_value = [orderbook1]
         mock_polymarket_platform.get_order_books.return_value = [orderbook2]
+        mock_kalshi_platform.get_top_of_book.return_value = {"KALSHI_MARKET_1": TopOfBook.from_orderbook(orderbook1)}
+        mock_polymarket_platform.get_top_of_book.return_value = {"POLY_MARKET_1": TopOfBook.from_orderbook(orderbook2)}
         
         # Act
         service = ArbitrageFinderService()
@@ -66,9 +78,324 @@ class TestArbitrageFinderService(unittest.TestCase):
 
         # Assert
         # Check that NO opportunity was published
-        mock_redis_manager.add_to_stream.assert_not_called()
+        mock_redis_manager.add_many_to_stream.assert_not_called()
         # Check that the message was still acknowledged
-        mock_redis_manager.acknowledge_message.assert_called_with(service.input_stream_name, service.group_name, message_id)
+        mock_redis_manager.acknowledge_messages.assert_called_with(service.input_stream_name, service.group_name, [message_id])
+
+    @patch('services.arbitrage_finder.main.RedisManager')
+    @patch('services.arbitrage_finder.main.KalshiPlatform')
+    @patch('services.arbitrage_finder.main.PolyMarketPlatform')
+    def test_process_market_pairs_reads_streamed_books(self, MockPolyMarketPlatform, MockKalshiPlatform, MockRedisManager):
+        # Arrange
+        mock_redis_manager = MockRedisManager.return_value
+        mock_kalshi_platform = MockKalshiPlatform.return_value
+        mock_polymarket_platform = MockPolyMarketPlatform.return_value
+
+        message_id = '12345-0'
+        message_data = {
+            'market_id_1': 'KALSHI_MARKET_1', 'platform_1': PlatformType.KALSHI.value,
+            'market_id_2': 'POLY_MARKET_1', 'platform_2': PlatformType.POLYMARKET.value
+        }
+        mock_redis_manager.read_from_stream.return_value = [(message_id, message_data)]
+
+        service = ArbitrageFinderService()
+        service.orderbook_stores[PlatformType.KALSHI].apply_snapshot(
+            BookSnapshot("KALSHI_MARKET_1", 123, yes_bid=[], yes_ask=[[400, 10]], no_bid=[], no_ask=[[600, 10]]))
+        service.orderbook_stores[PlatformType.POLYMARKET].apply_snapshot(
+            BookSnapshot("POLY_MARKET_1", 123, yes_bid=[], yes_ask=[[600, 10]], no_bid=[], no_ask=[[400, 10]]))
+
+        # Act
+        service.process_market_pairs()
+
+        # Assert
+        mock_kalshi_platform.get_order_books.assert_not_called()
+        mock_polymarket_platform.get_order_books.assert_not_called()
+        mock_redis_manager.add_many_to_stream.assert_called_once()
+    @patch('services.arbitrage_finder.main.RedisManager')
+    @patch('services.arbitrage_finder.main.KalshiPlatform')
+    @patch('services.arbitrage_finder.main.PolyMarketPlatform')
+    def test_async_handler_fetches_books_concurrently(self, MockPolyMarketPlatform, MockKalshiPlatform, MockRedisManager):
+        """
+        Test that the event-loop handler fetches the books of a whole batch with one concurrent
+        call per platform, and publishes and acknowledges the batch through the async Redis manager.
+        """
+        # Arrange
+        mock_kalshi_platform = MockKalshiPlatform.return_value
+        mock_polymarket_platform = MockPolyMarketPlatform.return_value
+        books = {
+            "KALSHI_MARKET_1": Orderbook(market_id="KALSHI_MARKET_1", timestamp=123, yes={"ask": [[400, 10]], "bid": []}, no={"ask": [[600, 10]], "bid": []}),
+            "POLY_MARKET_1": Orderbook(market_id="POLY_MARKET_1", timestamp=123, yes={"ask": [[600, 10]], "bid": []}, no={"ask": [[400, 10]], "bid": []}),
+        }
+
+        calls = []
+
+        async def aget_order_books(market_ids):
+            calls.append(market_ids)
+            await asyncio.sleep(0.1)
+            return [books.get(market_id) or Orderbook(market_id=market_id, timestamp=123, yes=books["POLY_MARKET_1"].yes, no=books["POLY_MARKET_1"].no)
+                    for market_id in market_ids]
+
+        async def aget_top_of_book(market_ids):
+            return {}  # tops unknown: every pair goes on to the full books
+
+        mock_kalshi_platform.aget_order_books = aget_order_books
+        mock_polymarket_platform.aget_order_books = aget_order_books
+        mock_kalshi_platform.aget_top_of_book = aget_top_of_book
+        mock_polymarket_platform.aget_top_of_book = aget_top_of_book
+        messages = [(f"{i}-0", {
+            'market_id_1': 'KALSHI_MARKET_1', 'platform_1': PlatformType.KALSHI.value,
+            'market_id_2': f'POLY_MARKET_{i}', 'platform_2': PlatformType.POLYMARKET.value
+        }) for i in range(1, 11)]
+        service = ArbitrageFinderService()
+        service.async_redis_manager = AsyncMock()
+
+        # Act
+        start = time.perf_counter()
+        asyncio.run(service.ahandle_market_pairs(messages))
+        elapsed = time.perf_counter() - start
+
+        # Assert
+        self.assertLess(elapsed, 0.5)
+        self.assertEqual(sorted(calls), [["KALSHI_MARKET_1"], [f"POLY_MARKET_{i}" for i in range(1, 11)]])
+        published = service.async_redis_manager.add_many_to_stream.call_args.args[1]
+        self.assertEqual(len(published), 10)
+        service.async_redis_manager.acknowledge_messages.assert_called_once_with(
+            service.input_stream_name, service.group_name, [message_id for message_id, _ in messages])
+
+    @patch('services.arbitrage_finder.main.RedisManager')
+    @patch('services.arbitrage_finder.main.KalshiPlatform')
+    @patch('services.arbitrage_finder.main.PolyMarketPlatform')
+    def test_screen_fetches_full_books_only_for_passing_pairs(self, MockPolyMarketPlatform, MockKalshiPlatform, MockRedisManager):
+        """
+        Test that the batch's top of book is fetched in one call per platform, that only pairs
+        whose best asks could be profitable get their full books fetched, and that screened-out
+        pairs are still acknowledged.
+        """
+        # Arrange
+        mock_redis_manager = MockRedisManager.return_value
+        mock_kalshi_platform = MockKalshiPlatform.return_value
+        mock_polymarket_platform = MockPolyMarketPlatform.return_value
+        messages = [(f"{i}-0", {
+            'market_id_1': f'KALSHI_MARKET_{i}', 'platform_1': PlatformType.KALSHI.value,
+            'market_id_2': f'POLY_MARKET_{i}', 'platform_2': PlatformType.POLYMARKET.value
+        }) for i in range(1, 6)]
+        mock_kalshi_platform.get_top_of_book.return_value = {
+            f"KALSHI_MARKET_{i}": TopOfBook(f"KALSHI_MARKET_{i}", yes_ask=400 if i == 3 else 500, no_ask=520) for i in range(1, 6)
+        }
+        mock_polymarket_platform.get_top_of_book.return_value = {
+            f"POLY_MARKET_{i}": TopOfBook(f"POLY_MARKET_{i}", yes_ask=520, no_ask=500) for i in range(1, 6)
+        }
+        mock_kalshi_platform.get_order_books.return_value = [
+            Orderbook(market_id="KALSHI_MARKET_3", timestamp=123, yes={"ask": [[400, 10]], "bid": []}, no={"ask": [[520, 10]], "bid": []})]
+        mock_polymarket_platform.get_order_books.return_value = [
+            Orderbook(market_id="POLY_MARKET_3", timestamp=123, yes={"ask": [[520, 10]], "bid": []}, no={"ask": [[500, 10]], "bid": []})]
+        service = ArbitrageFinderService()
+
+        # Act
+        service.handle_market_pairs(messages)
+
+        # Assert
+        mock_kalshi_platform.get_top_of_book.assert_called_once_with([f"KALSHI_MARKET_{i}" for i in range(1, 6)])
+        mock_polymarket_platform.get_top_of_book.assert_called_once_with([f"POLY_MARKET_{i}" for i in range(1, 6)])
+        mock_kalshi_platform.get_order_books.assert_called_once_with(["KALSHI_MARKET_3"])
+        mock_polymarket_platform.get_order_books.assert_called_once_with(["POLY_MARKET_3"])
+        mock_redis_manager.add_many_to_stream.assert_called_once()
+        acknowledged = mock_redis_manager.acknowledge_messages.call_args.args[2]
+        self.assertEqual(sorted(acknowledged), [message_id for message_id, _ in messages])
+
+    @patch('services.arbitrage_finder.main.RedisManager')
+    @patch('services.arbitrage_finder.main.KalshiPlatform')
+    @patch('services.arbitrage_finder.main.PolyMarketPlatform')
+    def test_batch_fetches_each_platform_once_and_redelivers_failed_fetches(self, MockPolyMarketPlatform, MockKalshiPlatform, MockRedisManager):
+        """
+        Test that the books of every pair in a batch come from one get_order_books call per
+        platform, and that pairs on a platform whose fetch raised are not acknowledged.
+        """
+        # Arrange
+        mock_redis_manager = MockRedisManager.return_value
+        mock_kalshi_platform = MockKalshiPlatform.return_value
+        mock_polymarket_platform = MockPolyMarketPlatform.return_value
+        messages = [(f"{i}-0", {
+            'market_id_1': f'KALSHI_MARKET_{i % 2}', 'platform_1': PlatformType.KALSHI.value,
+            'market_id_2': f'POLY_MARKET_{i}', 'platform_2': PlatformType.POLYMARKET.value
+        }) for i in range(1, 5)]
+        mock_kalshi_platform.get_order_books.side_effect = lambda market_ids: [
+            Orderbook(market_id=market_id, timestamp=123, yes={"ask": [[400, 10]], "bid": []}, no={"ask": [[600, 10]], "bid": []})
+            for market_id in market_ids]
+        mock_polymarket_platform.get_order_books.side_effect = lambda market_ids: [
+            Orderbook(market_id=market_id, timestamp=123, yes={"ask": [[600, 10]], "bid": []}, no={"ask": [[400, 10]], "bid": []})
+            for market_id in market_ids]
+        service = ArbitrageFinderService()
+        service.screen_top_of_book = False
+
+        # Act
+        service.handle_market_pairs(messages)
+        mock_polymarket_platform.get_order_books.side_effect = ConnectionError("down")
+        service.handle_market_pairs(messages)
+
+        # Assert
+        mock_kalshi_platform.get_order_books.assert_called_with(["KALSHI_MARKET_1", "KALSHI_MARKET_0"])
+        self.assertEqual(mock_kalshi_platform.get_order_books.call_count, 2)
+        first_publish = mock_redis_manager.add_many_to_stream.call_args_list[0].args[1]
+        self.assertEqual([opportunity["market_id_2"] for opportunity in first_publish], [f"POLY_MARKET_{i}" for i in range(1, 5)])
+        self.assertEqual(mock_redis_manager.add_many_to_stream.call_count, 1)
+        acknowledged = [call.args[2] for call in mock_redis_manager.acknowledge_messages.call_args_list]
+        self.assertEqual(acknowledged, [[message_id for message_id, _ in messages], []])
+
+    @patch('services.arbitrage_finder.main.RedisManager')
+    @patch('services.arbitrage_finder.main.KalshiPlatform')
+    @patch('services.arbitrage_finder.main.PolyMarketPlatform')
+    def test_unchanged_opportunities_are_not_republished(self, MockPolyMarketPlatform, MockKalshiPlatform, MockRedisManager):
+        """
+        Test that checking a pair again on unchanged books reuses the cached result and does not
+        publish the same opportunity twice, while a change in the books publishes again.
+        """
+        # Arrange
+        mock_redis_manager = MockRedisManager.return_value
+        mock_kalshi_platform = MockKalshiPlatform.return_value
+        mock_polymarket_platform = MockPolyMarketPlatform.return_value
+        message = ('1-0', {
+            'market_id_1': 'KALSHI_MARKET_1', 'platform_1': PlatformType.KALSHI.value,
+            'market_id_2': 'POLY_MARKET_1', 'platform_2': PlatformType.POLYMARKET.value
+        })
+        kalshi_book = Orderbook(market_id="KALSHI_MARKET_1", timestamp=123, yes={"ask": [[400, 10]], "bid": []}, no={"ask": [[600, 10]], "bid": []})
+        mock_kalshi_platform.get_order_books.return_value = [kalshi_book]
+        mock_polymarket_platform.get_order_books.return_value = [
+            Orderbook(market_id="POLY_MARKET_1", timestamp=123, yes={"ask": [[600, 10]], "bid": []}, no={"ask": [[400, 10]], "bid": []})]
+        mock_redis_manager.add_many_to_stream.side_effect = stream_ids
+        service = ArbitrageFinderService()
+        service.screen_top_of_book = False
+
+        # Act
+        service.handle_market_pairs([message])
+        service.handle_market_pairs([message])
+        kalshi_book.yes["ask"][0][0] = 390
+        service.handle_market_pairs([message])
+
+        # Assert
+        self.assertEqual(mock_redis_manager.add_many_to_stream.call_count, 2)
+        self.assertEqual((service.memo.hits, service.memo.misses), (1, 2))
+
+    @patch('services.arbitrage_finder.main.RedisManager')
+    @patch('services.arbitrage_finder.main.KalshiPlatform')
+    @patch('services.arbitrage_finder.main.PolyMarketPlatform')
+    def test_async_sweep_does_not_block_the_event_loop(self, MockPolyMarketPlatform, MockKalshiPlatform, MockRedisManager):
+        """
+        Test that while a slow batch is being scored, other tasks on the event loop keep running.
+        """
+        # Arrange
+        mock_kalshi_platform = MockKalshiPlatform.return_value
+        mock_polymarket_platform = MockPolyMarketPlatform.return_value
+        mock_kalshi_platform.aget_order_books = AsyncMock(return_value=[
+            Orderbook(market_id="KALSHI_MARKET_1", timestamp=123, yes={"ask": [[400, 10]], "bid": []}, no={"ask": [[600, 10]], "bid": []})])
+        mock_polymarket_platform.aget_order_books = AsyncMock(return_value=[
+            Orderbook(market_id="POLY_MARKET_1", timestamp=123, yes={"ask": [[600, 10]], "bid": []}, no={"ask": [[400, 10]], "bid": []})])
+        service = ArbitrageFinderService()
+        service.screen_top_of_book = False
+        service.async_redis_manager = AsyncMock()
+        calculate = service.memo.calculate
+
+        def slow_calculate(pairs, **settings):
+            time.sleep(0.3)
+            return calculate(pairs, **settings)
+
+        service.memo.calculate = slow_calculate
+        message = ('1-0', {
+            'market_id_1': 'KALSHI_MARKET_1', 'platform_1': PlatformType.KALSHI.value,
+            'market_id_2': 'POLY_MARKET_1', 'platform_2': PlatformType.POLYMARKET.value
+        })
+        ticks = []
+
+        async def tick():
+            for _ in range(5):
+                ticks.append(time.perf_counter())
+                await asyncio.sleep(0.02)
+
+        async def handle_while_ticking():
+            await asyncio.gather(service.ahandle_market_pairs([message]), tick())
+
+        # Act
+        start = time.perf_counter()
+        asyncio.run(handle_while_ticking())
+
+        # Assert
+        self.assertEqual(len(ticks), 5)
+        self.assertLess(ticks[-1] - start, 0.25)
+        self.assertEqual(len(service.async_redis_manager.add_many_to_stream.call_args.args[1]), 1)
+
+    @patch('services.arbitrage_finder.main.RedisManager')
+    @patch('services.arbitrage_finder.main.KalshiPlatform')
+    @patch('services.arbitrage_finder.main.PolyMarketPlatform')
+    def test_opportunity_is_republished_after_the_screen_rejects_it(self, MockPolyMarketPlatform, MockKalshiPlatform, MockRedisManager):
+        """
+        Test that an opportunity that disappears at the top-of-book screen and then comes back
+        unchanged is published again, whatever the order of the pair's legs, and that the
+        published record is dropped when the pair leaves the watchlist.
+        """
+        # Arrange
+        mock_redis_manager = MockRedisManager.return_value
+        mock_kalshi_platform = MockKalshiPlatform.return_value
+        mock_polymarket_platform = MockPolyMarketPlatform.return_value
+        message = ('1-0', {
+            'market_id_1': 'POLY_MARKET_1', 'platform_1': PlatformType.POLYMARKET.value,
+            'market_id_2': 'KALSHI_MARKET_1', 'platform_2': PlatformType.KALSHI.value
+        })
+        kalshi_book = Orderbook(market_id="KALSHI_MARKET_1", timestamp=123, yes={"ask": [[400, 10]], "bid": []}, no={"ask": [[600, 10]], "bid": []})
+        poly_book = Orderbook(market_id="POLY_MARKET_1", timestamp=123, yes={"ask": [[600, 10]], "bid": []}, no={"ask": [[400, 10]], "bid": []})
+        mock_kalshi_platform.get_order_books.return_value = [kalshi_book]
+        mock_polymarket_platform.get_order_books.return_value = [poly_book]
+        open_tops = ({"KALSHI_MARKET_1": TopOfBook.from_orderbook(kalshi_book)}, {"POLY_MARKET_1": TopOfBook.from_orderbook(poly_book)})
+        closed_tops = ({"KALSHI_MARKET_1": TopOfBook("KALSHI_MARKET_1", yes_ask=600, no_ask=600)}, {"POLY_MARKET_1": TopOfBook("POLY_MARKET_1", yes_ask=600, no_ask=600)})
+        mock_redis_manager.add_many_to_stream.side_effect = stream_ids
+        service = ArbitrageFinderService()
+
+        # Act
+        for kalshi_tops, poly_tops in (open_tops, closed_tops, open_tops):
+            mock_kalshi_platform.get_top_of_book.return_value = kalshi_tops
+            mock_polymarket_platform.get_top_of_book.return_value = poly_tops
+            service.handle_market_pairs([message])
+        published_keys = list(service.published)
+        service.watchlist.remove(("KALSHI_MARKET_1", "POLY_MARKET_1"))
+
+        # Assert
+        self.assertEqual(mock_redis_manager.add_many_to_stream.call_count, 2)
+        self.assertEqual(published_keys, [("KALSHI_MARKET_1", "POLY_MARKET_1")])
+        self.assertEqual(service.published, {})
+
+    @patch('services.arbitrage_finder.main.RedisManager')
+    @patch('services.arbitrage_finder.main.KalshiPlatform')
+    @patch('services.arbitrage_finder.main.PolyMarketPlatform')
+    def test_opportunity_is_republished_after_its_publish_fails(self, MockPolyMarketPlatform, MockKalshiPlatform, MockRedisManager):
+        """
+        Test that an opportunity whose XADD failed is not recorded as published, so the next
+        check on unchanged books sends it again.
+        """
+        # Arrange
+        mock_redis_manager = MockRedisManager.return_value
+        mock_kalshi_platform = MockKalshiPlatform.return_value
+        mock_polymarket_platform = MockPolyMarketPlatform.return_value
+        message = ('1-0', {
+            'market_id_1': 'KALSHI_MARKET_1', 'platform_1': PlatformType.KALSHI.value,
+            'market_id_2': 'POLY_MARKET_1', 'platform_2': PlatformType.POLYMARKET.value
+        })
+        mock_kalshi_platform.get_order_books.return_value = [
+            Orderbook(market_id="KALSHI_MARKET_1", timestamp=123, yes={"ask": [[400, 10]], "bid": []}, no={"ask": [[600, 10]], "bid": []})]
+        mock_polymarket_platform.get_order_books.return_value = [
+            Orderbook(market_id="POLY_MARKET_1", timestamp=123, yes={"ask": [[600, 10]], "bid": []}, no={"ask": [[400, 10]], "bid": []})]
+        mock_redis_manager.add_many_to_stream.side_effect = [[None], ["1-0"], ["2-0"]]
+        service = ArbitrageFinderService()
+        service.screen_top_of_book = False
+
+        # Act
+        service.handle_market_pairs([message])
+        published_after_failure = dict(service.published)
+        service.handle_market_pairs([message])
+        service.handle_market_pairs([message])
+
+        # Assert
+        self.assertEqual(published_after_failure, {})
+        self.assertEqual(mock_redis_manager.add_many_to_stream.call_count, 2)
+        self.assertEqual(list(service.published), [("KALSHI_MARKET_1", "POLY_MARKET_1")])
 
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
@@ -0,0 +1,69 @@
+import random
+import unittest
+from models.Orderbook import Orderbook
+from models.CompactOrderbook import CompactOrderbook
+from services.arbitrage_finder.calculator import calculate_many
+from services.arbitrage_finder.memo import ArbitrageMemo
+
+
+def book(market_id, yes_ask, no_ask, yes_bid=()):
+    return Orderbook(market_id=market_id, timestamp=0, yes={"bid": [list(level) for level in yes_bid], "ask": yes_ask}, no={"bid": [], "ask": no_ask})
+
+
+class TestArbitrageMemo(unittest.TestCase):
+
+    def test_fingerprints_follow_the_ask_ladders_only(self):
+        """
+        Test that equal asks give equal fingerprints whatever the bids, and that any change in an
+        ask price or quantity changes it, for both book representations.
+        """
+        # Arrange
+        base = book("m", [[400, 10], [410, 5]], [[550, 7]])
+        same_asks = book("m", [[400, 10], [410, 5]], [[550, 7]], yes_bid=[[390, 3]])
+        changed_qty = book("m", [[400, 10], [410, 6]], [[550, 7]])
+        swapped_sides = book("m", [[550, 7]], [[400, 10], [410, 5]])
+
+        # Act
+        fingerprints = [ob.ask_fingerprint() for ob in (base, same_asks, changed_qty, swapped_sides)]
+        compact = [CompactOrderbook.from_orderbook(ob).ask_fingerprint() for ob in (base, same_asks, changed_qty)]
+
+        # Assert
+        self.assertEqual(fingerprints[0], fingerprints[1])
+        self.assertEqual(len(set(fingerprints[1:])), 3)
+        self.assertEqual(compact[0], compact[1])
+        self.assertNotEqual(compact[0], compact[2])
+
+    def test_unchanged_pairs_are_answered_from_the_cache(self):
+        """
+        Test that a second pass over the same books is served entirely from the cache with the
+        same results as the calculator, that a changed book or setting is recalculated, and that
+        the cache stays within its size.
+        """
+        # Arrange
+        rng = random.Random(3)
+
+        def ladder():
+            return [[price, rng.randint(1, 50)] for price in sorted(rng.randint(350, 600) for _ in range(4))]
+
+        pairs = [(book(f"a{i}", ladder(), ladder()), book(f"b{i}", ladder(), ladder())) for i in range(200)]
+        memo = ArbitrageMemo(max_size=250)
+        expected = calculate_many(pairs)
+
+        # Act
+        first = memo.calculate_many(pairs)
+        second = memo.calculate_many(pairs)
+        pairs[0][0].yes["ask"][0][1] += 1
+        memo.calculate_many(pairs[:1])
+        memo.calculate_many(pairs[1:2], profit_threshold=0.02)
+
+        # Assert
+        self.assertEqual(first, expected)
+        self.assertEqual(second, expected)
+        self.assertTrue(any(expected), "Fixture should contain at least one opportunity.")
+        self.assertEqual(memo.stats()["hits"], 200)
+        self.assertEqual(memo.stats()["misses"], 202)
+        self.assertLessEqual(len(memo), 250)
+
+
+if __name__ == '__main__':
+    unittest.main()
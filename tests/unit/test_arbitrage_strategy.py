@@ -0,0 +1,71 @@
+import unittest
+from models.Market import Market
+from models.OrderStatus import OrderStatus
+from models.PlatformType import PlatformType
+from services.trade_executor.strategies.arbitrage_strategy import create_arbitrage_orders
+
+
+class FakePlatform:
+    """Fills every order on the first status check and remembers the orders placed."""
+
+    def __init__(self):
+        self.orders = []
+
+    async def aplace_order(self, order):
+        order.status = OrderStatus.OPEN
+        order.order_id = f"order-{len(self.orders)}"
+        self.orders.append(order)
+
+    async def aget_order_status(self, order):
+        order.status = OrderStatus.EXECUTED
+        return []
+
+    async def acancel_order(self, order):
+        order.status = OrderStatus.CANCELED
+
+
+class FakeDBManager:
+    def add_order(self, order):
+        return order.client_order_id
+
+    def update_order(self, order):
+        pass
+
+    def add_trades(self, trades):
+        pass
+
+
+class TestArbitrageStrategy(unittest.TestCase):
+
+    def test_yes2_no1_legs_are_capped_at_their_own_prices(self):
+        """
+        Test that for a yes2_no1 opportunity the "no" order on market1 is capped at the no price
+        and the "yes" order on market2 at the yes price, each at the ladder level its chunk
+        reaches.
+        """
+        # Arrange
+        market1 = Market(PlatformType.KALSHI, "K1", "Kalshi market", "", 0)
+        market2 = Market(PlatformType.POLYMARKET, "P1", "Polymarket market", "", 0)
+        platform1, platform2 = FakePlatform(), FakePlatform()
+        opportunity = {
+            "type": "yes2_no1",
+            "shares": 20,
+            # The yes leg (market2) first, then the no leg (market1).
+            "max_price_1": 450,
+            "max_price_2": 540,
+            "ladder": [[10, 420, 530, 30], [20, 450, 540, 10]],
+        }
+
+        # Act
+        create_arbitrage_orders(market1, market2, platform1, platform2, opportunity, FakeDBManager())
+
+        # Assert
+        self.assertEqual({order.side for order in platform1.orders}, {"no"})
+        self.assertEqual({order.side for order in platform2.orders}, {"yes"})
+        self.assertEqual([order.max_price for order in platform1.orders], [53] * 5 + [54] * 5)
+        self.assertEqual([order.max_price for order in platform2.orders], [42] * 5 + [45] * 5)
+        self.assertEqual(sum(order.size for order in platform1.orders), 20)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,231 @@
+import asyncio
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+from aiohttp import web
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cache.TokenIdCache import TokenIdCache
+from platforms import TestPlatform as test_platform
+from platforms.BasePlatform import run_sync
+from platforms.KalshiPlatform import KalshiPlatform
+from platforms.PolyMarketPlatform import PolyMarketPlatform
+
+
+class FakeKalshi:
+    """Local stand-in for Kalshi's market lookup and order book endpoints, with per-request latency."""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.requests = []
+
+    async def __aenter__(self):
+        app = web.Application()
+        app.router.add_get("/markets", self._markets)
+        app.router.add_get("/markets/{ticker}/orderbook", self._orderbook)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        self.url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.runner.cleanup()
+
+    async def _markets(self, request):
+        self.requests.append(request.path)
+        await asyncio.sleep(self.delay)
+        tickers = request.query["tickers"].split(",")
+        return web.json_response({"markets": [
+            {"ticker": ticker, "yes_bid": 40, "no_bid": 55} for ticker in tickers if ticker != "KX-UNKNOWN"
+        ]})
+
+    async def _orderbook(self, request):
+        self.requests.append(request.path)
+        await asyncio.sleep(self.delay)
+        ticker = request.match_info["ticker"]
+        if ticker == "KX-UNKNOWN":
+            return web.json_response({"error": "not found"}, status=404)
+        if ticker == "KX-BROKEN":
+            return web.json_response({"error": "internal"}, status=500)
+        yes, no = [[38, 0], [39, 5], [40, 10]], [[54, 2], [55, 3]]
+        depth = int(request.query.get("depth", 0))
+        if depth:
+            yes, no = yes[-depth:], no[-depth:]
+        return web.json_response({"orderbook": {"yes": yes, "no": no}})
+
+
+def kalshi(url):
+    platform = KalshiPlatform.__new__(KalshiPlatform)
+    platform.base_url = url
+    platform.key_id = "key-id"
+    platform.private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    return platform
+
+
+class FakeClob:
+    """Local stand-in for the Polymarket CLOB /books endpoint; token "huge-yes" has an outsized level."""
+
+    async def __aenter__(self):
+        app = web.Application()
+        app.router.add_post("/books", self._books)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        self.url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.runner.cleanup()
+
+    async def _books(self, request):
+        books = []
+        for entry in await request.json():
+            size = "50000000" if entry["token_id"] == "huge-yes" else "12.5"
+            books.append({"asset_id": entry["token_id"], "bids": [{"price": "0.4", "size": "3"}], "asks": [{"price": "0.45", "size": size}]})
+        return web.json_response(books)
+
+
+def polymarket(url, token_ids: dict):
+    platform = PolyMarketPlatform.__new__(PolyMarketPlatform)
+    platform.client = SimpleNamespace(host=url)
+    platform.token_ids = TokenIdCache(lambda ids: {})
+    platform.token_ids.put_many(token_ids)
+    return platform
+
+
+class TestAsyncPlatforms(unittest.IsolatedAsyncioTestCase):
+
+    async def test_kalshi_order_books_are_fetched_concurrently(self):
+        """
+        Test that every book is requested at once, one request per market and no market lookup,
+        and that unknown markets are left out.
+        """
+        # Arrange
+        async with FakeKalshi(delay=0.2) as server:
+            platform = kalshi(server.url)
+            tickers = [f"KX-{i}" for i in range(20)] + ["KX-UNKNOWN"]
+
+            # Act
+            start = time.perf_counter()
+            orderbooks = await platform.aget_order_books(tickers)
+            elapsed = time.perf_counter() - start
+
+        # Assert
+        self.assertEqual([ob.market_id for ob in orderbooks], tickers[:-1])
+        self.assertEqual(orderbooks[0].yes["bid"], [[390, 500], [400, 1000]])
+        self.assertEqual(orderbooks[0].yes["ask"], [[450, 300], [460, 200]])
+        self.assertEqual(orderbooks[0].no["ask"], [[600, 1000], [610, 500]])
+        self.assertEqual(len(server.requests), 21)
+        self.assertTrue(all(path.endswith("/orderbook") for path in server.requests))
+        # One round of book requests, far from the 4.2s of fetching them one by one.
+        self.assertLess(elapsed, 1.0)
+
+    async def test_kalshi_depth_limit_and_partial_failures(self):
+        """
+        Test that `depth` keeps only the best levels of each side, and that a failing market is
+        left out without losing the others.
+        """
+        # Arrange
+        async with FakeKalshi(delay=0) as server:
+            platform = kalshi(server.url)
+
+            # Act
+            with self.assertLogs(level="WARNING"):
+                orderbooks = await platform.aget_order_books(["KX-1", "KX-BROKEN", "KX-2"], depth=1)
+
+        # Assert
+        self.assertEqual([ob.market_id for ob in orderbooks], ["KX-1", "KX-2"])
+        self.assertEqual(orderbooks[0].yes["bid"], [[400, 1000]])
+        self.assertEqual(orderbooks[0].no["bid"], [[550, 300]])
+        self.assertEqual(orderbooks[0].yes["ask"], [[450, 300]])
+
+    async def test_polymarket_book_too_large_for_int32_is_skipped_alone(self):
+        """
+        Test that a market whose book holds a level too large for CompactOrderbook is left out
+        with a warning, and the rest of the batch is still returned.
+        """
+        # Arrange
+        async with FakeClob() as server:
+            platform = polymarket(server.url, {
+                "0x1": ["yes-1", "no-1"],
+                "0xHUGE": ["huge-yes", "huge-no"],
+                "0x2": ["yes-2", "no-2"],
+            })
+
+            # Act
+            with self.assertLogs(level="WARNING"):
+                orderbooks = await platform.aget_order_books(["0x1", "0xHUGE", "0x2"])
+
+        # Assert
+        self.assertEqual([ob.market_id for ob in orderbooks], ["0x1", "0x2"])
+        self.assertEqual(orderbooks[0].yes["ask"], [[450, 1250]])
+
+    async def test_default_async_methods_run_in_a_worker_thread(self):
+        """
+        Test that platforms without native async I/O get working a* methods that do not block the loop.
+        """
+        # Arrange
+        platform = test_platform.TestPlatform(num_levels=3)
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0)
+
+        task = asyncio.create_task(ticker())
+
+        # Act
+        orderbooks, balance = await asyncio.gather(platform.aget_order_books(["A", "B"]), platform.aget_balance())
+        task.cancel()
+
+        # Assert
+        self.assertEqual([ob.market_id for ob in orderbooks], ["A", "B"])
+        self.assertEqual(balance, 0.0)
+        self.assertGreater(ticks, 0)
+
+    async def test_run_sync_refuses_to_block_a_running_loop(self):
+        """
+        Test that run_sync raises instead of deadlocking when called from a coroutine.
+        """
+        # Arrange
+        async def answer():
+            return 42
+
+        # Act / Assert
+        with self.assertRaises(RuntimeError):
+            run_sync(answer())
+
+
+class TestRunSync(unittest.TestCase):
+
+    def test_one_loop_is_reused_across_calls_and_threads(self):
+        """
+        Test that blocking callers on any thread share one persistent event loop.
+        """
+        # Arrange
+        async def current_loop():
+            return asyncio.get_running_loop()
+
+        loops = []
+
+        # Act
+        loops.append(run_sync(current_loop()))
+        threads = [threading.Thread(target=lambda: loops.append(run_sync(current_loop()))) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Assert
+        self.assertEqual(len(loops), 5)
+        self.assertEqual(len(set(map(id, loops))), 1)
+        self.assertTrue(loops[0].is_running())
+
+
+if __name__ == '__main__':
+    unittest.main()
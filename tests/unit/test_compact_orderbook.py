@@ -0,0 +1,94 @@
+import unittest
+import tracemalloc
+from models.Orderbook import Orderbook
+from models.CompactOrderbook import CompactOrderbook
+from platforms import TestPlatform as test_platform
+from services.arbitrage_finder.calculator import calculate_cross_platform_arbitrage, calculate_many
+
+class TestCompactOrderbook(unittest.TestCase):
+
+    def test_from_levels_sorts_and_keeps_compatibility_view(self):
+        """
+        Test that raw levels are sorted by price and still readable as `ob.yes["ask"]` lists.
+        """
+        # Arrange / Act
+        orderbook = CompactOrderbook.from_levels(
+            market_id="1",
+            timestamp=123456789,
+            yes_bid=[[300, 5], [100, 7], [200, 9]],
+            yes_ask=[[700, 4], [400, 2]],
+            no_bid=[],
+            no_ask=[[650, 1], [650, 3], [600, 8]],
+        )
+
+        # Assert
+        self.assertEqual(orderbook.yes["bid"], [[100, 7], [200, 9], [300, 5]])
+        self.assertEqual(orderbook.yes["ask"], [[400, 2], [700, 4]])
+        self.assertEqual(orderbook.no["bid"], [])
+        self.assertEqual(orderbook.no["ask"], [[600, 8], [650, 1], [650, 3]])
+        self.assertEqual(dict(orderbook.yes), {"bid": orderbook.yes["bid"], "ask": orderbook.yes["ask"]})
+        self.assertEqual(orderbook.best_bid("yes"), 300)
+        self.assertEqual(orderbook.best_ask("yes"), 400)
+        self.assertIsNone(orderbook.best_bid("no"))
+
+        cum_qty, cum_cost = orderbook.prefix_sums("no")
+        self.assertEqual(cum_qty.tolist(), [8, 9, 12])
+        self.assertEqual(cum_cost.tolist(), [4800, 5450, 7400])
+
+    def test_values_outside_int32_are_rejected(self):
+        """
+        Test that a quantity too large for the int32 buffer raises instead of wrapping around.
+        """
+        # Arrange
+        huge = [[500, 3_000_000_000]]
+
+        # Act / Assert
+        with self.assertRaises(ValueError):
+            CompactOrderbook.from_levels("m", 0, yes_bid=huge, yes_ask=[], no_bid=[], no_ask=[])
+        with self.assertRaises(ValueError):
+            CompactOrderbook("m", 0, yes={"bid": [], "ask": [[-2_200_000_000, 1]]}, no={"bid": [], "ask": []})
+        largest = CompactOrderbook.from_levels("m", 0, yes_bid=[[500, 2**31 - 1]], yes_ask=[], no_bid=[], no_ask=[])
+        self.assertEqual(largest.yes["bid"], [[500, 2**31 - 1]])
+
+    def test_round_trip_and_calculator_results_match(self):
+        """
+        Test that the calculator returns the same opportunities for compact and list-backed books.
+        """
+        # Arrange
+        books = test_platform.TestPlatform(num_levels=50).get_order_books([f"m{i}" for i in range(40)])
+        compact = [CompactOrderbook.from_orderbook(ob) for ob in books]
+
+        # Act
+        pairs = list(zip(books[0::2], books[1::2]))
+        compact_pairs = list(zip(compact[0::2], compact[1::2]))
+
+        # Assert
+        for ob, cob in zip(books, compact):
+            round_trip = cob.to_orderbook()
+            self.assertEqual((round_trip.yes, round_trip.no), (ob.yes, ob.no))
+        expected = [calculate_cross_platform_arbitrage(ob1, ob2) for ob1, ob2 in pairs]
+        self.assertEqual([calculate_cross_platform_arbitrage(ob1, ob2) for ob1, ob2 in compact_pairs], expected)
+        self.assertEqual(calculate_many(compact_pairs), expected)
+
+    def test_uses_less_memory_than_nested_lists(self):
+        """
+        Test that packing a deep book takes a fraction of the memory of nested lists.
+        """
+        def traced_size(build):
+            tracemalloc.start()
+            obj = build()
+            size = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            return obj, size
+
+        ladder = [[price, 10_000 + price] for price in range(1, 1000)]
+        _, list_bytes = traced_size(lambda: Orderbook(
+            "1", 0, {"bid": [list(l) for l in ladder], "ask": [list(l) for l in ladder]},
+            {"bid": [list(l) for l in ladder], "ask": [list(l) for l in ladder]},
+        ))
+        _, compact_bytes = traced_size(lambda: CompactOrderbook.from_levels("1", 0, ladder, ladder, ladder, ladder))
+
+        self.assertLess(compact_bytes * 5, list_bytes)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+import asyncio
+import threading
+import unittest
+from unittest.mock import patch
+from aiohttp import web
+from platforms.HttpTransport import HttpTransport
+
+
+class CountingServer:
+    """Local HTTP server that counts requests and the distinct client connections they came on."""
+
+    async def __aenter__(self):
+        self.peers = set()
+        self.requests = 0
+        app = web.Application()
+        app.router.add_route("*", "/{tail:.*}", self._handle)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        self.url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.runner.cleanup()
+
+    async def _handle(self, request):
+        self.requests += 1
+        self.peers.add(request.transport.get_extra_info("peername"))
+        return web.json_response({"ok": True})
+
+
+class TestHttpTransport(unittest.IsolatedAsyncioTestCase):
+
+    async def test_async_requests_reuse_pooled_connections(self):
+        """
+        Test that requests to one origin share a keep-alive pool instead of connecting each time,
+        and that pre-warming opens the connection before the first real request.
+        """
+        # Arrange
+        async with CountingServer() as server:
+            transport = HttpTransport(max_keepalive=4)
+            await transport.awarm([server.url, f"{server.url}/markets"])
+
+            # Act
+            client = transport.async_client(f"{server.url}/markets")
+            for _ in range(10):
+                (await client.get(f"{server.url}/markets")).raise_for_status()
+            await asyncio.gather(*(client.get(f"{server.url}/markets/{i}") for i in range(4)))
+            await transport.aclose()
+
+        # Assert
+        self.assertEqual(server.requests, 1 + 10 + 4)
+        self.assertLessEqual(len(server.peers), 4)
+
+    async def test_blocking_requests_reuse_pooled_connections(self):
+        """
+        Test that the blocking client keeps its connection alive across calls from worker threads.
+        """
+        # Arrange
+        async with CountingServer() as server:
+            transport = HttpTransport()
+
+            def fetch_many():
+                for _ in range(10):
+                    transport.client(server.url).get(f"{server.url}/balance").raise_for_status()
+
+            # Act
+            await asyncio.to_thread(fetch_many)
+            transport.close()
+
+        # Assert
+        self.assertEqual(server.requests, 10)
+        self.assertEqual(len(server.peers), 1)
+
+    async def test_clients_are_shared_per_origin_and_loop(self):
+        """
+        Test that URLs on one origin share a client, other origins and event loops get their own.
+        """
+        # Arrange
+        transport = HttpTransport()
+        other_loop_client = []
+
+        # Act
+        markets = transport.async_client("https://api.example.com/markets?limit=5")
+        orders = transport.async_client("https://api.example.com/orders")
+        other_host = transport.async_client("https://gamma.example.com/markets")
+        thread = threading.Thread(target=lambda: other_loop_client.append(
+            asyncio.run(self._async_client(transport, "https://api.example.com/markets"))
+        ))
+        thread.start()
+        thread.join()
+
+        # Assert
+        self.assertIs(markets, orders)
+        self.assertIsNot(markets, other_host)
+        self.assertIsNot(markets, other_loop_client[0])
+        self.assertIs(transport.client("https://api.example.com/a"), transport.client("https://api.example.com/b"))
+        await transport.aclose()
+
+    async def test_warm_ignores_unreachable_hosts(self):
+        """
+        Test that a host that cannot be reached is logged and skipped instead of failing start-up.
+        """
+        # Arrange
+        transport = HttpTransport(connect_timeout_s=0.5)
+
+        # Act / Assert
+        with self.assertLogs(level="WARNING"):
+            await transport.awarm(["http://127.0.0.1:1"])
+        await transport.aclose()
+
+    async def test_http2_falls_back_without_h2(self):
+        """
+        Test that asking for HTTP/2 without the h2 package uses HTTP/1.1 instead of failing.
+        """
+        # Arrange / Act
+        with patch.dict("sys.modules", {"h2": None}), self.assertLogs(level="WARNING"):
+            transport = HttpTransport(http2=True)
+
+        # Assert
+        self.assertFalse(transport.http2)
+
+    @staticmethod
+    async def _async_client(transport, url):
+        return transport.async_client(url)
+
+
+if __name__ == '__main__':
+    unittest.main()
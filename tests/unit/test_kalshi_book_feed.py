@@ -0,0 +1,192 @@
+import asyncio
+import json
+import time
+import unittest
+from cryptography.hazmat.primitives.asymmetric import rsa
+from websockets.asyncio.server import serve
+from feeds.KalshiBookFeed import KalshiBookFeed
+from feeds.OrderbookStore import OrderbookStore
+
+PRIVATE_KEY = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+class FakeKalshiServer():
+    """
+    Local stand-in for the Kalshi WebSocket API. Every subscribe command gets a new sid and then
+    the next captured message sequence from `scripts`, with `{sid}` filled in.
+    """
+
+    def __init__(self, scripts: list[list[dict]]):
+        self.scripts = list(scripts)
+        self.commands = []
+        self.headers = []
+        self.next_sid = 1
+        self.server = None
+
+    async def __aenter__(self):
+        self.server = await serve(self._handler, "127.0.0.1", 0)
+        port = self.server.sockets[0].getsockname()[1]
+        self.url = f"ws://127.0.0.1:{port}"
+        return self
+
+    async def __aexit__(self, *exc):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _handler(self, ws):
+        self.headers.append(ws.request.headers)
+        async for raw in ws:
+            command = json.loads(raw)
+            self.commands.append(command)
+            if command["cmd"] != "subscribe":
+                continue
+            sid = self.next_sid
+            self.next_sid += 1
+            await ws.send(json.dumps({"id": command["id"], "type": "subscribed", "msg": {"channel": "orderbook_delta", "sid": sid}}))
+            script = self.scripts.pop(0) if self.scripts else []
+            for message in script:
+                await ws.send(json.dumps({**message, "sid": sid}))
+
+
+def snapshot(seq, ticker, yes, no):
+    return {"type": "orderbook_snapshot", "seq": seq, "msg": {"market_ticker": ticker, "yes": yes, "no": no}}
+
+
+def delta(seq, ticker, side, price, change):
+    return {"type": "orderbook_delta", "seq": seq, "msg": {"market_ticker": ticker, "side": side, "price": price, "delta": change}}
+
+
+async def wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not met before timeout")
+        await asyncio.sleep(0.005)
+
+
+class TestKalshiBookFeed(unittest.IsolatedAsyncioTestCase):
+
+    async def test_snapshot_and_deltas_are_normalized(self):
+        """
+        Test that a snapshot and deltas produce the same deci-cent x100 ladders as the REST adapter,
+        and that the handshake is signed.
+        """
+        # Arrange
+        script = [
+            snapshot(1, "KX-1", yes=[[40, 10], [42, 5]], no=[[55, 3]]),
+            delta(2, "KX-1", "yes", 42, -5),
+            delta(3, "KX-1", "no", 56, 7),
+            delta(4, "KX-1", "yes", 41, 2),
+        ]
+        store = OrderbookStore()
+        async with FakeKalshiServer([script]) as server:
+            feed = KalshiBookFeed(store, "key-id", PRIVATE_KEY, url=server.url)
+            feed.watch(["KX-1"])
+            task = asyncio.create_task(feed.run())
+
+            # Act
+            await wait_for(lambda: feed.messages_received >= 5)
+            orderbook = store.get_order_book("KX-1")
+            feed.stop()
+            await task
+
+        # Assert
+        self.assertEqual(orderbook.yes["bid"], [[400, 1000], [410, 200]])
+        self.assertEqual(orderbook.no["ask"], [[590, 200], [600, 1000]])
+        self.assertEqual(orderbook.no["bid"], [[550, 300], [560, 700]])
+        self.assertEqual(orderbook.yes["ask"], [[440, 700], [450, 300]])
+        self.assertEqual(server.commands[0]["params"], {"channels": ["orderbook_delta"], "market_tickers": ["KX-1"]})
+        self.assertEqual(server.headers[0]["KALSHI-ACCESS-KEY"], "key-id")
+        self.assertIn("KALSHI-ACCESS-SIGNATURE", server.headers[0])
+
+    async def test_sequence_gap_resubscribes_and_rebuilds_book(self):
+        """
+        Test that a missed seq drops the book, unsubscribes the broken sid and resubscribes,
+        and that the book is rebuilt from the fresh snapshot. Books are dropped again on stop.
+        """
+        # Arrange
+        broken = [
+            snapshot(1, "KX-1", yes=[[40, 10]], no=[]),
+            delta(2, "KX-1", "yes", 40, 5),
+            delta(4, "KX-1", "yes", 40, 100),
+            delta(5, "KX-1", "yes", 40, 100),
+        ]
+        fresh = [snapshot(1, "KX-1", yes=[[40, 20], [45, 1]], no=[])]
+        store = OrderbookStore()
+        async with FakeKalshiServer([broken, fresh]) as server:
+            feed = KalshiBookFeed(store, "key-id", PRIVATE_KEY, url=server.url)
+            feed.watch(["KX-1"])
+            task = asyncio.create_task(feed.run())
+
+            # Act
+            await wait_for(lambda: server.next_sid == 3 and store.get_order_book("KX-1") is not None)
+            orderbook = store.get_order_book("KX-1")
+            feed.stop()
+            await task
+
+        # Assert
+        self.assertEqual(feed.gaps_detected, 1)
+        self.assertEqual(orderbook.yes["bid"], [[400, 2000], [450, 100]])
+        self.assertEqual([c["cmd"] for c in server.commands], ["subscribe", "unsubscribe", "subscribe"])
+        self.assertEqual(server.commands[1]["params"], {"sids": [1]})
+
+    async def test_unwatch_updates_subscription(self):
+        """
+        Test that unwatching one of several tickers deletes it from the subscription and the store.
+        """
+        # Arrange
+        script = [
+            snapshot(1, "KX-1", yes=[[40, 10]], no=[]),
+            snapshot(2, "KX-2", yes=[[30, 10]], no=[]),
+        ]
+        store = OrderbookStore()
+        async with FakeKalshiServer([script]) as server:
+            feed = KalshiBookFeed(store, "key-id", PRIVATE_KEY, url=server.url)
+            feed.watch(["KX-1", "KX-2"])
+            task = asyncio.create_task(feed.run())
+            await wait_for(lambda: len(store) == 2)
+
+            # Act
+            feed.unwatch(["KX-2"])
+            await wait_for(lambda: len(server.commands) == 2)
+            market_ids = store.market_ids()
+            feed.stop()
+            await task
+
+        # Assert
+        self.assertEqual(market_ids, ["KX-1"])
+        self.assertEqual(len(store), 0)
+        self.assertEqual(server.commands[1]["params"], {"sids": [1], "market_tickers": ["KX-2"], "action": "delete_markets"})
+
+    async def test_replayed_deltas_throughput(self):
+        """
+        Test that a long captured delta sequence is applied in order and fast enough for a busy feed.
+        """
+        # Arrange
+        num_deltas = 20000
+        script = [snapshot(1, "KX-1", yes=[[p, 10] for p in range(1, 50)], no=[[p, 10] for p in range(1, 50)])]
+        for i in range(num_deltas):
+            side = "yes" if i % 2 else "no"
+            script.append(delta(i + 2, "KX-1", side, 1 + i % 49, 1 if i % 4 < 2 else -1))
+        store = OrderbookStore()
+        async with FakeKalshiServer([script]) as server:
+            feed = KalshiBookFeed(store, "key-id", PRIVATE_KEY, url=server.url)
+            feed.watch(["KX-1"])
+            task = asyncio.create_task(feed.run())
+
+            # Act
+            start = time.perf_counter()
+            await wait_for(lambda: feed.messages_received >= num_deltas + 2, timeout=60)
+            elapsed = time.perf_counter() - start
+            feed.stop()
+            await task
+
+        # Assert
+        print(f"Kalshi feed applied {num_deltas} deltas in {elapsed:.3f}s ({num_deltas / elapsed:.0f} msgs/s)")
+        self.assertEqual(feed.gaps_detected, 0)
+        self.assertEqual(store.events_applied, 1 + 2 * num_deltas)
+        self.assertGreater(num_deltas / elapsed, 2000)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,142 @@
+import asyncio
+import time
+import unittest
+from platforms.LatencyTracker import LatencyTracker, endpoint_key
+from platforms.RateLimiter import TokenBucket
+
+
+class SlowOnce:
+    """A request whose first call stalls for `stall` seconds and whose later calls answer after `delay`."""
+
+    def __init__(self, stall: float, delay: float = 0.01):
+        self.stall = stall
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.stall if self.calls == 1 else self.delay)
+        return f"answer {self.calls}"
+
+
+def primed(**kwargs) -> LatencyTracker:
+    tracker = LatencyTracker(min_samples=20, **kwargs)
+    for _ in range(100):
+        tracker.record("api.example.com/book", 0.01)
+    return tracker
+
+
+class TestLatencyTracker(unittest.IsolatedAsyncioTestCase):
+
+    def test_percentiles_and_timeouts_follow_the_samples(self):
+        """
+        Test that p50/p95/p99 come from the rolling window, and that the timeout is a multiple of
+        p99 within its bounds, unset until enough samples exist.
+        """
+        # Arrange
+        tracker = LatencyTracker(min_samples=20, timeout_multiplier=3, min_timeout_s=0.05, max_timeout_s=1)
+
+        # Act
+        before = tracker.timeout_for("k")
+        for i in range(1, 101):
+            tracker.record("k", i / 1000)
+
+        # Assert
+        self.assertIsNone(before)
+        p50, p95, p99 = tracker.percentiles("k")
+        self.assertAlmostEqual(p50, 0.050, places=3)
+        self.assertAlmostEqual(p95, 0.095, places=3)
+        self.assertAlmostEqual(p99, 0.099, places=3)
+        self.assertAlmostEqual(tracker.timeout_for("k"), 0.297, places=3)
+        self.assertEqual(endpoint_key("https://api.example.com/markets/X/orderbook", "/markets/{ticker}/orderbook"),
+                         "api.example.com/markets/{ticker}/orderbook")
+
+    async def test_slow_request_is_hedged_and_the_first_answer_wins(self):
+        """
+        Test that a request still outstanding at p95 gets a duplicate, and the fast duplicate's
+        answer is returned without waiting for the stalled original.
+        """
+        # Arrange
+        tracker = primed()
+        request = SlowOnce(stall=2.0)
+
+        # Act
+        start = time.monotonic()
+        result = await tracker.run("api.example.com/book", request, can_hedge=lambda: True)
+        elapsed = time.monotonic() - start
+
+        # Assert
+        self.assertEqual(result, "answer 2")
+        self.assertLess(elapsed, 0.3)
+        stats = tracker.stats()["api.example.com/book"]
+        self.assertEqual((stats["hedged"], stats["hedge_wins"]), (1, 1))
+
+    async def test_attempts_beaten_by_a_hedge_still_count(self):
+        """
+        Test that when hedges keep winning, the stalled originals they replace are recorded for
+        as long as they ran, so the percentiles do not drop to the hedges' fast answers.
+        """
+        # Arrange
+        tracker = LatencyTracker(min_samples=20, min_timeout_s=5, max_hedge_ratio=1)
+        for i in range(1, 101):
+            tracker.record("api.example.com/book", i / 10000)
+        before = tracker.percentiles("api.example.com/book")
+
+        # Act
+        for _ in range(20):
+            await tracker.run("api.example.com/book", SlowOnce(stall=2.0, delay=0.001), can_hedge=lambda: True)
+        # Let the cancelled originals finish unwinding.
+        await asyncio.sleep(0)
+        after = tracker.percentiles("api.example.com/book")
+
+        # Assert
+        self.assertEqual(tracker.stats()["api.example.com/book"]["hedge_wins"], 20)
+        for percentile_before, percentile_after in zip(before, after):
+            self.assertGreaterEqual(percentile_after, percentile_before)
+
+    async def test_no_hedge_without_a_free_token_and_stalls_time_out(self):
+        """
+        Test that no duplicate is sent when the rate limiter has no token free, and that the
+        request is then cut off at its latency-based timeout instead of stalling the caller.
+        """
+        # Arrange
+        tracker = primed(min_timeout_s=0.2)
+        bucket = TokenBucket("TEST:market_data", rate=1, burst=1)
+        bucket.acquire()  # the original request's token; nothing is left for a hedge
+        request = SlowOnce(stall=2.0)
+
+        # Act
+        start = time.monotonic()
+        with self.assertRaises(TimeoutError):
+            await tracker.run("api.example.com/book", request, can_hedge=bucket.try_acquire)
+        elapsed = time.monotonic() - start
+
+        # Assert
+        self.assertEqual(request.calls, 1)
+        self.assertAlmostEqual(elapsed, 0.2, delta=0.1)
+        await asyncio.sleep(0)
+        self.assertEqual(tracker.stats()["api.example.com/book"]["timeouts"], 1)
+        self.assertAlmostEqual(tracker._endpoint("api.example.com/book").samples[-1], 0.2, delta=0.1)
+
+    async def test_hedges_are_capped_to_a_share_of_requests(self):
+        """
+        Test that once hedges reach max_hedge_ratio of an endpoint's requests, slow requests
+        wait for their own answer instead of being duplicated.
+        """
+        # Arrange
+        tracker = primed(max_hedge_ratio=0.25, min_timeout_s=5)
+        requests = [SlowOnce(stall=0.1) for _ in range(8)]
+
+        # Act
+        for request in requests:
+            await tracker.run("api.example.com/book", request, can_hedge=lambda: True)
+
+        # Assert
+        stats = tracker.stats()["api.example.com/book"]
+        self.assertEqual(stats["requests"], 8)
+        self.assertEqual(stats["hedged"], 2)
+        self.assertEqual(sum(request.calls for request in requests), 8 + 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,150 @@
+import os
+import tempfile
+import unittest
+from db.MarketCatalog import MarketCatalog
+
+
+def gamma_market(i):
+    return {
+        "id": str(i),
+        "conditionId": f"0x{i}",
+        "question": f"Question {i}?",
+        "description": f"Rules {i}",
+        "endDate": "2030-01-01T00:00:00Z",
+        "clobTokenIds": f'["yes-{i}", "no-{i}"]',
+    }
+
+
+class FakeGamma:
+    """Market list ordered by descending ID, as `order=id&ascending=false` returns it."""
+
+    def __init__(self, ids):
+        self.markets = [gamma_market(i) for i in sorted(ids, reverse=True)]
+        self.page_requests = []
+        self.id_requests = []
+
+    def add(self, ids):
+        self.markets = [gamma_market(i) for i in sorted(ids, reverse=True)] + self.markets
+
+    def fetch_page(self, offset, limit):
+        self.page_requests.append(offset)
+        return self.markets[offset:offset + limit]
+
+    def fetch_by_ids(self, condition_ids):
+        self.id_requests.append(list(condition_ids))
+        wanted = set(condition_ids)
+        return [m for m in self.markets if m["conditionId"] in wanted]
+
+
+class TestMarketCatalog(unittest.TestCase):
+
+    def test_incremental_sync_stops_at_high_water_mark(self):
+        """
+        Test that the first sync walks the whole list and later syncs only fetch new pages.
+        """
+        # Arrange
+        gamma = FakeGamma(range(1, 26))
+        catalog = MarketCatalog(":memory:", gamma.fetch_page, gamma.fetch_by_ids, page_size=10)
+
+        # Act
+        first = catalog.sync()
+        first_requests = list(gamma.page_requests)
+        gamma.add(range(26, 30))
+        gamma.page_requests.clear()
+        second = catalog.sync()
+
+        # Assert
+        self.assertEqual(first, 25)
+        self.assertEqual(first_requests, [0, 10, 20])
+        self.assertEqual(second, 4)
+        self.assertEqual(gamma.page_requests, [0])
+        self.assertEqual(catalog.high_water_mark(), 29)
+        self.assertEqual(len(catalog), 29)
+
+    def test_markets_stored_outside_sync_do_not_move_its_cursor(self):
+        """
+        Test that a newer market stored by a lookup does not make the next sync skip the older
+        new markets it has not reached yet.
+        """
+        # Arrange
+        gamma = FakeGamma(range(1, 11))
+        catalog = MarketCatalog(":memory:", gamma.fetch_page, gamma.fetch_by_ids, page_size=10)
+        catalog.sync()
+        gamma.add(range(11, 21))
+
+        # Act
+        catalog.get_markets(["0x20"])
+        mark_after_lookup = catalog.high_water_mark()
+        stored = catalog.sync()
+
+        # Assert
+        self.assertEqual(mark_after_lookup, 10)
+        self.assertEqual(stored, 10)
+        self.assertEqual(len(catalog), 20)
+        self.assertEqual(catalog.high_water_mark(), 20)
+
+    def test_get_markets_is_a_local_lookup_with_targeted_fallback(self):
+        """
+        Test that known markets never hit Gamma, misses are fetched together in one request,
+        unknown IDs are left out and the result keeps the request order.
+        """
+        # Arrange
+        gamma = FakeGamma(range(1, 11))
+        catalog = MarketCatalog(":memory:", gamma.fetch_page, gamma.fetch_by_ids)
+        catalog.upsert(gamma.markets[5:])   # IDs 5..1
+
+        # Act
+        markets = catalog.get_markets(["0x9", "0x2", "0xmissing", "0x7"])
+        again = catalog.get_markets(["0x9", "0x7"])
+
+        # Assert
+        self.assertEqual([m.market_id for m in markets], ["0x9", "0x2", "0x7"])
+        self.assertEqual(markets[1].name, "Question 2?")
+        self.assertEqual(markets[1].rules, "Rules 2")
+        self.assertEqual(gamma.id_requests, [["0x9", "0xmissing", "0x7"]])
+        self.assertEqual([m.market_id for m in again], ["0x9", "0x7"])
+        self.assertEqual(gamma.page_requests, [])
+
+    def test_catalog_persists_and_opens_lazily(self):
+        """
+        Test that the catalog file is only opened on first use and survives a restart.
+        """
+        # Arrange
+        gamma = FakeGamma(range(1, 4))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "markets.sqlite3")
+            catalog = MarketCatalog(path, gamma.fetch_page, gamma.fetch_by_ids)
+            self.assertFalse(os.path.exists(path))
+            catalog.sync()
+
+            # Act
+            restarted = MarketCatalog(path, gamma.fetch_page, gamma.fetch_by_ids)
+            markets = restarted.get_markets(["0x1", "0x3"])
+
+        # Assert
+        self.assertEqual([m.market_id for m in markets], ["0x1", "0x3"])
+        self.assertEqual(gamma.id_requests, [])
+
+    def test_background_sync(self):
+        """
+        Test that the background thread syncs without the caller waiting on it and stops cleanly.
+        """
+        # Arrange
+        gamma = FakeGamma(range(1, 6))
+        catalog = MarketCatalog(":memory:", gamma.fetch_page, gamma.fetch_by_ids)
+
+        # Act
+        thread = catalog.start_background_sync(interval_s=0.01)
+        for _ in range(500):
+            if len(catalog) == 5:
+                break
+            thread.join(0.01)
+        catalog.stop_background_sync()
+
+        # Assert
+        self.assertEqual(len(catalog), 5)
+        self.assertFalse(thread.is_alive())
+
+
+if __name__ == '__main__':
+    unittest.main()
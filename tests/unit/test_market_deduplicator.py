@@ -0,0 +1,121 @@
+import unittest
+from unittest.mock import patch
+from cache.MarketDeduplicator import MarketDeduplicator
+from models.Market import Market
+from models.PlatformType import PlatformType
+from platforms import TestPlatform as test_platform
+from services.market_poller.main import MarketPollingService
+
+
+class FakeRedis:
+    """Just enough of a redis-py client for string keys with expiry."""
+
+    def __init__(self):
+        self.data = {}
+        self.expiry = {}
+
+    def mget(self, keys):
+        return [self.data.get(key) for key in keys]
+
+    def pipeline(self, transaction=True):
+        return self
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+        self.expiry[key] = ex
+
+    def execute(self):
+        return []
+
+
+class FakePlatform(test_platform.TestPlatform):
+    def __init__(self, platform_type, markets):
+        self.PLATFORM = platform_type
+        self.markets = {m.market_id: m for m in markets}
+
+    def find_new_markets(self, num_markets):
+        return list(self.markets)[:num_markets]
+
+    def get_markets(self, market_ids):
+        return [self.markets[market_id] for market_id in market_ids]
+
+
+def market(market_id, name="Will it rain?", platform=PlatformType.KALSHI):
+    return Market(platform=platform, market_id=market_id, name=name, rules="Rules", close_timestamp=1700000000)
+
+
+class TestMarketDeduplicator(unittest.TestCase):
+
+    def test_only_new_or_changed_markets_pass(self):
+        """
+        Test that seen markets are suppressed until their content changes, and that the same ID
+        on another platform is a different market.
+        """
+        # Arrange
+        redis_client = FakeRedis()
+        deduplicator = MarketDeduplicator(redis_client, ttl_s=60)
+        deduplicator.mark_seen([market("A"), market("B")])
+
+        # Act
+        fresh = deduplicator.filter_new([
+            market("A"),
+            market("B", name="Will it snow?"),
+            market("C"),
+            market("A", platform=PlatformType.POLYMARKET),
+        ])
+
+        # Assert
+        self.assertEqual([(m.platform, m.market_id) for m in fresh], [
+            (PlatformType.KALSHI, "B"), (PlatformType.KALSHI, "C"), (PlatformType.POLYMARKET, "A"),
+        ])
+        self.assertEqual(set(redis_client.expiry.values()), {60})
+
+    def test_redis_failure_passes_everything_through(self):
+        """
+        Test that an unavailable Redis never suppresses markets.
+        """
+        # Arrange
+        class BrokenRedis:
+            def mget(self, keys):
+                raise ConnectionError("redis down")
+
+        deduplicator = MarketDeduplicator(BrokenRedis())
+
+        # Act
+        fresh = deduplicator.filter_new([market("A"), market("B")])
+
+        # Assert
+        self.assertEqual([m.market_id for m in fresh], ["A", "B"])
+
+    @patch('services.market_poller.main.DBManager')
+    @patch('services.market_poller.main.RedisManager')
+    @patch('services.market_poller.main.TestPlatform')
+    @patch('services.market_poller.main.PolyMarketPlatform')
+    @patch('services.market_poller.main.KalshiPlatform')
+    def test_poller_publishes_each_market_once(self, MockKalshiPlatform, MockPolyMarketPlatform, MockTestPlatform, MockRedisManager, MockDBManager):
+        """
+        Test that a second poll cycle over the same markets publishes nothing and reports them as suppressed.
+        """
+        # Arrange
+        mock_redis_manager = MockRedisManager.return_value
+        mock_redis_manager.redis_client = FakeRedis()
+        mock_redis_manager.add_many_to_stream.side_effect = lambda stream_name, messages: [f"{i}-0" for i, _ in enumerate(messages, 1)]
+        MockKalshiPlatform.return_value = FakePlatform(PlatformType.KALSHI, [market("A"), market("B")])
+        MockPolyMarketPlatform.return_value = FakePlatform(PlatformType.POLYMARKET, [])
+        MockTestPlatform.return_value = FakePlatform(PlatformType.TEST, [])
+        service = MarketPollingService()
+
+        # Act
+        service.poll_markets()
+        published_first = mock_redis_manager.add_many_to_stream.call_args_list[:]
+        service.poll_markets()
+
+        # Assert
+        self.assertEqual(len(published_first), 1)
+        self.assertEqual([m["market_id"] for m in published_first[0].args[1]], ["A", "B"])
+        self.assertEqual(mock_redis_manager.add_many_to_stream.call_count, 1)
+        self.assertEqual(service.suppressed_last_cycle, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,222 @@
+import asyncio
+import json
+import time
+import unittest
+from aiohttp import web
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cache.TokenIdCache import TokenIdCache
+from db.MarketCatalog import MarketCatalog
+from platforms.BasePlatform import collect
+from platforms.KalshiPlatform import KalshiPlatform
+from platforms.PolyMarketPlatform import PolyMarketPlatform
+
+
+class FakeListing:
+    """Local stand-in for the Gamma and Kalshi /markets listings, with per-request latency."""
+
+    def __init__(self, num_markets: int, delay: float = 0.0):
+        self.num_markets = num_markets
+        self.delay = delay
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def __aenter__(self):
+        app = web.Application()
+        app.router.add_get("/gamma/markets", self._gamma)
+        app.router.add_get("/kalshi/markets", self._kalshi)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}"
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.runner.cleanup()
+
+    async def _slow(self):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+
+    async def _gamma(self, request):
+        offset, limit = int(request.query["offset"]), int(request.query["limit"])
+        self.requests.append((offset, limit))
+        await self._slow()
+        ids = range(self.num_markets - offset, max(self.num_markets - offset - limit, 0), -1)
+        return web.json_response([{
+            "id": str(i),
+            "conditionId": f"0x{i}",
+            "question": f"Question {i}?",
+            "description": "",
+            "endDate": "2030-01-01T00:00:00Z",
+            "endDateIso": "2030-01-01",
+            "clobTokenIds": json.dumps([f"yes-{i}", f"no-{i}"]),
+        } for i in ids])
+
+    async def _kalshi(self, request):
+        start, limit = int(request.query.get("cursor") or 0), int(request.query["limit"])
+        self.requests.append((start, limit))
+        await self._slow()
+        end = min(start + limit, self.num_markets)
+        return web.json_response({
+            "markets": [{"ticker": f"KX-{i}"} for i in range(start, end)],
+            "cursor": str(end) if end < self.num_markets else "",
+        })
+
+
+def polymarket(url):
+    platform = PolyMarketPlatform.__new__(PolyMarketPlatform)
+    platform.base_url = f"{url}/gamma"
+    platform.token_ids = TokenIdCache(lambda ids: {})
+    platform.catalog = MarketCatalog(":memory:", lambda offset, limit: [], lambda ids: [])
+    return platform
+
+
+def kalshi(url):
+    platform = KalshiPlatform.__new__(KalshiPlatform)
+    platform.base_url = f"{url}/kalshi"
+    platform.key_id = "key-id"
+    platform.private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    return platform
+
+
+class TestMarketDiscovery(unittest.IsolatedAsyncioTestCase):
+
+    async def test_polymarket_prefetches_pages_with_bounded_concurrency(self):
+        """
+        Test that pages are fetched concurrently, never more than the bound at once, and that
+        exactly num_markets IDs are yielded newest first.
+        """
+        # Arrange
+        async with FakeListing(num_markets=20000, delay=0.2) as listing:
+            platform = polymarket(listing.url)
+
+            # Act
+            start = time.perf_counter()
+            market_ids = await collect(platform.iter_new_markets(12345, concurrency=8))
+            elapsed = time.perf_counter() - start
+
+        # Assert
+        print(f"\nDiscovered {len(market_ids)} markets in {elapsed:.2f}s ({len(listing.requests)} pages)")
+        self.assertEqual(len(market_ids), 12345)
+        self.assertEqual(market_ids[:2], ["0x20000", "0x19999"])
+        self.assertEqual(len(set(market_ids)), 12345)
+        self.assertEqual(len(listing.requests), 25)
+        self.assertEqual(listing.max_in_flight, 8)
+        self.assertLess(elapsed, 25 * 0.2 / 2)
+        self.assertEqual(platform.token_ids.get("0x20000"), ["yes-20000", "no-20000"])
+        self.assertEqual(len(platform.catalog.lookup(["0x20000", "0x7656"])), 2)
+
+    async def test_polymarket_catalog_writes_do_not_block_the_event_loop(self):
+        """
+        Test that a slow catalog write for a fetched page runs off the event loop, so other
+        work on the loop keeps running while it is in progress.
+        """
+        # Arrange
+        async with FakeListing(num_markets=20000) as listing:
+            platform = polymarket(listing.url)
+            upsert = platform.catalog.upsert
+
+            def slow_upsert(markets):
+                time.sleep(0.3)
+                return upsert(markets)
+
+            platform.catalog.upsert = slow_upsert
+            gaps = []
+
+            async def tick():
+                last = time.perf_counter()
+                while True:
+                    await asyncio.sleep(0.01)
+                    now = time.perf_counter()
+                    gaps.append(now - last)
+                    last = now
+
+            ticker = asyncio.create_task(tick())
+
+            # Act
+            market_ids = await collect(platform.iter_new_markets(3))
+            ticker.cancel()
+
+        # Assert
+        self.assertEqual(len(market_ids), 3)
+        self.assertLess(max(gaps), 0.15)
+        self.assertEqual(len(platform.catalog.lookup(["0x20000"])), 1)
+
+    async def test_polymarket_small_requests_use_a_small_page(self):
+        """
+        Test that the requested limit is sent instead of always asking for 500 markets.
+        """
+        # Arrange
+        async with FakeListing(num_markets=20000) as listing:
+            platform = polymarket(listing.url)
+
+            # Act
+            market_ids = await collect(platform.iter_new_markets(3))
+
+        # Assert
+        self.assertEqual(market_ids, ["0x20000", "0x19999", "0x19998"])
+        self.assertEqual(listing.requests, [(0, 3)])
+
+    async def test_polymarket_stops_at_end_of_list(self):
+        """
+        Test that discovery ends when the listing runs out, without requesting beyond it.
+        """
+        # Arrange
+        async with FakeListing(num_markets=1200) as listing:
+            platform = polymarket(listing.url)
+
+            # Act
+            market_ids = await collect(platform.iter_new_markets(5000, concurrency=2))
+
+        # Assert
+        self.assertEqual(len(market_ids), 1200)
+        self.assertLessEqual(max(offset for offset, _ in listing.requests), 1500)
+
+    async def test_early_stop_cancels_prefetched_pages(self):
+        """
+        Test that closing the generator early cancels the pages still in flight.
+        """
+        # Arrange
+        async with FakeListing(num_markets=20000, delay=0.2) as listing:
+            platform = polymarket(listing.url)
+            iterator = platform.iter_new_markets(20000, concurrency=4)
+
+            # Act
+            first = await iterator.__anext__()
+            await iterator.aclose()
+            await asyncio.sleep(0.05)
+
+        # Assert
+        self.assertEqual(first, "0x20000")
+        self.assertEqual(listing.in_flight, 0)
+
+    async def test_kalshi_follows_cursor_until_exhausted(self):
+        """
+        Test that the cursor walk stops on an empty cursor and honors num_markets exactly.
+        """
+        # Arrange
+        async with FakeListing(num_markets=2500) as listing:
+            platform = kalshi(listing.url)
+
+            # Act
+            everything = await collect(platform.iter_new_markets(10000))
+            requests_for_everything = list(listing.requests)
+            listing.requests.clear()
+            some = await collect(platform.iter_new_markets(1500))
+
+        # Assert
+        self.assertEqual(len(everything), 2500)
+        self.assertEqual(requests_for_everything, [(0, 1000), (1000, 1000), (2000, 1000)])
+        self.assertEqual(some, [f"KX-{i}" for i in range(1500)])
+        self.assertEqual(listing.requests, [(0, 1000), (1000, 500)])
+
+
+if __name__ == '__main__':
+    unittest.main()
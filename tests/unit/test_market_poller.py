@@ -1,12 +1,73 @@
 from services.market_poller.main import MarketPollingService
+from models.Market import Market
+from models.PlatformType import PlatformType
+from platforms import TestPlatform as test_platform
+from unittest.mock import patch
+import asyncio
+import os
+import threading
+import time
 import unittest
 
 class SpyRedisManager:
     def __init__(self):
         self.calls = []
+        self.round_trips = 0
+
+    def add_many_to_stream(self, stream_name, messages, maxlen=None, batch_size=500):
+        self.round_trips += 1
+        message_ids = []
+        for data in messages:
+            self.calls.append({"stream_name": stream_name, "data": data})
+            message_ids.append(f"{len(self.calls)}-0")
+        return message_ids
+
+class SlowPlatform(test_platform.TestPlatform):
+    """Platform whose discovery takes `delay` seconds per batch of markets, or raises."""
+
+    def __init__(self, platform_type, num_markets, delay=0.0, error=None):
+        self.PLATFORM = platform_type
+        self.num_markets = num_markets
+        self.delay = delay
+        self.error = error
+
+    def find_new_markets(self, num_markets):
+        time.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return [f"{self.PLATFORM.value}-{i}" for i in range(min(num_markets, self.num_markets))]
+
+    def get_markets(self, market_ids):
+        return [Market(self.PLATFORM, market_id, market_id, "", 0) for market_id in market_ids]
+
+
+class HangingPlatform(SlowPlatform):
+    """Platform whose discovery yields a few markets and then never finishes."""
+
+    def __init__(self, platform_type, num_markets):
+        super().__init__(platform_type, num_markets)
+        self.cancelled = threading.Event()
+
+    async def iter_new_markets(self, num_markets):
+        for market_id in self.find_new_markets(num_markets):
+            yield market_id
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            self.cancelled.set()
+            raise
+
+
+class LockedSpyRedisManager(SpyRedisManager):
+    def __init__(self):
+        super().__init__()
+        self.lock = threading.Lock()
+        self.redis_client = None
+
+    def add_many_to_stream(self, stream_name, messages, maxlen=None, batch_size=500):
+        with self.lock:
+            return super().add_many_to_stream(stream_name, messages, maxlen, batch_size)
 
-    def add_to_stream(self, stream_name, data):
-        self.calls.append({"stream_name": stream_name, "data": data})
 
 class TestMarketPoller(unittest.TestCase):
     def test_poll_markets_with_real_platforms(self):
@@ -37,5 +98,133 @@ class TestMarketPoller(unittest.TestCase):
     
         print(f"\nSuccessfully streamed {len(spy_redis_manager.calls)} markets.")
 
+    def _service(self, *platforms):
+        with patch('services.market_poller.main.RedisManager', return_value=LockedSpyRedisManager()), \
+             patch('services.market_poller.main.DBManager'), \
+             patch('services.market_poller.main.KalshiPlatform', return_value=platforms[0]), \
+             patch('services.market_poller.main.PolyMarketPlatform', return_value=platforms[1]), \
+             patch('services.market_poller.main.TestPlatform', return_value=platforms[2]):
+            service = MarketPollingService()
+        service.deduplicator.filter_new = lambda markets: list(markets)
+        service.deduplicator.mark_seen = lambda markets: None
+        return service
+
+    def test_markets_whose_publish_failed_are_not_marked_seen(self):
+        """
+        Test that markets in a stream batch that failed are not marked seen, so they are
+        published again on the next cycle instead of being suppressed.
+        """
+        # Arrange
+        service = self._service(*(SlowPlatform(platform_type, 0) for platform_type in (PlatformType.KALSHI, PlatformType.POLYMARKET, PlatformType.TEST)))
+        markets = [Market(PlatformType.KALSHI, f"K{i}", f"K{i}", "", 0) for i in range(4)]
+        service.redis_manager.add_many_to_stream = lambda stream_name, messages, maxlen=None, batch_size=500: ["1-0", "2-0", None, None]
+        seen = []
+        service.deduplicator.mark_seen = seen.extend
+
+        # Act
+        streamed, suppressed = service._publish(markets)
+
+        # Assert
+        self.assertEqual((streamed, suppressed), (2, 0))
+        self.assertEqual([market.market_id for market in seen], ["K0", "K1"])
+
+    def test_platforms_are_polled_concurrently(self):
+        """
+        Test that cycle latency is the slowest platform's, not the sum, and that each platform's
+        timing is reported.
+        """
+        # Arrange
+        service = self._service(
+            SlowPlatform(PlatformType.KALSHI, 5, delay=0.3),
+            SlowPlatform(PlatformType.POLYMARKET, 5, delay=0.3),
+            SlowPlatform(PlatformType.TEST, 5, delay=0.3),
+        )
+
+        # Act
+        start = time.perf_counter()
+        results = service.poll_markets()
+        elapsed = time.perf_counter() - start
+
+        # Assert
+        self.assertLess(elapsed, 0.6)
+        self.assertEqual(len(service.redis_manager.calls), 15)
+        self.assertEqual(set(results), {"KALSHI", "POLYMARKET", "TEST"})
+        for stats in results.values():
+            self.assertEqual(stats["streamed"], 5)
+            self.assertGreaterEqual(stats["seconds"], 0.3)
+
+    def test_failing_and_slow_platforms_are_isolated(self):
+        """
+        Test that one platform raising and another exceeding its timeout do not stop the rest
+        from publishing.
+        """
+        # Arrange
+        service = self._service(
+            SlowPlatform(PlatformType.KALSHI, 5, error=RuntimeError("venue down")),
+            SlowPlatform(PlatformType.POLYMARKET, 5, delay=1.0),
+            SlowPlatform(PlatformType.TEST, 3),
+        )
+
+        # Act
+        with patch.dict(os.environ, {"POLL_TIMEOUT_S_POLYMARKET": "0.2"}):
+            start = time.perf_counter()
+            results = service.poll_markets()
+            elapsed = time.perf_counter() - start
+
+        # Assert
+        self.assertLess(elapsed, 0.8)
+        self.assertEqual(results["KALSHI"]["error"], "venue down")
+        self.assertEqual(results["POLYMARKET"]["error"], "timeout")
+        self.assertEqual(results["TEST"]["streamed"], 3)
+        self.assertEqual([call["data"]["market_id"] for call in service.redis_manager.calls], ["TEST-0", "TEST-1", "TEST-2"])
+        service.in_flight["POLYMARKET"].result()
+
+    def test_hung_platform_is_timed_out_and_cancelled_on_the_run_path(self):
+        """
+        Test that a platform cycle started the way `run` starts it is cancelled at its timeout,
+        reported as such, and that suppressed counts are kept without going through poll_markets.
+        """
+        # Arrange
+        hanging = HangingPlatform(PlatformType.POLYMARKET, 2)
+        service = self._service(SlowPlatform(PlatformType.KALSHI, 3), hanging, SlowPlatform(PlatformType.TEST, 0))
+        service.deduplicator.filter_new = lambda markets: list(markets)[1:]
+
+        # Act
+        with patch.dict(os.environ, {"POLL_TIMEOUT_S_POLYMARKET": "0.2", "POLL_PUBLISH_BATCH_SIZE": "1"}):
+            start = time.perf_counter()
+            stats = service._submit(hanging).result(timeout=5)
+            elapsed = time.perf_counter() - start
+            service._submit(service.platforms[0]).result(timeout=5)
+
+        # Assert
+        self.assertLess(elapsed, 1.0)
+        self.assertEqual((stats["error"], stats["found"]), ("timeout", 2))
+        self.assertTrue(hanging.cancelled.wait(1))
+        self.assertEqual(service.suppressed, {"POLYMARKET": 2, "KALSHI": 3})
+        self.assertEqual(service.suppressed_last_cycle, 5)
+
+    def test_results_stream_in_batches(self):
+        """
+        Test that markets are published batch by batch as discovery yields them.
+        """
+        # Arrange
+        service = self._service(
+            SlowPlatform(PlatformType.KALSHI, 250),
+            SlowPlatform(PlatformType.POLYMARKET, 0),
+            SlowPlatform(PlatformType.TEST, 0),
+        )
+        batches = []
+        publish = service._publish
+        service._publish = lambda found: batches.append(len(found)) or publish(found)
+
+        # Act
+        with patch.dict(os.environ, {"POLL_NUM_MARKETS": "250", "POLL_PUBLISH_BATCH_SIZE": "100"}):
+            service.poll_markets()
+
+        # Assert
+        self.assertEqual(sorted(batches), [50, 100, 100])
+        self.assertEqual(len(service.redis_manager.calls), 250)
+        self.assertEqual(service.redis_manager.round_trips, 3)
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -43,9 +43,9 @@ class TestMarketSimilarityService(unittest.TestCase):
         service.process_market_events()
 
         # Assert
-        mock_redis.add_to_stream.assert_called_once()
+        mock_redis.add_many_to_stream.assert_called_once()
         mock_db.add_market_pairs.assert_called_once()
-        mock_redis.acknowledge_message.assert_called_with(service.input_stream_name, service.group_name, message_id)
+        mock_redis.acknowledge_messages.assert_called_with(service.input_stream_name, service.group_name, [message_id])
 
     @patch('services.market_similarity.main.RedisManager')
     @patch('services.market_similarity.main.DBManager')
@@ -72,9 +72,9 @@ class TestMarketSimilarityService(unittest.TestCase):
         service.process_market_events()
 
         # Assert
-        mock_redis.add_to_stream.assert_not_called()
+        mock_redis.add_many_to_stream.assert_not_called()
         mock_db.add_market_pairs.assert_not_called()
-        mock_redis.acknowledge_message.assert_called_with(service.input_stream_name, service.group_name, message_id)
+        mock_redis.acknowledge_messages.assert_called_with(service.input_stream_name, service.group_name, [message_id])
 
     @patch('services.market_similarity.main.RedisManager')
     @patch('services.market_similarity.main.DBManager')
@@ -115,9 +115,9 @@ class TestMarketSimilarityService(unittest.TestCase):
         service.process_market_events()
 
         # Assert
-        mock_redis.add_to_stream.assert_not_called()
+        mock_redis.add_many_to_stream.assert_not_called()
         mock_db.add_market_pairs.assert_not_called()
-        mock_redis.acknowledge_message.assert_called_with(service.input_stream_name, service.group_name, message_id)
+        mock_redis.acknowledge_messages.assert_called_with(service.input_stream_name, service.group_name, [message_id])
 
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
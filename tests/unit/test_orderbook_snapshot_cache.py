@@ -0,0 +1,217 @@
+import asyncio
+import threading
+import time
+import unittest
+from cache.OrderbookSnapshotCache import OrderbookSnapshotCache
+from models.Orderbook import Orderbook
+from models.PlatformType import PlatformType
+
+
+def book(market_id, yes_ask=400):
+    return Orderbook(
+        market_id=market_id, timestamp=123,
+        yes={"bid": [[380, 4], [390, 2]], "ask": [[yes_ask, 10], [yes_ask + 10, 5]]},
+        no={"bid": [[560, 3]], "ask": [[600, 7]]},
+    )
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def set(self, key, value, nx=False, px=None):
+        self.commands.append((key, value, nx))
+        return self
+
+    def execute(self):
+        return [self.redis.set(key, value, nx=nx) for key, value, nx in self.commands]
+
+
+class FakeRedis:
+    """The part of the redis-py client the cache uses, keeping bytes values in a dict."""
+
+    def __init__(self):
+        self.data = {}
+        self.lock = threading.Lock()
+        self.calls = 0
+
+    def set(self, key, value, nx=False, px=None):
+        with self.lock:
+            self.calls += 1
+            if nx and key in self.data:
+                return None
+            self.data[key] = value if isinstance(value, bytes) else str(value).encode()
+            return True
+
+    def mget(self, keys):
+        with self.lock:
+            self.calls += 1
+            return [self.data.get(key) for key in keys]
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def register_script(self, script):
+        def release(keys, args):
+            with self.lock:
+                self.calls += 1
+                token = args[0].encode()
+                released = [key for key in keys if self.data.get(key) == token]
+                for key in released:
+                    del self.data[key]
+                return len(released)
+        return release
+
+
+class DownRedis(FakeRedis):
+    def mget(self, keys):
+        self.calls += 1
+        raise ConnectionError("Connection refused")
+
+    def pipeline(self, transaction=True):
+        self.calls += 1
+        raise ConnectionError("Connection refused")
+
+
+class CountingFetch:
+    def __init__(self, delay_s=0.0, missing=()):
+        self.calls = []
+        self.delay_s = delay_s
+        self.missing = set(missing)
+
+    def __call__(self, market_ids):
+        self.calls.append(list(market_ids))
+        time.sleep(self.delay_s)
+        return [book(market_id) for market_id in market_ids if market_id not in self.missing]
+
+    async def afetch(self, market_ids):
+        self.calls.append(list(market_ids))
+        await asyncio.sleep(self.delay_s)
+        return [book(market_id) for market_id in market_ids if market_id not in self.missing]
+
+
+class TestOrderbookSnapshotCache(unittest.TestCase):
+
+    def test_snapshots_round_trip_and_respect_max_age(self):
+        """
+        Test that a stored book decodes to the same ladders with its fetch time, and that reads
+        leave out snapshots older than the requested age.
+        """
+        # Arrange
+        cache = OrderbookSnapshotCache(FakeRedis())
+        now_ms = int(time.time() * 1000)
+
+        # Act
+        cache.write(PlatformType.KALSHI, [book("K-OLD")], fetched_at_ms=now_ms - 5000)
+        cache.write(PlatformType.KALSHI, [book("K-NEW")], fetched_at_ms=now_ms)
+        decoded, fetched_at_ms = cache.decode("K-NEW", cache.redis_client.data[cache.key(PlatformType.KALSHI, "K-NEW")])
+        fresh = cache.read(PlatformType.KALSHI, ["K-OLD", "K-NEW", "K-NONE"], max_age_ms=1000)
+        any_age = cache.read(PlatformType.KALSHI, ["K-OLD", "K-NEW"])
+
+        # Assert
+        self.assertEqual(fetched_at_ms, now_ms)
+        self.assertEqual((decoded.market_id, decoded.timestamp), ("K-NEW", 123))
+        self.assertEqual((decoded.yes, decoded.no), (book("K-NEW").yes, book("K-NEW").no))
+        self.assertEqual(list(fresh), ["K-NEW"])
+        self.assertEqual(sorted(any_age), ["K-NEW", "K-OLD"])
+
+    def test_fresh_books_are_served_and_the_rest_fetched_once(self):
+        """
+        Test that get_many fetches only books missing from the cache, in one call, returns them
+        in input order without unfetchable ones, and serves the next read from the cache.
+        """
+        # Arrange
+        cache = OrderbookSnapshotCache(FakeRedis())
+        cache.write(PlatformType.POLYMARKET, [book("P2")])
+        fetch = CountingFetch(missing={"P4"})
+
+        # Act
+        first = cache.get_many(PlatformType.POLYMARKET, ["P1", "P2", "P3", "P4"], fetch, max_age_ms=1000)
+        second = cache.get_many(PlatformType.POLYMARKET, ["P3", "P1"], fetch, max_age_ms=1000)
+
+        # Assert
+        self.assertEqual([ob.market_id for ob in first], ["P1", "P2", "P3"])
+        self.assertEqual([ob.market_id for ob in second], ["P3", "P1"])
+        self.assertEqual(fetch.calls, [["P1", "P3", "P4"]])
+        self.assertEqual(cache.stats(), {"hits": 3, "fetched": 2, "waited": 0})
+        self.assertEqual([key for key in cache.redis_client.data if key.startswith("lock:")], [])
+
+    def test_only_one_process_fetches_a_book_at_a_time(self):
+        """
+        Test that when another process holds a book's fetch lock, get_many waits for its write
+        instead of fetching, and fetches the book itself if the write never comes.
+        """
+        # Arrange
+        redis = FakeRedis()
+        other = OrderbookSnapshotCache(redis)
+        cache = OrderbookSnapshotCache(redis, wait_ms=500, poll_ms=5)
+        redis.set(f"lock:{cache.key(PlatformType.KALSHI, 'K1')}", "other-token")
+        redis.set(f"lock:{cache.key(PlatformType.KALSHI, 'K2')}", "other-token")
+        threading.Timer(0.05, lambda: other.write(PlatformType.KALSHI, [book("K1", yes_ask=420)])).start()
+        fetch = CountingFetch()
+
+        # Act
+        started = time.monotonic()
+        books = cache.get_many(PlatformType.KALSHI, ["K1", "K2"], fetch, max_age_ms=1000)
+        elapsed = time.monotonic() - started
+
+        # Assert
+        self.assertEqual([ob.market_id for ob in books], ["K1", "K2"])
+        self.assertEqual(books[0].yes["ask"][0], [420, 10])
+        self.assertEqual(fetch.calls, [["K2"]])
+        self.assertEqual(cache.stats(), {"hits": 0, "fetched": 1, "waited": 1})
+        self.assertGreaterEqual(elapsed, 0.5)
+        # Locks held by another process are not released.
+        self.assertIn(f"lock:{cache.key(PlatformType.KALSHI, 'K1')}", redis.data)
+
+    def test_concurrent_async_readers_share_one_fetch(self):
+        """
+        Test that two caches asking for the same books at once fetch them from the venue once
+        between them, and both get every book.
+        """
+        # Arrange
+        redis = FakeRedis()
+        caches = [OrderbookSnapshotCache(redis, poll_ms=5), OrderbookSnapshotCache(redis, poll_ms=5)]
+        fetch = CountingFetch(delay_s=0.05)
+        market_ids = ["P1", "P2", "P3"]
+
+        async def read_all():
+            return await asyncio.gather(
+                *(cache.aget_many(PlatformType.POLYMARKET, market_ids, fetch.afetch, max_age_ms=1000) for cache in caches)
+            )
+
+        # Act
+        results = asyncio.run(read_all())
+
+        # Assert
+        for books in results:
+            self.assertEqual([ob.market_id for ob in books], market_ids)
+        self.assertEqual(sorted(market_id for call in fetch.calls for market_id in call), market_ids)
+        self.assertEqual(sum(cache.stats()["fetched"] for cache in caches), 3)
+
+    def test_books_are_fetched_directly_while_redis_is_down(self):
+        """
+        Test that an unreachable Redis makes get_many fetch every book directly, and that Redis
+        is not tried again on the next call.
+        """
+        # Arrange
+        redis = DownRedis()
+        cache = OrderbookSnapshotCache(redis)
+        fetch = CountingFetch()
+
+        # Act
+        with self.assertLogs(level="WARNING"):
+            first = cache.get_many(PlatformType.KALSHI, ["K1", "K2"], fetch, max_age_ms=1000)
+        calls_after_first = redis.calls
+        second = cache.get_many(PlatformType.KALSHI, ["K1"], fetch, max_age_ms=1000)
+
+        # Assert
+        self.assertEqual([ob.market_id for ob in first], ["K1", "K2"])
+        self.assertEqual([ob.market_id for ob in second], ["K1"])
+        self.assertEqual(fetch.calls, [["K1", "K2"], ["K1"]])
+        self.assertEqual((calls_after_first, redis.calls), (1, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+import os
+import random
+import tempfile
+import time
+import unittest
+from feeds.BookSource import BookDelta, BookSnapshot, ReplayBookSource, record_events
+from feeds.OrderbookStore import OrderbookStore
+from services.arbitrage_finder.calculator import calculate_cross_platform_arbitrage
+
+class TestOrderbookStore(unittest.TestCase):
+
+    def test_snapshot_then_deltas(self):
+        """
+        Test that deltas set, add to and remove price levels on top of a snapshot.
+        """
+        # Arrange
+        store = OrderbookStore()
+        store.apply_snapshot(BookSnapshot("M1", 1, yes_bid=[[400, 10]], yes_ask=[[600, 5], [450, 7]], no_bid=[], no_ask=[[600, 10]]))
+
+        # Act
+        store.apply_delta(BookDelta("M1", 2, "yes", "ask", 500, 3))
+        store.apply_delta(BookDelta("M1", 3, "yes", "ask", 600, 0))
+        store.apply_delta(BookDelta("M1", 4, "no", "ask", 600, -4, relative=True))
+        store.apply_delta(BookDelta("M1", 5, "no", "bid", 380, 2, relative=True))
+        applied = store.apply_delta(BookDelta("UNKNOWN", 6, "yes", "ask", 500, 1))
+
+        # Assert
+        orderbook = store.get_order_book("M1")
+        self.assertEqual(orderbook.yes["ask"], [[450, 7], [500, 3]])
+        self.assertEqual(orderbook.yes["bid"], [[400, 10]])
+        self.assertEqual(orderbook.no["ask"], [[600, 6]])
+        self.assertEqual(orderbook.no["bid"], [[380, 2]])
+        self.assertEqual(orderbook.timestamp, 5)
+        self.assertEqual(orderbook.prefix_sums("yes")[0].tolist(), [7, 10])
+        self.assertFalse(applied)
+        self.assertEqual(store.get_order_books(["M1", "UNKNOWN"]), [orderbook])
+
+    def test_reads_between_deltas_see_every_change(self):
+        """
+        Test that a book read after each delta reflects quantity updates, added and removed
+        levels, while ladders the delta did not touch keep their levels.
+        """
+        # Arrange
+        store = OrderbookStore()
+        store.apply_snapshot(BookSnapshot("M1", 1, yes_bid=[[400, 10]], yes_ask=[[450, 7]], no_bid=[], no_ask=[[600, 10]]))
+        deltas = [
+            BookDelta("M1", 2, "yes", "ask", 450, 9),
+            BookDelta("M1", 3, "yes", "ask", 440, 2),
+            BookDelta("M1", 4, "yes", "ask", 450, 0),
+            BookDelta("M1", 5, "no", "ask", 600, -10, relative=True),
+        ]
+
+        # Act
+        reads = [store.get_order_book("M1")]
+        for delta in deltas:
+            store.apply_delta(delta)
+            reads.append(store.get_order_book("M1"))
+
+        # Assert
+        self.assertEqual([book.yes["ask"] for book in reads], [[[450, 7]], [[450, 9]], [[440, 2], [450, 9]], [[440, 2]], [[440, 2]]])
+        self.assertEqual([book.no["ask"] for book in reads], [[[600, 10]]] * 4 + [[]])
+        self.assertEqual({str(book.yes["bid"]) for book in reads}, {"[[400, 10]]"})
+
+    def test_replayed_feed_matches_full_snapshots(self):
+        """
+        Test that replaying a recorded feed leaves the store with the same books, and the same
+        arbitrage results, as rebuilding each book from scratch.
+        """
+        # Arrange
+        rng = random.Random(11)
+        market_ids = [f"M{i}" for i in range(20)]
+        truth = {m: {ladder: {} for ladder in ("yes_bid", "yes_ask", "no_bid", "no_ask")} for m in market_ids}
+        events = [BookSnapshot(m, 0, [], [], [], []) for m in market_ids]
+        for t in range(1, 20001):
+            market_id = rng.choice(market_ids)
+            side, kind = rng.choice(["yes", "no"]), rng.choice(["bid", "ask"])
+            price, quantity = rng.randint(1, 999), rng.choice([0, rng.randint(1, 5000)])
+            events.append(BookDelta(market_id, t, side, kind, price, quantity))
+            ladder = truth[market_id][f"{side}_{kind}"]
+            if quantity:
+                ladder[price] = quantity
+            else:
+                ladder.pop(price, None)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "feed.jsonl")
+            record_events(path, events)
+
+            # Act
+            store = OrderbookStore()
+            start = time.perf_counter()
+            count = store.consume(ReplayBookSource(path))
+            elapsed = time.perf_counter() - start
+
+        # Assert
+        self.assertEqual(count, len(events))
+        print(f"\nReplayed {count} events at {count / elapsed:,.0f} events/s")
+        for market_id in market_ids:
+            orderbook = store.get_order_book(market_id)
+            expected = {name: sorted([p, q] for p, q in levels.items()) for name, levels in truth[market_id].items()}
+            self.assertEqual(orderbook.yes["ask"], expected["yes_ask"])
+            self.assertEqual(orderbook.no["bid"], expected["no_bid"])
+        books = store.get_order_books(market_ids)
+        for ob1, ob2 in zip(books[0::2], books[1::2]):
+            self.assertEqual(
+                calculate_cross_platform_arbitrage(ob1, ob2),
+                calculate_cross_platform_arbitrage(ob1.to_orderbook(), ob2.to_orderbook()),
+            )
+
+if __name__ == '__main__':
+    unittest.main()
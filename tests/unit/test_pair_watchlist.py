@@ -0,0 +1,140 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, patch
+from models.PlatformType import PlatformType
+from models.TopOfBook import TopOfBook
+from models.Orderbook import Orderbook
+from services.arbitrage_finder.main import ArbitrageFinderService
+from services.arbitrage_finder.watchlist import PairWatchlist, to_millis
+
+NOW = 1_700_000_000.0
+
+
+def watchlist() -> PairWatchlist:
+    return PairWatchlist(min_interval_s=1, max_interval_s=300, gap_scale=100, close_horizon_s=86400)
+
+
+class TestPairWatchlist(unittest.TestCase):
+
+    def test_hot_pairs_are_checked_often_and_cold_ones_rarely(self):
+        """
+        Test that a pair at an opportunity is due again within about a second, a pair far from one
+        after the maximum interval, and that due pairs come out most overdue first.
+        """
+        # Arrange
+        pairs = watchlist()
+        hot = pairs.add("A", PlatformType.KALSHI, "B", PlatformType.POLYMARKET, now=NOW)
+        cold = pairs.add("C", PlatformType.KALSHI, "D", PlatformType.POLYMARKET, now=NOW)
+        warm = pairs.add("E", PlatformType.KALSHI, "F", PlatformType.POLYMARKET, now=NOW)
+
+        # Act
+        pairs.record(hot.key, gap=-20, hit=True, now=NOW)
+        pairs.record(cold.key, gap=400, hit=False, now=NOW)
+        pairs.record(warm.key, gap=30, hit=False, now=NOW)
+
+        # Assert
+        self.assertAlmostEqual(hot.interval, 1, places=6)
+        self.assertAlmostEqual(cold.interval, 300, places=6)
+        self.assertLess(hot.interval, warm.interval)
+        self.assertLess(warm.interval, cold.interval)
+        self.assertEqual(pairs.due(now=NOW + 0.5), [])
+        self.assertEqual([pair.key for pair in pairs.due(now=NOW + 400)], [hot.key, warm.key, cold.key])
+
+    def test_volatility_closeness_and_hit_rate_raise_priority(self):
+        """
+        Test that a pair whose gap keeps moving, a pair about to close and a pair with past hits
+        are all checked sooner than an otherwise identical quiet pair.
+        """
+        # Arrange
+        pairs = watchlist()
+        quiet, moving, closing, hitting = (
+            pairs.add(f"M{i}", PlatformType.KALSHI, f"N{i}", PlatformType.POLYMARKET, now=NOW) for i in range(4)
+        )
+        pairs.set_close_timestamps({"M2": int(NOW) + 600})
+
+        # Act
+        for i in range(6):
+            pairs.record(quiet.key, gap=80, hit=False, now=NOW)
+            pairs.record(moving.key, gap=80 if i % 2 else 0, hit=False, now=NOW)
+            pairs.record(closing.key, gap=80, hit=False, now=NOW)
+            pairs.record(hitting.key, gap=80, hit=i < 3, now=NOW)
+
+        # Assert
+        for pair in (moving, closing, hitting):
+            self.assertLess(pair.interval, quiet.interval / 2, pair)
+
+    def test_closed_markets_are_evicted(self):
+        """
+        Test that a pair is dropped when it comes due after either market closed, whether the
+        close timestamp is in seconds or milliseconds.
+        """
+        # Arrange
+        pairs = watchlist()
+        pairs.add("K1", PlatformType.KALSHI, "P1", PlatformType.POLYMARKET, now=NOW)
+        pairs.add("K2", PlatformType.KALSHI, "P2", PlatformType.POLYMARKET, now=NOW)
+        pairs.add("K3", PlatformType.KALSHI, "P3", PlatformType.POLYMARKET, now=NOW)
+        pairs.set_close_timestamps({
+            "K1": int(NOW) - 60,             # seconds, closed
+            "P2": int(NOW * 1000) - 60_000,  # milliseconds, closed
+            "K3": int(NOW) + 3600,           # still open
+            "P3": None,                      # unknown
+        })
+
+        # Act
+        due = pairs.due(now=NOW)
+
+        # Assert
+        self.assertEqual([pair.key for pair in due], [("K3", "P3")])
+        self.assertEqual((len(pairs), pairs.evicted), (1, 2))
+        self.assertEqual(to_millis(1_700_000_000), 1_700_000_000_000)
+        self.assertEqual(to_millis(1_700_000_000_000), 1_700_000_000_000)
+        self.assertEqual(pairs.markets_without_close(), [])
+
+
+class TestArbitrageFinderWatchlist(unittest.TestCase):
+
+    @patch('services.arbitrage_finder.main.RedisManager')
+    @patch('services.arbitrage_finder.main.KalshiPlatform')
+    @patch('services.arbitrage_finder.main.PolyMarketPlatform')
+    def test_stream_pairs_are_watched_and_rechecked_when_due(self, MockPolyMarketPlatform, MockKalshiPlatform, MockRedisManager):
+        """
+        Test that a pair handled from the stream stays on the watchlist, is checked again once its
+        interval has passed, and that opportunities found then are published.
+        """
+        # Arrange
+        mock_kalshi_platform = MockKalshiPlatform.return_value
+        mock_polymarket_platform = MockPolyMarketPlatform.return_value
+        kalshi_book = Orderbook(market_id="K1", timestamp=123, yes={"ask": [[400, 10]], "bid": []}, no={"ask": [[600, 10]], "bid": []})
+        poly_book = Orderbook(market_id="P1", timestamp=123, yes={"ask": [[600, 10]], "bid": []}, no={"ask": [[400, 10]], "bid": []})
+        mock_kalshi_platform.get_top_of_book.return_value = {"K1": TopOfBook("K1", yes_ask=500, no_ask=600)}
+        mock_polymarket_platform.get_top_of_book.return_value = {"P1": TopOfBook("P1", yes_ask=600, no_ask=500)}
+        mock_kalshi_platform.aget_top_of_book = AsyncMock(return_value={"K1": TopOfBook.from_orderbook(kalshi_book)})
+        mock_polymarket_platform.aget_top_of_book = AsyncMock(return_value={"P1": TopOfBook.from_orderbook(poly_book)})
+        mock_kalshi_platform.aget_order_books = AsyncMock(return_value=[kalshi_book])
+        mock_polymarket_platform.aget_order_books = AsyncMock(return_value=[poly_book])
+        service = ArbitrageFinderService()
+        service.watchlist = watchlist()
+        service.async_redis_manager = AsyncMock()
+
+        # Act
+        service.handle_market_pairs([("1-0", {
+            'market_id_1': 'P1', 'platform_1': PlatformType.POLYMARKET.value,
+            'market_id_2': 'K1', 'platform_2': PlatformType.KALSHI.value,
+        })])
+        watched = service.watchlist.get(("K1", "P1"))
+        first_interval = watched.interval
+        early = asyncio.run(service.acheck_watchlist(now=watched.due - 1))
+        later = asyncio.run(service.acheck_watchlist(now=watched.due))
+
+        # Assert
+        self.assertEqual(len(service.watchlist), 1)
+        self.assertEqual((early, later), (0, 1))
+        self.assertGreater(first_interval, 10)
+        published = service.async_redis_manager.add_many_to_stream.call_args.args[1]
+        self.assertEqual([(o["market_id_1"], o["market_id_2"]) for o in published], [("K1", "P1")])
+        self.assertEqual((watched.checks, watched.hits), (2, 1))
+        self.assertLess(watched.interval, first_interval)
+
+
+if __name__ == '__main__':
+    unittest.main()
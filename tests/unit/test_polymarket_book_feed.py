@@ -0,0 +1,186 @@
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+import unittest
+from websockets.asyncio.server import serve
+from feeds.OrderbookStore import OrderbookStore
+from feeds.PolymarketBookFeed import PolymarketBookFeed, PolymarketReplaySource
+from platforms.PolyMarketPlatform import parse_fixed
+
+MARKETS = {"0xabc": ["yes-token", "no-token"]}
+
+
+class FakeMarketChannel():
+    """Local stand-in for the CLOB market channel that sends a `book` for every newly subscribed asset."""
+
+    def __init__(self, books: dict, updates: list[dict]):
+        self.books = books
+        self.updates = updates
+        self.commands = []
+        self.server = None
+
+    async def __aenter__(self):
+        self.server = await serve(self._handler, "127.0.0.1", 0)
+        port = self.server.sockets[0].getsockname()[1]
+        self.url = f"ws://127.0.0.1:{port}"
+        return self
+
+    async def __aexit__(self, *exc):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _handler(self, ws):
+        async for raw in ws:
+            if raw == "PING":
+                await ws.send("PONG")
+                continue
+            command = json.loads(raw)
+            self.commands.append(command)
+            if command.get("operation") == "unsubscribe":
+                continue
+            await ws.send(json.dumps([self.books[asset] for asset in command["assets_ids"]]))
+            for update in self.updates:
+                await ws.send(json.dumps(update))
+
+
+def book(asset_id, bids, asks):
+    return {
+        "event_type": "book",
+        "asset_id": asset_id,
+        "market": "0xabc",
+        "timestamp": "1700000000000",
+        "bids": [{"price": p, "size": s} for p, s in bids],
+        "asks": [{"price": p, "size": s} for p, s in asks],
+    }
+
+
+async def wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not met before timeout")
+        await asyncio.sleep(0.005)
+
+
+class TestPolymarketBookFeed(unittest.IsolatedAsyncioTestCase):
+
+    def test_parse_fixed_is_exact(self):
+        """
+        Test that decimal strings are scaled without float rounding errors.
+        """
+        # Act / Assert
+        self.assertEqual(parse_fixed("0.29", 3), 290)
+        self.assertEqual(parse_fixed("0.57", 3), 570)
+        self.assertEqual(parse_fixed("1234.567", 2), 123456)
+        self.assertEqual(parse_fixed("15", 2), 1500)
+        self.assertEqual(parse_fixed("1e-3", 3), 1)
+
+    async def test_book_and_price_change_events(self):
+        """
+        Test that a market is readable only once both tokens' books arrived, and that price
+        changes set absolute sizes, with zero removing the level.
+        """
+        # Arrange
+        books = {
+            "yes-token": book("yes-token", bids=[("0.29", "100"), ("0.3", "12.5")], asks=[("0.35", "40")]),
+            "no-token": book("no-token", bids=[("0.64", "10")], asks=[("0.71", "100.129")]),
+        }
+        updates = [{
+            "event_type": "price_change",
+            "market": "0xabc",
+            "timestamp": "1700000000001",
+            "price_changes": [
+                {"asset_id": "yes-token", "price": "0.3", "size": "0", "side": "BUY"},
+                {"asset_id": "yes-token", "price": "0.34", "size": "7", "side": "SELL"},
+                {"asset_id": "no-token", "price": "0.64", "size": "25", "side": "BUY"},
+            ],
+        }]
+        store = OrderbookStore()
+        async with FakeMarketChannel(books, updates) as server:
+            feed = PolymarketBookFeed(store, url=server.url)
+            feed.watch(MARKETS)
+            task = asyncio.create_task(feed.run())
+
+            # Act
+            await wait_for(lambda: feed.messages_received >= 2)
+            orderbooks = feed.get_order_books(["0xabc"])
+            feed.unwatch(["0xabc"])
+            await wait_for(lambda: len(server.commands) == 2)
+            feed.stop()
+            await task
+
+        # Assert
+        orderbook = orderbooks[0]
+        self.assertEqual(orderbook.yes["bid"], [[290, 10000]])
+        self.assertEqual(orderbook.yes["ask"], [[340, 700], [350, 4000]])
+        self.assertEqual(orderbook.no["bid"], [[640, 2500]])
+        self.assertEqual(orderbook.no["ask"], [[710, 10012]])
+        self.assertEqual(orderbook.timestamp, 1700000000001)
+        self.assertEqual(server.commands[0], {"type": "market", "assets_ids": ["no-token", "yes-token"]})
+        self.assertEqual(server.commands[1], {"assets_ids": ["no-token", "yes-token"], "operation": "unsubscribe"})
+        self.assertEqual(len(store), 0)
+
+    def test_half_book_is_not_served(self):
+        """
+        Test that a market with only one token's book is not returned to readers.
+        """
+        # Arrange
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "market_channel.jsonl")
+            with open(path, "w") as f:
+                f.write(json.dumps(book("yes-token", bids=[("0.4", "1")], asks=[])) + "\n")
+
+            # Act
+            store = OrderbookStore()
+            store.consume(PolymarketReplaySource(path, MARKETS))
+
+        # Assert
+        self.assertIn("0xabc", store)
+        self.assertEqual(store.get_order_books(["0xabc"]), [])
+
+    def test_replay_throughput(self):
+        """
+        Test that a recorded market-channel log replays above 10k events/s and ends in the same
+        state as applying the changes directly.
+        """
+        # Arrange
+        rng = random.Random(5)
+        truth = {("yes", "bid"): {}, ("yes", "ask"): {}, ("no", "bid"): {}, ("no", "ask"): {}}
+        num_events = 30000
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "market_channel.jsonl")
+            with open(path, "w") as f:
+                f.write(json.dumps(book("yes-token", [], [])) + "\n")
+                f.write(json.dumps(book("no-token", [], [])) + "\n")
+                for t in range(num_events):
+                    token = rng.choice(["yes-token", "no-token"])
+                    side = rng.choice(["BUY", "SELL"])
+                    cents, size = rng.randint(1, 99), rng.choice([0, rng.randint(1, 1000)])
+                    change = {"asset_id": token, "price": f"0.{cents:02d}", "size": str(size), "side": side}
+                    f.write(json.dumps({"event_type": "price_change", "timestamp": str(t), "price_changes": [change]}) + "\n")
+                    ladder = truth[(token.split("-")[0], "bid" if side == "BUY" else "ask")]
+                    if size:
+                        ladder[cents * 10] = size * 100
+                    else:
+                        ladder.pop(cents * 10, None)
+
+            # Act
+            store = OrderbookStore()
+            start = time.perf_counter()
+            count = store.consume(PolymarketReplaySource(path, MARKETS))
+            elapsed = time.perf_counter() - start
+
+        # Assert
+        print(f"\nReplayed {count} market-channel events at {count / elapsed:,.0f} events/s")
+        orderbook = store.get_order_book("0xabc")
+        for (side, kind), levels in truth.items():
+            self.assertEqual(orderbook.levels(side, kind), sorted([p, q] for p, q in levels.items()))
+        self.assertEqual(count, num_events + 2)
+        self.assertGreater(count / elapsed, 10000)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,224 @@
+import asyncio
+import os
+import time
+import unittest
+from unittest.mock import patch
+from aiohttp import web
+import httpx
+from models.PlatformType import PlatformType
+from platforms.RateLimiter import MARKET_DATA, RateLimiter, TokenBucket, rate_limit_window
+
+
+class ThrottlingServer:
+    """Local endpoint that answers 429 with a Retry-After hint whenever requests come faster than `rate`."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.ok = 0
+        self.rejected = 0
+
+    async def __aenter__(self):
+        app = web.Application()
+        app.router.add_get("/book", self._book)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        self.url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.runner.cleanup()
+
+    async def _book(self, request):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < 1:
+            self.rejected += 1
+            return web.json_response({"error": "too many requests"}, status=429, headers={"Retry-After": "0.2"})
+        self.tokens -= 1
+        self.ok += 1
+        return web.json_response({"ok": True})
+
+
+class FakeScript:
+    def __init__(self, wait_ms=0, rate=10, error=None):
+        self.wait_ms = wait_ms
+        self.rate = rate
+        self.error = error
+        self.calls = []
+
+    def __call__(self, keys, args):
+        self.calls.append((keys, args))
+        if self.error:
+            raise self.error
+        return [self.wait_ms, str(self.rate).encode()]
+
+
+class FakeScriptRedis:
+    def __init__(self, script):
+        self.script = script
+
+    def register_script(self, source):
+        return self.script
+
+
+class TestTokenBucket(unittest.TestCase):
+
+    def test_requests_are_paced_at_the_rate_after_the_burst(self):
+        """
+        Test that a burst is let through at once and the rest queues at `rate`, with the wait recorded.
+        """
+        # Arrange
+        bucket = TokenBucket("TEST:market_data", rate=50, burst=5)
+
+        # Act
+        start = time.monotonic()
+        for _ in range(30):
+            bucket.acquire()
+        elapsed = time.monotonic() - start
+
+        # Assert
+        self.assertAlmostEqual(elapsed, 25 / 50, delta=0.15)
+        stats = bucket.stats()
+        self.assertEqual(stats["acquired"], 30)
+        self.assertGreater(stats["wait_max_ms"], 10)
+        self.assertGreater(stats["wait_p95_ms"], 0)
+
+    def test_429_pauses_and_slows_down_then_recovers(self):
+        """
+        Test that a 429 halves the rate and holds requests for the Retry-After time, and that
+        successful responses bring the rate back up to the configured limit.
+        """
+        # Arrange
+        bucket = TokenBucket("TEST:market_data", rate=100, burst=100)
+
+        # Act
+        bucket.observe(429, {"Retry-After": "0.3"})
+        slowed = bucket.rate
+        waited = bucket.acquire()
+        for _ in range(20):
+            bucket.observe(200, {})
+
+        # Assert
+        self.assertEqual(slowed, 50)
+        self.assertGreaterEqual(waited, 0.25)
+        self.assertEqual(bucket.rate, 100)
+        self.assertEqual(bucket.stats()["throttled"], 1)
+
+    def test_rate_limit_headers_adapt_the_rate(self):
+        """
+        Test that X-RateLimit-* headers lower the rate to what the window allows, and pause the
+        bucket when nothing is left.
+        """
+        # Arrange
+        bucket = TokenBucket("TEST:market_data", rate=100, burst=100)
+
+        # Act
+        bucket.observe(200, {"X-RateLimit-Remaining": "20", "X-RateLimit-Reset": "2"})
+        lowered = bucket.rate
+        bucket.observe(200, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(time.time() + 0.3)})
+        waited = bucket.acquire()
+
+        # Assert
+        self.assertEqual(lowered, 10)
+        self.assertGreaterEqual(waited, 0.25)
+        self.assertIsNone(rate_limit_window({}))
+
+    def test_shared_budget_comes_from_redis_and_falls_back_locally(self):
+        """
+        Test that the Redis script decides the wait when Redis is up, and that the bucket limits
+        locally when it is not.
+        """
+        # Arrange
+        script = FakeScript(wait_ms=200)
+        shared = TokenBucket("KALSHI:market_data", rate=10, redis_client=FakeScriptRedis(script))
+        broken = TokenBucket("KALSHI:portfolio", rate=10, redis_client=FakeScriptRedis(FakeScript(error=ConnectionError("down"))))
+
+        # Act
+        shared_wait = shared.acquire()
+        with self.assertLogs(level="WARNING"):
+            local_wait = broken.acquire()
+
+        # Assert
+        self.assertGreaterEqual(shared_wait, 0.2)
+        self.assertEqual(script.calls[0][0], ["ratelimit:KALSHI:market_data"])
+        self.assertLess(local_wait, 0.05)
+
+    def test_shared_bucket_follows_the_rate_adapted_in_redis(self):
+        """
+        Test that a shared bucket takes over the rate stored in Redis, which another service may
+        have lowered, and sends its own 429s, header caps and recoveries to Redis as adjustments
+        rather than as the rate the bucket refills at.
+        """
+        # Arrange
+        script = FakeScript(rate=4)
+        bucket = TokenBucket("KALSHI:market_data", rate=10, redis_client=FakeScriptRedis(script))
+
+        # Act
+        bucket.acquire()
+        shared_rate = bucket.rate
+        bucket.observe(200, {})
+        with self.assertLogs(level="WARNING"):
+            bucket.observe(429, {"Retry-After": "0"})
+        bucket.observe(200, {"X-RateLimit-Remaining": "2", "X-RateLimit-Reset": "1"})
+
+        # Assert
+        self.assertEqual(shared_rate, 4)
+        self.assertEqual([args[0] for _, args in script.calls], [10.0] * 4)
+        self.assertEqual([args[4] for _, args in script.calls], ["", "raise", "slow", "cap"])
+        self.assertEqual(script.calls[-1][1][5], 2)
+        self.assertEqual(bucket.rate, 4)
+
+
+class TestRateLimiter(unittest.IsolatedAsyncioTestCase):
+
+    async def test_requests_stay_under_the_venue_limit_without_drops(self):
+        """
+        Test that a burst far above the venue's limit is queued rather than rejected, and that
+        every request eventually succeeds.
+        """
+        # Arrange
+        async with ThrottlingServer(rate=40, burst=12) as server:
+            with patch.dict(os.environ, {"RATE_LIMIT_KALSHI_MARKET_DATA": "40:10"}):
+                limiter = RateLimiter(PlatformType.KALSHI)
+                bucket = limiter.bucket(MARKET_DATA)
+            async with httpx.AsyncClient() as client:
+
+                # Act
+                responses = await asyncio.gather(*[
+                    limiter.asend(MARKET_DATA, lambda: client.get(f"{server.url}/book")) for _ in range(40)
+                ])
+
+        # Assert
+        self.assertEqual([r.status_code for r in responses], [200] * 40)
+        self.assertEqual(server.ok, 40)
+        self.assertLess(server.rejected, 5)
+        self.assertEqual(bucket.max_rate, 40)
+        self.assertGreater(limiter.stats()[MARKET_DATA]["wait_max_ms"], 500)
+
+    async def test_429_responses_are_retried(self):
+        """
+        Test that a request rejected with 429 is sent again after the pause instead of being dropped.
+        """
+        # Arrange
+        async with ThrottlingServer(rate=1, burst=1) as server:
+            limiter = RateLimiter(PlatformType.POLYMARKET)
+            async with httpx.AsyncClient() as client:
+                await client.get(f"{server.url}/book")  # uses the server's only token
+
+                # Act
+                response = await limiter.asend(MARKET_DATA, lambda: client.get(f"{server.url}/book"))
+
+        # Assert
+        self.assertEqual(response.status_code, 200)
+        self.assertGreaterEqual(server.rejected, 1)
+        self.assertGreaterEqual(limiter.stats()[MARKET_DATA]["throttled"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,280 @@
+import asyncio
+import os
+import time
+import unittest
+from unittest.mock import patch
+from cache.AsyncRedisManager import AsyncRedisManager
+from cache.RedisManager import RedisManager
+
+
+class FakeStreamRedis:
+    """Records stream commands and counts how many round trips reach the server."""
+
+    def __init__(self, fail_on_batch=None):
+        self.streams = {}
+        self.acked = []
+        self.trims = []
+        self.round_trips = 0
+        self.fail_on_batch = fail_on_batch
+        # Pending entries of the only group: message ID -> [data, consumer, idle ms, deliveries]
+        self.pending = {}
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def xautoclaim(self, name, groupname, consumername, min_idle_time, start_id="0-0", count=None):
+        self.round_trips += 1
+        claimed = []
+        for message_id in sorted(self.pending, key=lambda i: int(i.split("-")[0])):
+            entry = self.pending[message_id]
+            if int(message_id.split("-")[0]) >= int(start_id.split("-")[0]) and entry[2] >= min_idle_time:
+                entry[1:] = [consumername, 0, entry[3] + 1]
+                claimed.append((message_id, entry[0]))
+                if len(claimed) == count:
+                    break
+        return ["0-0", claimed, []]
+
+    def pending_range(self, name, groupname, min, max, count, consumername=None):
+        def key(message_id):
+            return tuple(int(part) for part in message_id.split("-"))
+        return [
+            {"message_id": message_id, "consumer": entry[1], "time_since_delivered": entry[2], "times_delivered": entry[3]}
+            for message_id, entry in sorted(self.pending.items(), key=lambda item: key(item[0]))
+            if key(min) <= key(message_id) <= key(max) and consumername in (None, entry[1])
+        ][:count]
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    def xadd(self, name, fields, maxlen=None, approximate=True, minid=None):
+        self.client.trims.append((name, maxlen, minid))
+        self.commands.append(("xadd", name, fields))
+
+    def xack(self, name, group, *ids):
+        self.commands.append(("xack", name, group, ids))
+
+    def xpending_range(self, *args, **kwargs):
+        self.commands.append(("xpending_range", args, kwargs))
+
+    def execute(self):
+        self.client.round_trips += 1
+        if self.client.fail_on_batch == self.client.round_trips:
+            raise ConnectionError("redis down")
+        results = []
+        for command in self.commands:
+            if command[0] == "xadd":
+                stream = self.client.streams.setdefault(command[1], [])
+                stream.append(command[2])
+                results.append(f"{len(stream)}-0")
+            elif command[0] == "xpending_range":
+                results.append(self.client.pending_range(*command[1], **command[2]))
+            else:
+                self.client.acked.extend(command[3])
+                for message_id in command[3]:
+                    self.client.pending.pop(message_id, None)
+                results.append(len(command[3]))
+        return results
+
+
+class FakeAsyncPipeline(FakePipeline):
+    async def execute(self):
+        return super().execute()
+
+
+class FakeAsyncStreamRedis(FakeStreamRedis):
+    def pipeline(self, transaction=True):
+        return FakeAsyncPipeline(self)
+
+    async def xautoclaim(self, *args, **kwargs):
+        return super().xautoclaim(*args, **kwargs)
+
+
+class TestRedisManager(unittest.TestCase):
+
+    def _manager(self, client):
+        manager = RedisManager.__new__(RedisManager)
+        manager.redis_client = client
+        manager._claim_cursors = {}
+        return manager
+
+    def test_add_many_to_stream_pipelines_in_batches(self):
+        """
+        Test that 10k messages cost one round trip per batch and keep their order.
+        """
+        # Arrange
+        client = FakeStreamRedis()
+        manager = self._manager(client)
+        messages = [{"market_id": str(i)} for i in range(10000)]
+
+        # Act
+        message_ids = manager.add_many_to_stream("market_events_stream", messages, batch_size=1000)
+
+        # Assert
+        self.assertEqual(client.round_trips, 10)
+        self.assertEqual(len(message_ids), 10000)
+        self.assertEqual(client.streams["market_events_stream"], messages)
+
+    def test_failed_batch_is_skipped(self):
+        """
+        Test that a failing batch is reported without raising, that its messages get no ID and
+        that later batches still go out.
+        """
+        # Arrange
+        client = FakeStreamRedis(fail_on_batch=1)
+        manager = self._manager(client)
+
+        # Act
+        message_ids = manager.add_many_to_stream("s", [{"i": str(i)} for i in range(5)], batch_size=2)
+
+        # Assert
+        self.assertEqual(message_ids, [None, None, "1-0", "2-0", "3-0"])
+        self.assertEqual(client.round_trips, 3)
+
+    def test_acknowledge_messages_in_one_round_trip(self):
+        """
+        Test that acknowledgements are chunked into multi-ID XACKs sent in a single pipeline.
+        """
+        # Arrange
+        client = FakeStreamRedis()
+        manager = self._manager(client)
+        message_ids = [f"{i}-0" for i in range(2500)]
+
+        # Act
+        acked = manager.acknowledge_messages("s", "g", message_ids, batch_size=1000)
+        nothing = manager.acknowledge_messages("s", "g", [])
+
+        # Assert
+        self.assertEqual(acked, 2500)
+        self.assertEqual(nothing, 0)
+        self.assertEqual(client.round_trips, 1)
+        self.assertEqual(client.acked, message_ids)
+
+    def test_streams_are_trimmed_by_policy(self):
+        """
+        Test that each stream is capped by length or by age, and that env overrides apply.
+        """
+        # Arrange
+        client = FakeStreamRedis()
+        manager = self._manager(client)
+
+        # Act
+        with patch.dict(os.environ, {"STREAM_MAXLEN_SIMILAR_MARKET_PAIRS_STREAM": "500"}):
+            manager.add_many_to_stream("market_events_stream", [{"a": "1"}])
+            manager.add_many_to_stream("similar_market_pairs_stream", [{"a": "1"}])
+            manager.add_many_to_stream("arbitrage_opportunities_stream", [{"a": "1"}])
+            manager.add_many_to_stream("other_stream", [{"a": "1"}], maxlen=10)
+
+        # Assert
+        self.assertEqual(client.trims[0], ("market_events_stream", 100000, None))
+        self.assertEqual(client.trims[1], ("similar_market_pairs_stream", 500, None))
+        name, maxlen, minid = client.trims[2]
+        self.assertIsNone(maxlen)
+        self.assertAlmostEqual(int(minid.split("-")[0]), time.time() * 1000 - 3600 * 1000, delta=5000)
+        self.assertEqual(client.trims[3], ("other_stream", 10, None))
+
+    def test_stale_messages_are_reclaimed_and_poison_is_dead_lettered(self):
+        """
+        Test that idle pending messages are claimed for reprocessing, that those past the delivery
+        cap move to the dead-letter stream and are acknowledged, and that fresh ones are left alone.
+        """
+        # Arrange
+        client = FakeStreamRedis()
+        manager = self._manager(client)
+        client.pending = {
+            "1-0": [{"market_id": "A"}, "crashed-consumer", 120000, 1],
+            "2-0": [{"market_id": "B"}, "crashed-consumer", 120000, 5],
+            "3-0": [{"market_id": "C"}, "busy-consumer", 10, 1],
+        }
+
+        # Act
+        retry = manager.claim_stale_messages("s", "g", "me", min_idle_ms=60000, max_deliveries=5)
+
+        # Assert
+        self.assertEqual(retry, [("1-0", {"market_id": "A"})])
+        self.assertEqual(client.streams["s:dead_letter"], [{
+            "market_id": "B", "dead_letter_source": "s", "dead_letter_id": "2-0", "dead_letter_deliveries": 6,
+        }])
+        self.assertEqual(client.acked, ["2-0"])
+        self.assertEqual(sorted(client.pending), ["1-0", "3-0"])
+        self.assertEqual(client.pending["1-0"][1:], ["me", 0, 2])
+
+    def test_delivery_counts_are_read_for_exactly_the_claimed_messages(self):
+        """
+        Test that a message this consumer already holds, pending between two claimed ones, does
+        not crowd a claimed message out of the delivery-count lookup.
+        """
+        # Arrange
+        client = FakeStreamRedis()
+        manager = self._manager(client)
+        client.pending = {
+            "1-0": [{"market_id": "A"}, "crashed-consumer", 120000, 1],
+            "2-0": [{"market_id": "B"}, "me", 10, 1],
+            "3-0": [{"market_id": "C"}, "crashed-consumer", 120000, 5],
+        }
+
+        # Act
+        retry = manager.claim_stale_messages("s", "g", "me", min_idle_ms=60000, max_deliveries=5)
+
+        # Assert
+        self.assertEqual(retry, [("1-0", {"market_id": "A"})])
+        self.assertEqual([entry["dead_letter_id"] for entry in client.streams["s:dead_letter"]], ["3-0"])
+        self.assertEqual(client.acked, ["3-0"])
+        self.assertIn("2-0", client.pending)
+
+    def test_async_manager_pipelines_like_the_blocking_one(self):
+        """
+        Test that AsyncRedisManager publishes and acknowledges with the same batching and trimming.
+        """
+        # Arrange
+        client = FakeAsyncStreamRedis()
+        manager = AsyncRedisManager.__new__(AsyncRedisManager)
+        manager.redis_client = client
+        messages = [{"market_id": str(i)} for i in range(1200)]
+
+        async def publish_and_ack():
+            message_ids = await manager.add_many_to_stream("market_events_stream", messages)
+            acked = await manager.acknowledge_messages("market_events_stream", "g", message_ids)
+            return message_ids, acked
+
+        # Act
+        message_ids, acked = asyncio.run(publish_and_ack())
+
+        # Assert
+        self.assertEqual(len(message_ids), 1200)
+        self.assertEqual(acked, 1200)
+        self.assertEqual(client.round_trips, 3 + 1)
+        self.assertEqual(client.trims[0], ("market_events_stream", 100000, None))
+
+    def test_async_manager_dead_letters_like_the_blocking_one(self):
+        """
+        Test that AsyncRedisManager reclaims stale messages and dead-letters poison ones exactly
+        like RedisManager.
+        """
+        # Arrange
+        pending = {
+            "1-0": [{"market_id": "A"}, "crashed-consumer", 120000, 1],
+            "2-0": [{"market_id": "B"}, "crashed-consumer", 120000, 5],
+        }
+        blocking_client, async_client = FakeStreamRedis(), FakeAsyncStreamRedis()
+        blocking_client.pending = {key: list(entry) for key, entry in pending.items()}
+        async_client.pending = {key: list(entry) for key, entry in pending.items()}
+        manager = AsyncRedisManager.__new__(AsyncRedisManager)
+        manager.redis_client = async_client
+        manager._claim_cursors = {}
+
+        # Act
+        expected = self._manager(blocking_client).claim_stale_messages("s", "g", "me", min_idle_ms=60000)
+        retry = asyncio.run(manager.claim_stale_messages("s", "g", "me", min_idle_ms=60000))
+
+        # Assert
+        self.assertEqual(retry, expected)
+        self.assertEqual(async_client.streams, blocking_client.streams)
+        self.assertEqual(async_client.acked, ["2-0"])
+        self.assertEqual(async_client.round_trips, blocking_client.round_trips)
+
+
+if __name__ == '__main__':
+    unittest.main()
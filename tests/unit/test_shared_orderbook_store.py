@@ -0,0 +1,183 @@
+import random
+import threading
+import unittest
+from feeds.BookSource import BookSnapshot
+from feeds.OrderbookStore import OrderbookStore
+from feeds.SharedOrderbookStore import SharedOrderbookStore
+from models.Orderbook import Orderbook
+from services.arbitrage_finder.calculator import calculate_many
+from services.arbitrage_finder.workers import SweepPool
+
+
+def book(market_id, yes_ask, no_ask, timestamp=1):
+    return Orderbook(market_id=market_id, timestamp=timestamp, yes={"bid": [[300, 1]], "ask": yes_ask}, no={"bid": [], "ask": no_ask})
+
+
+class TestSharedOrderbookStore(unittest.TestCase):
+
+    def setUp(self):
+        self.writer = SharedOrderbookStore.create(capacity=3, max_depth=4)
+        self.reader = SharedOrderbookStore.attach(self.writer.name)
+
+    def tearDown(self):
+        self.reader.close()
+        self.writer.close()
+        self.writer.unlink()
+
+    def test_readers_see_the_writers_books(self):
+        """
+        Test that a book written by the writer is read back unchanged by an attached reader, both
+        as a copy and as a view, that a view's version goes stale when the book is rewritten,
+        that ladders too deep for a slot keep their best levels and that IDs too long are refused.
+        """
+        # Arrange
+        first = book("M1", [[400, 10], [410, 5]], [[550, 7]], timestamp=5)
+        deep = Orderbook(market_id="M2", timestamp=1, yes={"bid": [[300 + i, 1] for i in range(6)], "ask": [[400 + i, 1] for i in range(6)]}, no={"bid": [], "ask": []})
+
+        # Act
+        stored = [self.writer.put(first), self.writer.put(deep), self.writer.put(book("M" * 100, [], []))]
+        copy = self.reader.get_order_book("M1")
+        views, versions = self.reader.view_order_books(["M1", "M2", "M" * 100])
+        unchanged_before = self.reader.unchanged(versions[0])
+        self.writer.put(book("M1", [[420, 1]], [[550, 7]], timestamp=6))
+
+        # Assert
+        self.assertEqual(stored, [True, True, False])
+        self.assertEqual((copy.timestamp, copy.yes, copy.no), (5, first.yes, first.no))
+        self.assertEqual(views[1].yes["ask"], [[400 + i, 1] for i in range(4)])
+        self.assertEqual(views[1].yes["bid"], [[302 + i, 1] for i in range(4)])
+        self.assertEqual(self.writer.truncated, 2)
+        self.assertIsNone(views[2])
+        self.assertTrue(unchanged_before)
+        self.assertFalse(self.reader.unchanged(versions[0]))
+        self.assertEqual(copy.yes["ask"], [[400, 10], [410, 5]])
+        self.assertEqual(self.reader.get_order_book("M1").yes["ask"], [[420, 1]])
+
+    def test_least_recently_written_market_is_evicted_when_full(self):
+        """
+        Test that writing a market into a full store evicts the market written least recently,
+        and that readers stop finding it.
+        """
+        # Arrange
+        local = OrderbookStore()
+        for i in range(3):
+            local.apply_snapshot(BookSnapshot(f"M{i}", i, yes_bid=[], yes_ask=[[400 + i, 1]], no_bid=[], no_ask=[]))
+
+        # Act
+        synced = self.writer.sync(local)
+        resynced = self.writer.sync(local)
+        self.writer.put(local.get_order_book("M0"))
+        self.writer.put(book("M3", [[450, 1]], []))
+
+        # Assert
+        self.assertEqual((synced, resynced), (3, 0))
+        self.assertEqual(sorted(self.reader.market_ids()), ["M0", "M2", "M3"])
+        self.assertIsNone(self.reader.get_order_book("M1"))
+        self.assertEqual(self.reader.get_order_book("M3").yes["ask"], [[450, 1]])
+
+    def test_readers_rebuild_their_index_only_after_slots_change(self):
+        """
+        Test that a reader looking up a market that was never stored does not rescan the IDs
+        again until the writer has added or removed a market.
+        """
+        # Arrange
+        self.writer.put(book("M1", [[400, 1]], []))
+        self.reader.get_order_book("M1")
+        index = self.reader._index
+
+        # Act
+        missing = [self.reader.get_order_book("UNKNOWN") for _ in range(3)]
+        index_after_misses = self.reader._index
+        self.writer.put(book("M2", [[410, 1]], []))
+        added = self.reader.get_order_book("M2")
+
+        # Assert
+        self.assertEqual(missing, [None] * 3)
+        self.assertIs(index_after_misses, index)
+        self.assertEqual(added.yes["ask"], [[410, 1]])
+
+    def test_reads_during_writes_are_never_torn(self):
+        """
+        Test that a reader running while the writer keeps rewriting a book only ever sees whole
+        versions of it, and nothing while a write is in progress.
+        """
+        # Arrange
+        self.writer.put(book("M1", [[400, 1]], [[600, 1]], timestamp=0))
+        done = threading.Event()
+
+        def write():
+            for version in range(1, 3000):
+                depth = version % 4 + 1
+                self.writer.put(book("M1", [[400 + level, version] for level in range(depth)], [[600, version]] * depth, timestamp=version))
+            done.set()
+
+        # Act
+        writer = threading.Thread(target=write)
+        writer.start()
+        reads = 0
+        while not done.is_set():
+            orderbook = self.reader.get_order_book("M1")
+            if orderbook is None:
+                continue
+            reads += 1
+            version = orderbook.timestamp
+            # Assert
+            self.assertEqual(orderbook.depth("yes", "ask"), version % 4 + 1 if version else 1)
+            self.assertEqual({qty for _, qty in orderbook.yes["ask"] + orderbook.no["ask"]}, {version or 1})
+        writer.join()
+
+        self.assertGreater(reads, 0)
+
+    def test_reads_give_up_while_a_write_is_in_progress(self):
+        """
+        Test that a reader returns no book while the slot's sequence number is odd.
+        """
+        # Arrange
+        self.writer.put(book("M1", [[400, 1]], [[600, 1]]))
+        self.writer._seq[0] += 1
+
+        # Act
+        orderbook = self.reader.get_order_book("M1")
+
+        # Assert
+        self.assertIsNone(orderbook)
+
+
+class TestSweepPool(unittest.TestCase):
+
+    def test_workers_score_pairs_like_the_calculator(self):
+        """
+        Test that pairs scored by worker processes from shared memory give the calculator's
+        results on books cut to the slot depth, and that a pair whose book cannot be stored is
+        scored in-process.
+        """
+        # Arrange
+        rng = random.Random(7)
+
+        def ladder(depth=4):
+            return [[price, rng.randint(1, 50)] for price in sorted(rng.randint(350, 600) for _ in range(depth))]
+
+        pairs = [(book(f"a{i}", ladder(), ladder()), book(f"b{i}", ladder(), ladder())) for i in range(60)]
+        deep = book("deep", ladder(12), ladder())
+        pairs.append((deep, pairs[0][1]))
+        pairs.append((book("x" * 100, ladder(), ladder()), pairs[1][1]))
+        cut = book("deep", deep.yes["ask"][:8], deep.no["ask"])
+        expected = calculate_many(pairs[:-2] + [(cut, pairs[0][1])] + pairs[-1:])
+        pool = SweepPool(processes=2, capacity=200, max_depth=8)
+
+        # Act
+        try:
+            results = pool.calculate_many(pairs)
+            again = pool.calculate_many(pairs[:-2], profit_threshold=0.02)
+        finally:
+            pool.close()
+
+        # Assert
+        self.assertEqual(results, expected)
+        self.assertEqual(again, calculate_many(pairs[:-2], profit_threshold=0.02))
+        self.assertEqual(pool.scored_locally, 1)
+        self.assertTrue(any(expected), "Fixture should contain at least one opportunity.")
+
+
+if __name__ == '__main__':
+    unittest.main()
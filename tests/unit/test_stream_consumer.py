@@ -0,0 +1,166 @@
+import queue
+import threading
+import time
+import unittest
+from cache.StreamConsumer import StreamConsumer
+
+
+class FakeBlockingRedisManager:
+    """In-memory stream whose reads block like XREADGROUP BLOCK."""
+
+    def __init__(self, fail=False):
+        self.pending = queue.Queue()
+        self.reads = []
+        self.fail = fail
+
+    def publish(self, message_id, message_data):
+        self.pending.put((message_id, message_data))
+
+    def read_from_stream(self, stream_name, group_name, consumer_name, count=1, block_ms=None):
+        self.reads.append((count, block_ms))
+        if self.fail:
+            return None
+        messages = []
+        try:
+            messages.append(self.pending.get(timeout=(block_ms or 0) / 1000))
+            while len(messages) < count:
+                messages.append(self.pending.get_nowait())
+        except queue.Empty:
+            pass
+        return messages or None
+
+    def claim_stale_messages(self, stream_name, group_name, consumer_name, min_idle_ms, count=100, max_deliveries=5):
+        return []
+
+    def stream_stats(self, stream_name, group_name):
+        return {}
+
+
+class TestStreamConsumer(unittest.TestCase):
+
+    def _consumer(self, redis_manager, handler, **kwargs):
+        return StreamConsumer(redis_manager, "stream", "group", "consumer", handler, **kwargs)
+
+    def test_message_is_handled_as_soon_as_it_arrives(self):
+        """
+        Test that a message published while the consumer is blocked is handled within
+        milliseconds rather than after a polling interval.
+        """
+        # Arrange
+        redis_manager = FakeBlockingRedisManager()
+        handled = threading.Event()
+        stop = threading.Event()
+        consumer = self._consumer(redis_manager, lambda messages: handled.set(), block_ms=5000)
+        thread = threading.Thread(target=consumer.run, args=(stop.is_set,))
+        thread.start()
+        time.sleep(0.05)
+
+        # Act
+        start = time.perf_counter()
+        redis_manager.publish("1-0", {"market_id": "A"})
+        handled.wait(1)
+        latency = time.perf_counter() - start
+        stop.set()
+        thread.join(6)
+
+        # Assert
+        self.assertTrue(handled.is_set())
+        self.assertLess(latency, 0.05)
+        self.assertEqual(redis_manager.reads[0], (100, 5000))
+
+    def test_backlog_is_drained_in_batches(self):
+        """
+        Test that a backlog is read in full batches back to back.
+        """
+        # Arrange
+        redis_manager = FakeBlockingRedisManager()
+        for i in range(250):
+            redis_manager.publish(f"{i}-0", {"market_id": str(i)})
+        batches = []
+        consumer = self._consumer(redis_manager, lambda messages: batches.append(len(messages)), batch_size=100, block_ms=10)
+
+        # Act
+        consumer.run(lambda: sum(batches) == 250)
+
+        # Assert
+        self.assertEqual(batches, [100, 100, 50])
+        self.assertEqual(len(redis_manager.reads), 3)
+
+    def test_failed_reads_back_off(self):
+        """
+        Test that reads failing immediately are retried once per block interval, not in a tight loop.
+        """
+        # Arrange
+        redis_manager = FakeBlockingRedisManager(fail=True)
+        consumer = self._consumer(redis_manager, lambda messages: None, block_ms=50)
+        deadline = time.monotonic() + 0.25
+
+        # Act
+        consumer.run(lambda: time.monotonic() > deadline)
+
+        # Assert
+        self.assertLessEqual(len(redis_manager.reads), 6)
+
+    def test_handler_errors_do_not_stop_the_loop(self):
+        """
+        Test that a batch whose handler raises is reported and the next batch is still handled.
+        """
+        # Arrange
+        redis_manager = FakeBlockingRedisManager()
+        redis_manager.publish("1-0", {"market_id": "A"})
+        redis_manager.publish("2-0", {"market_id": "B"})
+        handled = []
+
+        def handler(messages):
+            handled.append(messages[0][0])
+            if len(handled) == 1:
+                raise ValueError("bad message")
+
+        consumer = self._consumer(redis_manager, handler, batch_size=1, block_ms=10)
+
+        # Act
+        consumer.run(lambda: len(handled) == 2)
+
+        # Assert
+        self.assertEqual(handled, ["1-0", "2-0"])
+
+    def test_stale_messages_are_reprocessed_and_stats_reported(self):
+        """
+        Test that the maintenance pass hands reclaimed messages to the handler before reading new
+        ones, and reports the stream's pending stats.
+        """
+        # Arrange
+        class RecoveringRedisManager(FakeBlockingRedisManager):
+            def __init__(self):
+                super().__init__()
+                self.stale = [("1-0", {"market_id": "A"})]
+                self.claims = []
+
+            def claim_stale_messages(self, stream_name, group_name, consumer_name, min_idle_ms, count=100, max_deliveries=5):
+                self.claims.append((min_idle_ms, max_deliveries))
+                stale, self.stale = self.stale, []
+                return stale
+
+            def stream_stats(self, stream_name, group_name):
+                return {"length": 3, "pending": 1, "consumers": {"consumer": {"pending": 1, "idle_ms": 5}}}
+
+        redis_manager = RecoveringRedisManager()
+        redis_manager.publish("2-0", {"market_id": "B"})
+        handled = []
+        consumer = self._consumer(
+            redis_manager, lambda messages: handled.extend(m[0] for m in messages),
+            block_ms=10, claim_idle_ms=30000, max_deliveries=2,
+        )
+
+        # Act
+        consumer.run(lambda: len(handled) == 2)
+        stats = consumer.report_stats()
+
+        # Assert
+        self.assertEqual(handled, ["1-0", "2-0"])
+        self.assertEqual(redis_manager.claims, [(30000, 2)])
+        self.assertEqual(stats["pending"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,176 @@
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from cache.TokenIdCache import TokenIdCache
+
+
+class FakeRedisHash:
+    """Just enough of a redis-py client for a single hash."""
+
+    def __init__(self):
+        self.data = {}
+        self.hmget_calls = 0
+
+    def hmget(self, name, keys):
+        self.hmget_calls += 1
+        return [self.data.get((name, key)) for key in keys]
+
+    def hset(self, name, mapping):
+        for key, value in mapping.items():
+            self.data[(name, key)] = value
+
+
+class FakeGamma:
+    def __init__(self, known, delay=0.0):
+        self.known = known
+        self.delay = delay
+        self.calls = []
+
+    def __call__(self, condition_ids):
+        self.calls.append(list(condition_ids))
+        time.sleep(self.delay)
+        return {cid: self.known[cid] for cid in condition_ids if cid in self.known}
+
+
+KNOWN = {f"0x{i}": [f"yes-{i}", f"no-{i}"] for i in range(10)}
+
+
+class TestTokenIdCache(unittest.TestCase):
+
+    def test_misses_are_fetched_in_one_batch_and_then_cached(self):
+        """
+        Test that misses go to Gamma in a single call, unknown IDs are left out, and repeated
+        lookups are served from the LRU.
+        """
+        # Arrange
+        gamma = FakeGamma(KNOWN)
+        redis_client = FakeRedisHash()
+        cache = TokenIdCache(gamma, redis_client=redis_client)
+
+        # Act
+        first = cache.get_many(["0x1", "0x2", "0x3", "0xunknown"])
+        second = cache.get_many(["0x1", "0x2", "0x3"])
+
+        # Assert
+        self.assertEqual(first, {"0x1": KNOWN["0x1"], "0x2": KNOWN["0x2"], "0x3": KNOWN["0x3"]})
+        self.assertEqual(second, {"0x1": KNOWN["0x1"], "0x2": KNOWN["0x2"], "0x3": KNOWN["0x3"]})
+        self.assertEqual(gamma.calls, [["0x1", "0x2", "0x3", "0xunknown"]])
+        self.assertEqual(redis_client.hmget_calls, 1)
+        self.assertEqual(cache.hits, 3)
+
+    def test_redis_hash_is_shared_between_instances(self):
+        """
+        Test that a second process-level cache resolves IDs from Redis without calling Gamma.
+        """
+        # Arrange
+        redis_client = FakeRedisHash()
+        TokenIdCache(FakeGamma(KNOWN), redis_client=redis_client).get_many(["0x4", "0x5"])
+        gamma = FakeGamma(KNOWN)
+        cache = TokenIdCache(gamma, redis_client=redis_client)
+
+        # Act
+        result = cache.get_many(["0x4", "0x5", "0x6"])
+
+        # Assert
+        self.assertEqual(result, {cid: KNOWN[cid] for cid in ["0x4", "0x5", "0x6"]})
+        self.assertEqual(gamma.calls, [["0x6"]])
+        self.assertEqual(cache.redis_hits, 2)
+
+    def test_concurrent_lookups_share_one_fetch(self):
+        """
+        Test that threads asking for the same missing ID wait for the fetch already in flight.
+        """
+        # Arrange
+        gamma = FakeGamma(KNOWN, delay=0.1)
+        cache = TokenIdCache(gamma)
+        barrier = threading.Barrier(8)
+
+        def lookup():
+            barrier.wait()
+            return cache.get("0x7")
+
+        # Act
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda _: lookup(), range(8)))
+
+        # Assert
+        self.assertEqual(results, [KNOWN["0x7"]] * 8)
+        self.assertEqual(len(gamma.calls), 1)
+
+    def test_lru_evicts_least_recently_used(self):
+        """
+        Test that the in-process level is bounded and keeps recently used entries.
+        """
+        # Arrange
+        gamma = FakeGamma(KNOWN)
+        cache = TokenIdCache(gamma, max_size=2)
+        cache.get_many(["0x1", "0x2"])
+        cache.get("0x1")
+
+        # Act
+        cache.get("0x3")
+        cache.get_many(["0x1", "0x2"])
+
+        # Assert
+        self.assertEqual(gamma.calls, [["0x1", "0x2"], ["0x3"], ["0x2"]])
+
+    def test_redis_errors_fall_back_to_gamma(self):
+        """
+        Test that an unavailable Redis does not stop lookups.
+        """
+        # Arrange
+        class BrokenRedis:
+            def hmget(self, name, keys):
+                raise ConnectionError("redis down")
+
+            def hset(self, name, mapping):
+                raise ConnectionError("redis down")
+
+        gamma = FakeGamma(KNOWN)
+        cache = TokenIdCache(gamma, redis_client=BrokenRedis())
+
+        # Act
+        result = cache.get("0x9")
+
+        # Assert
+        self.assertEqual(result, KNOWN["0x9"])
+        self.assertEqual(gamma.calls, [["0x9"]])
+
+    def test_unreachable_redis_is_not_retried_on_every_lookup(self):
+        """
+        Test that once Redis fails, lookups are served from the in-process LRU and Gamma without
+        trying Redis again until the retry interval has passed.
+        """
+        # Arrange
+        class DownRedis:
+            def __init__(self):
+                self.calls = 0
+
+            def hmget(self, name, keys):
+                self.calls += 1
+                raise ConnectionError("Connection refused")
+
+            def hset(self, name, mapping):
+                self.calls += 1
+                raise ConnectionError("Connection refused")
+
+        redis_client = DownRedis()
+        gamma = FakeGamma(KNOWN)
+        cache = TokenIdCache(gamma, redis_client=redis_client)
+
+        # Act
+        with self.assertLogs(level="WARNING"):
+            first = cache.get_many(["0x1", "0x2"])
+        second = cache.get_many(["0x1", "0x3"])
+
+        # Assert
+        self.assertEqual(first, {"0x1": KNOWN["0x1"], "0x2": KNOWN["0x2"]})
+        self.assertEqual(second, {"0x1": KNOWN["0x1"], "0x3": KNOWN["0x3"]})
+        self.assertEqual(gamma.calls, [["0x1", "0x2"], ["0x3"]])
+        self.assertEqual(redis_client.calls, 1)
+        self.assertEqual(cache.hits, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()